@@ -0,0 +1,91 @@
+"""
+Benchmark: fixed versus adaptive concurrency against a saturating gateway
+
+A simulated gateway serves CAPACITY requests at a time in LATENCY each;
+the requests above that wait (the latency grows) and beyond QUEUE_LIMIT
+waiting requests it answers 429 at once. The same bulk run is made with a
+fixed low concurrency, a fixed high concurrency, and an AdaptiveLimiter
+capped at the high one. Reports throughput, 429 responses and the final
+limit.
+
+Usage (from the repository root, after ``pip install -e .``):
+    python benchmarks/bench_adaptive.py
+"""
+
+import threading
+import time
+from collections import deque
+
+from fasoarzeka.adaptive import AdaptiveLimiter
+from fasoarzeka.bulk import bulk_map
+from fasoarzeka.exceptions import ArzekaAPIError
+
+CAPACITY = 16  # Requests the gateway serves at a time
+QUEUE_LIMIT = 8  # Waiting requests before it sheds load
+LATENCY = 0.01  # Seconds per request
+CALLS = 2_000
+LOW, HIGH = 4, 64
+
+
+class Gateway:
+    """Serves CAPACITY requests at a time, queues a few, rejects the rest"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.free = CAPACITY
+        self.queue = deque()
+        self.rejected = 0
+
+    def call(self, _):
+        with self.lock:
+            turn = None
+            if self.free and not self.queue:
+                self.free -= 1
+            elif len(self.queue) >= QUEUE_LIMIT:
+                self.rejected += 1
+                raise ArzekaAPIError("Too many requests", status_code=429)
+            else:
+                turn = threading.Event()
+                self.queue.append(turn)
+        if turn is not None:
+            turn.wait()
+        time.sleep(LATENCY)
+        with self.lock:
+            if self.queue:
+                self.queue.popleft().set()
+            else:
+                self.free += 1
+
+
+def run(label, concurrency=None, limiter=None):
+    gateway = Gateway()
+    start = time.perf_counter()
+    ok = sum(
+        outcome.ok
+        for outcome in bulk_map(
+            gateway.call,
+            range(CALLS),
+            concurrency=concurrency or HIGH,
+            limiter=limiter,
+        )
+    )
+    elapsed = time.perf_counter() - start
+    limit = f", final limit {limiter.limit}" if limiter else ""
+    print(
+        f"{label:<22} {ok / elapsed:7.0f} ok/s, {ok} ok, "
+        f"{gateway.rejected} rejected (429){limit}"
+    )
+
+
+def main():
+    print(
+        f"Gateway: {CAPACITY} concurrent, {QUEUE_LIMIT} queued, "
+        f"{LATENCY * 1e3:.0f} ms; {CALLS} calls"
+    )
+    run(f"fixed {LOW}", concurrency=LOW)
+    run(f"fixed {HIGH}", concurrency=HIGH)
+    run(f"adaptive (max {HIGH})", limiter=AdaptiveLimiter(max_limit=HIGH))
+
+
+if __name__ == "__main__":
+    main()
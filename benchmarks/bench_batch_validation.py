@@ -0,0 +1,89 @@
+"""
+Benchmark: pre-screening a payout batch before any network call
+
+Compares validating each payment with build_payment_data (which also signs
+it) and validate_payment_batch on columns and on rows.
+
+Usage (from the repository root, after ``pip install -e .[numpy]``):
+    python benchmarks/bench_batch_validation.py [rows]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from fasoarzeka import protocol
+from fasoarzeka.exceptions import ArzekaValidationError
+from fasoarzeka.validation import validate_payment_batch
+
+
+def make_columns(rows):
+    rng = np.random.default_rng(0)
+    amounts = rng.integers(50, 100_000, rows)
+    lastnames = np.where(rng.random(rows) < 0.01, "", "Ouedraogo")
+    return {
+        "amount": amounts,
+        "merchant_id": np.full(rows, "M1"),
+        "firstname": np.full(rows, "Awa"),
+        "lastname": lastnames,
+        "mobile": np.full(rows, "70123456"),
+    }
+
+
+def to_rows(columns):
+    size = len(columns["amount"])
+    return [
+        {
+            "amount": int(columns["amount"][i]),
+            "merchant_id": str(columns["merchant_id"][i]),
+            "additional_info": {
+                "firstname": str(columns["firstname"][i]),
+                "lastname": str(columns["lastname"][i]),
+                "mobile": str(columns["mobile"][i]),
+            },
+        }
+        for i in range(size)
+    ]
+
+
+def one_by_one(rows):
+    invalid = 0
+    for row in rows:
+        try:
+            protocol.build_payment_data(
+                row["amount"],
+                row["merchant_id"],
+                "https://example.com/webhook",
+                "https://example.com/return",
+                dict(row["additional_info"]),
+                "secret",
+                "ORDER",
+            )
+        except ArzekaValidationError:
+            invalid += 1
+    return invalid
+
+
+def timed(label, func):
+    start = time.perf_counter()
+    result = func()
+    print(f"{label:<35} {(time.perf_counter() - start) * 1000:9.1f} ms")
+    return result
+
+
+def main(rows: int = 100_000):
+    columns = make_columns(rows)
+    payment_rows = to_rows(columns)
+    print(f"{rows} payments\n")
+
+    timed("build_payment_data per row", lambda: one_by_one(payment_rows))
+    timed("validate_payment_batch (rows)", lambda: validate_payment_batch(payment_rows))
+    report = timed(
+        "validate_payment_batch (columns)", lambda: validate_payment_batch(columns)
+    )
+    print(f"\n{len(report.errors)} invalid payment(s)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
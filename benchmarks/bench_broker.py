@@ -0,0 +1,84 @@
+"""
+Benchmark: token from the broker versus authenticating
+
+Each iteration plays a short-lived process: a new ArzekaPayment gets a
+token, either by authenticating against a local HTTP server standing in
+for the gateway (new connection, plus AUTH_LATENCY of server time), or
+from a TokenBroker over its Unix socket. Over the Internet and TLS the
+direct path costs far more than here.
+
+Usage (from the repository root, after ``pip install -e .``):
+    python benchmarks/bench_broker.py
+"""
+
+import json
+import logging
+import os
+import statistics
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from fasoarzeka import ArzekaPayment
+from fasoarzeka.broker import BrokerTokenProvider, TokenBroker
+
+ITERATIONS = 200
+AUTH_LATENCY = 0.005  # Server time of an authentication
+
+BODY = json.dumps({"access_token": "tok", "expires_in": 3600}).encode()
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        time.sleep(AUTH_LATENCY)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+def measure(label, make_client):
+    timings = []
+    for _ in range(ITERATIONS):
+        client = make_client()
+        start = time.perf_counter()
+        client.authenticate("user", "password")
+        timings.append(time.perf_counter() - start)
+        client.close()
+    timings.sort()
+    print(
+        f"{label:<10} median {statistics.median(timings) * 1e6:8.0f} µs, "
+        f"p99 {timings[int(len(timings) * 0.99)] * 1e6:8.0f} µs"
+    )
+
+
+def main():
+    logging.disable(logging.INFO)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/"
+    print(
+        f"{ITERATIONS} short-lived clients, local gateway answering "
+        f"authentications in {AUTH_LATENCY * 1e3:.0f} ms"
+    )
+
+    measure("direct", lambda: ArzekaPayment(base_url))
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "broker.sock")
+        with TokenBroker(path):
+            provider = BrokerTokenProvider(path)
+            measure("broker", lambda: ArzekaPayment(base_url, token_provider=provider))
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Benchmark: memory of the streaming bulk runner
+
+Runs bulk_map over generated CSV rows and writes the results, as
+``fasoarzeka bulk-check`` does, and reports the peak traced memory for
+inputs of increasing size. The peak should stay flat.
+
+Usage (from the repository root, after ``pip install -e .``):
+    python benchmarks/bench_bulk.py
+"""
+
+import io
+import time
+import tracemalloc
+
+from fasoarzeka.bulk import RowWriter, bulk_map, read_rows
+
+
+def rows(count):
+    yield "mapped_order_id,transaction_id\n"
+    for index in range(count):
+        yield f"ORDER{index:09d},T{index}\n"
+
+
+class NullStream(io.StringIO):
+    def write(self, text):
+        return len(text)
+
+
+def check(row):
+    return {"status": "SUCCESS", "transaction_id": row["transaction_id"]}
+
+
+def run(count):
+    writer = RowWriter(NullStream())
+    tracemalloc.start()
+    start = time.perf_counter()
+    for outcome in bulk_map(check, read_rows(rows(count)), concurrency=8):
+        writer.write(dict(outcome.item, ok=outcome.ok, **outcome.result))
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak, elapsed
+
+
+def main():
+    for count in (10_000, 100_000):
+        peak, elapsed = run(count)
+        print(
+            f"{count:>7} rows: peak {peak / 1024:7.0f} KiB, "
+            f"{count / elapsed:7.0f} rows/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
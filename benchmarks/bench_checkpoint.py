@@ -0,0 +1,65 @@
+"""
+Benchmark: resuming a bulk run from a checkpoint
+
+Runs a status sweep over simulated orders with a fixed latency per call,
+stops it at 80%, and resumes it from the checkpoint. Reports the calls
+made by the resumed run (instead of all of them again), the checkpoint
+overhead per row and the size of the checkpoint file.
+
+Usage (from the repository root, after ``pip install -e .``):
+    python benchmarks/bench_checkpoint.py [orders]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from fasoarzeka.bulk import BulkCheckpoint, bulk_map
+
+LATENCY = 0.001  # Seconds per simulated check_payment call
+CONCURRENCY = 32
+
+
+def sweep(orders, checkpoint=None, stop_at=None):
+    calls = 0
+
+    def check(order_id):
+        nonlocal calls
+        calls += 1
+        time.sleep(LATENCY)
+        return "SUCCESS"
+
+    items = (f"ORDER{index:09d}" for index in range(orders))
+    start = time.perf_counter()
+    for outcome in bulk_map(
+        check, items, concurrency=CONCURRENCY, checkpoint=checkpoint
+    ):
+        if outcome.index == stop_at:
+            break
+    return calls, time.perf_counter() - start
+
+
+def main(orders: int = 50_000):
+    stop_at = int(orders * 0.8)
+    _, plain = sweep(orders)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "sweep.checkpoint")
+        _, checked = sweep(orders, BulkCheckpoint(path))
+        os.remove(path)
+
+        sweep(orders, BulkCheckpoint(path), stop_at=stop_at)
+        size = os.path.getsize(path)
+        calls, resumed = sweep(orders, BulkCheckpoint(path))
+
+    print(f"full sweep, {orders} orders:   {plain:6.2f} s")
+    print(
+        f"with checkpoint:              {checked:6.2f} s "
+        f"({(checked - plain) / orders * 1e6:+.1f} us/row)"
+    )
+    print(f"checkpoint file at 80%:       {size} bytes")
+    print(f"resume after stop at 80%:     {resumed:6.2f} s, {calls} calls")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50_000)
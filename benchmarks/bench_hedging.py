@@ -0,0 +1,108 @@
+"""
+Benchmark: tail latency of check_payment with and without hedging
+
+A keep-alive HTTP server, in its own process, plays the gateway: most
+lookups take FAST seconds, SLOW_RATE of them take SLOW seconds (a stalled
+worker). THREADS threads check CALLS payments through one ArzekaPayment,
+without hedging and with a HedgePolicy, and the median, p99 and extra
+requests are printed.
+
+Usage (from the repository root, after ``pip install -e .``):
+    python benchmarks/bench_hedging.py
+"""
+
+import json
+import logging
+import multiprocessing
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from fasoarzeka import ArzekaPayment, HedgePolicy
+
+CALLS = 2000
+THREADS = 6  # Plain http:// uses the default pool of 10 connections
+FAST = 0.002
+SLOW = 0.1
+SLOW_RATE = 0.03
+
+BODY = json.dumps({"status": "SUCCESS"}).encode()
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive
+    disable_nagle_algorithm = True  # Headers and body are written separately
+
+    def _reply(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        with self.server.requests.get_lock():
+            self.server.requests.value += 1
+        time.sleep(SLOW if random.random() < SLOW_RATE else FAST)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    do_GET = do_POST = _reply
+
+    def log_message(self, *args):
+        pass
+
+
+class Gateway(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+def serve(server, requests):
+    # In its own process, so that the server does not compete for the GIL
+    random.seed(1)
+    server.requests = requests
+    server.serve_forever()
+
+
+def measure(label, requests, base_url, hedging=None):
+    client = ArzekaPayment(base_url, hedging=hedging)
+    client._set_token("tok", "Bearer", time.time() + 3600)
+    requests.value = 0
+
+    def check(index):
+        start = time.perf_counter()
+        client.check_payment(f"ORDER-{index}")
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(THREADS) as executor:
+        timings = sorted(executor.map(check, range(CALLS)))
+    client.close()
+    print(
+        f"{label:<10} p50 {timings[len(timings) // 2] * 1e3:6.1f} ms, "
+        f"p99 {timings[int(len(timings) * 0.99)] * 1e3:6.1f} ms, "
+        f"max {timings[-1] * 1e3:6.1f} ms, "
+        f"extra requests {(requests.value - CALLS) / CALLS:6.1%}"
+    )
+
+
+def main():
+    logging.disable(logging.INFO)
+    server = Gateway(("127.0.0.1", 0), Handler)
+    requests = multiprocessing.Value("i", 0)
+    process = multiprocessing.Process(target=serve, args=(server, requests))
+    process.start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/"
+    print(
+        f"{CALLS} checks, {THREADS} threads, {SLOW_RATE:.0%} of lookups "
+        f"take {SLOW * 1e3:.0f} ms instead of {FAST * 1e3:.0f} ms"
+    )
+
+    measure("plain", requests, base_url)
+    policy = HedgePolicy()
+    measure("hedged", requests, base_url, hedging=policy)
+    print(f"hedging delay {policy.delay * 1e3:.1f} ms, {policy.snapshot()}")
+    policy.close()
+    time.sleep(SLOW)  # Let the slower copies of hedged lookups finish
+    process.terminate()
+
+
+if __name__ == "__main__":
+    main()
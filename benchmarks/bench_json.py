@@ -0,0 +1,75 @@
+"""
+Benchmark: JSON encoding of additionalInfo and decoding of responses
+
+Compares the former ``json.dumps(..., separators=(",", ":"))`` /
+``json.loads`` calls with each available codec. Encoded payloads are
+checked to be identical, since they are part of the payment signature.
+
+Usage (from the repository root, after ``pip install -e .``):
+    python benchmarks/bench_json.py [iterations]
+"""
+
+import json
+import sys
+import timeit
+
+from fasoarzeka.codec import available_codecs, get_codec
+
+ADDITIONAL_INFO = {
+    "firstname": "Awa",
+    "lastname": "Ouedraogo",
+    "mobile": "70123456",
+    "generateReceipt": False,
+    "paymentDescription": "",
+    "accountingOffice": "",
+    "accountantName": "",
+    "address": "",
+}
+ADDITIONAL_INFO_ACCENTS = dict(ADDITIONAL_INFO, firstname="Aïcha", lastname="Kaboré")
+
+RESPONSE = json.dumps(
+    {
+        "status": "SUCCESS",
+        "mappedOrderId": "251022.143025.123456",
+        "transId": "TX1234567890",
+        "amount": 1000,
+        "fees": 15,
+        "merchantId": "M1",
+        "customer": {"msisdn": "22670123456", "operator": "ORANGE"},
+        "message": "Paiement effectué avec succès",
+        "history": [{"status": "PENDING", "at": "2025-10-22T14:30:25Z"}] * 4,
+    }
+).encode()
+
+
+def bench(label, func, number):
+    seconds = min(timeit.repeat(func, number=number, repeat=5))
+    per_call = seconds / number * 1e6
+    print(f"  {label:<12} {per_call:7.2f} us/call")
+    return per_call
+
+
+def main(number: int = 50000):
+    print(f"{number} iterations, best of 5, codecs: {', '.join(available_codecs())}")
+    cases = [
+        ("dumps additionalInfo (ASCII)", ADDITIONAL_INFO),
+        ("dumps additionalInfo (accents)", ADDITIONAL_INFO_ACCENTS),
+    ]
+    for title, value in cases:
+        print(f"\n{title}")
+        expected = json.dumps(value, separators=(",", ":"))
+        bench("json.dumps", lambda: json.dumps(value, separators=(",", ":")), number)
+        for name in available_codecs():
+            codec = get_codec(name)
+            assert codec.dumps(value) == expected, name
+            bench(name, lambda: codec.dumps(value), number)
+
+    print(f"\nloads response ({len(RESPONSE)} bytes)")
+    bench("json.loads", lambda: json.loads(RESPONSE), number)
+    for name in available_codecs():
+        codec = get_codec(name)
+        bench(name, lambda: codec.loads(RESPONSE), number)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
@@ -0,0 +1,60 @@
+"""
+Benchmark: reading the status of a payment response
+
+Compares decoding the whole body, as ``check_payment`` does by default,
+with a ``LazyResponse`` (``lazy_responses=True``) that is only asked for
+its "status" field, or not read at all.
+
+Usage (from the repository root, after ``pip install -e .``):
+    python benchmarks/bench_lazy_response.py [iterations]
+"""
+
+import json
+import sys
+import timeit
+
+from fasoarzeka.codec import available_codecs, get_codec
+from fasoarzeka.models import LazyResponse
+from fasoarzeka.protocol import decode_body
+
+RESPONSE = json.dumps(
+    {
+        "status": "SUCCESS",
+        "mappedOrderId": "251022.143025.123456",
+        "transId": "TX1234567890",
+        "amount": 1000,
+        "fees": 15,
+        "merchantId": "M1",
+        "customer": {"msisdn": "22670123456", "operator": "ORANGE"},
+        "message": "Paiement effectué avec succès",
+        "history": [{"state": "PENDING", "at": "2025-10-22T14:30:25Z"}] * 4,
+    }
+).encode()
+
+
+def bench(label, func, number):
+    seconds = min(timeit.repeat(func, number=number, repeat=5))
+    per_call = seconds / number * 1e6
+    print(f"  {label:<22} {per_call:7.2f} us/call")
+    return per_call
+
+
+def main(number: int = 50000):
+    print(f"{number} iterations, best of 5, response of {len(RESPONSE)} bytes")
+    for name in available_codecs():
+        codec = get_codec(name)
+        print(f"\n{name}")
+        assert LazyResponse(RESPONSE, codec)["status"] == "SUCCESS"
+        bench(
+            "decode, read status",
+            lambda: decode_body(RESPONSE, codec)["status"],
+            number,
+        )
+        bench(
+            "lazy, read status", lambda: LazyResponse(RESPONSE, codec)["status"], number
+        )
+        bench("lazy, not read", lambda: LazyResponse(RESPONSE, codec), number)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
@@ -0,0 +1,80 @@
+"""
+Benchmark: payment ledger write latency and pending-payment query
+
+Measures what recording a status costs on the payment path, with direct
+writes and in batching mode, and the "pending for more than 10 minutes"
+query on a large ledger, with the partial index and with a full scan.
+
+Usage (from the repository root, after ``pip install -e .``):
+    python benchmarks/bench_ledger.py [payments]
+"""
+
+import os
+import sys
+import tempfile
+import time
+import timeit
+
+from fasoarzeka.ledger import PaymentLedger
+
+
+def record_latency(path, count, **options):
+    ledger = PaymentLedger(path, **options)
+    start = time.perf_counter()
+    for i in range(count):
+        ledger.record_status(f"ORDER{i}", {"status": "PENDING"})
+    elapsed = time.perf_counter() - start
+    ledger.close()
+    return elapsed / count * 1e6
+
+
+def fill(ledger, count):
+    """count payments, 0.1% still open, spread over the last day"""
+    now = time.time()
+    rows = [
+        (f"ORDER{i}", "PENDING" if i % 1000 == 0 else "SUCCESS", i % 1000 != 0, None)
+        for i in range(count)
+    ]
+    with ledger._connection:
+        ledger._connection.executemany(
+            "INSERT INTO payments (mapped_order_id, status, final, transaction_id, "
+            "created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+            [row + (now - 86400 * i / count,) * 2 for i, row in enumerate(rows)],
+        )
+
+
+def main(count: int = 200000):
+    with tempfile.TemporaryDirectory() as directory:
+        print("record_status latency on the caller thread (file database)")
+        for label, options in (
+            ("direct write", {}),
+            ("batch_size=500", {"batch_size": 500}),
+        ):
+            path = os.path.join(directory, f"{label}.db")
+            print(
+                f"  {label:<16} {record_latency(path, 5000, **options):8.2f} us/record"
+            )
+
+        ledger = PaymentLedger(os.path.join(directory, "query.db"))
+        fill(ledger, count)
+        cutoff = time.time() - 600
+        queries = {
+            "partial index": "SELECT * FROM payments WHERE final = 0 "
+            "AND created_at <= ? ORDER BY created_at",
+            "full scan": "SELECT * FROM payments NOT INDEXED WHERE final = 0 "
+            "AND created_at <= ? ORDER BY created_at",
+        }
+        print(f"\npending older than 10 min, {count} payments, 0.1% open")
+        for label, sql in queries.items():
+
+            def run():
+                return ledger._connection.execute(sql, (cutoff,)).fetchall()
+
+            found = len(run())
+            seconds = min(timeit.repeat(run, number=10, repeat=3)) / 10
+            print(f"  {label:<16} {seconds * 1e3:8.2f} ms ({found} rows)")
+        ledger.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
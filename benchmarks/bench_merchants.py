@@ -0,0 +1,112 @@
+"""
+Benchmark: one client per merchant versus a MerchantPool
+
+A local keep-alive HTTP server plays the gateway and counts the TCP
+connections it accepts. MERCHANTS merchants each authenticate and check
+CALLS payments, from THREADS threads, either with one ArzekaPayment per
+merchant (one connection pool each) or with a MerchantPool (one pool for
+all). Over TLS every new connection also costs a handshake.
+
+Usage (from the repository root, after ``pip install -e .``):
+    python benchmarks/bench_merchants.py
+"""
+
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from fasoarzeka import ArzekaPayment, MerchantPool
+
+MERCHANTS = 50
+CALLS = 20
+THREADS = 8
+
+BODY = json.dumps(
+    {"access_token": "tok", "expires_in": 3600, "status": "SUCCESS"}
+).encode()
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive
+    disable_nagle_algorithm = True  # Headers and body are written separately
+
+    def _reply(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    do_GET = do_POST = _reply
+
+    def log_message(self, *args):
+        pass
+
+
+class Gateway(ThreadingHTTPServer):
+    daemon_threads = True
+    connections = 0
+
+    def process_request(self, request, client_address):
+        self.connections += 1
+        super().process_request(request, client_address)
+
+
+def run(make_call, close):
+    calls = [
+        (f"m{merchant}", f"ORDER-{merchant}-{call}")
+        for call in range(CALLS)
+        for merchant in range(MERCHANTS)
+    ]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(THREADS) as executor:
+        list(executor.map(lambda args: make_call(*args), calls))
+    elapsed = time.perf_counter() - start
+    close()
+    return elapsed
+
+
+def main():
+    logging.disable(logging.INFO)
+    server = Gateway(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/"
+    total = MERCHANTS * CALLS
+    print(f"{MERCHANTS} merchants x {CALLS} checks, {THREADS} threads")
+
+    clients = {}
+    for merchant in range(MERCHANTS):
+        client = ArzekaPayment(base_url, pool_maxsize=THREADS)
+        client._set_token(None, None, None, f"user{merchant}", "password")
+        clients[f"m{merchant}"] = client
+
+    def close_clients():
+        for client in clients.values():
+            client.close()
+
+    elapsed = run(
+        lambda key, order_id: clients[key].check_payment(order_id), close_clients
+    )
+    print(
+        f"one client per merchant: {total / elapsed:6.0f} calls/s, "
+        f"{server.connections} connections"
+    )
+
+    server.connections = 0
+    pool = MerchantPool(base_url, pool_maxsize=THREADS)
+    for merchant in range(MERCHANTS):
+        pool.add_merchant(f"m{merchant}", f"user{merchant}", "password", "secret")
+    elapsed = run(pool.check_payment, pool.close)
+    print(
+        f"MerchantPool:            {total / elapsed:6.0f} calls/s, "
+        f"{server.connections} connections"
+    )
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
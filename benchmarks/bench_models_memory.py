@@ -0,0 +1,73 @@
+"""
+Benchmark: memory held per tracked payment status
+
+Compares keeping the dict returned by ``check_payment`` with keeping the
+``PaymentStatus`` returned when ``typed_results=True``. Each response body
+is a distinct bytes object, as it is when read from the network.
+
+Usage (from the repository root, after ``pip install -e .``):
+    python benchmarks/bench_models_memory.py [count]
+"""
+
+import gc
+import json
+import sys
+import time
+import tracemalloc
+
+from fasoarzeka.codec import get_codec
+from fasoarzeka.models import PaymentStatus
+
+STATUSES = ("SUCCESS", "PENDING", "FAILED")
+
+
+def make_bodies(count):
+    return [
+        json.dumps(
+            {
+                "status": STATUSES[i % 3],
+                "mappedOrderId": f"251022.1430{i:06d}",
+                "transId": f"TX{i:010d}",
+                "amount": 1000 + i % 500,
+                "fees": 15,
+                "merchantId": "M1",
+                "customer": {"msisdn": f"2267{i:07d}", "operator": "ORANGE"},
+                "message": "Paiement effectué avec succès",
+            }
+        ).encode()
+        for i in range(count)
+    ]
+
+
+def measure(label, build, bodies):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    results = [build(body) for body in bodies]
+    elapsed = time.perf_counter() - start
+    # Body bytes are already allocated, only what the results add is counted
+    current = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    per_item = current / len(bodies)
+    print(
+        f"  {label:<16} {per_item:7.0f} bytes/result "
+        f"{current / 2**20:7.1f} MiB  {elapsed / len(bodies) * 1e6:5.2f} us/result"
+    )
+    del results
+    return per_item
+
+
+def main(count: int = 100000):
+    codec = get_codec()
+    bodies = make_bodies(count)
+    print(f"{count} payment statuses, codec: {codec.name}")
+    # Dicts drop the body, PaymentStatus keeps it: count it for the model
+    body_size = sum(sys.getsizeof(body) for body in bodies) / count
+    as_dict = measure("dict", codec.loads, bodies)
+    typed = measure("PaymentStatus", lambda body: PaymentStatus(body, codec), bodies)
+    typed += body_size
+    print(f"  PaymentStatus + body: {typed:.0f} bytes/result ({typed / as_dict:.0%})")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
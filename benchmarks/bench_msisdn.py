@@ -0,0 +1,58 @@
+"""
+Benchmark: cleaning and validating a subscriber list
+
+Compares one format_msisdn + validate_phone_number call per number with the
+batch normalize_msisdns API, on a list and on a NumPy array.
+
+Usage (from the repository root, after ``pip install -e .``):
+    python benchmarks/bench_msisdn.py [rows]
+"""
+
+import random
+import sys
+import time
+
+from fasoarzeka.msisdn import normalize_msisdns
+from fasoarzeka.utils import format_msisdn, validate_phone_number
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+FORMATS = ["+226 {} {} {} {}", "226-{}-{}-{}-{}", "226{}{}{}{}", "({}) {} {} {}"]
+
+
+def make_numbers(rows):
+    rng = random.Random(0)
+    return [
+        rng.choice(FORMATS).format(*(f"{rng.randint(0, 99):02d}" for _ in range(4)))
+        for _ in range(rows)
+    ]
+
+
+def timed(label, func, baseline=None):
+    start = time.perf_counter()
+    func()
+    seconds = time.perf_counter() - start
+    speedup = f"  x{baseline / seconds:.1f}" if baseline else ""
+    print(f"{label:<35} {seconds:8.3f} s{speedup}")
+    return seconds
+
+
+def main(rows: int = 1_000_000):
+    numbers = make_numbers(rows)
+    print(f"{rows} numbers\n")
+
+    baseline = timed(
+        "per number (format + validate)",
+        lambda: [(format_msisdn(n), validate_phone_number(n)) for n in numbers],
+    )
+    timed("normalize_msisdns (list)", lambda: normalize_msisdns(numbers), baseline)
+    if np is not None:
+        array = np.array(numbers)
+        timed("normalize_msisdns (numpy)", lambda: normalize_msisdns(array), baseline)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,59 @@
+"""
+Benchmark: outbox enqueue latency and drain throughput
+
+``enqueue`` replaces a gateway call on the request path: this measures its
+cost (a committed SQLite insert) and how fast a worker pool drains the
+outbox through a client whose calls take a fixed latency.
+
+Usage (from the repository root, after ``pip install -e .``):
+    python benchmarks/bench_outbox.py [jobs]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from fasoarzeka.outbox import Outbox, OutboxWorker
+
+GATEWAY_LATENCY = 0.02  # Seconds per simulated send_sms call
+
+
+class SlowClient:
+    def send_sms(self, mobile, message):
+        time.sleep(GATEWAY_LATENCY)
+        return {"status": "SENT"}
+
+
+def fill(outbox, count):
+    for index in range(count):
+        outbox.enqueue("send_sms", mobile=f"2267{index:07d}", message="Merci")
+
+
+def main(count: int = 2000):
+    with tempfile.TemporaryDirectory() as directory:
+        with Outbox(os.path.join(directory, "enqueue.db")) as outbox:
+            start = time.perf_counter()
+            fill(outbox, count)
+            elapsed = time.perf_counter() - start
+        print(f"enqueue: {elapsed / count * 1e6:.1f} us/job ({count} jobs, WAL file)")
+        print(
+            f"send_sms on the request path: {GATEWAY_LATENCY * 1e3:.0f} ms (simulated)"
+        )
+
+        for workers in (1, 8, 32):
+            jobs = 50 * workers
+            with Outbox(os.path.join(directory, f"drain{workers}.db")) as outbox:
+                fill(outbox, jobs)
+                worker = OutboxWorker(outbox, SlowClient(), workers=workers)
+                start = time.perf_counter()
+                worker.start()
+                while len(outbox):
+                    time.sleep(0.005)
+                elapsed = time.perf_counter() - start
+                worker.stop()
+            print(f"drain, {workers:>2} thread(s): {jobs / elapsed:7.0f} jobs/s")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
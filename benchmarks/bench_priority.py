@@ -0,0 +1,98 @@
+"""
+Benchmark: interactive latency while a background sweep runs
+
+A simulated gateway serves POOL requests at a time, each taking LATENCY.
+A background sweep keeps many threads calling it while one thread makes
+interactive calls. Reports the interactive latency without scheduling and
+with a PriorityScheduler (background in its own lane).
+
+Usage (from the repository root, after ``pip install -e .``):
+    python benchmarks/bench_priority.py
+"""
+
+import statistics
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+
+from fasoarzeka.priority import BACKGROUND, INTERACTIVE, PriorityScheduler
+
+POOL = 8  # Concurrent requests the pool (and gateway) can carry
+LATENCY = 0.01  # Seconds per request
+SWEEP_THREADS = 32
+INTERACTIVE_CALLS = 100
+
+
+class Gateway:
+    """Serves POOL requests at a time, the others wait in arrival order"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.free = POOL
+        self.queue = deque()
+
+    def call(self):
+        with self.lock:
+            turn = None
+            if self.free and not self.queue:
+                self.free -= 1
+            else:
+                turn = threading.Event()
+                self.queue.append(turn)
+        if turn is not None:
+            turn.wait()
+        time.sleep(LATENCY)
+        with self.lock:
+            if self.queue:
+                self.queue.popleft().set()  # Hand the slot over
+            else:
+                self.free += 1
+
+
+def run(scheduler):
+    gateway = Gateway()
+    stop = threading.Event()
+
+    def call(lane):
+        slot = nullcontext() if scheduler is None else scheduler.slot(lane)
+        with slot:
+            gateway.call()
+
+    def sweep():
+        while not stop.is_set():
+            call(BACKGROUND)
+
+    threads = [threading.Thread(target=sweep) for _ in range(SWEEP_THREADS)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+
+    latencies = []
+    for _ in range(INTERACTIVE_CALLS):
+        start = time.perf_counter()
+        call(INTERACTIVE)
+        latencies.append(time.perf_counter() - start)
+        time.sleep(0.005)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    latencies.sort()
+    return statistics.median(latencies), latencies[int(len(latencies) * 0.99) - 1]
+
+
+def main():
+    print(f"gateway latency {LATENCY * 1e3:.0f} ms, {SWEEP_THREADS} sweep threads")
+    for label, scheduler in (
+        ("shared pool", None),
+        ("priority lanes", PriorityScheduler(POOL, limits={BACKGROUND: 6})),
+    ):
+        median, p99 = run(scheduler)
+        print(
+            f"{label:15} interactive p50 {median * 1e3:6.1f} ms, "
+            f"p99 {p99 * 1e3:6.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Benchmark: nightly reconciliation of an order export
+
+Reconciles simulated orders against a gateway whose check_payment takes a
+fixed latency, and compares checking them one at a time with the
+Reconciler: a first run with concurrent checks, a second run where final
+statuses come from the ledger, and an incremental run.
+
+Usage (from the repository root, after ``pip install -e .``):
+    python benchmarks/bench_reconcile.py [orders]
+"""
+
+import sys
+import time
+
+from fasoarzeka.ledger import PaymentLedger
+from fasoarzeka.reconcile import Reconciler
+
+LATENCY = 0.002  # Seconds per simulated check_payment call
+CONCURRENCY = 32
+PENDING_EVERY = 20  # 5% of the orders are still pending on the gateway
+
+
+class Gateway:
+    def __init__(self):
+        self.calls = 0
+
+    def check_payment(self, mapped_order_id, transaction_id=None):
+        self.calls += 1
+        time.sleep(LATENCY)
+        index = int(mapped_order_id[5:])
+        return {"status": "PENDING" if index % PENDING_EVERY == 0 else "SUCCESS"}
+
+
+def orders(count):
+    for index in range(count):
+        yield {"mapped_order_id": f"ORDER{index}", "fulfilled": "1", "updated_at": 0}
+
+
+def timed(reconciler, gateway, count, **kwargs):
+    gateway.calls = 0
+    start = time.perf_counter()
+    lines = sum(1 for _ in reconciler.reconcile(orders(count), **kwargs))
+    return time.perf_counter() - start, gateway.calls, lines
+
+
+def main(count: int = 10_000):
+    gateway = Gateway()
+    sample = 200
+    start = time.perf_counter()
+    for order in orders(sample):
+        gateway.check_payment(order["mapped_order_id"])
+    sequential = (time.perf_counter() - start) / sample * count
+    print(f"one at a time (estimated): {sequential:6.2f} s, {count} calls")
+
+    with PaymentLedger() as ledger:
+        reconciler = Reconciler(gateway, ledger, concurrency=CONCURRENCY)
+        for label, kwargs in (
+            ("first run", {}),
+            ("cached final statuses", {}),
+            ("incremental", {"incremental": True}),
+        ):
+            elapsed, calls, lines = timed(reconciler, gateway, count, **kwargs)
+            print(
+                f"{label + ':':26} {elapsed:6.2f} s, {calls} calls, "
+                f"{lines} discrepancies"
+            )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
@@ -0,0 +1,128 @@
+"""
+Micro-benchmark: per-request CPU spent building requests
+
+Compares the former hot path (header dict rebuilt on every call, urljoin,
+query string concatenation, form encoding left to requests) with the
+prepared-request path (precomputed endpoint URLs, cached Authorization
+header, body encoded once). No network access is needed.
+
+Usage (from the repository root, after ``pip install -e .``):
+    python benchmarks/bench_request_building.py [iterations]
+"""
+
+import sys
+import timeit
+from urllib.parse import urljoin
+
+import requests
+
+from fasoarzeka import protocol
+
+BASE_URL = "https://pgw-test.fasoarzeka.bf/"
+TOKEN_TYPE = "Bearer"
+TOKEN = "eyJhbGciOiJIUzI1NiJ9." + "x" * 300
+
+
+def legacy_headers():
+    return {
+        "Content-Type": "application/x-www-form-urlencoded",
+        "User-Agent": "arzeka-payment-client/1.0",
+        "Accept-Language": "fr-FR,en-GB;q=0.8,en;q=0.6",
+        "Authorization": f"{TOKEN_TYPE} {TOKEN}",
+    }
+
+
+def legacy_check_payment(order_id, trans_id):
+    endpoint = (
+        protocol.PAYMENT_BASE_URL
+        + protocol.PAYMENT_VERIFICATION_ENDPOINT
+        + f"?mappedOrderId={order_id}"
+    )
+    if trans_id:
+        endpoint += f"&transId={trans_id}"
+    url = urljoin(BASE_URL, endpoint)
+    return requests.Request("POST", url, headers=legacy_headers()).prepare()
+
+
+def legacy_send_sms(mobile, message):
+    url = urljoin(BASE_URL, protocol.SMS_BASE_URL + protocol.SEND_SMS)
+    data = {"msisdn": mobile, "message": message}
+    return requests.Request("POST", url, data=data, headers=legacy_headers()).prepare()
+
+
+ENDPOINTS = protocol.Endpoints(BASE_URL)
+HEADERS = protocol.HeaderCache()
+
+
+def prepared_check_payment(order_id, trans_id):
+    prepared = protocol.prepare_check_payment(
+        ENDPOINTS, HEADERS.get(TOKEN_TYPE, TOKEN), order_id, trans_id
+    )
+    return requests.Request(
+        prepared.method, prepared.url, headers=prepared.headers
+    ).prepare()
+
+
+def prepared_send_sms(mobile, message):
+    prepared = protocol.prepare_send_sms(
+        ENDPOINTS, HEADERS.get(TOKEN_TYPE, TOKEN), mobile, message
+    )
+    return requests.Request(
+        prepared.method, prepared.url, data=prepared.body, headers=prepared.headers
+    ).prepare()
+
+
+def protocol_only_check_payment(order_id, trans_id):
+    return protocol.prepare_check_payment(
+        ENDPOINTS, HEADERS.get(TOKEN_TYPE, TOKEN), order_id, trans_id
+    )
+
+
+def legacy_only_check_payment(order_id, trans_id):
+    endpoint = (
+        protocol.PAYMENT_BASE_URL
+        + protocol.PAYMENT_VERIFICATION_ENDPOINT
+        + f"?mappedOrderId={order_id}"
+    )
+    if trans_id:
+        endpoint += f"&transId={trans_id}"
+    return urljoin(BASE_URL, endpoint), legacy_headers()
+
+
+def bench(label, func, args, number):
+    seconds = min(timeit.repeat(lambda: func(*args), number=number, repeat=5))
+    per_call = seconds / number * 1e6
+    print(f"{label:<45} {per_call:8.2f} us/call")
+    return per_call
+
+
+def main(number: int = 20000):
+    print(f"{number} iterations, best of 5\n")
+    pairs = [
+        (
+            "check_payment (build only)",
+            legacy_only_check_payment,
+            protocol_only_check_payment,
+            ("251022.143025.123456", "TX123"),
+        ),
+        (
+            "check_payment (+ requests.prepare)",
+            legacy_check_payment,
+            prepared_check_payment,
+            ("251022.143025.123456", "TX123"),
+        ),
+        (
+            "send_sms (+ requests.prepare)",
+            legacy_send_sms,
+            prepared_send_sms,
+            ("22670123456", "Votre paiement a été reçu"),
+        ),
+    ]
+    for label, legacy, prepared, args in pairs:
+        before = bench(f"{label} legacy", legacy, args, number)
+        after = bench(f"{label} prepared", prepared, args, number)
+        print(f"{'':<45} saved {before - after:6.2f} us ({1 - after / before:.0%})\n")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,101 @@
+"""
+Benchmark: load on a failing gateway with and without a retry budget
+
+A local HTTP server plays a gateway in a partial outage: FAILURE_RATE of
+the requests get a 503. THREADS threads check CALLS payments through one
+ArzekaPayment, without and with a RetryBudget, and the number of requests
+the gateway received is printed. The session backoff is disabled to keep
+the run short; it does not change the number of requests.
+
+Usage (from the repository root, after ``pip install -e .``):
+    python benchmarks/bench_retry_budget.py
+"""
+
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from fasoarzeka import ArzekaPayment, RetryBudget
+from fasoarzeka.exceptions import ArzekaPaymentError
+
+CALLS = 2000
+THREADS = 8
+FAILURE_RATE = 0.8
+
+BODY = b'{"status": "SUCCESS"}'
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive
+    disable_nagle_algorithm = True  # Headers and body are written separately
+
+    def _reply(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        with self.server.lock:
+            self.server.requests += 1
+        self.send_response(503 if random.random() < FAILURE_RATE else 200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    do_GET = do_POST = _reply
+
+    def log_message(self, *args):
+        pass
+
+
+class Gateway(ThreadingHTTPServer):
+    daemon_threads = True
+    requests = 0
+    lock = threading.Lock()
+
+
+def measure(label, server, base_url, budget=None):
+    client = ArzekaPayment(base_url, retry_budget=budget)
+    # The session only retries https:// URLs; the gateway here is http://
+    adapter = client._session.get_adapter("https://")
+    adapter.max_retries.backoff_factor = 0
+    client._session.mount("http://", adapter)
+    client._set_token("tok", "Bearer", time.time() + 3600)
+    server.requests = 0
+
+    def check(index):
+        try:
+            client.check_payment(f"ORDER-{index}")
+            return True
+        except ArzekaPaymentError:
+            return False
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(THREADS) as executor:
+        succeeded = sum(executor.map(check, range(CALLS)))
+    elapsed = time.perf_counter() - start
+    client.close()
+    print(
+        f"{label:<10} {server.requests:6d} requests "
+        f"({server.requests / CALLS:4.2f} per call), {succeeded} succeeded, "
+        f"{elapsed:5.2f}s"
+    )
+
+
+def main():
+    logging.disable(logging.ERROR)  # Every failed call is logged
+    random.seed(1)
+    server = Gateway(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/"
+    print(f"{CALLS} checks, {THREADS} threads, {FAILURE_RATE:.0%} of requests fail")
+
+    measure("no budget", server, base_url)
+    budget = RetryBudget()
+    measure("budget", server, base_url, budget)
+    print(f"retry budget: {budget.snapshot()}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
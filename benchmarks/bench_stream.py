@@ -0,0 +1,73 @@
+"""
+Benchmark: memory of streaming versus gathering many async status checks
+
+Checks N order IDs with a simulated check coroutine (LATENCY each), at most
+CONCURRENCY at a time, either by gathering one task per order behind a
+semaphore (the usual asyncio.gather pattern) or with abulk_map, which pulls
+order IDs from an async producer as room frees up. Reports wall time and
+peak traced memory.
+
+Usage (from the repository root, after ``pip install -e .``):
+    python benchmarks/bench_stream.py
+"""
+
+import asyncio
+import time
+import tracemalloc
+
+from fasoarzeka.bulk import abulk_map
+
+CONCURRENCY = 64
+LATENCY = 0.001
+
+
+async def check(order_id):
+    await asyncio.sleep(LATENCY)
+    return {"mappedOrderId": order_id, "status": "SUCCESS"}
+
+
+async def order_ids(n):
+    for index in range(n):
+        yield f"ORDER-{index:08d}"
+
+
+async def gathered(n):
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def bounded(order_id):
+        async with semaphore:
+            return await check(order_id)
+
+    ids = [order_id async for order_id in order_ids(n)]
+    paid = 0
+    for status in await asyncio.gather(*(bounded(order_id) for order_id in ids)):
+        paid += status["status"] == "SUCCESS"
+    return paid
+
+
+async def streamed(n):
+    paid = 0
+    async for outcome in abulk_map(check, order_ids(n), CONCURRENCY):
+        paid += outcome.ok and outcome.result["status"] == "SUCCESS"
+    return paid
+
+
+def measure(label, coroutine, n):
+    tracemalloc.start()
+    start = time.perf_counter()
+    paid = asyncio.run(coroutine(n))
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    assert paid == n
+    print(f"{label:<9} n={n:>7}: {elapsed:6.2f}s, peak {peak / 1024:9.0f} KiB")
+
+
+def main():
+    for n in (10_000, 50_000):
+        measure("gather", gathered, n)
+        measure("stream", streamed, n)
+
+
+if __name__ == "__main__":
+    main()
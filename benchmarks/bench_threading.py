@@ -0,0 +1,70 @@
+"""
+Thread-scaling benchmark: signed payment requests built per second
+
+Builds and signs payment requests (validation, JSON encoding, SHA hashing)
+from 1 to N threads sharing one client. On a free-threaded CPython build the
+rate should grow with the number of cores; with the GIL it stays flat, but
+must not collapse because of lock contention in the client.
+
+Usage (from the repository root, after ``pip install -e .``):
+    python benchmarks/bench_threading.py [max_threads] [requests_per_thread]
+"""
+
+import os
+import sys
+import sysconfig
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fasoarzeka import protocol
+from fasoarzeka.arzeka import ArzekaPayment
+
+PAYMENT = {
+    "amount": 1000,
+    "merchant_id": "M1",
+    "link_for_update_status": "https://example.com/webhook",
+    "link_back_to_calling_website": "https://example.com/return",
+    "hash_secret": "secret",
+}
+ADDITIONAL_INFO = {"firstname": "A", "lastname": "B", "mobile": "70123456"}
+
+
+def build_many(client, count):
+    for i in range(count):
+        # build_payment_data fills in the receipt fields of additional_info:
+        # each call gets its own dict, as in real use
+        data = protocol.build_payment_data(
+            mapped_order_id=f"ORDER{i}",
+            additional_info=dict(ADDITIONAL_INFO),
+            **PAYMENT,
+        )
+        protocol.prepare_initiate_payment(
+            client._endpoints, client._get_headers(), data
+        )
+
+
+def main(max_threads: int = os.cpu_count() or 4, per_thread: int = 2000):
+    free_threaded = bool(sysconfig.get_config_var("Py_GIL_DISABLED"))
+    print(f"free-threaded build: {free_threaded}, {per_thread} requests/thread\n")
+
+    client = ArzekaPayment()
+    client._set_token("tok", "Bearer", time.time() + 3600)
+
+    baseline = None
+    threads = 1
+    while threads <= max_threads:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(threads) as executor:
+            for _ in range(threads):
+                executor.submit(build_many, client, per_thread)
+        rate = threads * per_thread / (time.perf_counter() - start)
+        baseline = baseline or rate
+        print(f"{threads:>3} thread(s) {rate:12.0f} req/s  x{rate / baseline:.2f}")
+        threads *= 2
+
+    client.close()
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    main(*args)
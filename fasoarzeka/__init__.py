@@ -13,6 +13,28 @@ from .arzeka import (
     send_sms,
     check_sms_status,
 )
+from .adaptive import AdaptiveLimiter, AsyncAdaptiveLimiter
+from .async_client import AsyncArzekaPayment
+from .broker import BrokerTokenProvider, TokenBroker
+from .bulk import BulkCheckpoint, abulk_map, bulk_map
+from .hedging import HedgePolicy
+from .models import (
+    AuthToken,
+    LazyResponse,
+    PaymentInitiation,
+    PaymentStatus,
+    SmsReceipt,
+)
+from .ledger import PaymentLedger
+from .merchants import MerchantPool
+from .msisdn import normalize_msisdns, stream_msisdns, validate_msisdns
+from .outbox import Outbox, OutboxWorker
+from .parallel import ClientSpec, process_map
+from .priority import AsyncPriorityScheduler, PriorityScheduler, priority_scope
+from .reconcile import Reconciler
+from .retries import RetryBudget
+from .timeouts import deadline_scope
+from .validation import validate_payment_batch
 from .utils import (
     format_msisdn,
     get_reference,
@@ -25,6 +47,27 @@ __author__ = "Mohamed Zeba (m.zeba@mzeba.dev)"
 __all__ = [
     # Classes
     "ArzekaPayment",
+    "AsyncArzekaPayment",
+    "ClientSpec",
+    "AuthToken",
+    "PaymentInitiation",
+    "PaymentStatus",
+    "SmsReceipt",
+    "LazyResponse",
+    "PaymentLedger",
+    "Outbox",
+    "OutboxWorker",
+    "BulkCheckpoint",
+    "Reconciler",
+    "MerchantPool",
+    "TokenBroker",
+    "BrokerTokenProvider",
+    "PriorityScheduler",
+    "AsyncPriorityScheduler",
+    "AdaptiveLimiter",
+    "AsyncAdaptiveLimiter",
+    "HedgePolicy",
+    "RetryBudget",
     # Functions
     "initiate_payment",
     "check_payment",
@@ -33,9 +76,18 @@ __all__ = [
     "get_shared_client",
     "send_sms",
     "check_sms_status",
+    "deadline_scope",
+    "priority_scope",
+    "process_map",
+    "bulk_map",
+    "abulk_map",
     # Utility functions
     "get_reference",
     "format_msisdn",
     "validate_phone_number",
     "generate_hash_signature",
+    "normalize_msisdns",
+    "validate_msisdns",
+    "stream_msisdns",
+    "validate_payment_batch",
 ]
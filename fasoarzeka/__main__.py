@@ -0,0 +1,7 @@
+"""Run the fasoarzeka command: python -m fasoarzeka"""
+
+import sys
+
+from .cli import main
+
+sys.exit(main())
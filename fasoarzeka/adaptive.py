@@ -0,0 +1,313 @@
+"""
+Adaptive concurrency limits
+
+An ``AdaptiveLimiter`` replaces a fixed number of workers. It caps the
+calls in flight and moves the cap with what the gateway shows (AIMD):
+
+- while the latency stays close to its baseline (the fastest recent
+  responses) and the cap is reached, the limit grows by about one call per
+  round trip (additive increase);
+- when the latency climbs above ``tolerance`` times the baseline, the
+  limit is cut by ``latency_backoff``; when the gateway sheds load (429,
+  5xx, timeouts, connection errors) it is cut by ``error_backoff``
+  (multiplicative decrease). Cuts are at most one per round trip, so one
+  burst of errors counts once.
+
+The current limit is available as ``limit`` and, with the other
+counters, from ``snapshot()``. ``bulk_map(limiter=...)`` and
+``AsyncArzekaPayment(limiter=...)`` use it; any code can wrap its calls
+in ``slot()``.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Iterator, Optional
+
+from .exceptions import ArzekaAPIError, ArzekaConnectionError, ArzekaTimeoutError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INITIAL_LIMIT = 4
+DEFAULT_MIN_LIMIT = 1
+DEFAULT_MAX_LIMIT = 64
+DEFAULT_TOLERANCE = 2.0  # Latency / baseline ratio considered congestion
+DEFAULT_LATENCY_BACKOFF = 0.9
+DEFAULT_ERROR_BACKOFF = 0.5
+_SMOOTHING = 0.2  # Weight of a new sample in the smoothed latency
+_BASELINE_DRIFT = 0.01  # Rate at which the baseline follows slower samples
+
+
+def is_overload(error: BaseException) -> bool:
+    """
+    Tell whether an error means the gateway is overloaded
+
+    Args:
+        error: Exception raised by a call
+
+    Returns:
+        bool: True for timeouts, connection errors, 408, 429 and 5xx
+    """
+    if isinstance(error, (ArzekaTimeoutError, ArzekaConnectionError)):
+        return True
+    if isinstance(error, ArzekaAPIError) and error.status_code is not None:
+        return error.status_code >= 500 or error.status_code in (408, 429)
+    return False
+
+
+class _AIMD:
+    """Limit computation shared by the sync and async limiters"""
+
+    def __init__(
+        self,
+        initial: int = DEFAULT_INITIAL_LIMIT,
+        min_limit: int = DEFAULT_MIN_LIMIT,
+        max_limit: int = DEFAULT_MAX_LIMIT,
+        tolerance: float = DEFAULT_TOLERANCE,
+        latency_backoff: float = DEFAULT_LATENCY_BACKOFF,
+        error_backoff: float = DEFAULT_ERROR_BACKOFF,
+    ):
+        if not 1 <= min_limit <= max_limit:
+            raise ValueError(
+                f"Invalid limits: min_limit={min_limit}, max_limit={max_limit}"
+            )
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.latency_backoff = latency_backoff
+        self.error_backoff = error_backoff
+
+        self._limit = float(min(max(initial, min_limit), max_limit))
+        self._in_flight = 0
+        self._baseline: Optional[float] = None
+        self._smoothed: Optional[float] = None
+        self._last_decrease = 0.0
+        self.stats = {"calls": 0, "overloads": 0, "increases": 0, "decreases": 0}
+
+    @property
+    def limit(self) -> int:
+        """Current number of calls allowed in flight"""
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        """Calls currently in flight"""
+        return self._in_flight
+
+    def _available(self) -> bool:
+        return self._in_flight < int(self._limit)
+
+    def _decrease(self, factor: float, now: float, reason: str) -> None:
+        # One cut per round trip: the samples that follow a cut were sent
+        # before it took effect
+        if now - self._last_decrease < (self._smoothed or 0.0):
+            return
+        self._last_decrease = now
+        previous = self.limit
+        self._limit = max(self.min_limit, self._limit * factor)
+        self.stats["decreases"] += 1
+        if self.limit != previous:
+            logger.info(f"Concurrency limit {previous} -> {self.limit} ({reason})")
+
+    def _record(self, latency: float, error: Optional[BaseException], saturated: bool):
+        """Update the limit with one completed call"""
+        now = time.monotonic()
+        self.stats["calls"] += 1
+        if error is not None and is_overload(error):
+            self.stats["overloads"] += 1
+            self._decrease(self.error_backoff, now, f"{type(error).__name__}")
+            return
+        if error is not None:
+            return  # Rejected request (validation, 4xx): says nothing of load
+
+        if self._baseline is None or latency < self._baseline:
+            self._baseline = latency
+        else:
+            self._baseline += (latency - self._baseline) * _BASELINE_DRIFT
+        if self._smoothed is None:
+            self._smoothed = latency
+        else:
+            self._smoothed += (latency - self._smoothed) * _SMOOTHING
+
+        if self._smoothed > self._baseline * self.tolerance:
+            self._decrease(
+                self.latency_backoff,
+                now,
+                f"latency {self._smoothed * 1e3:.0f} ms, "
+                f"baseline {self._baseline * 1e3:.0f} ms",
+            )
+        elif saturated and self._limit < self.max_limit:
+            # About +1 per round trip: limit successes of 1/limit each
+            previous = self.limit
+            self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+            if self.limit != previous:
+                self.stats["increases"] += 1
+                logger.debug(f"Concurrency limit {previous} -> {self.limit}")
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Get the current limit and counters
+
+        Returns:
+            dict: limit, in_flight, baseline and smoothed latency (seconds),
+            calls, overloads, increases and decreases
+        """
+        return {
+            "limit": self.limit,
+            "in_flight": self._in_flight,
+            "baseline_latency": self._baseline,
+            "latency": self._smoothed,
+            **self.stats,
+        }
+
+
+class AdaptiveLimiter(_AIMD):
+    """
+    Concurrency limit that follows the gateway latency and errors (threads)
+
+    Attributes:
+        limit (int): Current number of calls allowed in flight
+        min_limit (int): Lowest limit
+        max_limit (int): Highest limit (size the thread pool to it)
+        tolerance (float): Latency over baseline ratio that triggers a cut
+        latency_backoff (float): Factor applied on latency growth
+        error_backoff (float): Factor applied on overload errors
+        stats (dict): Calls, overloads, increases and decreases
+
+    Example:
+        >>> limiter = AdaptiveLimiter(max_limit=32)
+        >>> for outcome in bulk_map(check, orders, limiter=limiter):
+        ...     ...
+        >>> limiter.snapshot()["limit"]
+        17
+    """
+
+    def __init__(
+        self,
+        initial: int = DEFAULT_INITIAL_LIMIT,
+        min_limit: int = DEFAULT_MIN_LIMIT,
+        max_limit: int = DEFAULT_MAX_LIMIT,
+        tolerance: float = DEFAULT_TOLERANCE,
+        latency_backoff: float = DEFAULT_LATENCY_BACKOFF,
+        error_backoff: float = DEFAULT_ERROR_BACKOFF,
+    ):
+        """
+        Create a limiter
+
+        Args:
+            initial: Starting limit
+            min_limit: Lowest limit
+            max_limit: Highest limit
+            tolerance: Smoothed latency over baseline ratio above which the
+                gateway is considered congested
+            latency_backoff: Factor applied to the limit on congestion
+            error_backoff: Factor applied to the limit on overload errors
+
+        Raises:
+            ValueError: If the limits are not 1 <= min_limit <= max_limit
+        """
+        super().__init__(
+            initial, min_limit, max_limit, tolerance, latency_backoff, error_backoff
+        )
+        self._condition = threading.Condition()
+
+    def __repr__(self) -> str:
+        return f"AdaptiveLimiter(limit={self.limit}, max_limit={self.max_limit})"
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """
+        Wait for room under the limit and time the call made in the block
+
+        An exception raised in the block is recorded (overload errors lower
+        the limit) and propagated.
+        """
+        with self._condition:
+            while not self._available():
+                self._condition.wait()
+            self._in_flight += 1
+            saturated = self._in_flight >= int(self._limit)
+        start = time.monotonic()
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            with self._condition:
+                self._in_flight -= 1
+                self._record(time.monotonic() - start, error, saturated)
+                self._condition.notify_all()
+
+
+class AsyncAdaptiveLimiter(_AIMD):
+    """
+    AdaptiveLimiter for coroutines (one event loop)
+
+    Same arguments and attributes as AdaptiveLimiter, with an asynchronous
+    ``slot``.
+    """
+
+    def __init__(
+        self,
+        initial: int = DEFAULT_INITIAL_LIMIT,
+        min_limit: int = DEFAULT_MIN_LIMIT,
+        max_limit: int = DEFAULT_MAX_LIMIT,
+        tolerance: float = DEFAULT_TOLERANCE,
+        latency_backoff: float = DEFAULT_LATENCY_BACKOFF,
+        error_backoff: float = DEFAULT_ERROR_BACKOFF,
+    ):
+        super().__init__(
+            initial, min_limit, max_limit, tolerance, latency_backoff, error_backoff
+        )
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    def __repr__(self) -> str:
+        return f"AsyncAdaptiveLimiter(limit={self.limit}, max_limit={self.max_limit})"
+
+    def _hand_over(self) -> None:
+        # Give the free room to the oldest waiters, without yielding to the
+        # event loop, so that a cancelled caller never leaks its slot
+        while self._waiters and self._available():
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self._in_flight += 1
+                waiter.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """
+        Wait for room under the limit and time the call made in the block
+
+        An exception raised in the block is recorded (overload errors lower
+        the limit) and propagated.
+        """
+        if self._available() and not self._waiters:
+            self._in_flight += 1
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    # Room was handed over just before the cancellation
+                    self._in_flight -= 1
+                    self._hand_over()
+                raise
+        saturated = self._in_flight >= int(self._limit)
+        start = time.monotonic()
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self._in_flight -= 1
+            self._record(time.monotonic() - start, error, saturated)
+            self._hand_over()
@@ -3,25 +3,68 @@ Faso Arzeka Payment Gateway API Client
 Unofficial API client for Arzeka mobile money payments in Burkina Faso
 """
 
-import base64
-import json
 import logging
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from functools import partial
 from datetime import datetime, timezone
-from typing import Any, Dict, Optional, Tuple
-from urllib.parse import urljoin
+from typing import Any, Callable, Dict, Optional, Tuple, Union
 
 import requests
 from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
 
-from .exceptions import (
+from . import protocol
+from .codec import AUTO, JSONCodec, get_codec
+from .exceptions import (  # noqa: F401 - re-exported for backward compatibility
     ArzekaAPIError,
     ArzekaAuthenticationError,
     ArzekaConnectionError,
     ArzekaPaymentError,
+    ArzekaTimeoutError,
     ArzekaValidationError,
 )
-from .utils import generate_hash_signature, get_reference
+from .hedging import HedgePolicy
+from .ledger import PaymentLedger
+from .priority import PriorityScheduler
+from .retries import BudgetedRetry, RetryBudget, is_retry_deadline_error
+from .models import (
+    AuthToken,
+    LazyResponse,
+    PaymentInitiation,
+    PaymentStatus,
+    SmsReceipt,
+)
+from .protocol import (  # noqa: F401 - re-exported for backward compatibility
+    AUTH_ENDPOINT,
+    CHECK_SMS_STATUS,
+    INITIATE_PAYMENT_ENDPOINT,
+    MINIMUM_AMOUNT,
+    PAYMENT_BASE_URL,
+    PAYMENT_VERIFICATION_ENDPOINT,
+    SEND_SMS,
+    SMS_BASE_URL,
+    PreparedRequest,
+)
+from .timeouts import (
+    DEFAULT_CONNECT_TIMEOUT,
+    deadline_at,
+    effective_deadline,
+    operation_timeouts_for,
+    resolve_timeout,
+)
+from .transport import (
+    CONNECTION_ERRORS,
+    DEFAULT_KEEPALIVE_IDLE,
+    DEFAULT_MAX_CONNECTIONS,
+    TIMEOUT_ERRORS,
+    create_http2_client,
+    http2_available,
+    httpx_timeout,
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -30,21 +73,13 @@ logger = logging.getLogger(__name__)
 # Constants
 BASE_URL = "https://pgw-test.fasoarzeka.bf/"
 
-PAYMENT_BASE_URL = "AvepayPaymentGatewayUI/avepay-payment/"
-INITIATE_PAYMENT_ENDPOINT = "app/initializePayment"
-AUTH_ENDPOINT = "auth/getToken"
-PAYMENT_VERIFICATION_ENDPOINT = "app/getThirdPartyMapInfo"
-
-SMS_BASE_URL = "ArzekaSmsSender/"
-SEND_SMS = "sendSms"
-CHECK_SMS_STATUS = "checkSms"
-
-
 DEFAULT_TIMEOUT = 30
 MAX_RETRIES = 3
-MINIMUM_AMOUNT = 100  # Minimum payment amount in Franc CFA (XOF)
 EXPIRATION_MARGIN_SECONDS = 2 * 60  # Default margin for token validity checks
 
+# Live clients whose connection pools must be rebuilt in forked children
+_live_clients: "weakref.WeakSet[BasePayment]" = weakref.WeakSet()
+
 
 class BasePayment:
     """
@@ -53,19 +88,95 @@ class BasePayment:
     Attributes:
 
         base_url (str): Base URL for the Arzeka API
-        timeout (int): Request timeout in seconds
+        timeout (int): Default read timeout in seconds
+        connect_timeout (float): Connect timeout in seconds
+        operation_timeouts (dict): Read timeout per operation
+        http2 (bool): Whether requests go through the HTTP/2 transport
+        pool_maxsize (int): Maximum number of pooled connections
+        keepalive_idle (float): Idle time after which pooled connections are
+            dropped instead of reused (None disables pruning)
+        json_codec (JSONCodec): Codec for payloads and responses
+        typed_results (bool): Whether operations return result objects from
+            fasoarzeka.models instead of dicts
+        lazy_responses (bool): Whether dict results are LazyResponse views
+            decoded on first access
+        ledger (PaymentLedger): Local record of payments and SMS, if any
+        scheduler (PriorityScheduler): Admits requests by priority lane, if any
+        token_provider (callable): Source of tokens tried before the API, if any
+        hedging (HedgePolicy): Hedges slow status lookups, if any
+        retry_budget (RetryBudget): Caps the session retries, if any
     """
 
-    def __init__(self, base_url: str = BASE_URL, timeout: int = DEFAULT_TIMEOUT):
+    def __init__(
+        self,
+        base_url: str = BASE_URL,
+        timeout: Optional[float] = None,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        operation_timeouts: Optional[Dict[str, float]] = None,
+        http2: bool = False,
+        pool_maxsize: int = DEFAULT_MAX_CONNECTIONS,
+        keepalive_idle: Optional[float] = DEFAULT_KEEPALIVE_IDLE,
+        json_codec: Union[str, JSONCodec] = AUTO,
+        typed_results: bool = False,
+        lazy_responses: bool = False,
+        ledger: Optional[PaymentLedger] = None,
+        scheduler: Optional[PriorityScheduler] = None,
+        token_provider: Optional[Callable[[str, str, str], Dict[str, Any]]] = None,
+        hedging: Optional[HedgePolicy] = None,
+        retry_budget: Optional[RetryBudget] = None,
+    ):
         """
         Initialize the BasePayment client
 
         Args:
             base_url: Base URL for the API (default: test environment)
-            timeout: Request timeout in seconds
+            timeout: Read timeout in seconds of every request. When it is
+                   not given, each operation has its own default
+                   (DEFAULT_OPERATION_TIMEOUTS) and other requests get
+                   DEFAULT_TIMEOUT.
+            connect_timeout: Time allowed to establish a connection, so that a
+                   dead host is detected quickly whatever the operation
+            operation_timeouts: Read timeouts overriding the ones above,
+                   keyed by operation name
+                   (authenticate, initiate_payment, check_payment, send_sms,
+                   check_sms_status)
+            http2: Use the HTTP/2 transport (requires ``fasoarzeka[http2]``).
+                   HTTP/1.1 is used when the server does not negotiate h2.
+            pool_maxsize: Maximum number of pooled connections
+            keepalive_idle: Seconds a pooled connection may stay idle before
+                   it is dropped. Keep it below the server keep-alive timeout
+                   so that stale sockets are never reused.
+            json_codec: JSON library: "auto" (orjson or ujson when installed,
+                   else the standard library), "orjson", "ujson" or "json".
+                   Signed payloads are identical whatever the codec.
+            typed_results: Return compact result objects (AuthToken,
+                   PaymentInitiation, PaymentStatus, SmsReceipt) instead of
+                   dicts, for services that keep many results in memory
+            lazy_responses: Return read-only LazyResponse mappings that
+                   decode the body only when a field is read, instead of
+                   dicts. Results of authenticate are never lazy.
+            ledger: PaymentLedger recording initiated payments, their
+                   statuses and sent SMS
+            scheduler: PriorityScheduler giving interactive calls precedence
+                   over background work on the connection pool (see
+                   fasoarzeka.priority). Its capacity should not exceed
+                   pool_maxsize.
+            token_provider: Callable (base_url, username, password) returning
+                   token information, used by authenticate instead of a
+                   request to the API, e.g. a BrokerTokenProvider (see
+                   fasoarzeka.broker). When it raises ArzekaConnectionError
+                   the client authenticates with the API itself.
+            hedging: HedgePolicy sending a second copy of check_payment and
+                   check_sms_status requests that are slower than its
+                   latency percentile (see fasoarzeka.hedging)
+            retry_budget: RetryBudget shared by all threads, limiting
+                   retries to a ratio of successful requests so that an
+                   outage does not multiply the load (see
+                   fasoarzeka.retries). HTTP/1.1 transport only.
 
         Raises:
             ArzekaValidationError: If token is invalid
+            ValueError: If the JSON codec is not available
         """
 
         self._token: str = None
@@ -73,35 +184,135 @@ class BasePayment:
         self._expires_at: float = None
         self._username: Optional[str] = None
         self._password: Optional[str] = None
-        self.base_url = base_url.rstrip("/") + "/"
-        self.timeout = timeout
+        # Guards the token fields above, which are read and written together
+        self._token_lock = threading.Lock()
+        # Serializes re-authentication so that only one thread refreshes
+        self._auth_lock = threading.Lock()
+        self._headers_cache = protocol.HeaderCache()
+        self.base_url = base_url
+        self.timeout = DEFAULT_TIMEOUT if timeout is None else timeout
+        self.connect_timeout = connect_timeout
+        self.operation_timeouts = operation_timeouts_for(timeout, operation_timeouts)
+
+        if http2 and not http2_available():
+            logger.warning(
+                "HTTP/2 requested but httpx/h2 are not installed, using HTTP/1.1"
+            )
+            http2 = False
+        self.http2 = http2
+        self.json_codec = get_codec(json_codec)
+        self.typed_results = typed_results
+        self.lazy_responses = lazy_responses
+        self.ledger = ledger
+        self.scheduler = scheduler
+        self.token_provider = token_provider
+        self.hedging = hedging
+        self.retry_budget = retry_budget
+        self.pool_maxsize = pool_maxsize
+        self.keepalive_idle = keepalive_idle
+
+        self._pool_lock = threading.Lock()
+        self._last_used = time.monotonic()
         self._session = self._create_session()
+        self._pid = os.getpid()
+        _live_clients.add(self)
 
         logger.info("Arzeka payment client initialized")
 
+    @property
+    def base_url(self) -> str:
+        """Base URL for the API, always ending with a slash"""
+        return self._endpoints.base_url
+
+    @base_url.setter
+    def base_url(self, value: str) -> None:
+        self._endpoints = protocol.Endpoints(value.rstrip("/") + "/")
+
     def _create_session(self) -> requests.Session:
         """
         Create a requests session with retry logic
 
+        When HTTP/2 is enabled an ``httpx.Client`` is returned instead. It
+        exposes the same ``get``/``post`` interface; its retries only cover
+        connection failures.
+
         Returns:
             Configured requests.Session object
         """
+        if self.http2:
+            return create_http2_client(
+                max_connections=self.pool_maxsize,
+                retries=MAX_RETRIES,
+                keepalive_expiry=self.keepalive_idle,
+            )
+
         session = requests.Session()
 
         # Configure retry strategy
-        retry_strategy = Retry(
+        retry_strategy = BudgetedRetry(
             total=MAX_RETRIES,
             backoff_factor=1,
             status_forcelist=[429, 500, 502, 503, 504],
             allowed_methods=["GET", "POST"],
+            budget=self.retry_budget,
         )
 
-        adapter = HTTPAdapter(max_retries=retry_strategy)
+        adapter = HTTPAdapter(
+            max_retries=retry_strategy, pool_maxsize=self.pool_maxsize
+        )
         # session.mount("http://", adapter)
         session.mount("https://", adapter)
 
         return session
 
+    def _reset_after_fork(self) -> None:
+        """
+        Give a forked child its own connection pool and locks
+
+        Sockets inherited from the parent are shared with it and with every
+        sibling; using them interleaves responses. They are abandoned rather
+        than closed, so that no shutdown reaches the parent's connections.
+        The token is kept, so children do not each re-authenticate.
+        """
+        self._pool_lock = threading.Lock()
+        self._token_lock = threading.Lock()
+        self._auth_lock = threading.Lock()
+        self._session = self._create_session()
+        self._last_used = time.monotonic()
+        self._pid = os.getpid()
+        logger.debug(f"Rebuilt connection pool in forked process {self._pid}")
+
+    def _check_fork(self) -> None:
+        """Rebuild the pool if the client is used in a forked process"""
+        if self._pid != os.getpid():
+            self._reset_after_fork()
+
+    def _prune_idle_connections(self) -> None:
+        """
+        Drop pooled connections that stayed idle longer than keepalive_idle
+
+        Servers close idle keep-alive sockets on their side; reusing one of
+        them fails with a reset and costs a retry. Dropping the pool before
+        that happens makes the next request open a fresh connection instead.
+        httpx prunes its own pool through ``keepalive_expiry``.
+        """
+        # One lock for the timestamp and the pools: concurrent callers see
+        # the idle period once and only the first one clears
+        with self._pool_lock:
+            now = time.monotonic()
+            idle = now - self._last_used
+            self._last_used = now
+
+            if self.http2 or self.keepalive_idle is None or idle < self.keepalive_idle:
+                return
+
+            for adapter in self._session.adapters.values():
+                poolmanager = getattr(adapter, "poolmanager", None)
+                if poolmanager is not None:
+                    poolmanager.clear()
+
+        logger.debug(f"Dropped pooled connections after {idle:.0f}s of inactivity")
+
     def _get_headers(
         self, additional_headers: Optional[Dict[str, str]] = None
     ) -> Dict[str, str]:
@@ -112,110 +323,266 @@ class BasePayment:
             additional_headers: Optional dictionary of additional headers
 
         Returns:
-            Dictionary of headers
+            Dictionary of headers. The dictionary is cached until the token
+            changes and must not be modified.
         """
-        headers = {
-            "Content-Type": "application/x-www-form-urlencoded",
-            "User-Agent": "arzeka-payment-client/1.0",
-            "Accept-Language": "fr-FR,en-GB;q=0.8,en;q=0.6",
-            "Authorization": f"{self._token_type} {self._token}",
-        }
+        with self._token_lock:
+            token_type, token = self._token_type, self._token
+        headers = self._headers_cache.get(token_type, token)
 
         if additional_headers:
-            headers.update(additional_headers)
+            return {**headers, **additional_headers}
 
         return headers
 
-    def _make_request(
+    def _timeout_for(
         self,
-        method: str,
-        endpoint: str,
-        data: Optional[Dict[str, Any]] = None,
-        params: Optional[Dict[str, Any]] = None,
-        **kwargs,
-    ) -> Dict[str, Any]:
+        operation: Optional[str] = None,
+        timeout: Optional[float] = None,
+        deadline: Optional[float] = None,
+    ) -> Tuple[float, float]:
         """
-        Make HTTP request to Arzeka API
+        Compute the (connect, read) timeouts of a request
 
         Args:
-            method: HTTP method (GET, POST)
-            endpoint: API endpoint
-            data: Request body data (for POST)
-            params: URL parameters (for GET)
-            **kwargs: Additional arguments for requests
+            operation: Operation name used to look up the read timeout
+            timeout: Explicit read timeout overriding the operation default
+            deadline: Absolute ``time.monotonic()`` deadline of the call
 
         Returns:
-            Response data as dictionary
+            Tuple of (connect, read) timeouts in seconds
 
         Raises:
-            ArzekaConnectionError: If connection fails
-            ArzekaAPIError: If API returns an error
+            ArzekaTimeoutError: If the deadline has already passed
+        """
+        if timeout is None:
+            timeout = self.operation_timeouts.get(operation, self.timeout)
+        return resolve_timeout(self.connect_timeout, timeout, deadline)
+
+    def _token_snapshot(self) -> Tuple[Optional[str], Optional[str], Optional[float]]:
+        """
+        Read the token fields consistently
+
+        Returns:
+            Tuple of (token, token_type, expires_at)
         """
+        with self._token_lock:
+            return self._token, self._token_type, self._expires_at
 
-        if self._token is None or self._expires_at is None:
+    def _set_token(
+        self,
+        token: Optional[str],
+        token_type: Optional[str],
+        expires_at: Optional[float],
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+    ) -> None:
+        """
+        Replace the token fields and, if given, the stored credentials at once
+
+        Args:
+            token: Access token
+            token_type: Token type, usually "Bearer"
+            expires_at: Token expiration timestamp
+            username: Username for automatic re-authentication
+            password: Password for automatic re-authentication
+        """
+        with self._token_lock:
+            self._token = token
+            self._token_type = token_type
+            self._expires_at = expires_at
+            if username is not None:
+                self._username = username
+                self._password = password
+
+    def _require_token(self) -> None:
+        """
+        Raise if no token has been obtained yet
+
+        Raises:
+            ArzekaAuthenticationError: If the client is not authenticated
+        """
+        token, _, expires_at = self._token_snapshot()
+        if token is None or expires_at is None:
             raise ArzekaAuthenticationError(
                 "Authentication token is not set. Please authenticate first."
             )
 
-        url = urljoin(self.base_url, endpoint)
-        headers = kwargs.pop("headers", {})
-        headers = self._get_headers(headers)
+    def _transport_timeout(self, timeout: Tuple[float, float]):
+        """Convert (connect, read) timeouts to the session's format"""
+        return httpx_timeout(*timeout) if self.http2 else timeout
 
-        timeout = kwargs.pop("timeout", self.timeout)
+    def _transmit(
+        self, prepared: PreparedRequest, timeout: Tuple[float, float], **kwargs
+    ):
+        """
+        Hand a prepared request to the session, without error mapping
 
-        try:
-            logger.debug(f"Making {method} request to {url}")
+        Args:
+            prepared: Request built by the protocol layer
+            timeout: (connect, read) timeouts in seconds
+            **kwargs: Additional arguments for the session
 
-            if method.upper() == "POST":
-                response = self._session.post(
-                    url, data=data, headers=headers, timeout=timeout, **kwargs
-                )
-            elif method.upper() == "GET":
-                response = self._session.get(
-                    url, params=params, headers=headers, timeout=timeout, **kwargs
-                )
-            else:
-                raise ValueError(f"Unsupported HTTP method: {method}")
+        Returns:
+            The transport response object
+        """
+        self._check_fork()
+        self._prune_idle_connections()
+
+        # httpx takes raw bytes through ``content``, requests through ``data``
+        body_argument = "content" if self.http2 else "data"
+        kwargs[body_argument] = prepared.body
+
+        return self._session.request(
+            prepared.method,
+            prepared.url,
+            headers=prepared.headers,
+            timeout=self._transport_timeout(timeout),
+            **kwargs,
+        )
 
-            # Check for HTTP errors
-            response.raise_for_status()
+    def _send(
+        self,
+        prepared: PreparedRequest,
+        timeout: Tuple[float, float],
+        deadline: Optional[float] = None,
+        **kwargs,
+    ):
+        """
+        Send a prepared request through the session
 
-            # Parse response
-            try:
-                response_data = response.json()
-            except ValueError:
-                response_data = {"raw_response": response.text}
+        Args:
+            prepared: Request built by the protocol layer
+            timeout: (connect, read) timeouts in seconds
+            deadline: Absolute ``time.monotonic()`` deadline of the call; the
+                session stops retrying when its back-off would reach it
+            **kwargs: Additional arguments for the session
 
-            logger.info(f"Request successful: {method} {url}")
-            return response_data
+        Returns:
+            The transport response object
+
+        Raises:
+            ArzekaTimeoutError: If the request times out or retries would
+                end after the deadline
+            ArzekaConnectionError: If connection fails
+        """
+        try:
+            logger.debug(f"Making {prepared.method} request to {prepared.url}")
+            # Entered here rather than by the caller: hedged copies run in
+            # pool threads, which do not see the caller's deadline_scope
+            with deadline_at(deadline):
+                return self._transmit(prepared, timeout, **kwargs)
 
-        except requests.exceptions.Timeout as e:
+        except TIMEOUT_ERRORS as e:
             logger.error(f"Request timeout: {e}")
-            raise ArzekaConnectionError(
-                f"Request timeout after {timeout} seconds"
+            raise ArzekaTimeoutError(
+                f"Request timeout after {timeout[1]:g} seconds"
             ) from e
 
-        except requests.exceptions.ConnectionError as e:
+        except CONNECTION_ERRORS as e:
+            if is_retry_deadline_error(e):
+                logger.error(f"Deadline reached while retrying: {e}")
+                raise ArzekaTimeoutError(
+                    "Deadline exceeded before the request could be retried"
+                ) from e
             logger.error(f"Connection error: {e}")
             raise ArzekaConnectionError(f"Failed to connect to Arzeka API: {e}") from e
 
-        except requests.exceptions.HTTPError as e:
-            logger.error(f"HTTP error: {e}")
-            try:
-                error_data = response.json()
-            except ValueError:
-                error_data = {"error": response.text}
-
-            raise ArzekaAPIError(
-                f"API request failed: {e}",
-                status_code=response.status_code,
-                response_data=error_data,
-            ) from e
-
         except Exception as e:
             logger.error(f"Unexpected error: {e}")
             raise ArzekaPaymentError(f"Unexpected error: {e}") from e
 
+    def _execute(
+        self,
+        prepared: PreparedRequest,
+        operation: Optional[str] = None,
+        deadline: Optional[float] = None,
+        model: Optional[Callable[[bytes, JSONCodec], Any]] = None,
+        **kwargs,
+    ) -> Any:
+        """
+        Send a prepared request and parse its response
+
+        Args:
+            prepared: Request built by the protocol layer
+            operation: Operation name, selects the default read timeout
+            deadline: Absolute ``time.monotonic()`` deadline of the call
+            model: Result class built from the body when typed_results is on
+            **kwargs: Additional arguments for the session (e.g. timeout)
+
+        Returns:
+            Response data as dictionary, LazyResponse or model instance
+
+        Raises:
+            ArzekaTimeoutError: If the request times out or the deadline passed
+            ArzekaConnectionError: If connection fails
+            ArzekaAPIError: If API returns an error
+        """
+        slot = (
+            nullcontext()
+            if self.scheduler is None
+            else self.scheduler.slot(deadline=deadline)
+        )
+        with slot:
+            # Timeouts are computed once admitted, from the time left
+            timeout = self._timeout_for(
+                operation, kwargs.pop("timeout", None), deadline
+            )
+            deadline = effective_deadline(deadline)
+            if self.hedging is not None and self.hedging.applies(operation):
+                response = self.hedging.run(
+                    partial(self._send, prepared, timeout, deadline, **kwargs)
+                )
+            else:
+                response = self._send(prepared, timeout, deadline, **kwargs)
+
+        if model is None or not self.typed_results:
+            model = LazyResponse if self.lazy_responses else None
+        if model is not None:
+            protocol.raise_for_status(
+                response.status_code, response.content, prepared.url, self.json_codec
+            )
+            response_data = model(response.content, self.json_codec)
+        else:
+            response_data = protocol.parse_response(
+                response.status_code, response.content, prepared.url, self.json_codec
+            )
+        logger.info(f"Request successful: {prepared.method} {prepared.url}")
+        return response_data
+
+    def _make_request(
+        self,
+        method: str,
+        endpoint: str,
+        data: Optional[Dict[str, Any]] = None,
+        params: Optional[Dict[str, Any]] = None,
+        **kwargs,
+    ) -> Dict[str, Any]:
+        """
+        Make HTTP request to Arzeka API
+
+        Args:
+            method: HTTP method (GET, POST)
+            endpoint: API endpoint
+            data: Request body data (for POST)
+            params: URL parameters (for GET)
+            **kwargs: Additional arguments for requests
+
+        Returns:
+            Response data as dictionary
+
+        Raises:
+            ArzekaConnectionError: If connection fails
+            ArzekaAPIError: If API returns an error
+        """
+        self._require_token()
+
+        headers = self._get_headers(kwargs.pop("headers", None))
+        prepared = protocol.prepare_request(
+            method, self.base_url, endpoint, headers, data=data, params=params
+        )
+        return self._execute(prepared, **kwargs)
+
     def post(
         self, endpoint: str, data: Optional[Dict[str, Any]] = None, **kwargs
     ) -> Dict[str, Any]:
@@ -270,15 +637,91 @@ class ArzekaPayment(BasePayment):
     Provides methods to initiate and check payment status
     """
 
-    def __init__(self, base_url: str = BASE_URL, timeout: int = DEFAULT_TIMEOUT):
+    def __init__(
+        self, base_url: str = BASE_URL, timeout: Optional[float] = None, **kwargs
+    ):
         """
         Initialize Arzeka Payment client
 
         Args:
             base_url: Base URL for the API
-            timeout: Request timeout in seconds
+            timeout: Read timeout in seconds (default: per operation)
+            **kwargs: Connection options forwarded to BasePayment
+                      (connect_timeout, operation_timeouts, http2,
+                      pool_maxsize, keepalive_idle, json_codec,
+                      typed_results, lazy_responses, ledger, scheduler,
+                      token_provider, hedging, retry_budget)
         """
-        super().__init__(base_url, timeout)
+        super().__init__(base_url, timeout, **kwargs)
+
+    def warmup(
+        self,
+        n_connections: int = 1,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+    ) -> int:
+        """
+        Open pooled connections ahead of the first real request
+
+        DNS resolution, TCP and TLS handshakes are paid here instead of on the
+        first customer payment. When credentials are given, authentication
+        runs on one of the connections being opened.
+
+        Args:
+            n_connections: Number of connections to open (capped to pool_maxsize)
+            username: Optional username to authenticate with
+            password: Optional password to authenticate with
+
+        Returns:
+            int: Number of connections successfully opened
+
+        Raises:
+            ArzekaAuthenticationError: If authentication was requested and failed
+
+        Example:
+            >>> client = ArzekaPayment(pool_maxsize=20)
+            >>> client.warmup(10, username="user", password="password")
+            10
+        """
+        if n_connections > self.pool_maxsize:
+            logger.warning(
+                f"Cannot warm up {n_connections} connections, pool_maxsize is {self.pool_maxsize}"
+            )
+            n_connections = self.pool_maxsize
+
+        timeout = self._timeout_for()
+
+        def touch() -> bool:
+            try:
+                self._session.head(
+                    self.base_url, timeout=self._transport_timeout(timeout)
+                )
+                return True
+            except TIMEOUT_ERRORS + CONNECTION_ERRORS as e:
+                logger.warning(f"Connection warmup failed: {e}")
+                return False
+
+        # Drop stale sockets first so that warmed connections are kept
+        self._check_fork()
+        self._prune_idle_connections()
+
+        # Concurrent requests force the pool to open distinct connections
+        with ThreadPoolExecutor(max_workers=max(n_connections, 1)) as executor:
+            auth_future = None
+            if username and password:
+                auth_future = executor.submit(self.authenticate, username, password)
+                n_connections -= 1
+            futures = [executor.submit(touch) for _ in range(n_connections)]
+
+            opened = sum(future.result() for future in futures)
+            if auth_future is not None:
+                auth_future.result()
+                opened += 1
+
+        with self._pool_lock:
+            self._last_used = time.monotonic()
+        logger.info(f"Warmed up {opened} connection(s)")
+        return opened
 
     def is_token_valid(self, margin_seconds: int = EXPIRATION_MARGIN_SECONDS) -> bool:
         """
@@ -304,13 +747,15 @@ class ArzekaPayment(BasePayment):
             >>> if client.is_token_valid(margin_seconds=300):
             ...     print("Token valid for at least 5 more minutes")
         """
+        token, _, expires_at = self._token_snapshot()
+
         # Check if token exists
-        if self._token is None:
+        if token is None:
             logger.debug("No token available")
             return False
 
         # Check if expiration timestamp is set
-        if self._expires_at is None or self._expires_at == 0:
+        if expires_at is None or expires_at == 0:
             logger.debug("No expiration timestamp available")
             return False
 
@@ -318,7 +763,7 @@ class ArzekaPayment(BasePayment):
         current_time = datetime.now(timezone.utc).timestamp()
 
         # Calculate time until expiration
-        time_until_expiry = self._expires_at - current_time
+        time_until_expiry = expires_at - current_time
 
         # Check if token is still valid (considering the margin)
         is_valid = time_until_expiry > margin_seconds
@@ -346,8 +791,9 @@ class ArzekaPayment(BasePayment):
             >>> print(f"Is valid: {info['is_valid']}")
         """
         current_time = datetime.now(timezone.utc).timestamp()
+        token, _, expires_at = self._token_snapshot()
 
-        if self._token is None:
+        if token is None:
             return {
                 "is_valid": False,
                 "expires_at": None,
@@ -357,7 +803,7 @@ class ArzekaPayment(BasePayment):
                 "has_token": False,
             }
 
-        if self._expires_at is None or self._expires_at == 0:
+        if expires_at is None or expires_at == 0:
             return {
                 "is_valid": False,
                 "expires_at": None,
@@ -367,11 +813,11 @@ class ArzekaPayment(BasePayment):
                 "has_token": True,
             }
 
-        time_until_expiry = self._expires_at - current_time
+        time_until_expiry = expires_at - current_time
 
         return {
             "is_valid": self.is_token_valid(),
-            "expires_at": self._expires_at,
+            "expires_at": expires_at,
             "expires_in_seconds": time_until_expiry,
             "expires_in_minutes": time_until_expiry / 60,
             "is_expired": time_until_expiry <= 0,
@@ -399,39 +845,86 @@ class ArzekaPayment(BasePayment):
             logger.debug("Token is still valid")
             return
 
-        # Token is invalid or expired, need to re-authenticate
-        logger.info("Token expired or invalid, attempting to re-authenticate")
+        # Only one thread re-authenticates, the others wait for its token
+        with self._auth_lock:
+            if self.is_token_valid():
+                logger.debug("Token refreshed by another thread")
+                return
 
-        # Check if we have stored credentials
-        if not self._username or not self._password:
-            raise ArzekaAuthenticationError(
-                "Token expired and no credentials stored for automatic re-authentication. "
-                "Please call authenticate() again with username and password."
-            )
+            # Token is invalid or expired, need to re-authenticate
+            logger.info("Token expired or invalid, attempting to re-authenticate")
+
+            with self._token_lock:
+                username, password = self._username, self._password
+
+            # Check if we have stored credentials
+            if not username or not password:
+                raise ArzekaAuthenticationError(
+                    "Token expired and no credentials stored for automatic re-authentication. "
+                    "Please call authenticate() again with username and password."
+                )
 
-        # Re-authenticate
+            # Re-authenticate
+            try:
+                self.authenticate(username, password)
+                logger.info("Successfully re-authenticated")
+            except Exception as e:
+                logger.error(f"Failed to re-authenticate: {e}")
+                raise ArzekaAuthenticationError(
+                    f"Automatic re-authentication failed: {e}"
+                ) from e
+
+    def _provided_token(self, username: str, password: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a token from the token provider and store it
+
+        Args:
+            username: User's username or email
+            password: User's password
+
+        Returns:
+            Token information, or None if the provider is unavailable
+
+        Raises:
+            ArzekaAuthenticationError: If the credentials were refused
+            ArzekaAPIError: If the provider's authentication failed
+        """
         try:
-            self.authenticate(self._username, self._password)
-            logger.info("Successfully re-authenticated")
-        except Exception as e:
-            logger.error(f"Failed to re-authenticate: {e}")
-            raise ArzekaAuthenticationError(
-                f"Automatic re-authentication failed: {e}"
-            ) from e
+            token_info = self.token_provider(self.base_url, username, password)
+        except ArzekaConnectionError as e:
+            logger.warning(f"Token provider unavailable, authenticating directly: {e}")
+            return None
+
+        self._set_token(
+            token_info["access_token"],
+            token_info["token_type"],
+            token_info["expires_at"],
+            username,
+            password,
+        )
+        logger.info(f"Token for user {username} obtained from the token provider")
+        return token_info
 
-    def authenticate(self, username: str, password: str) -> Dict[str, Any]:
+    def authenticate(
+        self, username: str, password: str, deadline: Optional[float] = None
+    ) -> Union[Dict[str, Any], AuthToken]:
         """
         Authenticate with Arzeka API to obtain an access token
 
+        With a token_provider, the token is taken from it without a request
+        to the API, unless the provider is unavailable.
+
         Args:
             username: User's username or email
             password: User's password
+            deadline: Optional absolute ``time.monotonic()`` deadline
 
         Returns:
             Dictionary containing:
                 - access_token (str): The JWT access token
                 - token_type (str): Type of token (usually "Bearer")
                 - expires_in (int): Token expiration time in seconds
+            or an AuthToken when typed_results is enabled
 
         Raises:
             ArzekaValidationError: If credentials are invalid
@@ -444,120 +937,78 @@ class ArzekaPayment(BasePayment):
             >>> print(f"Token: {auth_response['access_token']}")
             >>> print(f"Expires in: {auth_response['expires_in']} seconds")
         """
-        # Validate inputs
-        if not username or not isinstance(username, str):
-            raise ArzekaValidationError("username must be a non-empty string")
-
-        if not password or not isinstance(password, str):
-            raise ArzekaValidationError("password must be a non-empty string")
+        prepared = protocol.prepare_authenticate(self._endpoints, username, password)
 
-        # Prepare authentication data
-        auth_data = {
-            "username": username,
-            "password": password,
-            "grant_type": "access_token",
-        }
+        if self.token_provider is not None:
+            token_info = self._provided_token(username, password)
+            if token_info is not None:
+                if self.typed_results:
+                    return AuthToken.from_token_info(token_info)
+                return token_info
 
         logger.info(f"Attempting authentication for user: {username}")
+        logger.info(f"Sending authentication request to {prepared.url}")
 
-        try:
-            # Make API request without requiring prior authentication
-            # Temporarily override headers to exclude Authorization
-            url = urljoin(self.base_url, PAYMENT_BASE_URL + AUTH_ENDPOINT)
-            logger.info(f"Sending authentication request to {url}")
-            headers = {
-                "Content-Type": "application/x-www-form-urlencoded",
-                "User-Agent": "fasoarzeka-client",
-                "Accept-Language": "fr-FR,en-GB;q=0.8,en;q=0.6",
-            }
-
-            response = self._session.post(
-                url,
-                data=auth_data,
-                headers=headers,
-                timeout=self.timeout,
-            )
-
-            # Check for HTTP errors
-            response.raise_for_status()
-
-            # Parse response
-            try:
-                response_data = response.json()
-            except ValueError:
-                logger.error("Failed to parse authentication response")
-                raise ArzekaAuthenticationError(
-                    "Invalid response format from authentication endpoint"
-                )
-            except requests.exceptions.JSONDecodeError as e:
-                logger.error(f"JSON decode error during authentication: {e}")
-                raise ArzekaAuthenticationError(
-                    "Invalid JSON response from authentication endpoint"
-                ) from e
-
-            # Validate response contains required fields
-            if "access_token" not in response_data:
-                logger.error("Authentication response missing access_token")
-                raise ArzekaAuthenticationError(
-                    "Authentication response missing required fields"
-                )
-
-            # Update the client's token if authentication successful
-            if response_data.get("access_token"):
-                self._token = response_data["access_token"]
-                self._expires_at = datetime.now(timezone.utc).timestamp() + float(
-                    response_data["expires_in"]
-                )
-                # Store credentials for automatic re-authentication
-                self._username = username
-                self._password = password
-                self._token_type = response_data.get("token_type", "Bearer")
-
-                logger.info(f"Authentication successful for user: {username}")
+        timeout = self._timeout_for("authenticate", deadline=deadline)
 
-            return {
-                "access_token": response_data.get("access_token"),
-                "token_type": response_data.get("token_type", "Bearer"),
-                "expires_in": response_data.get("expires_in", 3600),
-                "expires_at": self._expires_at,
-            }
-
-        except requests.exceptions.HTTPError as e:
-            logger.error(f"Authentication failed: {e}")
+        try:
+            with deadline_at(deadline):
+                response = self._transmit(prepared, timeout)
 
-            # Handle authentication errors
-            try:
-                error_data = response.json()
-            except requests.exceptions.JSONDecodeError:
-                error_data = {"error": response.text}
-            raise ArzekaAPIError(
-                f"Authentication request failed: {e}",
-                status_code=response.status_code,
-                response_data=error_data,
+        except TIMEOUT_ERRORS as e:
+            logger.error(f"Authentication timeout: {e}")
+            raise ArzekaTimeoutError(
+                f"Authentication request timeout after {timeout[1]:g} seconds"
             ) from e
 
-        except requests.exceptions.ConnectionError as e:
+        except CONNECTION_ERRORS as e:
+            if is_retry_deadline_error(e):
+                logger.error(f"Deadline reached while retrying authentication: {e}")
+                raise ArzekaTimeoutError(
+                    "Deadline exceeded before authentication could be retried"
+                ) from e
             logger.error(f"Connection error during authentication: {e}")
             raise ArzekaConnectionError(
                 f"Failed to connect to authentication endpoint: {e}"
             ) from e
 
-        except requests.exceptions.Timeout as e:
-            logger.error(f"Authentication timeout: {e}")
-            raise ArzekaConnectionError(
-                f"Authentication request timeout after {self.timeout} seconds"
-            ) from e
-
-        except ArzekaPaymentError:
-            # Re-raise our custom exceptions
-            raise
-
         except Exception as e:
             logger.error(f"Unexpected error during authentication: {e}")
             raise ArzekaAuthenticationError(
                 f"Authentication failed with unexpected error: {e}"
             ) from e
 
+        try:
+            token_info = protocol.parse_auth_response(
+                response.status_code,
+                response.content,
+                datetime.now(timezone.utc).timestamp(),
+                prepared.url,
+                self.json_codec,
+            )
+        except ArzekaPaymentError as e:
+            logger.error(f"Authentication failed: {e}")
+            raise
+
+        # Update the client's token if authentication successful
+        if token_info["access_token"]:
+            # Store credentials for automatic re-authentication
+            self._set_token(
+                token_info["access_token"],
+                token_info["token_type"],
+                token_info["expires_at"],
+                username,
+                password,
+            )
+
+            logger.info(f"Authentication successful for user: {username}")
+
+        if self.typed_results:
+            return AuthToken.from_token_info(
+                token_info, response.content, self.json_codec
+            )
+        return token_info
+
     def initiate_payment(
         self,
         amount: float,
@@ -567,7 +1018,8 @@ class ArzekaPayment(BasePayment):
         additional_info: Dict[str, Any],
         hash_secret: str,
         mapped_order_id: Optional[str] = None,
-    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        deadline: Optional[float] = None,
+    ) -> Union[Tuple[Dict[str, Any], Dict[str, Any]], PaymentInitiation]:
         """
         Initiate a payment transaction
 
@@ -579,10 +1031,12 @@ class ArzekaPayment(BasePayment):
             link_back_to_calling_website: Redirect URL after payment
             additional_info: Additional payment information
             hash_secret: Secret key for generating hash signature
+            deadline: Optional absolute ``time.monotonic()`` deadline
 
 
         Returns:
             url: URL to redirect user for payment
+            (a PaymentInitiation when typed_results is on)
 
         Raises:
             ArzekaValidationError: If required parameters are invalid
@@ -591,96 +1045,55 @@ class ArzekaPayment(BasePayment):
         # Ensure token is valid before making the request
         self._ensure_valid_token()
 
-        # Validate inputs
-        if not isinstance(amount, (int, float)) or amount <= MINIMUM_AMOUNT:
-            raise ArzekaValidationError(
-                f"amount must be a positive number greater than {MINIMUM_AMOUNT}"
-            )
-
-        if not merchant_id or not isinstance(merchant_id, (str, int)):
-            raise ArzekaValidationError("merchant_id must be a non-empty string/int")
-
-        if not set(["firstname", "lastname", "mobile"]).issubset(
-            additional_info.keys()
-        ):
-            raise ArzekaValidationError(
-                "additional_info must contain firstname, lastname, and mobile"
-            )
-
-        if (
-            not additional_info.get("firstname", None)
-            or not additional_info.get("lastname", None)
-            or not additional_info.get("mobile", None)
-        ):
-            raise ArzekaValidationError(
-                "additional_info fields firstname, lastname, and mobile cannot be empty or null"
-            )
-
-        if "generateReceipt" not in additional_info:
-            additional_info["generateReceipt"] = False
-            additional_info["paymentDescription"] = ""
-            additional_info["accountingOffice"] = ""
-            additional_info["accountantName"] = ""
-            additional_info["address"] = ""
-        elif (
-            "generateReceipt" in additional_info and additional_info["generateReceipt"]
-        ):
-            required_receipt_fields = [
-                "paymentDescription",
-                "accountingOffice",
-                "accountantName",
-            ]
-            if not set(required_receipt_fields).issubset(additional_info.keys()):
-                raise ArzekaValidationError(
-                    f"When generateReceipt is True, additional_info must contain: {', '.join(required_receipt_fields)}"
-                )
-
-        # Generate order ID if not provided
-        if not mapped_order_id:
-            mapped_order_id = get_reference()
-            logger.info(f"Generated order ID: {mapped_order_id}")
-
-        # Prepare payment data
-        payment_data = {
-            "amount": amount,
-            "merchantId": merchant_id,
-            "mappedOrderId": mapped_order_id,
-            "additionalInfo": json.dumps(additional_info, separators=(",", ":")),
-            "linkForUpdateStatus": base64.b64encode(
-                link_for_update_status.encode()
-            ).decode(),
-            "linkBackToCallingWebsite": base64.b64encode(
-                link_back_to_calling_website.encode()
-            ).decode(),
-        }
-
-        hash_string = generate_hash_signature(hash_secret=hash_secret, **payment_data)
-        payment_data["hashString"] = hash_string
+        payment_data = protocol.build_payment_data(
+            amount=amount,
+            merchant_id=merchant_id,
+            link_for_update_status=link_for_update_status,
+            link_back_to_calling_website=link_back_to_calling_website,
+            additional_info=additional_info,
+            hash_secret=hash_secret,
+            mapped_order_id=mapped_order_id,
+            codec=self.json_codec,
+        )
+        mapped_order_id = payment_data["mappedOrderId"]
 
         logger.info(
             f"Initiating payment for order: {mapped_order_id}, amount: {amount}"
         )
 
         # Make API request
-        response = self.post(
-            PAYMENT_BASE_URL + INITIATE_PAYMENT_ENDPOINT, data=payment_data
+        response = self._execute(
+            protocol.prepare_initiate_payment(
+                self._endpoints, self._get_headers(), payment_data
+            ),
+            "initiate_payment",
+            deadline,
+            model=partial(PaymentInitiation, payment_data=payment_data),
         )
 
         logger.info(f"Payment initiated successfully: {mapped_order_id}")
+        if self.ledger is not None:
+            self.ledger.record_initiation(payment_data, response)
+        if self.typed_results:
+            return response
         return response, payment_data
 
     def check_payment(
-        self, mapped_order_id: str, transaction_id: str = None
-    ) -> Dict[str, Any]:
+        self,
+        mapped_order_id: str,
+        transaction_id: str = None,
+        deadline: Optional[float] = None,
+    ) -> Union[Dict[str, Any], PaymentStatus]:
         """
         Check payment transaction status
 
         Args:
             mapped_order_id: Transaction ID to check
-            **kwargs: Additional parameters
+            transaction_id: Optional gateway transaction ID
+            deadline: Optional absolute ``time.monotonic()`` deadline
 
         Returns:
-            Payment status data
+            Payment status data (a PaymentStatus when typed_results is on)
 
         Raises:
             ArzekaValidationError: If order ID is invalid
@@ -689,43 +1102,39 @@ class ArzekaPayment(BasePayment):
         # Ensure token is valid before making the request
         self._ensure_valid_token()
 
-        if not mapped_order_id or not isinstance(mapped_order_id, str):
-            raise ArzekaValidationError("mapped_order_id must be a non-empty string")
-
-        logger.info(f"Checking payment status for order: {mapped_order_id}")
-
-        # Prepare query parameters
-        url = (
-            PAYMENT_BASE_URL
-            + PAYMENT_VERIFICATION_ENDPOINT
-            + f"?mappedOrderId={mapped_order_id}"
+        prepared = protocol.prepare_check_payment(
+            self._endpoints, self._get_headers(), mapped_order_id, transaction_id
         )
 
-        if transaction_id:
-            url += f"&transId={transaction_id}"
+        logger.info(f"Checking payment status for order: {mapped_order_id}")
 
         # Make API request
-        response = self.post(url)
+        response = self._execute(
+            prepared, "check_payment", deadline, model=PaymentStatus
+        )
 
         logger.info(f"Payment status retrieved for order: {mapped_order_id}")
+        if self.ledger is not None:
+            self.ledger.record_status(mapped_order_id, response)
         return response
 
     def send_sms(
         self,
         mobile: str,
         message: str,
-    ) -> Dict[str, Any]:
+        deadline: Optional[float] = None,
+    ) -> Union[Dict[str, Any], SmsReceipt]:
         """
         Send an SMS using the Arzeka SMS sender endpoint
 
         Args:
             mobile: Recipient phone number (string)
             message: SMS message content
-            sender: Optional sender identifier
-            **kwargs: Additional parameters forwarded to the SMS API
+            deadline: Optional absolute ``time.monotonic()`` deadline
 
         Returns:
-            Response data from the SMS API as a dict
+            Response data from the SMS API as a dict (a SmsReceipt when
+            typed_results is on)
 
         Raises:
             ArzekaValidationError: If inputs are invalid
@@ -734,48 +1143,57 @@ class ArzekaPayment(BasePayment):
         # Ensure authentication
         self._ensure_valid_token()
 
-        if not mobile or not isinstance(mobile, str):
-            raise ArzekaValidationError("mobile must be a non-empty string")
-
-        if not message or not isinstance(message, str):
-            raise ArzekaValidationError("message must be a non-empty string")
-
-        data: Dict[str, Any] = {"msisdn": mobile, "message": message}
+        prepared = protocol.prepare_send_sms(
+            self._endpoints, self._get_headers(), mobile, message
+        )
 
-        # Use existing request wrapper to benefit from shared headers/retries/errors
-        return self.post(SMS_BASE_URL + SEND_SMS, data=data)
+        response = self._execute(prepared, "send_sms", deadline, model=SmsReceipt)
+        if self.ledger is not None:
+            self.ledger.record_sms(response, mobile=mobile)
+        return response
 
-    def check_sms_status(self, sms_id: str) -> Dict[str, Any]:
+    def check_sms_status(
+        self, sms_id: str, deadline: Optional[float] = None
+    ) -> Union[Dict[str, Any], SmsReceipt]:
         """Check the delivery/status of a previously sent SMS
 
         Args:
             sms_id: Identifier of the SMS to check
+            deadline: Optional absolute ``time.monotonic()`` deadline
 
         Returns:
-            Response data from the SMS status API as a dict
+            Response data from the SMS status API as a dict (a SmsReceipt
+            when typed_results is on)
         """
         self._ensure_valid_token()
 
-        if not sms_id or not isinstance(sms_id, str):
-            raise ArzekaValidationError("sms_id must be a non-empty string")
+        prepared = protocol.prepare_check_sms_status(
+            self._endpoints, self._get_headers(), sms_id
+        )
 
-        return self.get(SMS_BASE_URL + CHECK_SMS_STATUS + f"?referenceid={sms_id}")
+        response = self._execute(
+            prepared, "check_sms_status", deadline, model=SmsReceipt
+        )
+        if self.ledger is not None:
+            self.ledger.record_sms(response, sms_id=sms_id)
+        return response
 
 
 # Shared client instance for convenience functions
 _shared_client: Optional[ArzekaPayment] = None
 _shared_client_config: Dict[str, Any] = {}
+_shared_client_lock = threading.Lock()
 
 
 def _get_shared_client(
-    base_url: str = BASE_URL, timeout: int = DEFAULT_TIMEOUT
+    base_url: str = BASE_URL, timeout: Optional[float] = None
 ) -> ArzekaPayment:
     """
     Get or create a shared ArzekaPayment client instance
 
     Args:
         base_url: Base URL for the API
-        timeout: Request timeout in seconds
+        timeout: Read timeout in seconds (default: per operation)
 
     Returns:
         Shared ArzekaPayment instance
@@ -785,20 +1203,35 @@ def _get_shared_client(
     # Check if we need to create a new client or if config changed
     current_config = {"base_url": base_url, "timeout": timeout}
 
-    if _shared_client is None or _shared_client_config != current_config:
-        # Close existing client if any
-        if _shared_client is not None:
-            try:
-                _shared_client.close()
-            except Exception as e:
-                logger.debug(f"Error closing previous shared client: {e}")
+    with _shared_client_lock:
+        if _shared_client is None or _shared_client_config != current_config:
+            # Close existing client if any
+            if _shared_client is not None:
+                try:
+                    _shared_client.close()
+                except Exception as e:
+                    logger.debug(f"Error closing previous shared client: {e}")
 
-        # Create new client
-        _shared_client = ArzekaPayment(base_url=base_url, timeout=timeout)
-        _shared_client_config = current_config
-        logger.debug("Created new shared ArzekaPayment client")
+            # Create new client
+            _shared_client = ArzekaPayment(base_url=base_url, timeout=timeout)
+            _shared_client_config = current_config
+            logger.debug("Created new shared ArzekaPayment client")
 
-    return _shared_client
+        return _shared_client
+
+
+def _after_fork_in_child() -> None:
+    """Rebuild the connection pools of every live client in a forked child"""
+    global _shared_client_lock
+
+    # The lock may have been held by a parent thread at fork time
+    _shared_client_lock = threading.Lock()
+    for client in list(_live_clients):
+        client._reset_after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
 
 
 def get_shared_client() -> Optional[ArzekaPayment]:
@@ -828,15 +1261,16 @@ def close_shared_client() -> None:
     """
     global _shared_client, _shared_client_config
 
-    if _shared_client is not None:
-        try:
-            _shared_client.close()
-            logger.info("Shared client closed")
-        except Exception as e:
-            logger.error(f"Error closing shared client: {e}")
-        finally:
-            _shared_client = None
-            _shared_client_config = {}
+    with _shared_client_lock:
+        if _shared_client is not None:
+            try:
+                _shared_client.close()
+                logger.info("Shared client closed")
+            except Exception as e:
+                logger.error(f"Error closing shared client: {e}")
+            finally:
+                _shared_client = None
+                _shared_client_config = {}
 
 
 # Convenience functions using shared client instance
@@ -844,7 +1278,7 @@ def authenticate(
     username: str,
     password: str,
     base_url: str = BASE_URL,
-    timeout: int = DEFAULT_TIMEOUT,
+    timeout: Optional[float] = None,
 ) -> Dict[str, Any]:
     """
     Authenticate and obtain access token using shared client instance
@@ -857,7 +1291,7 @@ def authenticate(
         username: User's username or email
         password: User's password
         base_url: API base URL
-        timeout: Request timeout
+        timeout: Read timeout in seconds (default: per operation)
 
     Returns:
         Dictionary containing access_token, token_type, and expires_in
@@ -878,7 +1312,7 @@ def authenticate(
 def initiate_payment(
     payment_data: Dict[str, Any],
     base_url: str = BASE_URL,
-    timeout: int = DEFAULT_TIMEOUT,
+    timeout: Optional[float] = None,
 ) -> Tuple[Dict[str, str], Dict[str, str]]:
     """
     Initiate a payment using shared client instance
@@ -896,7 +1330,7 @@ def initiate_payment(
             - link_back_to_calling_website: Redirect URL
             - mapped_order_id: (optional) Transaction ID
         base_url: API base URL (default: uses same as authenticate)
-        timeout: Request timeout
+        timeout: Read timeout in seconds (default: per operation)
 
     Returns:
         url: URL to redirect user for payment
@@ -942,7 +1376,7 @@ def check_payment(
     mapped_order_id: str,
     transaction_id: Optional[str] = None,
     base_url: str = BASE_URL,
-    timeout: int = DEFAULT_TIMEOUT,
+    timeout: Optional[float] = None,
 ) -> Dict[str, Any]:
     """
     Check payment status using shared client instance
@@ -954,7 +1388,7 @@ def check_payment(
         mapped_order_id: Transaction ID to check
         transaction_id: Optional transaction ID for additional verification
         base_url: API base URL (default: uses same as authenticate)
-        timeout: Request timeout
+        timeout: Read timeout in seconds (default: per operation)
 
     Returns:
         Payment status data
@@ -985,7 +1419,7 @@ def send_sms(
     mobile: str,
     message: str,
     base_url: str = BASE_URL,
-    timeout: int = DEFAULT_TIMEOUT,
+    timeout: Optional[float] = None,
 ) -> Dict[str, Any]:
     """Send an SMS using the shared client instance.
 
@@ -1005,7 +1439,7 @@ def send_sms(
 def check_sms_status(
     sms_id: str,
     base_url: str = BASE_URL,
-    timeout: int = DEFAULT_TIMEOUT,
+    timeout: Optional[float] = None,
 ) -> Dict[str, Any]:
     """Check the SMS delivery/status using the shared client instance."""
     client = _get_shared_client(base_url, timeout)
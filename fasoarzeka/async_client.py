@@ -0,0 +1,647 @@
+"""
+Asynchronous Faso Arzeka Payment Gateway API Client
+
+Built on ``httpx.AsyncClient``. With ``http2=True`` many concurrent calls
+are multiplexed over a few HTTP/2 connections; servers that do not
+negotiate h2 are spoken to over HTTP/1.1.
+
+``stream_check_payments`` and ``stream_sms_statuses`` check many orders or
+SMS with a bounded number of requests in flight, yielding each status as
+it arrives.
+"""
+
+import asyncio
+import logging
+from contextlib import AsyncExitStack
+from datetime import datetime, timezone
+from functools import partial
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterable,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from . import protocol
+from .codec import AUTO, JSONCodec, get_codec
+from .arzeka import BASE_URL, DEFAULT_TIMEOUT, EXPIRATION_MARGIN_SECONDS, MAX_RETRIES
+from .bulk import DEFAULT_CONCURRENCY, BulkResult, abulk_map
+from .exceptions import (
+    ArzekaAuthenticationError,
+    ArzekaConnectionError,
+    ArzekaPaymentError,
+    ArzekaTimeoutError,
+)
+from .hedging import HedgePolicy
+from .ledger import PaymentLedger
+from .models import (
+    AuthToken,
+    LazyResponse,
+    PaymentInitiation,
+    PaymentStatus,
+    SmsReceipt,
+)
+from .adaptive import AsyncAdaptiveLimiter
+from .priority import AsyncPriorityScheduler
+from .protocol import PreparedRequest
+from .timeouts import (
+    DEFAULT_CONNECT_TIMEOUT,
+    operation_timeouts_for,
+    resolve_timeout,
+)
+from .transport import (
+    CONNECTION_ERRORS,
+    DEFAULT_MAX_CONNECTIONS,
+    TIMEOUT_ERRORS,
+    create_async_client,
+    httpx_timeout,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncArzekaPayment:
+    """
+    Asynchronous Arzeka Payment Gateway client
+
+    Mirrors the ArzekaPayment API with coroutine methods.
+
+    Example:
+        >>> async with AsyncArzekaPayment(http2=True) as client:
+        ...     await client.authenticate("user", "password")
+        ...     statuses = await asyncio.gather(
+        ...         *(client.check_payment(order_id) for order_id in order_ids)
+        ...     )
+    """
+
+    def __init__(
+        self,
+        base_url: str = BASE_URL,
+        timeout: Optional[float] = None,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        operation_timeouts: Optional[Dict[str, float]] = None,
+        http2: bool = False,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        json_codec: Union[str, JSONCodec] = AUTO,
+        typed_results: bool = False,
+        lazy_responses: bool = False,
+        ledger: Optional[PaymentLedger] = None,
+        scheduler: Optional[AsyncPriorityScheduler] = None,
+        limiter: Optional[AsyncAdaptiveLimiter] = None,
+        hedging: Optional[HedgePolicy] = None,
+    ):
+        """
+        Initialize the asynchronous client
+
+        Args:
+            base_url: Base URL for the API (default: test environment)
+            timeout: Read timeout of every request (default: per-operation
+                   DEFAULT_OPERATION_TIMEOUTS, DEFAULT_TIMEOUT otherwise)
+            connect_timeout: Time allowed to establish a connection
+            operation_timeouts: Read timeouts of specific operations, taking
+                   precedence over timeout
+            http2: Enable HTTP/2 multiplexing
+            max_connections: Maximum number of pooled connections
+            json_codec: JSON library ("auto", "orjson", "ujson" or "json")
+            typed_results: Return result objects from fasoarzeka.models
+                   instead of dicts
+            lazy_responses: Return LazyResponse mappings, decoded on first
+                   access, instead of dicts
+            ledger: PaymentLedger recording payments and SMS. Use one with
+                   batch_size set so that writes do not block the event loop.
+            scheduler: AsyncPriorityScheduler admitting requests by
+                   priority lane (see fasoarzeka.priority)
+            limiter: AsyncAdaptiveLimiter capping concurrent requests at
+                   a limit that follows the gateway latency and overload
+                   errors (see fasoarzeka.adaptive). Keep its max_limit at
+                   or below max_connections.
+            hedging: HedgePolicy sending a second copy of slow
+                   check_payment and check_sms_status requests; the slower
+                   copy is cancelled (see fasoarzeka.hedging)
+
+        Raises:
+            ImportError: If httpx is not installed
+            ValueError: If the JSON codec is not available
+        """
+        self._token: str = None
+        self._token_type: str = None
+        self._expires_at: float = None
+        self._username: Optional[str] = None
+        self._password: Optional[str] = None
+        self._auth_lock = asyncio.Lock()
+        self._headers_cache = protocol.HeaderCache()
+        self.base_url = base_url
+        self.timeout = DEFAULT_TIMEOUT if timeout is None else timeout
+        self.connect_timeout = connect_timeout
+        self.json_codec = get_codec(json_codec)
+        self.typed_results = typed_results
+        self.lazy_responses = lazy_responses
+        self.ledger = ledger
+        self.scheduler = scheduler
+        self.limiter = limiter
+        self.hedging = hedging
+        self.operation_timeouts = operation_timeouts_for(timeout, operation_timeouts)
+        self._client = create_async_client(
+            http2=http2, max_connections=max_connections, retries=MAX_RETRIES
+        )
+
+        logger.info("Async Arzeka payment client initialized")
+
+    @property
+    def base_url(self) -> str:
+        """Base URL for the API, always ending with a slash"""
+        return self._endpoints.base_url
+
+    @base_url.setter
+    def base_url(self, value: str) -> None:
+        self._endpoints = protocol.Endpoints(value.rstrip("/") + "/")
+
+    def _get_headers(self) -> Dict[str, str]:
+        return self._headers_cache.get(self._token_type, self._token)
+
+    def _require_token(self) -> None:
+        if self._token is None or self._expires_at is None:
+            raise ArzekaAuthenticationError(
+                "Authentication token is not set. Please authenticate first."
+            )
+
+    def _timeout_for(
+        self, operation: Optional[str] = None, deadline: Optional[float] = None
+    ) -> Tuple[float, float]:
+        timeout = self.operation_timeouts.get(operation, self.timeout)
+        return resolve_timeout(self.connect_timeout, timeout, deadline)
+
+    async def _send(
+        self,
+        prepared: PreparedRequest,
+        operation: Optional[str] = None,
+        deadline: Optional[float] = None,
+    ):
+        """
+        Send a prepared request through the httpx client
+
+        Args:
+            prepared: Request built by the protocol layer
+            operation: Operation name, selects the default read timeout
+            deadline: Absolute ``time.monotonic()`` deadline of the call
+
+        Returns:
+            httpx.Response
+
+        Raises:
+            ArzekaTimeoutError: If the request times out or the deadline passed
+            ArzekaConnectionError: If connection fails
+        """
+        timeout = self._timeout_for(operation, deadline)
+
+        try:
+            logger.debug(f"Making {prepared.method} request to {prepared.url}")
+            return await self._client.request(
+                prepared.method,
+                prepared.url,
+                content=prepared.body,
+                headers=prepared.headers,
+                timeout=httpx_timeout(*timeout),
+            )
+
+        except TIMEOUT_ERRORS as e:
+            logger.error(f"Request timeout: {e}")
+            raise ArzekaTimeoutError(
+                f"Request timeout after {timeout[1]:g} seconds"
+            ) from e
+
+        except CONNECTION_ERRORS as e:
+            logger.error(f"Connection error: {e}")
+            raise ArzekaConnectionError(f"Failed to connect to Arzeka API: {e}") from e
+
+        except Exception as e:
+            logger.error(f"Unexpected error: {e}")
+            raise ArzekaPaymentError(f"Unexpected error: {e}") from e
+
+    async def _execute(
+        self,
+        prepared: PreparedRequest,
+        operation: Optional[str] = None,
+        deadline: Optional[float] = None,
+        model: Optional[Callable[[bytes, JSONCodec], Any]] = None,
+    ) -> Any:
+        """
+        Send a prepared request and parse its response
+
+        Args:
+            prepared: Request built by the protocol layer
+            operation: Operation name, selects the default read timeout
+            deadline: Absolute ``time.monotonic()`` deadline of the call
+            model: Result class built from the body when typed_results is on
+
+        Returns:
+            Response data as dictionary, LazyResponse or model instance
+
+        Raises:
+            ArzekaConnectionError: If connection fails
+            ArzekaAPIError: If API returns an error
+        """
+        async with AsyncExitStack() as stack:
+            if self.scheduler is not None:
+                await stack.enter_async_context(self.scheduler.slot(deadline=deadline))
+            if self.limiter is not None:
+                await stack.enter_async_context(self.limiter.slot())
+            if self.hedging is not None and self.hedging.applies(operation):
+                response = await self.hedging.arun(
+                    partial(self._send, prepared, operation, deadline)
+                )
+            else:
+                response = await self._send(prepared, operation, deadline)
+            if self.limiter is not None:
+                # 429 and 5xx responses must reach the limiter
+                protocol.raise_for_status(
+                    response.status_code,
+                    response.content,
+                    prepared.url,
+                    self.json_codec,
+                )
+        if model is None or not self.typed_results:
+            model = LazyResponse if self.lazy_responses else None
+        if model is not None:
+            protocol.raise_for_status(
+                response.status_code, response.content, prepared.url, self.json_codec
+            )
+            response_data = model(response.content, self.json_codec)
+        else:
+            response_data = protocol.parse_response(
+                response.status_code, response.content, prepared.url, self.json_codec
+            )
+        logger.info(
+            f"Request successful: {prepared.method} {prepared.url} ({response.http_version})"
+        )
+        return response_data
+
+    async def post(
+        self, endpoint: str, data: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Make POST request to Arzeka API"""
+        self._require_token()
+        return await self._execute(
+            protocol.prepare_request(
+                "POST", self.base_url, endpoint, self._get_headers(), data=data
+            )
+        )
+
+    async def get(
+        self, endpoint: str, params: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Make GET request to Arzeka API"""
+        self._require_token()
+        return await self._execute(
+            protocol.prepare_request(
+                "GET", self.base_url, endpoint, self._get_headers(), params=params
+            )
+        )
+
+    def is_token_valid(self, margin_seconds: int = EXPIRATION_MARGIN_SECONDS) -> bool:
+        """
+        Check if the authentication token is still valid
+
+        Args:
+            margin_seconds: Safety margin in seconds before actual expiration
+
+        Returns:
+            bool: True if token is valid and not expired, False otherwise
+        """
+        if self._token is None or not self._expires_at:
+            return False
+
+        current_time = datetime.now(timezone.utc).timestamp()
+        return self._expires_at - current_time > margin_seconds
+
+    async def _ensure_valid_token(self) -> None:
+        """
+        Ensure the token is valid, re-authenticating if necessary
+
+        Concurrent callers share a single re-authentication.
+
+        Raises:
+            ArzekaAuthenticationError: If no credentials are stored or re-authentication fails
+        """
+        if self.is_token_valid():
+            return
+
+        async with self._auth_lock:
+            # Another task may have refreshed the token while we waited
+            if self.is_token_valid():
+                return
+
+            logger.info("Token expired or invalid, attempting to re-authenticate")
+
+            if not self._username or not self._password:
+                raise ArzekaAuthenticationError(
+                    "Token expired and no credentials stored for automatic re-authentication. "
+                    "Please call authenticate() again with username and password."
+                )
+
+            try:
+                await self.authenticate(self._username, self._password)
+                logger.info("Successfully re-authenticated")
+            except Exception as e:
+                logger.error(f"Failed to re-authenticate: {e}")
+                raise ArzekaAuthenticationError(
+                    f"Automatic re-authentication failed: {e}"
+                ) from e
+
+    async def authenticate(
+        self, username: str, password: str, deadline: Optional[float] = None
+    ) -> Union[Dict[str, Any], AuthToken]:
+        """
+        Authenticate with Arzeka API to obtain an access token
+
+        Args:
+            username: User's username or email
+            password: User's password
+            deadline: Optional absolute ``time.monotonic()`` deadline
+
+        Returns:
+            Dictionary containing access_token, token_type, expires_in and
+            expires_at, or an AuthToken when typed_results is enabled
+
+        Raises:
+            ArzekaValidationError: If credentials are invalid
+            ArzekaAuthenticationError: If authentication fails
+            ArzekaAPIError: If API request fails
+        """
+        prepared = protocol.prepare_authenticate(self._endpoints, username, password)
+
+        logger.info(f"Attempting authentication for user: {username}")
+        timeout = self._timeout_for("authenticate", deadline)
+
+        try:
+            response = await self._client.request(
+                prepared.method,
+                prepared.url,
+                content=prepared.body,
+                headers=prepared.headers,
+                timeout=httpx_timeout(*timeout),
+            )
+
+        except TIMEOUT_ERRORS as e:
+            logger.error(f"Authentication timeout: {e}")
+            raise ArzekaTimeoutError(
+                f"Authentication request timeout after {timeout[1]:g} seconds"
+            ) from e
+
+        except CONNECTION_ERRORS as e:
+            logger.error(f"Connection error during authentication: {e}")
+            raise ArzekaConnectionError(
+                f"Failed to connect to authentication endpoint: {e}"
+            ) from e
+
+        except Exception as e:
+            logger.error(f"Unexpected error during authentication: {e}")
+            raise ArzekaAuthenticationError(
+                f"Authentication failed with unexpected error: {e}"
+            ) from e
+
+        token_info = protocol.parse_auth_response(
+            response.status_code,
+            response.content,
+            datetime.now(timezone.utc).timestamp(),
+            prepared.url,
+            self.json_codec,
+        )
+
+        if token_info["access_token"]:
+            self._token = token_info["access_token"]
+            self._token_type = token_info["token_type"]
+            self._expires_at = token_info["expires_at"]
+            self._username = username
+            self._password = password
+
+            logger.info(f"Authentication successful for user: {username}")
+
+        if self.typed_results:
+            return AuthToken.from_token_info(
+                token_info, response.content, self.json_codec
+            )
+        return token_info
+
+    async def initiate_payment(
+        self,
+        amount: float,
+        merchant_id: str,
+        link_for_update_status: str,
+        link_back_to_calling_website: str,
+        additional_info: Dict[str, Any],
+        hash_secret: str,
+        mapped_order_id: Optional[str] = None,
+        deadline: Optional[float] = None,
+    ) -> Union[Tuple[Dict[str, Any], Dict[str, Any]], PaymentInitiation]:
+        """
+        Initiate a payment transaction
+
+        See ArzekaPayment.initiate_payment for the argument details.
+
+        Returns:
+            Tuple of (API response, submitted payment data), or a
+            PaymentInitiation when typed_results is enabled
+
+        Raises:
+            ArzekaValidationError: If required parameters are invalid
+            ArzekaAPIError: If API request fails
+        """
+        await self._ensure_valid_token()
+
+        payment_data = protocol.build_payment_data(
+            amount=amount,
+            merchant_id=merchant_id,
+            link_for_update_status=link_for_update_status,
+            link_back_to_calling_website=link_back_to_calling_website,
+            additional_info=additional_info,
+            hash_secret=hash_secret,
+            mapped_order_id=mapped_order_id,
+            codec=self.json_codec,
+        )
+        mapped_order_id = payment_data["mappedOrderId"]
+
+        logger.info(
+            f"Initiating payment for order: {mapped_order_id}, amount: {amount}"
+        )
+
+        response = await self._execute(
+            protocol.prepare_initiate_payment(
+                self._endpoints, self._get_headers(), payment_data
+            ),
+            "initiate_payment",
+            deadline,
+            model=partial(PaymentInitiation, payment_data=payment_data),
+        )
+
+        logger.info(f"Payment initiated successfully: {mapped_order_id}")
+        if self.ledger is not None:
+            self.ledger.record_initiation(payment_data, response)
+        if self.typed_results:
+            return response
+        return response, payment_data
+
+    async def check_payment(
+        self,
+        mapped_order_id: str,
+        transaction_id: str = None,
+        deadline: Optional[float] = None,
+    ) -> Union[Dict[str, Any], PaymentStatus]:
+        """
+        Check payment transaction status
+
+        Args:
+            mapped_order_id: Transaction ID to check
+            transaction_id: Optional gateway transaction ID
+            deadline: Optional absolute ``time.monotonic()`` deadline
+
+        Returns:
+            Payment status data (a PaymentStatus when typed_results is on)
+
+        Raises:
+            ArzekaValidationError: If order ID is invalid
+            ArzekaAPIError: If API request fails
+        """
+        await self._ensure_valid_token()
+
+        prepared = protocol.prepare_check_payment(
+            self._endpoints, self._get_headers(), mapped_order_id, transaction_id
+        )
+
+        logger.info(f"Checking payment status for order: {mapped_order_id}")
+        response = await self._execute(
+            prepared, "check_payment", deadline, model=PaymentStatus
+        )
+        if self.ledger is not None:
+            self.ledger.record_status(mapped_order_id, response)
+        return response
+
+    async def send_sms(
+        self, mobile: str, message: str, deadline: Optional[float] = None
+    ) -> Union[Dict[str, Any], SmsReceipt]:
+        """
+        Send an SMS using the Arzeka SMS sender endpoint
+
+        Args:
+            mobile: Recipient phone number (string)
+            message: SMS message content
+            deadline: Optional absolute ``time.monotonic()`` deadline
+
+        Returns:
+            Response data from the SMS API as a dict (a SmsReceipt when
+            typed_results is on)
+        """
+        await self._ensure_valid_token()
+
+        response = await self._execute(
+            protocol.prepare_send_sms(
+                self._endpoints, self._get_headers(), mobile, message
+            ),
+            "send_sms",
+            deadline,
+            model=SmsReceipt,
+        )
+        if self.ledger is not None:
+            self.ledger.record_sms(response, mobile=mobile)
+        return response
+
+    async def check_sms_status(
+        self, sms_id: str, deadline: Optional[float] = None
+    ) -> Union[Dict[str, Any], SmsReceipt]:
+        """
+        Check the delivery/status of a previously sent SMS
+
+        Args:
+            sms_id: Identifier of the SMS to check
+            deadline: Optional absolute ``time.monotonic()`` deadline
+
+        Returns:
+            Response data from the SMS status API as a dict (a SmsReceipt
+            when typed_results is on)
+        """
+        await self._ensure_valid_token()
+
+        response = await self._execute(
+            protocol.prepare_check_sms_status(
+                self._endpoints, self._get_headers(), sms_id
+            ),
+            "check_sms_status",
+            deadline,
+            model=SmsReceipt,
+        )
+        if self.ledger is not None:
+            self.ledger.record_sms(response, sms_id=sms_id)
+        return response
+
+    def stream_check_payments(
+        self,
+        order_ids: Union[Iterable[str], AsyncIterable[str]],
+        concurrency: int = DEFAULT_CONCURRENCY,
+        ordered: bool = False,
+    ) -> AsyncIterator[BulkResult]:
+        """
+        Check many payments, yielding each status as soon as it arrives
+
+        Order IDs are pulled lazily from a plain or asynchronous iterable
+        with at most ``concurrency`` requests in flight, and no new request
+        starts while the caller is not consuming, so memory stays flat
+        whatever the number of orders.
+
+        Args:
+            order_ids: mapped_order_id of each payment
+            concurrency: Maximum number of requests in flight (keep it at
+                or below max_connections)
+            ordered: Yield in the order of order_ids instead of as the
+                statuses arrive
+
+        Returns:
+            Asynchronous iterator of BulkResult: item is the order ID,
+            result the payment status, error the exception if the check
+            failed
+
+        Example:
+            >>> async for outcome in client.stream_check_payments(order_ids):
+            ...     if outcome.ok:
+            ...         await fulfil(outcome.item, outcome.result)
+        """
+        return abulk_map(self.check_payment, order_ids, concurrency, ordered)
+
+    def stream_sms_statuses(
+        self,
+        sms_ids: Union[Iterable[str], AsyncIterable[str]],
+        concurrency: int = DEFAULT_CONCURRENCY,
+        ordered: bool = False,
+    ) -> AsyncIterator[BulkResult]:
+        """
+        Check many SMS, yielding each status as soon as it arrives
+
+        Same streaming behaviour as stream_check_payments.
+
+        Args:
+            sms_ids: Identifier of each SMS
+            concurrency: Maximum number of requests in flight
+            ordered: Yield in the order of sms_ids
+
+        Returns:
+            Asynchronous iterator of BulkResult: item is the SMS ID,
+            result its status
+        """
+        return abulk_map(self.check_sms_status, sms_ids, concurrency, ordered)
+
+    async def aclose(self):
+        """Close the underlying connection pool"""
+        await self._client.aclose()
+        logger.info("Async session closed")
+
+    async def __aenter__(self):
+        """Async context manager entry"""
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        """Async context manager exit"""
+        await self.aclose()
@@ -0,0 +1,446 @@
+"""
+Local token broker for short-lived processes
+
+Cron jobs and command-line runs live for seconds, and each of them used to
+authenticate against the gateway and throw the token away. A
+``TokenBroker`` is a small daemon that keeps one valid token per
+credential set and refreshes it ahead of expiry; processes on the same
+host fetch the token from it over a Unix socket instead of authenticating::
+
+    # Once, as a service (or: fasoarzeka token-broker)
+    TokenBroker().serve_forever()
+
+    # In every job
+    client = ArzekaPayment(token_provider=BrokerTokenProvider())
+    client.authenticate(username, password)  # No request to the gateway
+
+Callers send their credentials with each request and only get a token for
+credentials that authenticated successfully, so one broker can serve
+several accounts. The socket is created with mode 0600 and the provider
+only talks to a socket owned by its own user. When the broker cannot be
+reached, ArzekaPayment authenticates directly as before.
+
+Protocol: one JSON object per line each way. Request fields: base_url,
+username, password. Response: access_token, token_type, expires_in and
+expires_at, or error (and status_code).
+"""
+
+import hashlib
+import hmac
+import json
+import logging
+import os
+import socket
+import socketserver
+import stat
+import tempfile
+import threading
+import time
+from functools import partial
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+from .arzeka import ArzekaPayment, EXPIRATION_MARGIN_SECONDS
+from .exceptions import (
+    ArzekaAPIError,
+    ArzekaAuthenticationError,
+    ArzekaConnectionError,
+    ArzekaPaymentError,
+)
+
+logger = logging.getLogger(__name__)
+
+ENV_SOCKET = "ARZEKA_TOKEN_BROKER"
+DEFAULT_REFRESH_AHEAD = 5 * 60  # Refresh tokens expiring within this delay
+DEFAULT_IDLE_TIMEOUT = 60 * 60  # Forget credentials not requested for this long
+REFRESH_CHECK_INTERVAL = 30  # Seconds between two refresh sweeps
+BROKER_TIMEOUT = 2.0  # Seconds a provider waits for the broker
+MAX_MESSAGE = 64 * 1024
+LISTEN_BACKLOG = 128  # Pending connections (socketserver's default is 5)
+_POLL_INTERVAL = 0.1  # Seconds for close() to stop the server
+
+
+def default_socket_path() -> str:
+    """
+    Socket path used when none is given
+
+    Returns:
+        str: $ARZEKA_TOKEN_BROKER, else fasoarzeka-broker.sock in
+        $XDG_RUNTIME_DIR (private to the user), else in the temporary
+        directory with the user id in the name
+    """
+    path = os.environ.get(ENV_SOCKET)
+    if path:
+        return path
+    runtime = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime:
+        return os.path.join(runtime, "fasoarzeka-broker.sock")
+    uid = os.getuid() if hasattr(os, "getuid") else "user"
+    return os.path.join(tempfile.gettempdir(), f"fasoarzeka-broker-{uid}.sock")
+
+
+class _Entry(NamedTuple):
+    """Client holding the token of one credential set"""
+
+    client: ArzekaPayment
+    password_digest: bytes
+    lock: threading.Lock
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """Answer token requests, one JSON line each, until the client hangs up"""
+
+    def handle(self):
+        broker: "TokenBroker" = self.server.broker
+        while True:
+            line = self.rfile.readline(MAX_MESSAGE)
+            if not line:
+                return
+            self.wfile.write(broker._answer(line) + b"\n")
+
+
+class TokenBroker:
+    """
+    Daemon keeping valid tokens per credential set behind a Unix socket
+
+    Attributes:
+        socket_path (str): Path of the Unix socket
+        refresh_ahead (float): Tokens expiring within this many seconds are
+            refreshed in the background (and before being handed out)
+        idle_timeout (float): Credentials not requested for this many
+            seconds are forgotten, with their token
+        stats (dict): requests, hits (served from memory), authentications,
+            refreshes and errors
+    """
+
+    def __init__(
+        self,
+        socket_path: Optional[str] = None,
+        refresh_ahead: float = DEFAULT_REFRESH_AHEAD,
+        idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+        **kwargs,
+    ):
+        """
+        Create a broker (the socket is opened by start or serve_forever)
+
+        Args:
+            socket_path: Unix socket path (default: default_socket_path())
+            refresh_ahead: Seconds before expiry at which tokens are renewed.
+                Keep it above EXPIRATION_MARGIN_SECONDS so that clients never
+                receive a token they consider expired.
+            idle_timeout: Seconds after which unused credentials are dropped
+            **kwargs: Options of the clients authenticating with the
+                gateway, as for ArzekaPayment (timeout, http2...)
+        """
+        self.socket_path = socket_path or default_socket_path()
+        self.refresh_ahead = max(refresh_ahead, EXPIRATION_MARGIN_SECONDS)
+        self.idle_timeout = idle_timeout
+        self._client_options = kwargs
+        self._salt = os.urandom(16)
+        self._entries: Dict[Tuple[str, str], _Entry] = {}
+        self._last_used: Dict[Tuple[str, str], float] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._server: Optional[socketserver.BaseServer] = None
+        self._threads = []
+        self.stats = dict.fromkeys(
+            ("requests", "hits", "authentications", "refreshes", "errors"), 0
+        )
+
+    def __repr__(self) -> str:
+        return f"TokenBroker(socket_path={self.socket_path!r})"
+
+    def _count(self, name: str) -> None:
+        # Handler threads and the refresh thread update the stats together
+        with self._lock:
+            self.stats[name] += 1
+
+    def _digest(self, password: str) -> bytes:
+        return hashlib.sha256(self._salt + password.encode()).digest()
+
+    def get_token(self, base_url: str, username: str, password: str) -> Dict[str, Any]:
+        """
+        Get a valid token for a credential set, authenticating if needed
+
+        Args:
+            base_url: Gateway base URL
+            username: Arzeka username
+            password: Arzeka password
+
+        Returns:
+            dict: access_token, token_type, expires_in and expires_at
+
+        Raises:
+            ArzekaPaymentError: If the gateway refused the credentials or
+                could not be reached
+        """
+        key = (base_url.rstrip("/") + "/", username)
+        digest = self._digest(password)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                client = ArzekaPayment(base_url=key[0], **self._client_options)
+                entry = _Entry(client, b"", threading.Lock())
+                self._entries[key] = entry
+            self._last_used[key] = time.monotonic()
+
+        with entry.lock:
+            entry = self._entries.get(key, entry)
+            known = hmac.compare_digest(entry.password_digest, digest)
+            if known and entry.client.is_token_valid(self.refresh_ahead):
+                self._count("hits")
+            else:
+                # Unknown password: only a successful authentication with it
+                # gives access to the token
+                entry.client.authenticate(username, password)
+                self._count("authentications")
+                if not known:
+                    entry = entry._replace(password_digest=digest)
+                    with self._lock:
+                        self._entries[key] = entry
+            token, token_type, expires_at = entry.client._token_snapshot()
+        return {
+            "access_token": token,
+            "token_type": token_type,
+            "expires_in": expires_at - time.time(),
+            "expires_at": expires_at,
+        }
+
+    def _answer(self, line: bytes) -> bytes:
+        """Answer one request line"""
+        self._count("requests")
+        try:
+            request = json.loads(line)
+            response = self.get_token(
+                request["base_url"], request["username"], request["password"]
+            )
+        except (ValueError, KeyError, TypeError) as e:
+            self._count("errors")
+            response = {"error": f"Invalid broker request: {e}"}
+        except ArzekaPaymentError as e:
+            self._count("errors")
+            response = {
+                "error": str(e),
+                "type": type(e).__name__,
+                "status_code": getattr(e, "status_code", None),
+            }
+        return json.dumps(response).encode()
+
+    def refresh(self) -> int:
+        """
+        Renew the tokens close to expiry and forget idle credentials
+
+        Called every REFRESH_CHECK_INTERVAL seconds by the broker.
+
+        Returns:
+            int: Number of tokens renewed
+        """
+        now = time.monotonic()
+        with self._lock:
+            for key in [
+                key
+                for key, used in self._last_used.items()
+                if now - used > self.idle_timeout
+            ]:
+                self._entries.pop(key).client.close()
+                del self._last_used[key]
+                logger.info(f"Forgot idle credentials of {key[1]}")
+            entries = list(self._entries.items())
+
+        renewed = 0
+        for (_, username), entry in entries:
+            if not entry.password_digest or entry.client.is_token_valid(
+                self.refresh_ahead
+            ):
+                continue
+            with entry.lock:
+                client = entry.client
+                if client.is_token_valid(self.refresh_ahead):
+                    continue  # Renewed by a request meanwhile
+                try:
+                    client.authenticate(client._username, client._password)
+                except ArzekaPaymentError as e:
+                    logger.warning(f"Token refresh failed for {username}: {e}")
+                    continue
+            renewed += 1
+            self._count("refreshes")
+        return renewed
+
+    def _refresh_loop(self) -> None:
+        while not self._stop.wait(REFRESH_CHECK_INTERVAL):
+            try:
+                self.refresh()
+            except Exception as e:  # Keep the daemon alive
+                logger.error(f"Token refresh sweep failed: {e}")
+
+    def _bind(self) -> socketserver.BaseServer:
+        server_class = getattr(socketserver, "ThreadingUnixStreamServer", None)
+        if server_class is None:
+            raise OSError("Unix domain sockets are not available on this platform")
+
+        if os.path.lexists(self.socket_path):
+            if not stat.S_ISSOCK(os.lstat(self.socket_path).st_mode):
+                raise OSError(f"{self.socket_path} exists and is not a socket")
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.socket_path)
+            except OSError:
+                os.unlink(self.socket_path)  # Left over by a stopped broker
+            else:
+                raise OSError(
+                    f"A token broker is already listening on {self.socket_path}"
+                )
+            finally:
+                probe.close()
+
+        # Private from the start: no window where others could connect
+        umask = os.umask(0o177)
+        try:
+            server = server_class(self.socket_path, _Handler, bind_and_activate=False)
+            # Workers starting together connect at once; past the backlog
+            # their connect fails and they authenticate by themselves
+            server.request_queue_size = LISTEN_BACKLOG
+            try:
+                server.server_bind()
+                server.server_activate()
+            except BaseException:
+                server.server_close()
+                raise
+        finally:
+            os.umask(umask)
+        server.daemon_threads = True
+        server.broker = self
+        return server
+
+    def start(self) -> "TokenBroker":
+        """
+        Open the socket and serve from background threads
+
+        Returns:
+            TokenBroker: self
+
+        Raises:
+            OSError: If the socket cannot be created or another broker
+                listens on it
+        """
+        self._server = self._bind()
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=target, name=name, daemon=True)
+            for target, name in (
+                (partial(self._server.serve_forever, _POLL_INTERVAL), "arzeka-broker"),
+                (self._refresh_loop, "arzeka-broker-refresh"),
+            )
+        ]
+        for thread in self._threads:
+            thread.start()
+        logger.info(f"Token broker listening on {self.socket_path}")
+        return self
+
+    def serve_forever(self) -> None:
+        """Serve until interrupted (Ctrl-C or SIGTERM turned into an exception)"""
+        self.start()
+        try:
+            while self._threads[0].is_alive():
+                self._threads[0].join(1)
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        """Stop serving, remove the socket and drop the tokens"""
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            try:
+                os.unlink(self.socket_path)
+            except FileNotFoundError:
+                pass
+        with self._lock:
+            for entry in self._entries.values():
+                entry.client.close()
+            self._entries.clear()
+            self._last_used.clear()
+        logger.info("Token broker stopped")
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class BrokerTokenProvider:
+    """
+    Fetch tokens from a TokenBroker, for ArzekaPayment(token_provider=...)
+
+    Attributes:
+        socket_path (str): Path of the broker's Unix socket
+        timeout (float): Seconds to wait for the broker
+    """
+
+    def __init__(
+        self, socket_path: Optional[str] = None, timeout: float = BROKER_TIMEOUT
+    ):
+        """
+        Args:
+            socket_path: Broker socket (default: default_socket_path())
+            timeout: Seconds to wait for the broker
+        """
+        self.socket_path = socket_path or default_socket_path()
+        self.timeout = timeout
+
+    def __repr__(self) -> str:
+        return f"BrokerTokenProvider(socket_path={self.socket_path!r})"
+
+    def __call__(self, base_url: str, username: str, password: str) -> Dict[str, Any]:
+        """
+        Get a token from the broker
+
+        Args:
+            base_url: Gateway base URL
+            username: Arzeka username
+            password: Arzeka password
+
+        Returns:
+            dict: access_token, token_type, expires_in and expires_at
+
+        Raises:
+            ArzekaConnectionError: If the broker cannot be reached (the
+                client then authenticates directly)
+            ArzekaAuthenticationError: If the gateway refused the credentials
+            ArzekaAPIError: If authentication failed with an HTTP error
+        """
+        request = json.dumps(
+            {"base_url": base_url, "username": username, "password": password}
+        ).encode()
+        try:
+            # The password goes to the socket: it must be our own broker's
+            if (
+                hasattr(os, "getuid")
+                and os.stat(self.socket_path).st_uid != os.getuid()
+            ):
+                raise ArzekaConnectionError(
+                    f"Token broker socket {self.socket_path} belongs to another user"
+                )
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+                conn.settimeout(self.timeout)
+                conn.connect(self.socket_path)
+                conn.sendall(request + b"\n")
+                with conn.makefile("rb") as reader:
+                    line = reader.readline(MAX_MESSAGE)
+        except (OSError, AttributeError) as e:
+            # AttributeError: no AF_UNIX on this platform
+            raise ArzekaConnectionError(f"Token broker unavailable: {e}") from e
+        try:
+            response = json.loads(line)
+        except ValueError as e:
+            raise ArzekaConnectionError("Invalid response from the token broker") from e
+
+        if "error" in response:
+            if response.get("status_code") is not None:
+                raise ArzekaAPIError(response["error"], response["status_code"])
+            if response.get("type") in ("ArzekaConnectionError", "ArzekaTimeoutError"):
+                raise ArzekaConnectionError(response["error"])
+            raise ArzekaAuthenticationError(response["error"])
+        return response
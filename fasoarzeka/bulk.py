@@ -0,0 +1,552 @@
+"""
+Streaming bulk execution
+
+``bulk_map`` runs a function over an iterable of rows with a pool of
+threads and an optional rate limit, and yields the results in input order.
+At most ``window`` rows are in flight, so memory use does not depend on
+the size of the input: rows are read as they are needed and results can
+be written as they come. ``abulk_map`` does the same for coroutines.
+
+``BulkCheckpoint`` records which rows are done, so that a run stopped
+midway can be resumed without repeating them.
+
+``read_rows`` and ``RowWriter`` stream CSV and JSON Lines files.
+"""
+
+import asyncio
+import base64
+import csv
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import ExitStack
+from contextvars import copy_context
+from itertools import islice
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    NamedTuple,
+    Optional,
+    Sequence,
+    TextIO,
+    Union,
+)
+
+from .adaptive import AdaptiveLimiter
+from .codec import DEFAULT_CODEC
+from .priority import priority_scope
+from .utils import get_reference
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENCY = 8
+FLUSH_EVERY = 100  # Rows written between two flushes of the output
+CHECKPOINT_INTERVAL = 1.0  # Maximum seconds between two checkpoint saves
+CHECKPOINT_VERSION = 1
+
+# File formats, by file extension
+FORMAT_CSV = "csv"
+FORMAT_JSONL = "jsonl"
+_FORMAT_EXTENSIONS = {".jsonl": FORMAT_JSONL, ".ndjson": FORMAT_JSONL}
+_TRUE_VALUES = ("1", "true", "yes", "oui")
+
+
+class BulkResult(NamedTuple):
+    """Outcome of one row: the function result, or the exception it raised"""
+
+    item: Any
+    result: Any = None
+    error: Optional[Exception] = None
+    index: Optional[int] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class RateLimiter:
+    """
+    Spread calls evenly, at most rate per second across all threads
+
+    Attributes:
+        rate (float): Calls per second
+    """
+
+    __slots__ = ("rate", "_interval", "_next", "_lock")
+
+    def __init__(self, rate: float):
+        if rate <= 0:
+            raise ValueError(f"rate must be positive, got {rate}")
+        self.rate = rate
+        self._interval = 1.0 / rate
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Wait for the next free slot"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next, now)
+            self._next = slot + self._interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def bulk_map(
+    func: Callable[[Any], Any],
+    items: Iterable[Any],
+    concurrency: int = DEFAULT_CONCURRENCY,
+    rate: Optional[float] = None,
+    window: Optional[int] = None,
+    ordered: bool = True,
+    checkpoint: Optional["BulkCheckpoint"] = None,
+    priority: Optional[str] = None,
+    limiter: Optional[AdaptiveLimiter] = None,
+) -> Iterator[BulkResult]:
+    """
+    Apply func to each item with a thread pool, yielding the results
+
+    Exceptions raised by func are returned in the BulkResult of the item,
+    they do not stop the run.
+
+    With a checkpoint, items already completed by a previous run are
+    skipped, and an item is marked completed once its successful result
+    has been consumed (when the caller asks for the next one). Failed
+    items are not marked and run again on the next run.
+
+    Args:
+        func: Function called with each item (e.g. a client call)
+        items: Items, consumed lazily. Must be the same sequence on every
+            run that shares a checkpoint.
+        concurrency: Number of threads
+        rate: Maximum calls per second (None: unlimited)
+        window: Maximum number of items in flight (default: 2 x concurrency)
+        ordered: Yield in the order of items. When False, yield results as
+            they complete, so one slow call does not hold back the others.
+        checkpoint: Progress of the run, saved periodically
+        priority: Lane of the client calls made by func (e.g. BACKGROUND),
+            for clients with a PriorityScheduler. The threads otherwise
+            inherit the caller's priority and deadline scopes.
+        limiter: Adaptive concurrency limit. The pool then has
+            limiter.max_limit threads, and calls wait for room under the
+            current limit, which follows the latency and overload errors.
+
+    Yields:
+        BulkResult for each item (index is its position in items)
+
+    Example:
+        >>> rows = ({"mapped_order_id": order_id} for order_id in order_ids)
+        >>> for outcome in bulk_map(lambda row: client.check_payment(**row), rows):
+        ...     print(outcome.item, outcome.result if outcome.ok else outcome.error)
+    """
+    rate_limiter = RateLimiter(rate) if rate else None
+    if limiter is not None:
+        concurrency = limiter.max_limit
+    window = window or 2 * concurrency
+    start = checkpoint.offset if checkpoint is not None else 0
+
+    def call(index: int, item: Any) -> BulkResult:
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        try:
+            with ExitStack() as stack:
+                if priority is not None:
+                    stack.enter_context(priority_scope(priority))
+                if limiter is not None:
+                    stack.enter_context(limiter.slot())
+                return BulkResult(item, func(item), index=index)
+        except Exception as e:
+            return BulkResult(item, error=e, index=index)
+
+    executor = ThreadPoolExecutor(concurrency, thread_name_prefix="arzeka-bulk")
+    in_flight = deque() if ordered else set()
+    submit = in_flight.append if ordered else in_flight.add
+
+    def completed(drain: bool) -> Iterator[BulkResult]:
+        # Results that can be yielded now: one when the window is full,
+        # everything when the input is exhausted
+        while in_flight and (drain or len(in_flight) >= window):
+            if ordered:
+                yield in_flight.popleft().result()
+            else:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    in_flight.remove(future)
+                    yield future.result()
+
+    try:
+        for index, item in enumerate(islice(items, start, None), start):
+            if checkpoint is not None and checkpoint.is_done(index):
+                continue
+            # Run in a copy of the caller's context (priority and deadline)
+            submit(executor.submit(copy_context().run, call, index, item))
+            for outcome in completed(drain=False):
+                yield outcome
+                if checkpoint is not None and outcome.ok:
+                    checkpoint.mark_done(outcome.index)
+        for outcome in completed(drain=True):
+            yield outcome
+            if checkpoint is not None and outcome.ok:
+                checkpoint.mark_done(outcome.index)
+    finally:
+        # Stopped early (error, break, Ctrl-C): drop the queued calls
+        for future in in_flight:
+            future.cancel()
+        executor.shutdown(wait=True)
+        if checkpoint is not None:
+            checkpoint.save()
+
+
+async def _aiterate(
+    items: Union[Iterable[Any], AsyncIterable[Any]],
+) -> AsyncIterator[Any]:
+    if hasattr(items, "__aiter__"):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+
+async def abulk_map(
+    func: Callable[[Any], Awaitable[Any]],
+    items: Union[Iterable[Any], AsyncIterable[Any]],
+    concurrency: int = DEFAULT_CONCURRENCY,
+    ordered: bool = False,
+    priority: Optional[str] = None,
+) -> AsyncIterator[BulkResult]:
+    """
+    Await func for each item with at most concurrency calls in flight
+
+    The asynchronous counterpart of bulk_map. Items are pulled from the
+    (async) iterable only when a call can start, and no new call starts
+    while the caller is not consuming results, so a slow consumer slows
+    the producer down instead of piling up results in memory.
+
+    Exceptions raised by func are returned in the BulkResult of the item.
+    When the caller stops early (break, cancellation), the calls in flight
+    are cancelled once the generator is closed, e.g. with
+    ``contextlib.aclosing`` or at the latest when it is garbage collected.
+
+    Args:
+        func: Coroutine function called with each item
+        items: Items, consumed lazily: a plain or an asynchronous iterable
+        concurrency: Maximum number of calls in flight
+        ordered: Yield in the order of items (one slow call then holds
+            back the others). By default results are yielded as they
+            complete.
+        priority: Lane of the client calls made by func, for clients with
+            an AsyncPriorityScheduler
+
+    Yields:
+        BulkResult for each item (index is its position in items)
+
+    Example:
+        >>> async for outcome in abulk_map(client.check_payment, order_ids):
+        ...     print(outcome.item, outcome.result if outcome.ok else outcome.error)
+    """
+    if concurrency < 1:
+        raise ValueError(f"concurrency must be at least 1, got {concurrency}")
+
+    async def call(index: int, item: Any) -> BulkResult:
+        try:
+            if priority is None:
+                return BulkResult(item, await func(item), index=index)
+            # Each task runs in its own copy of the context
+            with priority_scope(priority):
+                return BulkResult(item, await func(item), index=index)
+        except Exception as e:
+            return BulkResult(item, error=e, index=index)
+
+    source = _aiterate(items)
+    in_flight: Deque[asyncio.Task] = deque()
+    exhausted = False
+    index = 0
+    try:
+        while True:
+            while not exhausted and len(in_flight) < concurrency:
+                try:
+                    item = await source.__anext__()
+                except StopAsyncIteration:
+                    exhausted = True
+                    break
+                in_flight.append(asyncio.ensure_future(call(index, item)))
+                index += 1
+            if not in_flight:
+                return
+            if ordered:
+                yield await in_flight.popleft()
+                continue
+            done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                in_flight.remove(task)
+            for task in sorted(done, key=lambda task: task.result().index):
+                yield task.result()
+    finally:
+        for task in in_flight:
+            task.cancel()
+        if in_flight:
+            await asyncio.gather(*in_flight, return_exceptions=True)
+        await source.aclose()
+
+
+class BulkCheckpoint:
+    """
+    Progress of a bulk run, persisted to a small JSON file
+
+    Completed items are tracked by position: every item before offset is
+    completed, and a bitmap records the items completed after it (out of
+    order, or around failed items). The bitmap is shifted as the offset
+    advances, so its size depends on the items in flight and the failures,
+    not on the number of items.
+
+    The file is replaced atomically, every save_every completions or
+    save_interval seconds. before_save is called first, so that results
+    written by the caller are flushed before they are recorded as done: a
+    crash replays at most the items completed since the last save.
+
+    Attributes:
+        path (str): Checkpoint file
+        offset (int): Number of leading items completed
+        completed (int): Number of items completed, over all runs
+        run_id (str): Identifier fixed when the checkpoint is created
+        metadata (dict): Caller data saved with the progress (e.g. the
+            command and input file, to refuse resuming another job)
+
+    Example:
+        >>> checkpoint = BulkCheckpoint("sweep.checkpoint")
+        >>> for outcome in bulk_map(check, rows, checkpoint=checkpoint):
+        ...     writer.write(outcome.result)
+    """
+
+    def __init__(
+        self,
+        path: str,
+        metadata: Optional[Dict[str, Any]] = None,
+        save_every: int = FLUSH_EVERY,
+        save_interval: float = CHECKPOINT_INTERVAL,
+        before_save: Optional[Callable[[], None]] = None,
+    ):
+        """
+        Load the checkpoint file, or start a new one
+
+        Args:
+            path: Checkpoint file
+            metadata: Data saved with a new checkpoint (ignored when the
+                file exists: the saved metadata is kept)
+            save_every: Completions between two saves
+            save_interval: Maximum seconds between two saves
+            before_save: Called before each save (e.g. flush the output)
+        """
+        self.path = path
+        self.save_every = save_every
+        self.save_interval = save_interval
+        self.before_save = before_save
+        self.offset = 0
+        self.completed = 0
+        self.run_id = get_reference()
+        self.metadata = dict(metadata or {})
+        self.resumed = False
+        self._base = 0  # Item of the first bit, a multiple of 8
+        self._bits = bytearray()
+        self._unsaved = 0
+        self._saved_at = time.monotonic()
+        if os.path.exists(path):
+            self._load()
+
+    def _load(self) -> None:
+        with open(self.path, encoding="utf-8") as f:
+            state = DEFAULT_CODEC.loads(f.read())
+        if state.get("version") != CHECKPOINT_VERSION:
+            raise ValueError(f"Unsupported checkpoint file: {self.path}")
+        self.offset = state["offset"]
+        self.completed = state["completed"]
+        self.run_id = state["run_id"]
+        self.metadata = state["metadata"]
+        self._base = state["base"]
+        self._bits = bytearray(base64.b64decode(state["bitmap"]))
+        self.resumed = True
+        logger.info(
+            f"Resuming bulk run {self.run_id}: {self.completed} item(s) done, "
+            f"offset {self.offset}"
+        )
+
+    def is_done(self, index: int) -> bool:
+        """Whether the item at index was completed"""
+        return index < self.offset or self._bit(index)
+
+    def _bit(self, index: int) -> bool:
+        position = index - self._base
+        byte = position >> 3
+        return byte < len(self._bits) and bool(self._bits[byte] & (1 << (position & 7)))
+
+    def mark_done(self, index: int) -> None:
+        """Record the item at index as completed, saving when due"""
+        if self.is_done(index):
+            return
+        position = index - self._base
+        byte = position >> 3
+        if byte >= len(self._bits):
+            self._bits.extend(bytes(byte - len(self._bits) + 1))
+        self._bits[byte] |= 1 << (position & 7)
+        self.completed += 1
+        self._unsaved += 1
+
+        # Advance the offset over the completed prefix, then drop its bytes
+        while self._bit(self.offset):
+            self.offset += 1
+        drop = (self.offset - self._base) >> 3
+        if drop:
+            del self._bits[:drop]
+            self._base += drop << 3
+
+        if (
+            self._unsaved >= self.save_every
+            or time.monotonic() - self._saved_at >= self.save_interval
+        ):
+            self.save()
+
+    def save(self) -> None:
+        """Write the checkpoint file atomically"""
+        if self.before_save is not None:
+            self.before_save()
+        state = {
+            "version": CHECKPOINT_VERSION,
+            "run_id": self.run_id,
+            "offset": self.offset,
+            "completed": self.completed,
+            "base": self._base,
+            "bitmap": base64.b64encode(bytes(self._bits)).decode("ascii"),
+            "metadata": self.metadata,
+        }
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            f.write(DEFAULT_CODEC.dumps(state))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self.path)
+        self._unsaved = 0
+        self._saved_at = time.monotonic()
+
+    def remove(self) -> None:
+        """Delete the checkpoint file (e.g. once the job is complete)"""
+        for path in (self.path, f"{self.path}.tmp"):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def parse_flag(value: Any) -> bool:
+    """
+    Read a boolean column: CSV values such as "1", "true", "yes" or "oui"
+
+    Args:
+        value: Column value (string, bool, number or None)
+
+    Returns:
+        bool: Value of the flag
+    """
+    if isinstance(value, str):
+        return value.strip().lower() in _TRUE_VALUES
+    return bool(value)
+
+
+def detect_format(path: Optional[str], default: str = FORMAT_CSV) -> str:
+    """
+    Guess the format of a file from its extension
+
+    Args:
+        path: File path ("-" or None for standard streams)
+        default: Format returned when the extension is not known
+
+    Returns:
+        str: "csv" or "jsonl"
+    """
+    if path and path != "-":
+        for extension, file_format in _FORMAT_EXTENSIONS.items():
+            if path.lower().endswith(extension):
+                return file_format
+        if path.lower().endswith(".csv"):
+            return FORMAT_CSV
+    return default
+
+
+def read_rows(
+    source: TextIO, file_format: str = FORMAT_CSV
+) -> Iterator[Dict[str, Any]]:
+    """
+    Read rows one at a time from a CSV (with header) or JSON Lines stream
+
+    Args:
+        source: Open text stream
+        file_format: "csv" or "jsonl"
+
+    Yields:
+        dict for each row. CSV values are strings, blank JSONL lines are
+        skipped.
+    """
+    if file_format == FORMAT_CSV:
+        yield from csv.DictReader(source)
+        return
+    for line in source:
+        if line.strip():
+            yield DEFAULT_CODEC.loads(line)
+
+
+class RowWriter:
+    """
+    Write rows to a CSV or JSON Lines stream as they come
+
+    The CSV header is taken from the first row unless fieldnames is given.
+    Keys missing from a row are written empty, unknown keys are dropped.
+    Set header to False to append to a CSV file that already has one.
+    """
+
+    def __init__(
+        self,
+        stream: TextIO,
+        file_format: str = FORMAT_CSV,
+        fieldnames: Optional[Sequence[str]] = None,
+        flush_every: int = FLUSH_EVERY,
+        header: bool = True,
+    ):
+        self.stream = stream
+        self.file_format = file_format
+        self.fieldnames = list(fieldnames) if fieldnames else None
+        self.flush_every = flush_every
+        self.header = header
+        self.rows = 0
+        self._csv = None
+
+    def write(self, row: Dict[str, Any]) -> None:
+        """Write one row"""
+        if self.file_format == FORMAT_CSV:
+            if self._csv is None:
+                self._csv = csv.DictWriter(
+                    self.stream,
+                    fieldnames=self.fieldnames or list(row),
+                    extrasaction="ignore",
+                )
+                if self.header:
+                    self._csv.writeheader()
+            self._csv.writerow(row)
+        else:
+            self.stream.write(DEFAULT_CODEC.dumps(row))
+            self.stream.write("\n")
+
+        self.rows += 1
+        if self.rows % self.flush_every == 0:
+            self.stream.flush()
+
+    def flush(self) -> None:
+        """Flush the underlying stream"""
+        self.stream.flush()
@@ -0,0 +1,543 @@
+"""
+Command-line bulk runner
+
+    fasoarzeka bulk-sms -i recipients.csv -o results.csv --message "Merci"
+    fasoarzeka bulk-check -i orders.jsonl --concurrency 16 --rate 50
+    fasoarzeka bulk-pay -i payments.csv --merchant-id M1 \\
+        --callback-url https://example.com/webhook \\
+        --return-url https://example.com/return
+    fasoarzeka reconcile -i orders.csv -o report.csv --ledger ledger.db --incremental
+    fasoarzeka token-broker --socket /run/fasoarzeka/broker.sock
+
+Input rows are read from a CSV file (with header) or a JSON Lines file,
+or from standard input. Results are written incrementally, one output row
+per input row in the same order: the input columns plus ``ok``, ``error``
+and the fields of the operation. Memory use does not grow with the input.
+
+With ``--checkpoint FILE`` the progress is saved as the rows complete:
+running the same command again skips the rows already done and appends
+to the output, failed rows are tried again.
+
+Credentials are read from ARZEKA_USERNAME and ARZEKA_PASSWORD, and the
+payment signing secret from ARZEKA_HASH_SECRET, so that they do not
+appear in the process list. With ``--token-broker`` (or
+ARZEKA_TOKEN_BROKER set), the token comes from a running
+``fasoarzeka token-broker`` instead of a request to the API.
+"""
+
+import argparse
+import csv
+import logging
+import os
+import sys
+import time
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    TextIO,
+    Tuple,
+)
+
+from .adaptive import DEFAULT_INITIAL_LIMIT, AdaptiveLimiter
+from .arzeka import BASE_URL, ArzekaPayment
+from .broker import ENV_SOCKET, BrokerTokenProvider, TokenBroker
+from .bulk import (
+    DEFAULT_CONCURRENCY,
+    BulkCheckpoint,
+    FORMAT_CSV,
+    FORMAT_JSONL,
+    RowWriter,
+    bulk_map,
+    detect_format,
+    parse_flag,
+    read_rows,
+)
+from .exceptions import ArzekaPaymentError
+from .ledger import PaymentLedger, _sms_reference
+from .priority import BACKGROUND
+from .reconcile import PAID_STATUSES, Reconciler
+from .retries import RetryBudget
+from .transport import DEFAULT_MAX_CONNECTIONS
+
+logger = logging.getLogger(__name__)
+
+ENV_USERNAME = "ARZEKA_USERNAME"
+ENV_PASSWORD = "ARZEKA_PASSWORD"
+ENV_HASH_SECRET = "ARZEKA_HASH_SECRET"
+
+# Exit codes
+EXIT_OK = 0
+EXIT_FAILED_ROWS = 1  # Some rows failed, or authentication failed
+EXIT_USAGE = 2  # Same as argparse
+
+# bulk-pay columns that are initiate_payment arguments, the other columns
+# go to additional_info
+PAY_COLUMNS = (
+    "amount",
+    "merchant_id",
+    "mapped_order_id",
+    "link_for_update_status",
+    "link_back_to_calling_website",
+    "additional_info",
+)
+
+
+def _number(value: Any) -> Any:
+    """Convert a CSV amount to int or float, other values are kept"""
+    if isinstance(value, str) and value.strip():
+        try:
+            number = float(value)
+        except ValueError:
+            return value
+        return int(number) if number.is_integer() else number
+    return value
+
+
+def send_sms_row(
+    client: ArzekaPayment, row: Dict[str, Any], args: argparse.Namespace
+) -> Dict[str, Any]:
+    """Send the SMS of one input row (columns: mobile, message)"""
+    response = client.send_sms(row["mobile"], row.get("message") or args.message)
+    return {"status": response.get("status"), "sms_id": _sms_reference(response)}
+
+
+def check_payment_row(
+    client: ArzekaPayment, row: Dict[str, Any], args: argparse.Namespace
+) -> Dict[str, Any]:
+    """Check the payment of one input row (columns: mapped_order_id, transaction_id)"""
+    response = client.check_payment(
+        row["mapped_order_id"], row.get("transaction_id") or None
+    )
+    return {"status": response.get("status"), "transaction_id": response.get("transId")}
+
+
+def initiate_payment_row(
+    client: ArzekaPayment, row: Dict[str, Any], args: argparse.Namespace
+) -> Dict[str, Any]:
+    """
+    Initiate the payment of one input row
+
+    Columns: amount, merchant_id, mapped_order_id (optional), and the
+    additional_info fields (firstname, lastname, mobile, ...) either as
+    columns or, in JSON Lines, as an additional_info object.
+    """
+    additional_info = row.get("additional_info")
+    if not isinstance(additional_info, dict):
+        additional_info = {
+            key: value
+            for key, value in row.items()
+            if key not in PAY_COLUMNS and value not in (None, "")
+        }
+    if "generateReceipt" in additional_info:
+        additional_info["generateReceipt"] = parse_flag(
+            additional_info["generateReceipt"]
+        )
+
+    response, payment_data = client.initiate_payment(
+        amount=_number(row.get("amount")),
+        merchant_id=row.get("merchant_id") or args.merchant_id,
+        link_for_update_status=row.get("link_for_update_status") or args.callback_url,
+        link_back_to_calling_website=(
+            row.get("link_back_to_calling_website") or args.return_url
+        ),
+        additional_info=additional_info,
+        hash_secret=args.hash_secret,
+        mapped_order_id=row.get("mapped_order_id") or None,
+    )
+    return {
+        "mapped_order_id": payment_data["mappedOrderId"],
+        "url": response.get("url"),
+    }
+
+
+# Subcommand -> (row function, result fields)
+COMMANDS: Dict[
+    str,
+    Tuple[
+        Callable[[ArzekaPayment, Dict[str, Any], argparse.Namespace], Dict[str, Any]],
+        Tuple[str, ...],
+    ],
+] = {
+    "bulk-sms": (send_sms_row, ("status", "sms_id")),
+    "bulk-check": (check_payment_row, ("status", "transaction_id")),
+    "bulk-pay": (initiate_payment_row, ("mapped_order_id", "url")),
+}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Create the argument parser of the fasoarzeka command"""
+    parser = argparse.ArgumentParser(
+        prog="fasoarzeka", description="Bulk operations on the Arzeka API"
+    )
+    parser.add_argument("-v", "--verbose", action="store_true", help="log requests")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument(
+        "-i", "--input", default="-", help="CSV or JSONL file (default: stdin)"
+    )
+    common.add_argument(
+        "-o", "--output", default="-", help="results file (default: stdout)"
+    )
+    common.add_argument(
+        "--input-format",
+        choices=(FORMAT_CSV, FORMAT_JSONL),
+        help="default: from the file extension, else csv",
+    )
+    common.add_argument(
+        "--output-format",
+        choices=(FORMAT_CSV, FORMAT_JSONL),
+        help="default: from the file extension, else the input format",
+    )
+    common.add_argument(
+        "-c",
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help=f"parallel requests (default: {DEFAULT_CONCURRENCY})",
+    )
+    common.add_argument(
+        "--adaptive",
+        action="store_true",
+        help="adapt the parallel requests to the gateway latency and errors, "
+        "up to --concurrency",
+    )
+    common.add_argument(
+        "--retry-budget",
+        type=float,
+        metavar="RATIO",
+        help="retries allowed per successful request, so that an outage "
+        "fails fast (default: up to 3 retries per call)",
+    )
+    common.add_argument("-r", "--rate", type=float, help="maximum requests per second")
+    common.add_argument("--base-url", default=BASE_URL, help="Arzeka API base URL")
+    common.add_argument(
+        "--username",
+        default=os.environ.get(ENV_USERNAME),
+        help=f"default: ${ENV_USERNAME}",
+    )
+    common.add_argument(
+        "--token-broker",
+        metavar="SOCKET",
+        default=os.environ.get(ENV_SOCKET),
+        help=f"get the token from a token broker (default: ${ENV_SOCKET})",
+    )
+
+    resumable = argparse.ArgumentParser(add_help=False)
+    resumable.add_argument(
+        "--checkpoint",
+        help="progress file: resume from it if it exists (requires --output)",
+    )
+    resumable.add_argument(
+        "--unordered",
+        action="store_true",
+        help="write results as they complete instead of in input order",
+    )
+
+    sms = commands.add_parser(
+        "bulk-sms",
+        parents=[common, resumable],
+        help="send SMS (columns: mobile, message)",
+    )
+    sms.add_argument("--message", help="message for rows without a message column")
+
+    commands.add_parser(
+        "bulk-check",
+        parents=[common, resumable],
+        help="check payments (columns: mapped_order_id, transaction_id)",
+    )
+
+    pay = commands.add_parser(
+        "bulk-pay",
+        parents=[common, resumable],
+        help="initiate payments (columns: amount, merchant_id, mapped_order_id, "
+        "firstname, lastname, mobile, ...)",
+    )
+    pay.add_argument("--merchant-id", help="merchant for rows without merchant_id")
+    pay.add_argument("--callback-url", help="link_for_update_status")
+    pay.add_argument("--return-url", help="link_back_to_calling_website")
+
+    reconcile = commands.add_parser(
+        "reconcile",
+        parents=[common],
+        help="report orders whose gateway status disagrees "
+        "(columns: mapped_order_id, fulfilled, updated_at)",
+    )
+    reconcile.add_argument(
+        "--ledger", help="SQLite ledger caching final statuses and past runs"
+    )
+    reconcile.add_argument(
+        "--incremental",
+        action="store_true",
+        help="skip final orders unchanged since the last run (requires --ledger)",
+    )
+    reconcile.add_argument(
+        "--all", action="store_true", help="also report the matching orders"
+    )
+    reconcile.add_argument(
+        "--paid-status",
+        action="append",
+        help=f"gateway status of a paid order (default: {', '.join(PAID_STATUSES)})",
+    )
+    reconcile.set_defaults(checkpoint=None, unordered=True)
+
+    broker = commands.add_parser(
+        "token-broker",
+        help="keep tokens valid for other fasoarzeka processes (Unix socket)",
+    )
+    broker.add_argument(
+        "--socket", help=f"socket path (default: ${ENV_SOCKET} or a per-user path)"
+    )
+    return parser
+
+
+def serve_broker(args: argparse.Namespace) -> int:
+    """Run the token-broker subcommand until interrupted"""
+    logging.getLogger("fasoarzeka").setLevel(logging.INFO)
+    try:
+        TokenBroker(args.socket).serve_forever()
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        print(f"fasoarzeka: {e}", file=sys.stderr)
+        return EXIT_FAILED_ROWS
+    return EXIT_OK
+
+
+def _open(path: str, mode: str, standard: TextIO) -> TextIO:
+    if path == "-":
+        return standard
+    return open(path, mode, encoding="utf-8", newline="")
+
+
+def _csv_header(path: str) -> Optional[List[str]]:
+    """Header of an existing, non-empty CSV file"""
+    if path == "-" or not os.path.exists(path) or not os.path.getsize(path):
+        return None
+    with open(path, encoding="utf-8", newline="") as f:
+        return next(csv.reader(f), None)
+
+
+def _with_order_ids(
+    rows: Iterator[Dict[str, Any]], run_id: str
+) -> Iterator[Dict[str, Any]]:
+    """
+    Give each payment row without one a mapped_order_id derived from its
+    position, so that a resumed run initiates a replayed row under the same
+    reference instead of creating a second payment
+    """
+    for index, row in enumerate(rows):
+        if not row.get("mapped_order_id"):
+            row = dict(row, mapped_order_id=f"{run_id}.{index}")
+        yield row
+
+
+def run(
+    client: ArzekaPayment,
+    args: argparse.Namespace,
+    source: TextIO,
+    writer: RowWriter,
+    checkpoint: Optional[BulkCheckpoint] = None,
+) -> Tuple[int, int]:
+    """
+    Run a bulk subcommand
+
+    Args:
+        client: Authenticated client
+        args: Parsed arguments
+        source: Input stream
+        writer: Output rows
+        checkpoint: Progress of the run, rows already done are skipped
+
+    Returns:
+        tuple: (rows processed, rows failed)
+    """
+    row_function, fields = COMMANDS[args.command]
+    rows = read_rows(source, args.input_format or detect_format(args.input))
+    if checkpoint is not None and args.command == "bulk-pay":
+        rows = _with_order_ids(rows, checkpoint.run_id)
+    empty = dict.fromkeys(fields)
+
+    failed = 0
+    for outcome in bulk_map(
+        lambda row: row_function(client, row, args),
+        rows,
+        concurrency=args.concurrency,
+        rate=args.rate,
+        ordered=not args.unordered,
+        checkpoint=checkpoint,
+        priority=BACKGROUND,
+        limiter=args.limiter,
+    ):
+        if outcome.ok:
+            output = dict(outcome.item, ok=True, error="", **outcome.result)
+        else:
+            failed += 1
+            error = f"{type(outcome.error).__name__}: {outcome.error}"
+            output = dict(outcome.item, ok=False, error=error, **empty)
+        writer.write(output)
+    writer.flush()
+    return writer.rows, failed
+
+
+def run_reconcile(
+    client: ArzekaPayment,
+    args: argparse.Namespace,
+    source: TextIO,
+    writer: RowWriter,
+    ledger: Optional[PaymentLedger] = None,
+) -> Tuple[int, int]:
+    """
+    Run the reconcile subcommand
+
+    Args:
+        client: Authenticated client
+        args: Parsed arguments
+        source: Order export
+        writer: Report rows
+        ledger: Cache of final statuses and past runs
+
+    Returns:
+        tuple: (orders read, discrepancies)
+    """
+    reconciler = Reconciler(
+        client,
+        ledger,
+        concurrency=args.concurrency,
+        rate=args.rate,
+        paid_statuses=args.paid_status or PAID_STATUSES,
+        limiter=args.limiter,
+    )
+    rows = read_rows(source, args.input_format or detect_format(args.input))
+    for line in reconciler.reconcile(
+        rows, incremental=args.incremental, include_matched=args.all
+    ):
+        writer.write(line.as_row())
+    writer.flush()
+    return reconciler.stats["orders"], reconciler.stats["discrepancies"]
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """
+    Entry point of the fasoarzeka command
+
+    Args:
+        argv: Arguments (default: sys.argv[1:])
+
+    Returns:
+        int: 0 when every row succeeded (reconcile: no discrepancy), 1 when
+        some failed, 2 on usage errors
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    logging.getLogger("fasoarzeka").setLevel(
+        logging.INFO if args.verbose else logging.WARNING
+    )
+    if args.command == "token-broker":
+        return serve_broker(args)
+
+    password = os.environ.get(ENV_PASSWORD)
+    if not args.username or not password:
+        parser.error(f"set {ENV_USERNAME} (or --username) and {ENV_PASSWORD}")
+    args.hash_secret = os.environ.get(ENV_HASH_SECRET)
+    if args.command == "bulk-pay":
+        missing: List[str] = []
+        if not args.hash_secret:
+            missing.append(ENV_HASH_SECRET)
+        if not (args.callback_url and args.return_url):
+            missing.append("--callback-url and --return-url")
+        if missing:
+            parser.error(f"bulk-pay requires {', '.join(missing)}")
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+    if args.retry_budget is not None and args.retry_budget < 0:
+        parser.error("--retry-budget must not be negative")
+    if args.command == "reconcile" and args.incremental and not args.ledger:
+        parser.error("--incremental requires --ledger")
+    args.limiter = None
+    if args.adaptive:
+        args.limiter = AdaptiveLimiter(
+            initial=min(DEFAULT_INITIAL_LIMIT, args.concurrency),
+            max_limit=args.concurrency,
+        )
+
+    checkpoint = None
+    header = None
+    if args.checkpoint:
+        if args.output == "-":
+            parser.error("--checkpoint requires --output")
+        try:
+            checkpoint = BulkCheckpoint(
+                args.checkpoint,
+                metadata={"command": args.command, "input": args.input},
+            )
+        except (OSError, ValueError) as e:
+            parser.error(f"cannot read checkpoint {args.checkpoint}: {e}")
+        if checkpoint.metadata.get("command") != args.command:
+            parser.error(
+                f"checkpoint {args.checkpoint} belongs to "
+                f"{checkpoint.metadata.get('command')}, not {args.command}"
+            )
+        if checkpoint.resumed:
+            header = _csv_header(args.output)
+    input_format = args.input_format or detect_format(args.input)
+    output_format = args.output_format or detect_format(args.output, input_format)
+    append = checkpoint is not None and checkpoint.resumed
+
+    retry_budget = (
+        RetryBudget(ratio=args.retry_budget) if args.retry_budget is not None else None
+    )
+    client = ArzekaPayment(
+        base_url=args.base_url,
+        pool_maxsize=max(args.concurrency, DEFAULT_MAX_CONNECTIONS),
+        token_provider=(
+            BrokerTokenProvider(args.token_broker) if args.token_broker else None
+        ),
+        retry_budget=retry_budget,
+    )
+    source = _open(args.input, "r", sys.stdin)
+    destination = _open(args.output, "a" if append else "w", sys.stdout)
+    writer = RowWriter(
+        destination, output_format, fieldnames=header, header=header is None
+    )
+    if checkpoint is not None:
+        checkpoint.before_save = writer.flush
+    ledger = PaymentLedger(args.ledger) if getattr(args, "ledger", None) else None
+    start = time.monotonic()
+    try:
+        client.authenticate(args.username, password)
+        if args.command == "reconcile":
+            rows, failed = run_reconcile(client, args, source, writer, ledger)
+        else:
+            rows, failed = run(client, args, source, writer, checkpoint)
+    except ArzekaPaymentError as e:
+        print(f"fasoarzeka: {e}", file=sys.stderr)
+        return EXIT_FAILED_ROWS
+    finally:
+        for stream in (source, destination):
+            if stream not in (sys.stdin, sys.stdout):
+                stream.close()
+        client.close()
+        if ledger is not None:
+            ledger.close()
+
+    skipped = f", {checkpoint.completed - rows + failed} done before" if append else ""
+    outcome = "discrepancies" if args.command == "reconcile" else "failed"
+    limit = f", concurrency {args.limiter.limit}" if args.limiter else ""
+    denied = retry_budget.stats["denied"] if retry_budget else 0
+    retries = f", {denied} retries denied" if denied else ""
+    print(
+        f"fasoarzeka: {rows} row(s), {failed} {outcome}{skipped} "
+        f"in {time.monotonic() - start:.1f}s{limit}{retries}",
+        file=sys.stderr,
+    )
+    return EXIT_FAILED_ROWS if failed else EXIT_OK
+
+
+if __name__ == "__main__":  # pragma: no cover
+    sys.exit(main())
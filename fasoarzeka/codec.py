@@ -0,0 +1,238 @@
+"""
+JSON codecs for request payloads and API responses
+
+``additionalInfo`` is part of the signed payment data, so whatever library
+encodes it must produce exactly the bytes of
+``json.dumps(value, separators=(",", ":"))``. The fast codecs only encode
+values made of dicts, lists, strings, integers, booleans and None; other
+values (floats, custom types) go through the standard library. Non-ASCII
+characters are escaped afterwards the way ``ensure_ascii`` does.
+
+Decoding uses the fast library when it is installed and falls back to the
+standard library for inputs it rejects (NaN, ...). orjson decodes integers
+that do not fit in 64 bits as floats; the Arzeka API does not send such
+numbers, use the "json" codec if another service does.
+"""
+
+import json
+import logging
+import re
+from typing import Any, Callable, Dict, Tuple, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import ujson
+except ImportError:  # pragma: no cover - optional dependency
+    ujson = None
+
+logger = logging.getLogger(__name__)
+
+# Codec names accepted by get_codec, "auto" picks the fastest installed one
+AUTO = "auto"
+CODEC_PREFERENCE = ("orjson", "ujson", "json")
+
+_STDLIB_ENCODER = json.JSONEncoder(separators=(",", ":"))
+
+# Characters that ensure_ascii escapes and the fast libraries emit raw
+_NON_ASCII = re.compile("[^\x00-\x7e]")
+
+_INT_MIN = -(2**63)
+_INT_MAX = 2**64 - 1
+_SCALAR_TYPES = frozenset((str, bool, type(None)))
+
+
+def _escape_non_ascii(match: "re.Match") -> str:
+    code = ord(match.group())
+    if code < 0x10000:
+        return f"\\u{code:04x}"
+    code -= 0x10000
+    return f"\\u{0xD800 | (code >> 10):04x}\\u{0xDC00 | (code & 0x3FF):04x}"
+
+
+def _is_plain(value: Any) -> bool:
+    """Check that a value only holds types every codec encodes identically"""
+    kind = type(value)
+    if kind in _SCALAR_TYPES:
+        return True
+    if kind is int:
+        return _INT_MIN <= value <= _INT_MAX
+    if kind is dict:
+        # Loop rather than all(...): payloads are small, call overhead dominates
+        for key, item in value.items():
+            if type(key) is not str:
+                return False
+            if type(item) not in _SCALAR_TYPES and not _is_plain(item):
+                return False
+        return True
+    if kind is list:
+        for item in value:
+            if type(item) not in _SCALAR_TYPES and not _is_plain(item):
+                return False
+        return True
+    return False
+
+
+class JSONCodec:
+    """
+    Compact JSON encoder and decoder backed by the standard library
+
+    Attributes:
+        name (str): Name of the backing library
+    """
+
+    name = "json"
+    # Whether reading one field by scanning the raw body is cheaper than
+    # decoding the whole body (see models.LazyResponse)
+    scan_fields = True
+
+    def dumps(self, value: Any) -> str:
+        """
+        Encode a value as compact JSON
+
+        Args:
+            value: Value to encode
+
+        Returns:
+            str: Same text as ``json.dumps(value, separators=(",", ":"))``
+        """
+        return _STDLIB_ENCODER.encode(value)
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        """
+        Decode JSON
+
+        Args:
+            data: JSON document
+
+        Returns:
+            Decoded value
+
+        Raises:
+            ValueError: If data is not valid JSON
+        """
+        return json.loads(data)
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__} {self.name}>"
+
+    def __reduce__(self):
+        # Pickled by name: results sent back by worker processes hold a codec
+        return get_codec, (self.name,)
+
+
+class _FastJSONCodec(JSONCodec):
+    """JSON codec backed by a C library, with standard library fallbacks"""
+
+    # Whether the library escapes quotes and control characters exactly like
+    # the standard library. When False, any escaped output is re-encoded.
+    escapes_match_stdlib = False
+    # Full decoding in C is about as fast as scanning for a field in Python
+    scan_fields = False
+
+    def __init__(self, dumps: Callable[[Any], str], loads: Callable[[Any], Any]):
+        self._dumps = dumps
+        self._loads = loads
+
+    def dumps(self, value: Any) -> str:
+        if not _is_plain(value):
+            return _STDLIB_ENCODER.encode(value)
+
+        try:
+            text = self._dumps(value)
+        except (TypeError, ValueError, OverflowError):
+            # Lone surrogates and other values the library refuses
+            return _STDLIB_ENCODER.encode(value)
+        if not self.escapes_match_stdlib and "\\" in text:
+            return _STDLIB_ENCODER.encode(value)
+        if not text.isascii() or "\x7f" in text:
+            text = _NON_ASCII.sub(_escape_non_ascii, text)
+        return text
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        try:
+            return self._loads(data)
+        except ValueError:
+            # NaN, Infinity, huge integers...: let the standard library
+            # decide, it raises ValueError on truly invalid documents
+            return json.loads(data)
+
+
+class OrjsonCodec(_FastJSONCodec):
+    """JSON codec backed by orjson"""
+
+    name = "orjson"
+    escapes_match_stdlib = True
+
+    def __init__(self):
+        super().__init__(lambda value: orjson.dumps(value).decode(), orjson.loads)
+
+
+class UjsonCodec(_FastJSONCodec):
+    """JSON codec backed by ujson"""
+
+    name = "ujson"
+
+    def __init__(self):
+        super().__init__(
+            lambda value: ujson.dumps(
+                value, ensure_ascii=False, escape_forward_slashes=False
+            ),
+            ujson.loads,
+        )
+
+
+_CODEC_FACTORIES: Dict[str, Callable[[], JSONCodec]] = {"json": JSONCodec}
+if orjson is not None:
+    _CODEC_FACTORIES["orjson"] = OrjsonCodec
+if ujson is not None:
+    _CODEC_FACTORIES["ujson"] = UjsonCodec
+
+_codecs: Dict[str, JSONCodec] = {}
+
+
+def available_codecs() -> Tuple[str, ...]:
+    """
+    List the codecs that can be used
+
+    Returns:
+        tuple: Codec names, fastest first
+    """
+    return tuple(name for name in CODEC_PREFERENCE if name in _CODEC_FACTORIES)
+
+
+def get_codec(codec: Union[str, JSONCodec, None] = AUTO) -> JSONCodec:
+    """
+    Get a JSON codec by name
+
+    Args:
+        codec: "auto" (fastest installed library), "orjson", "ujson", "json",
+               or a JSONCodec instance which is returned as is
+
+    Returns:
+        JSONCodec instance (shared, codecs are stateless)
+
+    Raises:
+        ValueError: If the codec is unknown or its library is not installed
+    """
+    if isinstance(codec, JSONCodec):
+        return codec
+    if codec is None or codec == AUTO:
+        codec = available_codecs()[0]
+
+    if codec not in _codecs:
+        if codec not in _CODEC_FACTORIES:
+            raise ValueError(
+                f"Unknown or unavailable JSON codec: {codec!r}. "
+                f"Available: {', '.join(available_codecs())}"
+            )
+        _codecs[codec] = _CODEC_FACTORIES[codec]()
+        logger.debug(f"Using {codec} JSON codec")
+    return _codecs[codec]
+
+
+# Codec used by the protocol functions when none is given
+DEFAULT_CODEC = get_codec(AUTO)
@@ -32,8 +32,21 @@ class ArzekaAPIError(ArzekaPaymentError):
         self.status_code = status_code
         self.response_data = response_data
 
+    def __reduce__(self):
+        # Keep status and body when the error crosses a process boundary
+        return (
+            self.__class__,
+            (str(self), self.status_code, self.response_data),
+        )
+
 
 class ArzekaAuthenticationError(ArzekaPaymentError):
     """Exception raised when authentication fails"""
 
     pass
+
+
+class ArzekaTimeoutError(ArzekaConnectionError):
+    """Exception raised when a request times out or its deadline has passed"""
+
+    pass
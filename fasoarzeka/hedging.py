@@ -0,0 +1,335 @@
+"""
+Hedged requests for idempotent lookups
+
+A few status lookups take many times longer than the median, because of a
+slow connection or a busy gateway worker. With a ``HedgePolicy`` passed to
+a client as ``hedging=``, a lookup that got no answer after ``delay``
+seconds is sent a second time, on another pooled connection, and the first
+answer wins:
+
+- the delay is a percentile (p95 by default) of the recent lookup
+  latencies, so only the slowest lookups are hedged;
+- a budget caps the extra load: each lookup earns ``budget`` of a hedge,
+  and a hedge is only sent when a whole one has been earned (5% more
+  requests at most by default);
+- only idempotent lookups (check_payment, check_sms_status) are ever
+  hedged; payments and SMS are sent once.
+
+The slower copy of a hedged lookup is cancelled by the async client; the
+sync client lets it finish in the background and returns its connection to
+the pool. Sync lookups run on the policy's threads (max_workers); when they
+are all busy, a lookup is sent from the caller's thread without a hedge.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Sequence, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Operations that may be sent twice without side effects
+IDEMPOTENT_OPERATIONS = ("check_payment", "check_sms_status")
+
+DEFAULT_PERCENTILE = 95.0
+DEFAULT_BUDGET = 0.05  # Hedges allowed per lookup
+DEFAULT_MIN_DELAY = 0.005  # Seconds, never hedge sooner
+DEFAULT_WINDOW = 1000  # Latencies the percentile is computed over
+MIN_SAMPLES = 20  # Latencies needed before hedging starts
+MAX_CREDIT = 10.0  # Hedges that can be saved up for a burst of slow lookups
+_RECOMPUTE_EVERY = 20  # Samples between two percentile computations
+
+
+class HedgePolicy:
+    """
+    When to send a second copy of a slow idempotent lookup
+
+    A policy can be shared by several clients (sync and async): latencies
+    and budget are then pooled.
+
+    Attributes:
+        percentile (float): Latency percentile used as the hedging delay
+        budget (float): Hedges allowed per lookup (0.05: 5% extra requests)
+        min_delay (float): Lowest hedging delay in seconds
+        operations (frozenset): Operations that are hedged
+        stats (dict): lookups, hedged, hedge_wins (the hedge answered
+            first), over_budget (hedge not sent, budget exhausted) and
+            saturated (sync lookup not hedged, all threads busy)
+
+    Example:
+        >>> client = ArzekaPayment(hedging=HedgePolicy(percentile=90))
+        >>> client.check_payment(order_id)  # Hedged after the p90 latency
+    """
+
+    def __init__(
+        self,
+        percentile: float = DEFAULT_PERCENTILE,
+        budget: float = DEFAULT_BUDGET,
+        min_delay: float = DEFAULT_MIN_DELAY,
+        window: int = DEFAULT_WINDOW,
+        operations: Sequence[str] = IDEMPOTENT_OPERATIONS,
+        max_workers: int = 32,
+    ):
+        """
+        Create a hedging policy
+
+        Args:
+            percentile: Latency percentile after which a lookup is hedged
+            budget: Hedges allowed per lookup
+            min_delay: Lowest hedging delay in seconds
+            window: Number of recent latencies the percentile covers
+            operations: Operations to hedge, among IDEMPOTENT_OPERATIONS
+            max_workers: Threads running the copies of sync lookups. Give
+                at least twice the number of concurrent callers (e.g. the
+                pool_maxsize of the clients sharing the policy): lookups
+                beyond it are sent from the caller's thread, unhedged.
+
+        Raises:
+            ValueError: If an operation is not idempotent, or percentile
+                or budget is out of range
+        """
+        unsafe = set(operations) - set(IDEMPOTENT_OPERATIONS)
+        if unsafe:
+            raise ValueError(
+                f"Cannot hedge non-idempotent operations: {sorted(unsafe)}"
+            )
+        if not 0 < percentile < 100:
+            raise ValueError(f"percentile must be between 0 and 100, got {percentile}")
+        if budget < 0:
+            raise ValueError(f"budget must not be negative, got {budget}")
+        self.percentile = percentile
+        self.budget = budget
+        self.min_delay = min_delay
+        self.operations = frozenset(operations)
+        self.max_workers = max_workers
+
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._new_samples = 0
+        self._delay: Optional[float] = None
+        self._credit = 0.0
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._free = threading.BoundedSemaphore(max_workers)
+        self._pid = os.getpid()
+        self.stats = dict.fromkeys(
+            ("lookups", "hedged", "hedge_wins", "over_budget", "saturated"), 0
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"HedgePolicy(percentile={self.percentile}, budget={self.budget}, "
+            f"delay={self.delay})"
+        )
+
+    def applies(self, operation: Optional[str]) -> bool:
+        """Tell whether an operation is hedged"""
+        return operation in self.operations
+
+    @property
+    def delay(self) -> Optional[float]:
+        """Current hedging delay in seconds, None until enough latencies"""
+        return self._delay
+
+    def record(self, latency: float) -> None:
+        """
+        Add the latency of a successful lookup
+
+        Args:
+            latency: Seconds between sending the request and the answer
+        """
+        with self._lock:
+            self._samples.append(latency)
+            self._new_samples += 1
+            if len(self._samples) < MIN_SAMPLES:
+                return
+            if self._delay is None or self._new_samples >= _RECOMPUTE_EVERY:
+                ordered = sorted(self._samples)
+                rank = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))
+                self._delay = max(self.min_delay, ordered[rank])
+                self._new_samples = 0
+
+    def _start(self) -> Optional[float]:
+        """Count a lookup, earn its share of budget, return the delay"""
+        with self._lock:
+            self.stats["lookups"] += 1
+            self._credit = min(MAX_CREDIT, self._credit + self.budget)
+            return self._delay
+
+    def _spend(self) -> bool:
+        """Take one hedge from the budget"""
+        with self._lock:
+            if self._credit < 1:
+                self.stats["over_budget"] += 1
+                return False
+            self._credit -= 1
+            self.stats["hedged"] += 1
+            return True
+
+    def _count_win(self) -> None:
+        with self._lock:
+            self.stats["hedge_wins"] += 1
+
+    def _refund(self) -> None:
+        """Give back a hedge that found no free thread"""
+        with self._lock:
+            self._credit += 1
+            self.stats["hedged"] -= 1
+            self.stats["saturated"] += 1
+
+    def _submit(self, call: Callable[[], T]) -> "Optional[Future[T]]":
+        """
+        Run a copy of a lookup on a free pool thread
+
+        Copies never wait in the executor queue, where their wait would
+        escape the measured latencies: when all max_workers threads are
+        busy, None is returned.
+        """
+        with self._lock:
+            # Worker threads do not survive a fork: start a new pool in children
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(
+                    self.max_workers, thread_name_prefix="arzeka-hedge"
+                )
+                self._free = threading.BoundedSemaphore(self.max_workers)
+                self._pid = os.getpid()
+            executor, free = self._executor, self._free
+        if not free.acquire(blocking=False):
+            return None
+        try:
+            future = executor.submit(self._timed, call)
+        except BaseException:
+            free.release()
+            raise
+        future.add_done_callback(lambda _: free.release())
+        return future
+
+    def _timed(self, call: Callable[[], T]) -> T:
+        start = time.monotonic()
+        result = call()
+        self.record(time.monotonic() - start)
+        return result
+
+    def run(self, call: Callable[[], T]) -> T:
+        """
+        Run a blocking lookup, hedged if it is slower than the delay
+
+        Args:
+            call: Function sending the request and returning its response.
+                It may run twice, concurrently.
+
+        Returns:
+            The result of the first copy that succeeded
+
+        Raises:
+            Exception: The error of the first copy, if every copy failed
+        """
+        delay = self._start()
+        if delay is None:
+            return self._timed(call)
+
+        primary = self._submit(call)
+        if primary is None:
+            # Every pool thread is busy: send this lookup unhedged
+            with self._lock:
+                self.stats["saturated"] += 1
+            return self._timed(call)
+        try:
+            return primary.result(timeout=delay)
+        except FutureTimeoutError:
+            pass
+        if not self._spend():
+            return primary.result()
+
+        hedge = self._submit(call)
+        if hedge is None:
+            self._refund()
+            return primary.result()
+        logger.debug(f"Lookup slower than {delay * 1e3:.0f} ms, hedged")
+        pending = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        self._count_win()
+                    return future.result()
+        return primary.result()
+
+    async def arun(self, factory: Callable[[], Awaitable[T]]) -> T:
+        """
+        Await a lookup, hedged if it is slower than the delay
+
+        Args:
+            factory: Function returning a new awaitable of the request each
+                time it is called
+
+        Returns:
+            The result of the first copy that succeeded; the other copy
+            is cancelled
+
+        Raises:
+            Exception: The error of the first copy, if every copy failed
+        """
+
+        async def timed() -> Any:
+            start = time.monotonic()
+            result = await factory()
+            self.record(time.monotonic() - start)
+            return result
+
+        delay = self._start()
+        if delay is None:
+            return await timed()
+
+        primary = asyncio.ensure_future(timed())
+        pending = {primary}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if done or not self._spend():
+                return await primary
+            hedge = asyncio.ensure_future(timed())
+            logger.debug(f"Lookup slower than {delay * 1e3:.0f} ms, hedged")
+            pending.add(hedge)
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self._count_win()
+                        return task.result()
+            return primary.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Get the current delay, budget and counters
+
+        Returns:
+            dict: delay (seconds or None), credit (hedges available),
+            samples, and the stats counters
+        """
+        with self._lock:
+            return {
+                "delay": self._delay,
+                "credit": self._credit,
+                "samples": len(self._samples),
+                **self.stats,
+            }
+
+    def close(self) -> None:
+        """Stop the threads of sync lookups (slow copies may still finish)"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
@@ -0,0 +1,495 @@
+"""
+Local ledger of payments and SMS
+
+The gateway is the only place that knows what happened to a payment. A
+``PaymentLedger`` passed to a client as ``ledger=`` keeps a local copy in
+SQLite: every initiated payment, every status returned by check_payment
+(with the history of status changes) and every SMS reference. Open
+payments are indexed by age, so "all payments still pending after 10
+minutes" does not scan the table.
+
+With ``batch_size`` set, records are queued in memory and written by a
+background thread in one transaction per batch, so the payment path only
+pays for appending to a list. Write errors are logged and never raised to
+the payment path. Open one ledger per process, after forking.
+"""
+
+import atexit
+import logging
+import sqlite3
+import threading
+import time
+from itertools import groupby
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from .models import SMS_REFERENCE_KEYS
+
+logger = logging.getLogger(__name__)
+
+STATUS_INITIATED = "INITIATED"
+# Statuses after which a payment no longer changes
+FINAL_STATUSES = ("SUCCESS", "FAILED", "CANCELLED", "EXPIRED")
+
+DEFAULT_FLUSH_INTERVAL = 0.5  # Seconds between background flushes
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS payments (
+    mapped_order_id TEXT PRIMARY KEY,
+    merchant_id TEXT,
+    amount REAL,
+    status TEXT NOT NULL,
+    final INTEGER NOT NULL DEFAULT 0,
+    transaction_id TEXT,
+    payment_url TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS payments_status ON payments (status, updated_at);
+CREATE INDEX IF NOT EXISTS payments_merchant ON payments (merchant_id, created_at);
+CREATE INDEX IF NOT EXISTS payments_open ON payments (created_at) WHERE final = 0;
+
+CREATE TABLE IF NOT EXISTS payment_events (
+    id INTEGER PRIMARY KEY,
+    mapped_order_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS payment_events_order
+    ON payment_events (mapped_order_id, at);
+
+CREATE TRIGGER IF NOT EXISTS payments_inserted AFTER INSERT ON payments
+BEGIN
+    INSERT INTO payment_events (mapped_order_id, status, at)
+    VALUES (NEW.mapped_order_id, NEW.status, NEW.updated_at);
+END;
+CREATE TRIGGER IF NOT EXISTS payments_status_changed
+AFTER UPDATE OF status ON payments WHEN OLD.status IS NOT NEW.status
+BEGIN
+    INSERT INTO payment_events (mapped_order_id, status, at)
+    VALUES (NEW.mapped_order_id, NEW.status, NEW.updated_at);
+END;
+
+CREATE TABLE IF NOT EXISTS sms (
+    id INTEGER PRIMARY KEY,
+    sms_id TEXT UNIQUE,
+    mobile TEXT,
+    status TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sms_status ON sms (status, updated_at);
+
+CREATE TABLE IF NOT EXISTS reconciliations (
+    id INTEGER PRIMARY KEY,
+    started_at REAL NOT NULL,
+    finished_at REAL NOT NULL,
+    orders INTEGER NOT NULL,
+    checked INTEGER NOT NULL,
+    discrepancies INTEGER NOT NULL
+);
+"""
+
+# Statements queued by the record_* methods, executed in order
+_STATEMENTS = {
+    "initiation": """
+        INSERT INTO payments (mapped_order_id, merchant_id, amount, status,
+                              payment_url, created_at, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (mapped_order_id) DO UPDATE SET
+            merchant_id = excluded.merchant_id,
+            amount = excluded.amount,
+            payment_url = excluded.payment_url
+    """,
+    "status": """
+        INSERT INTO payments (mapped_order_id, status, final, transaction_id,
+                              created_at, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (mapped_order_id) DO UPDATE SET
+            status = excluded.status,
+            final = excluded.final,
+            transaction_id = coalesce(excluded.transaction_id, transaction_id),
+            updated_at = excluded.updated_at
+    """,
+    "sms": """
+        INSERT INTO sms (sms_id, mobile, status, created_at, updated_at)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (sms_id) DO UPDATE SET
+            mobile = coalesce(excluded.mobile, mobile),
+            status = coalesce(excluded.status, status),
+            updated_at = excluded.updated_at
+    """,
+}
+
+
+def _sms_reference(response: Mapping[str, Any]) -> Optional[str]:
+    for key in SMS_REFERENCE_KEYS:
+        value = response.get(key)
+        if value is not None:
+            return str(value)
+    return None
+
+
+class PaymentLedger:
+    """
+    SQLite record of initiated payments, their statuses and sent SMS
+
+    Attributes:
+        path (str): Database file, or ":memory:"
+        final_statuses (frozenset): Statuses that close a payment
+        batch_size (int): Records written per transaction in batching mode
+            (None writes each record immediately)
+        flush_interval (float): Maximum time a queued record waits
+    """
+
+    def __init__(
+        self,
+        path: str = ":memory:",
+        final_statuses: Iterable[str] = FINAL_STATUSES,
+        batch_size: Optional[int] = None,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+    ):
+        """
+        Open (and create if needed) a ledger
+
+        Args:
+            path: SQLite database file, or ":memory:"
+            final_statuses: Statuses after which a payment is no longer
+                   pending
+            batch_size: Queue records and write them from a background
+                   thread, in transactions of up to batch_size records
+            flush_interval: Seconds after which queued records are written
+                   even if the batch is not full
+        """
+        self.path = path
+        self.final_statuses = frozenset(final_statuses)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._db_lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        if path != ":memory:":
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(_SCHEMA)
+
+        self._pending: List[Tuple[str, tuple]] = []
+        self._pending_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._writer = None
+        if batch_size:
+            self._writer = threading.Thread(
+                target=self._write_loop, name="arzeka-ledger", daemon=True
+            )
+            self._writer.start()
+            atexit.register(self.close)
+
+        logger.info(f"Payment ledger opened: {path}")
+
+    def __repr__(self) -> str:
+        return f"PaymentLedger(path={self.path!r}, batch_size={self.batch_size})"
+
+    # Recording
+
+    def record_initiation(
+        self, payment_data: Mapping[str, Any], response: Mapping[str, Any]
+    ) -> None:
+        """
+        Record a payment returned by initiate_payment
+
+        Args:
+            payment_data: Submitted payment data (mappedOrderId, amount, ...)
+            response: API response (dict, LazyResponse or PaymentInitiation)
+        """
+        now = time.time()
+        self._submit(
+            "initiation",
+            (
+                payment_data["mappedOrderId"],
+                payment_data.get("merchantId"),
+                payment_data.get("amount"),
+                STATUS_INITIATED,
+                response.get("url"),
+                now,
+                now,
+            ),
+        )
+
+    def record_status(self, mapped_order_id: str, response: Mapping[str, Any]) -> None:
+        """
+        Record the status returned by check_payment
+
+        Args:
+            mapped_order_id: Order reference that was checked
+            response: API response (dict, LazyResponse or PaymentStatus)
+        """
+        status = response.get("status")
+        if status is None:
+            logger.debug(f"No status to record for order: {mapped_order_id}")
+            return
+        now = time.time()
+        self._submit(
+            "status",
+            (
+                mapped_order_id,
+                status,
+                status in self.final_statuses,
+                response.get("transId"),
+                now,
+                now,
+            ),
+        )
+
+    def record_sms(
+        self,
+        response: Mapping[str, Any],
+        mobile: Optional[str] = None,
+        sms_id: Optional[str] = None,
+    ) -> None:
+        """
+        Record an SMS returned by send_sms or check_sms_status
+
+        Args:
+            response: API response (dict, LazyResponse or SmsReceipt)
+            mobile: Recipient, when known
+            sms_id: SMS reference, read from the response when not given
+        """
+        now = time.time()
+        self._submit(
+            "sms",
+            (
+                sms_id or _sms_reference(response),
+                mobile,
+                response.get("status"),
+                now,
+                now,
+            ),
+        )
+
+    def _submit(self, kind: str, params: tuple) -> None:
+        with self._pending_lock:
+            if self._closed:
+                # The writer is gone: keeping the record would lose it silently
+                logger.warning(f"Ledger {self.path} is closed, {kind} record dropped")
+                return
+            if self._writer is not None:
+                self._pending.append((kind, params))
+                if len(self._pending) >= self.batch_size:
+                    self._wakeup.set()
+                return
+        self._write([(kind, params)])
+
+    def _write(self, records: List[Tuple[str, tuple]]) -> None:
+        try:
+            with self._db_lock, self._connection:
+                # Consecutive records of the same kind share one executemany
+                for kind, group in groupby(records, key=lambda record: record[0]):
+                    self._connection.executemany(
+                        _STATEMENTS[kind], [params for _, params in group]
+                    )
+        except sqlite3.Error as e:
+            logger.error(f"Failed to write {len(records)} ledger record(s): {e}")
+
+    def _write_loop(self) -> None:
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the queued records now"""
+        with self._pending_lock:
+            records, self._pending = self._pending, []
+        if records:
+            self._write(records)
+
+    def close(self) -> None:
+        """
+        Write the queued records and close the database
+
+        Records submitted afterwards are dropped with a warning.
+        """
+        with self._pending_lock:
+            if self._closed:
+                return
+            self._closed = True
+        if self._writer is not None:
+            atexit.unregister(self.close)
+            self._wakeup.set()
+            self._writer.join()
+        self.flush()
+        with self._db_lock:
+            self._connection.close()
+        logger.info(f"Payment ledger closed: {self.path}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def record_reconciliation(
+        self, started_at: float, finished_at: float, stats: Mapping[str, int]
+    ) -> None:
+        """
+        Record a completed reconciliation run (see fasoarzeka.reconcile)
+
+        Args:
+            started_at: Start of the run (timestamp)
+            finished_at: End of the run (timestamp)
+            stats: Counters of the run (orders, checked, discrepancies)
+        """
+        self.flush()
+        try:
+            with self._db_lock, self._connection:
+                self._connection.execute(
+                    "INSERT INTO reconciliations (started_at, finished_at, orders, "
+                    "checked, discrepancies) VALUES (?, ?, ?, ?, ?)",
+                    (
+                        started_at,
+                        finished_at,
+                        stats.get("orders", 0),
+                        stats.get("checked", 0),
+                        stats.get("discrepancies", 0),
+                    ),
+                )
+        except sqlite3.Error as e:
+            logger.error(f"Failed to record reconciliation run: {e}")
+
+    # Queries
+
+    def _query(self, sql: str, params: tuple = ()) -> List[Dict[str, Any]]:
+        # Queued records are written first so that queries see them
+        self.flush()
+        with self._db_lock:
+            return [dict(row) for row in self._connection.execute(sql, params)]
+
+    def get_payment(self, mapped_order_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the recorded state of a payment
+
+        Args:
+            mapped_order_id: Order reference
+
+        Returns:
+            dict of the payment columns, or None if it was never recorded
+        """
+        rows = self._query(
+            "SELECT * FROM payments WHERE mapped_order_id = ?", (mapped_order_id,)
+        )
+        return rows[0] if rows else None
+
+    def history(self, mapped_order_id: str) -> List[Tuple[str, float]]:
+        """
+        Get the successive statuses of a payment
+
+        Args:
+            mapped_order_id: Order reference
+
+        Returns:
+            list: (status, timestamp) pairs, oldest first
+        """
+        rows = self._query(
+            "SELECT status, at FROM payment_events WHERE mapped_order_id = ? "
+            "ORDER BY at, id",
+            (mapped_order_id,),
+        )
+        return [(row["status"], row["at"]) for row in rows]
+
+    def pending(
+        self,
+        older_than: float = 0,
+        merchant_id: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Get the payments that have not reached a final status
+
+        Args:
+            older_than: Only payments initiated at least this many seconds ago
+            merchant_id: Only payments of this merchant
+            limit: Maximum number of payments returned
+
+        Returns:
+            list: Payments, oldest first
+
+        Example:
+            >>> for payment in ledger.pending(older_than=600):
+            ...     client.check_payment(payment["mapped_order_id"])
+        """
+        sql = "SELECT * FROM payments WHERE final = 0 AND created_at <= ?"
+        params = [time.time() - older_than]
+        if merchant_id is not None:
+            sql += " AND merchant_id = ?"
+            params.append(merchant_id)
+        sql += " ORDER BY created_at"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return self._query(sql, tuple(params))
+
+    def payments(
+        self,
+        status: Optional[str] = None,
+        merchant_id: Optional[str] = None,
+        since: Optional[float] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Get recorded payments
+
+        Args:
+            status: Only payments with this status
+            merchant_id: Only payments of this merchant
+            since: Only payments updated at or after this timestamp
+            limit: Maximum number of payments returned
+
+        Returns:
+            list: Payments, most recently updated first
+        """
+        clauses = []
+        params: List[Any] = []
+        if status is not None:
+            clauses.append("status = ?")
+            params.append(status)
+        if merchant_id is not None:
+            clauses.append("merchant_id = ?")
+            params.append(merchant_id)
+        if since is not None:
+            clauses.append("updated_at >= ?")
+            params.append(since)
+
+        sql = "SELECT * FROM payments"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY updated_at DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return self._query(sql, tuple(params))
+
+    def last_reconciliation(self) -> Optional[Dict[str, Any]]:
+        """
+        Get the most recent completed reconciliation run
+
+        Returns:
+            dict with started_at, finished_at and the counters, or None
+        """
+        rows = self._query(
+            "SELECT * FROM reconciliations ORDER BY started_at DESC LIMIT 1"
+        )
+        return rows[0] if rows else None
+
+    def get_sms(self, sms_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the recorded state of an SMS
+
+        Args:
+            sms_id: SMS reference
+
+        Returns:
+            dict of the SMS columns, or None if it was never recorded
+        """
+        rows = self._query("SELECT * FROM sms WHERE sms_id = ?", (sms_id,))
+        return rows[0] if rows else None
@@ -0,0 +1,347 @@
+"""
+Several merchant accounts over one connection pool
+
+``ArzekaPayment`` holds a single credential set. A ``MerchantPool`` holds
+the credentials (username, password, hash_secret, merchant_id) of many
+merchant accounts and routes each call by merchant key:
+
+- every merchant gets its own client, hence its own token, refreshed
+  independently of the others;
+- all of them send their requests through one session owned by the pool,
+  so adding a merchant opens no connection and pays no TLS handshake;
+- clients of merchants that made no call for ``idle_timeout`` seconds are
+  dropped (their token with them) and recreated on their next call.
+
+Example::
+
+    pool = MerchantPool(pool_maxsize=20)
+    pool.add_merchant("boutique", "user1", "pass1", "secret1", merchant_id="M1")
+    pool.add_merchant("cantine", "user2", "pass2", "secret2", merchant_id="M2")
+    pool.check_payment("boutique", "ORDER-1")
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, NamedTuple, Optional, Tuple, Union
+
+from .arzeka import BASE_URL, ArzekaPayment
+from .models import PaymentInitiation, PaymentStatus, SmsReceipt
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_IDLE_TIMEOUT = 15 * 60  # Seconds before an unused merchant is evicted
+SWEEP_INTERVAL = 60  # Maximum seconds between two eviction sweeps
+
+
+class MerchantCredentials(NamedTuple):
+    """Credentials of one merchant account"""
+
+    username: str
+    password: str
+    hash_secret: str
+    merchant_id: Optional[str] = None
+
+    def __repr__(self) -> str:
+        # Keep secrets out of logs and tracebacks
+        return (
+            f"MerchantCredentials(username={self.username!r}, "
+            f"merchant_id={self.merchant_id!r})"
+        )
+
+
+class _MerchantClient(ArzekaPayment):
+    """ArzekaPayment that sends its requests through another client's session"""
+
+    def __init__(self, transport: ArzekaPayment, **kwargs):
+        self._transport = transport
+        super().__init__(**kwargs)
+
+    @property
+    def _session(self):
+        return self._transport._session
+
+    @_session.setter
+    def _session(self, value) -> None:
+        pass  # The session belongs to the transport
+
+    def _create_session(self):
+        return None
+
+    def _check_fork(self) -> None:
+        self._transport._check_fork()
+        super()._check_fork()
+
+    def _prune_idle_connections(self) -> None:
+        # Idleness is a property of the shared pool, not of one merchant
+        self._transport._prune_idle_connections()
+
+    def close(self):
+        """Forget the token; the shared session stays open"""
+        self._set_token(None, None, None)
+
+
+class MerchantPool:
+    """
+    Route Arzeka calls to per-merchant clients sharing one connection pool
+
+    Attributes:
+        idle_timeout (float): Seconds without calls after which a merchant's
+            client and token are dropped
+        stats (dict): Clients created and evicted
+    """
+
+    def __init__(
+        self,
+        base_url: str = BASE_URL,
+        timeout: Optional[float] = None,
+        idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+        **kwargs,
+    ):
+        """
+        Create a pool without merchants
+
+        Args:
+            base_url: Base URL for the API
+            timeout: Read timeout in seconds (default: per operation)
+            idle_timeout: Seconds without calls after which a merchant's
+                client is evicted
+            **kwargs: Options of every client, as for ArzekaPayment
+                (pool_maxsize, http2, operation_timeouts, json_codec,
+                typed_results, lazy_responses, ledger, scheduler...).
+                A scheduler or ledger given here is shared by all merchants.
+        """
+        self.idle_timeout = idle_timeout
+        self._transport = ArzekaPayment(base_url, timeout, **kwargs)
+        # Merchant clients must speak the transport's protocol
+        self._options = dict(
+            kwargs, base_url=base_url, timeout=timeout, http2=self._transport.http2
+        )
+        self._merchants: Dict[str, MerchantCredentials] = {}
+        # Least recently used first: key -> (client, last use)
+        self._clients: "OrderedDict[str, Tuple[_MerchantClient, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._next_sweep = time.monotonic() + min(idle_timeout, SWEEP_INTERVAL)
+        self.stats = {"created": 0, "evicted": 0}
+
+    def __repr__(self) -> str:
+        return (
+            f"MerchantPool(merchants={len(self._merchants)}, "
+            f"active={len(self._clients)})"
+        )
+
+    def __len__(self) -> int:
+        return len(self._merchants)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._merchants
+
+    def add_merchant(
+        self,
+        key: str,
+        username: str,
+        password: str,
+        hash_secret: str,
+        merchant_id: Optional[str] = None,
+    ) -> None:
+        """
+        Register (or replace) the credentials of a merchant
+
+        No request is made: the merchant authenticates on its first call.
+
+        Args:
+            key: Name the merchant is routed by
+            username: Arzeka username of the merchant
+            password: Arzeka password of the merchant
+            hash_secret: Secret signing the merchant's payments
+            merchant_id: Merchant identifier used by initiate_payment
+        """
+        credentials = MerchantCredentials(username, password, hash_secret, merchant_id)
+        with self._lock:
+            if self._merchants.get(key) not in (None, credentials):
+                # New credentials: the current token is no longer theirs
+                self._clients.pop(key, None)
+            self._merchants[key] = credentials
+        logger.info(f"Merchant added: {key}")
+
+    def remove_merchant(self, key: str) -> None:
+        """
+        Forget a merchant and its token
+
+        Args:
+            key: Merchant key
+
+        Raises:
+            KeyError: If the merchant is unknown
+        """
+        with self._lock:
+            if key not in self._merchants:
+                raise KeyError(f"Unknown merchant: {key!r}")
+            del self._merchants[key]
+            self._clients.pop(key, None)
+        logger.info(f"Merchant removed: {key}")
+
+    def credentials(self, key: str) -> MerchantCredentials:
+        """
+        Get the credentials of a merchant
+
+        Raises:
+            KeyError: If the merchant is unknown
+        """
+        try:
+            return self._merchants[key]
+        except KeyError:
+            raise KeyError(f"Unknown merchant: {key!r}") from None
+
+    def client(self, key: str) -> ArzekaPayment:
+        """
+        Get the client of a merchant, creating it on first use
+
+        The client shares the pool's connections. It authenticates with the
+        merchant's credentials when a call needs a token, and re-authenticates
+        by itself when the token expires.
+
+        Args:
+            key: Merchant key
+
+        Returns:
+            ArzekaPayment of the merchant
+
+        Raises:
+            KeyError: If the merchant is unknown
+        """
+        now = time.monotonic()
+        if now >= self._next_sweep:
+            self.evict_idle(now)
+        with self._lock:
+            entry = self._clients.get(key)
+            if entry is not None:
+                client = entry[0]
+                self._clients[key] = (client, now)
+                self._clients.move_to_end(key)
+                return client
+            credentials = self.credentials(key)
+            client = _MerchantClient(self._transport, **self._options)
+            client._set_token(
+                None, None, None, credentials.username, credentials.password
+            )
+            self._clients[key] = (client, now)
+            self.stats["created"] += 1
+        logger.debug(f"Client created for merchant {key}")
+        return client
+
+    def evict_idle(self, now: Optional[float] = None) -> int:
+        """
+        Drop the clients of merchants idle for longer than idle_timeout
+
+        Called regularly by client(); the credentials are kept. Calls
+        already running with an evicted client finish normally.
+
+        Args:
+            now: Current ``time.monotonic()`` (default: now)
+
+        Returns:
+            int: Number of clients evicted
+        """
+        now = time.monotonic() if now is None else now
+        evicted = 0
+        with self._lock:
+            self._next_sweep = now + min(self.idle_timeout, SWEEP_INTERVAL)
+            while self._clients:
+                key, (client, last_used) = next(iter(self._clients.items()))
+                if now - last_used < self.idle_timeout:
+                    break  # The others were used more recently
+                # Not closed: a call may still be using it on another thread.
+                # It holds no connection and goes away with its last caller.
+                del self._clients[key]
+                evicted += 1
+            self.stats["evicted"] += evicted
+        if evicted:
+            logger.info(f"Evicted {evicted} idle merchant client(s)")
+        return evicted
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Get the pool's state
+
+        Returns:
+            dict: merchants registered, active clients, clients created and
+            evicted
+        """
+        with self._lock:
+            return {
+                "merchants": len(self._merchants),
+                "active": len(self._clients),
+                **self.stats,
+            }
+
+    def initiate_payment(
+        self,
+        key: str,
+        amount: float,
+        link_for_update_status: str,
+        link_back_to_calling_website: str,
+        additional_info: Dict[str, Any],
+        mapped_order_id: Optional[str] = None,
+        merchant_id: Optional[str] = None,
+        deadline: Optional[float] = None,
+    ) -> Union[Tuple[Dict[str, Any], Dict[str, Any]], PaymentInitiation]:
+        """
+        Initiate a payment for a merchant, signed with its hash_secret
+
+        Args:
+            key: Merchant key
+            merchant_id: Overrides the merchant's registered merchant_id
+            Other arguments: as for ArzekaPayment.initiate_payment
+
+        Returns:
+            As ArzekaPayment.initiate_payment
+        """
+        credentials = self.credentials(key)
+        return self.client(key).initiate_payment(
+            amount=amount,
+            merchant_id=merchant_id or credentials.merchant_id,
+            link_for_update_status=link_for_update_status,
+            link_back_to_calling_website=link_back_to_calling_website,
+            additional_info=additional_info,
+            hash_secret=credentials.hash_secret,
+            mapped_order_id=mapped_order_id,
+            deadline=deadline,
+        )
+
+    def check_payment(
+        self,
+        key: str,
+        mapped_order_id: str,
+        transaction_id: Optional[str] = None,
+        deadline: Optional[float] = None,
+    ) -> Union[Dict[str, Any], PaymentStatus]:
+        """Check a payment of a merchant (see ArzekaPayment.check_payment)"""
+        return self.client(key).check_payment(mapped_order_id, transaction_id, deadline)
+
+    def send_sms(
+        self, key: str, mobile: str, message: str, deadline: Optional[float] = None
+    ) -> Union[Dict[str, Any], SmsReceipt]:
+        """Send an SMS for a merchant (see ArzekaPayment.send_sms)"""
+        return self.client(key).send_sms(mobile, message, deadline)
+
+    def check_sms_status(
+        self, key: str, sms_id: str, deadline: Optional[float] = None
+    ) -> Union[Dict[str, Any], SmsReceipt]:
+        """Check an SMS of a merchant (see ArzekaPayment.check_sms_status)"""
+        return self.client(key).check_sms_status(sms_id, deadline)
+
+    def close(self) -> None:
+        """Drop every merchant client and close the shared session"""
+        with self._lock:
+            for client, _ in self._clients.values():
+                client.close()
+            self._clients.clear()
+        self._transport.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
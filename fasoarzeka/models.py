@@ -0,0 +1,337 @@
+"""
+Typed, compact result objects
+
+With ``typed_results=True`` the clients return these objects instead of
+nested dicts. Each keeps the few fields callers need as slots and the
+response body as bytes; other fields are decoded from the body only when
+they are read. A tracked payment status therefore costs a small object and
+its body instead of a tree of dicts and strings.
+
+``raw`` decodes the whole body again on each access, it is meant as an
+escape hatch, not as the normal way to read results.
+
+``LazyResponse`` is the dict-like counterpart used with
+``lazy_responses=True``: the body is only decoded when it is read.
+"""
+
+import re
+import sys
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, Optional
+
+from .codec import DEFAULT_CODEC, JSONCodec
+from .protocol import decode_body
+
+# Returned by _scan_field when the field cannot be read without decoding
+_UNKNOWN = object()
+
+# Value of a top-level field: plain string, integer, or any other scalar
+_FIELD_VALUE = re.compile(
+    rb'\s*:\s*(?:"([^"\\]*)"|(-?\d+)(?=\s*[,}])'
+    rb'|("(?:[^"\\]|\\.)*"|-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?|true|false|null))'
+    rb"\s*[,}]"
+)
+_OPENERS = re.compile(rb"[{\[]")
+_PLAIN_KEY = re.compile(r"[\w.-]+", re.ASCII)
+
+# Keys under which the API may return the SMS reference
+SMS_REFERENCE_KEYS = ("referenceid", "referenceId", "smsId", "id")
+
+
+def _intern(value: Any) -> Any:
+    # Statuses repeat across millions of results, share one string per value
+    return sys.intern(value) if type(value) is str else value
+
+
+def _scan_field(content: bytes, key: str) -> Any:
+    """
+    Read one top-level scalar field from a JSON object without decoding it
+
+    Only the simple case is handled: the key is found before any nested
+    object or array and its value is a scalar. Anything else returns
+    _UNKNOWN and the caller decodes the whole body.
+    """
+    if not _PLAIN_KEY.fullmatch(key):
+        return _UNKNOWN
+    needle = f'"{key}"'.encode()
+    position = content.find(needle)
+    if position < 0:
+        return _UNKNOWN
+    match = _FIELD_VALUE.match(content, position + len(needle))
+    if match is None or content.find(needle, match.end()) >= 0:
+        # Repeated keys: the decoder would keep the last one
+        return _UNKNOWN
+
+    # The key must belong to the outer object: nothing but members before it
+    start = content.find(b"{")
+    if (
+        start < 0
+        or content[:start].strip()
+        or _OPENERS.search(content, start + 1, position) is not None
+        or content[start + 1 : position].rstrip()[-1:] not in (b"", b",")
+    ):
+        return _UNKNOWN
+
+    text, integer, other = match.groups()
+    try:
+        if text is not None:
+            return text.decode()
+        if integer is not None:
+            return int(integer)
+        return DEFAULT_CODEC.loads(other)
+    except ValueError:
+        return _UNKNOWN
+
+
+class _Result:
+    """Base class of the result objects: raw body plus lazy field access"""
+
+    __slots__ = ("_content", "_codec")
+
+    def __init__(self, content: bytes, codec: Optional[JSONCodec] = None):
+        self._content = content
+        self._codec = codec or DEFAULT_CODEC
+
+    @property
+    def raw(self) -> Dict[str, Any]:
+        """Whole decoded response body (decoded on every access)"""
+        try:
+            return self._codec.loads(self._content)
+        except ValueError:
+            return {"raw_response": self._content.decode("utf-8", "replace")}
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """
+        Read any field of the response body
+
+        Args:
+            key: Field name
+            default: Value returned when the field is missing
+
+        Returns:
+            The field value
+        """
+        if self._codec.scan_fields:
+            value = _scan_field(self._content, key)
+            if value is not _UNKNOWN:
+                return value
+        data = self.raw
+        return data.get(key, default) if isinstance(data, dict) else default
+
+    def __getitem__(self, key: str) -> Any:
+        # Keeps ``result["field"]`` working for code written for dict results
+        return self.raw[key]
+
+    def __repr__(self) -> str:
+        fields = ", ".join(
+            f"{name}={getattr(self, name)!r}" for name in self._repr_fields
+        )
+        return f"{self.__class__.__name__}({fields})"
+
+    _repr_fields = ()
+
+
+class AuthToken(_Result):
+    """
+    Result of authenticate
+
+    Attributes:
+        access_token (str): Access token
+        token_type (str): Token type, usually "Bearer"
+        expires_in (float): Token lifetime in seconds
+        expires_at (float): Expiration timestamp
+    """
+
+    __slots__ = ("access_token", "token_type", "expires_in", "expires_at")
+    _repr_fields = ("token_type", "expires_at")
+
+    def __init__(
+        self,
+        access_token: str,
+        token_type: str,
+        expires_in: float,
+        expires_at: float,
+        content: bytes = b"",
+        codec: Optional[JSONCodec] = None,
+    ):
+        super().__init__(content, codec)
+        self.access_token = access_token
+        self.token_type = token_type
+        self.expires_in = expires_in
+        self.expires_at = expires_at
+
+    @classmethod
+    def from_token_info(
+        cls,
+        token_info: Dict[str, Any],
+        content: bytes = b"",
+        codec: Optional[JSONCodec] = None,
+    ) -> "AuthToken":
+        """
+        Build from the dictionary returned by protocol.parse_auth_response
+
+        Args:
+            token_info: Parsed token information
+            content: Raw response body
+            codec: JSON codec used to decode the body on demand
+
+        Returns:
+            AuthToken
+        """
+        return cls(
+            token_info["access_token"],
+            _intern(token_info["token_type"]),
+            token_info["expires_in"],
+            token_info["expires_at"],
+            content,
+            codec,
+        )
+
+
+class PaymentInitiation(_Result):
+    """
+    Result of initiate_payment
+
+    Attributes:
+        mapped_order_id (str): Order reference sent to the API
+        url (str): Payment page to redirect the customer to
+        payment_data (dict): Signed form data that was sent
+    """
+
+    __slots__ = ("mapped_order_id", "url", "payment_data")
+    _repr_fields = ("mapped_order_id", "url")
+
+    def __init__(
+        self,
+        content: bytes,
+        codec: Optional[JSONCodec] = None,
+        *,
+        payment_data: Dict[str, Any],
+    ):
+        super().__init__(content, codec)
+        self.payment_data = payment_data
+        self.mapped_order_id = payment_data.get("mappedOrderId")
+        data = self.raw
+        self.url = data.get("url") if isinstance(data, dict) else None
+
+    @property
+    def amount(self) -> Any:
+        """Payment amount"""
+        return self.payment_data.get("amount")
+
+
+class PaymentStatus(_Result):
+    """
+    Result of check_payment
+
+    Attributes:
+        mapped_order_id (str): Order reference, if present in the response
+        status (str): Payment status reported by the API
+    """
+
+    __slots__ = ("mapped_order_id", "status")
+    _repr_fields = ("mapped_order_id", "status")
+
+    def __init__(self, content: bytes, codec: Optional[JSONCodec] = None):
+        super().__init__(content, codec)
+        data = self.raw
+        if not isinstance(data, dict):
+            data = {}
+        self.mapped_order_id = data.get("mappedOrderId")
+        self.status = _intern(data.get("status"))
+
+    @property
+    def transaction_id(self) -> Optional[str]:
+        """Operator transaction identifier (decoded on access)"""
+        return self.get("transId")
+
+    @property
+    def amount(self) -> Any:
+        """Paid amount (decoded on access)"""
+        return self.get("amount")
+
+
+class SmsReceipt(_Result):
+    """
+    Result of send_sms and check_sms_status
+
+    Attributes:
+        status (str): Delivery status reported by the API, if any
+    """
+
+    __slots__ = ("status",)
+    _repr_fields = ("status",)
+
+    def __init__(self, content: bytes, codec: Optional[JSONCodec] = None):
+        super().__init__(content, codec)
+        data = self.raw
+        self.status = _intern(data.get("status")) if isinstance(data, dict) else None
+
+    @property
+    def sms_id(self) -> Optional[str]:
+        """SMS reference to pass to check_sms_status (decoded on access)"""
+        data = self.raw
+        if isinstance(data, dict):
+            for key in SMS_REFERENCE_KEYS:
+                if key in data:
+                    return data[key]
+        return None
+
+
+class LazyResponse(Mapping):
+    """
+    Read-only dict view of a response body, decoded on first use
+
+    Callers that only test a field or two never pay for decoding the rest.
+    With the standard library codec, reading a top-level scalar field before
+    anything else scans the raw body for that field instead of decoding it.
+    Call ``decode()`` to get a regular, mutable dict.
+    """
+
+    __slots__ = ("_content", "_codec", "_data")
+
+    def __init__(self, content: bytes, codec: Optional[JSONCodec] = None):
+        self._content = content
+        self._codec = codec or DEFAULT_CODEC
+        self._data = None
+
+    @property
+    def content(self) -> bytes:
+        """Raw response body"""
+        return self._content
+
+    @property
+    def decoded(self) -> bool:
+        """Whether the whole body has been decoded"""
+        return self._data is not None
+
+    def decode(self) -> Dict[str, Any]:
+        """
+        Decode the whole body (once)
+
+        Returns:
+            Response data as dictionary, or {"raw_response": text} when the
+            body is not JSON
+        """
+        if self._data is None:
+            self._data = decode_body(self._content, self._codec)
+        return self._data
+
+    def __getitem__(self, key: str) -> Any:
+        data = self._data
+        if data is None:
+            if self._codec.scan_fields:
+                value = _scan_field(self._content, key)
+                if value is not _UNKNOWN:
+                    return value
+            data = self.decode()
+        return data[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.decode())
+
+    def __len__(self) -> int:
+        return len(self.decode())
+
+    def __repr__(self) -> str:
+        return f"LazyResponse({self.decode()!r})"
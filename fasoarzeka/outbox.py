@@ -0,0 +1,522 @@
+"""
+Durable outbox for payments and SMS
+
+Instead of calling ``send_sms`` or ``initiate_payment`` while serving a
+request, callers ``enqueue`` the operation: one SQLite insert, committed
+before ``enqueue`` returns, so the operation survives a crash of the
+process. An ``OutboxWorker`` drains the outbox through an ArzekaPayment
+client with a pool of threads.
+
+Delivery is at least once. A worker leases a job by pushing its
+``available_at`` forward. If the worker dies, the job becomes available
+again when the lease expires. Failures are retried with exponential
+backoff. Jobs that cannot succeed (invalid data, 4xx responses) or that
+exhaust their attempts are moved to the dead-letter table.
+
+``initiate_payment`` jobs get their ``mapped_order_id`` when they are
+enqueued, so a retried job reuses the same order reference.
+
+Arguments are stored as plain JSON. Secrets are kept out of them: the
+``hash_secret`` of payments is given to the OutboxWorker, not to
+``enqueue``.
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import nullcontext
+from typing import Any, Callable, Dict, List, Optional
+
+from .codec import DEFAULT_CODEC
+from .exceptions import ArzekaAPIError, ArzekaValidationError
+from .priority import BACKGROUND, priority_scope
+from .utils import get_reference
+
+logger = logging.getLogger(__name__)
+
+# Client methods that can be enqueued
+OUTBOX_OPERATIONS = ("initiate_payment", "send_sms")
+# Arguments never written to the outbox, supplied by the worker instead
+SECRET_ARGUMENTS = ("hash_secret",)
+
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_LEASE_TIMEOUT = 120  # Seconds before a claimed job is handed out again
+DEFAULT_RETRY_DELAY = 1.0  # First retry delay, doubled at each attempt
+DEFAULT_MAX_RETRY_DELAY = 300
+DEFAULT_POLL_INTERVAL = 1.0
+DEFAULT_WORKERS = 4
+DEFAULT_ERROR_BACKOFF = 1.0  # Pause of a worker thread after a database error
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY,
+    operation TEXT NOT NULL,
+    arguments TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS outbox_available ON outbox (available_at);
+
+CREATE TABLE IF NOT EXISTS dead_letters (
+    id INTEGER PRIMARY KEY,
+    operation TEXT NOT NULL,
+    arguments TEXT NOT NULL,
+    attempts INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    failed_at REAL NOT NULL,
+    last_error TEXT
+);
+"""
+
+
+class OutboxJob:
+    """
+    Operation claimed from the outbox
+
+    Attributes:
+        id (int): Job identifier
+        operation (str): Client method name
+        arguments (dict): Keyword arguments of the call
+        attempts (int): Number of attempts, including the current one
+    """
+
+    __slots__ = ("id", "operation", "arguments", "attempts")
+
+    def __init__(
+        self, id: int, operation: str, arguments: Dict[str, Any], attempts: int
+    ):
+        self.id = id
+        self.operation = operation
+        self.arguments = arguments
+        self.attempts = attempts
+
+    def __repr__(self) -> str:
+        return f"OutboxJob(id={self.id}, operation={self.operation!r}, attempts={self.attempts})"
+
+
+class Outbox:
+    """
+    SQLite-backed queue of payment and SMS operations
+
+    Attributes:
+        path (str): Database file
+    """
+
+    def __init__(self, path: str):
+        """
+        Open (and create if needed) an outbox
+
+        Args:
+            path: SQLite database file. ":memory:" works but is not durable.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        # Signals workers of this process that a job was enqueued
+        self._enqueued = threading.Condition(self._lock)
+        # Autocommit, transactions are opened explicitly
+        self._connection = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None
+        )
+        self._connection.row_factory = sqlite3.Row
+        if path != ":memory:":
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            # Commits survive a crash of the process, not of the machine
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(_SCHEMA)
+
+    def __repr__(self) -> str:
+        return f"Outbox(path={self.path!r})"
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT count(*) FROM outbox").fetchone()[0]
+
+    def enqueue(self, operation: str, delay: float = 0, **arguments) -> int:
+        """
+        Add an operation to the outbox
+
+        Args:
+            operation: "initiate_payment" or "send_sms"
+            delay: Seconds before the operation may be sent
+            **arguments: Keyword arguments of the client method. Pass
+                   mapped_order_id to know the order reference in advance,
+                   one is generated otherwise. hash_secret is not accepted:
+                   pass it to the OutboxWorker.
+
+        Returns:
+            int: Job identifier
+
+        Raises:
+            ArzekaValidationError: If the operation is not supported, or a
+                secret is among the arguments
+
+        Example:
+            >>> outbox.enqueue("send_sms", mobile="22670123456", message="Merci")
+        """
+        if operation not in OUTBOX_OPERATIONS:
+            raise ArzekaValidationError(
+                f"Unsupported outbox operation: {operation!r}. "
+                f"Supported: {', '.join(OUTBOX_OPERATIONS)}"
+            )
+        secrets = sorted(set(arguments) & set(SECRET_ARGUMENTS))
+        if secrets:
+            raise ArzekaValidationError(
+                f"Secrets are not stored in the outbox: {', '.join(secrets)}. "
+                "Pass them to the OutboxWorker instead."
+            )
+
+        now = time.time()
+        with self._lock:
+            if operation == "initiate_payment" and not arguments.get("mapped_order_id"):
+                # Generated under the lock: references have microsecond resolution
+                arguments["mapped_order_id"] = get_reference()
+            job_id = self._connection.execute(
+                "INSERT INTO outbox (operation, arguments, available_at, created_at) "
+                "VALUES (?, ?, ?, ?)",
+                (operation, DEFAULT_CODEC.dumps(arguments), now + delay, now),
+            ).lastrowid
+            self._enqueued.notify()
+        return job_id
+
+    def claim(
+        self, lease_timeout: float = DEFAULT_LEASE_TIMEOUT
+    ) -> Optional[OutboxJob]:
+        """
+        Lease the next job that is due
+
+        Args:
+            lease_timeout: Seconds after which the job is handed out again if
+                   it was neither completed nor failed
+
+        Returns:
+            OutboxJob, or None when no job is due
+        """
+        now = time.time()
+        with self._lock:
+            # IMMEDIATE: other processes draining the same file wait here
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._connection.execute(
+                    "SELECT id, operation, arguments, attempts FROM outbox "
+                    "WHERE available_at <= ? ORDER BY available_at LIMIT 1",
+                    (now,),
+                ).fetchone()
+                if row is not None:
+                    self._connection.execute(
+                        "UPDATE outbox SET available_at = ?, attempts = attempts + 1 "
+                        "WHERE id = ?",
+                        (now + lease_timeout, row[0]),
+                    )
+                self._connection.execute("COMMIT")
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        return OutboxJob(row[0], row[1], DEFAULT_CODEC.loads(row[2]), row[3] + 1)
+
+    def complete(self, job: OutboxJob) -> None:
+        """Remove a job that succeeded"""
+        with self._lock:
+            self._connection.execute("DELETE FROM outbox WHERE id = ?", (job.id,))
+
+    def retry(self, job: OutboxJob, delay: float, error: str) -> None:
+        """Make a failed job available again after delay seconds"""
+        with self._lock:
+            self._connection.execute(
+                "UPDATE outbox SET available_at = ?, last_error = ? WHERE id = ?",
+                (time.time() + delay, error, job.id),
+            )
+
+    def dead_letter(self, job: OutboxJob, error: str) -> None:
+        """Move a job that cannot succeed to the dead-letter table"""
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                self._connection.execute(
+                    "INSERT INTO dead_letters (id, operation, arguments, attempts, "
+                    "created_at, failed_at, last_error) "
+                    "SELECT id, operation, arguments, ?, created_at, ?, ? "
+                    "FROM outbox WHERE id = ?",
+                    (job.attempts, time.time(), error, job.id),
+                )
+                self._connection.execute("DELETE FROM outbox WHERE id = ?", (job.id,))
+                self._connection.execute("COMMIT")
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+
+    def dead_letters(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        List the jobs that were given up
+
+        Args:
+            limit: Maximum number of jobs returned
+
+        Returns:
+            list: Dead letters, oldest first, with decoded arguments
+        """
+        sql = (
+            "SELECT id, operation, arguments, attempts, created_at, failed_at, "
+            "last_error FROM dead_letters ORDER BY failed_at"
+        )
+        params: tuple = ()
+        if limit is not None:
+            sql += " LIMIT ?"
+            params = (limit,)
+        with self._lock:
+            rows = self._connection.execute(sql, params).fetchall()
+        return [
+            dict(row, arguments=DEFAULT_CODEC.loads(row["arguments"])) for row in rows
+        ]
+
+    def requeue_dead_letter(self, job_id: int) -> None:
+        """
+        Move a dead letter back to the outbox, with its attempts reset
+
+        Args:
+            job_id: Identifier of the dead letter
+        """
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                self._connection.execute(
+                    "INSERT INTO outbox (id, operation, arguments, available_at, "
+                    "created_at, last_error) "
+                    "SELECT id, operation, arguments, ?, created_at, last_error "
+                    "FROM dead_letters WHERE id = ?",
+                    (time.time(), job_id),
+                )
+                self._connection.execute(
+                    "DELETE FROM dead_letters WHERE id = ?", (job_id,)
+                )
+                self._connection.execute("COMMIT")
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+            self._enqueued.notify()
+
+    def wait(self, timeout: float) -> None:
+        """Wait until a job is enqueued in this process, or timeout"""
+        with self._enqueued:
+            self._enqueued.wait(timeout)
+
+    def close(self) -> None:
+        """Close the database"""
+        with self._lock:
+            self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def is_retryable(error: Exception) -> bool:
+    """
+    Tell whether a failed operation may succeed if sent again
+
+    Args:
+        error: Exception raised by the client
+
+    Returns:
+        bool: False for invalid data, 4xx responses (except 408 and 429) and
+        programming or configuration errors (TypeError, ValueError)
+    """
+    if isinstance(error, (ArzekaValidationError, TypeError, ValueError)):
+        return False
+    if isinstance(error, ArzekaAPIError) and error.status_code is not None:
+        return error.status_code >= 500 or error.status_code in (408, 429)
+    return True
+
+
+class OutboxWorker:
+    """
+    Thread pool draining an Outbox through an ArzekaPayment client
+
+    Attributes:
+        outbox (Outbox): Outbox to drain
+        client (ArzekaPayment): Client used to send the operations
+        workers (int): Number of threads
+        stats (dict): Counts of succeeded, retried and dead jobs, and of
+            errors of the worker itself (database, on_result)
+    """
+
+    def __init__(
+        self,
+        outbox: Outbox,
+        client: Any,
+        workers: int = DEFAULT_WORKERS,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        retry_delay: float = DEFAULT_RETRY_DELAY,
+        max_retry_delay: float = DEFAULT_MAX_RETRY_DELAY,
+        lease_timeout: float = DEFAULT_LEASE_TIMEOUT,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        on_result: Optional[Callable[[OutboxJob, Any], None]] = None,
+        priority: Optional[str] = BACKGROUND,
+        hash_secret: Optional[str] = None,
+        error_backoff: float = DEFAULT_ERROR_BACKOFF,
+    ):
+        """
+        Initialize the worker pool
+
+        Args:
+            outbox: Outbox to drain
+            client: Authenticated ArzekaPayment (shared by the threads)
+            workers: Number of threads started by start()
+            max_attempts: Attempts before a job is dead-lettered
+            retry_delay: Delay before the first retry, doubled at each attempt
+            max_retry_delay: Maximum delay between retries
+            lease_timeout: Seconds a claimed job stays hidden from other
+                   workers, longer than the slowest operation
+            poll_interval: Seconds between polls when the outbox is empty
+            on_result: Called with the job and the client result after each
+                   success
+            priority: Lane of the calls when the client has a
+                   PriorityScheduler (None: the caller's priority_scope)
+            hash_secret: Secret signing the initiate_payment jobs, which
+                   is not stored in the outbox
+            error_backoff: Seconds a thread pauses after a database error
+                   (e.g. "database is locked") before claiming again
+        """
+        self.outbox = outbox
+        self.client = client
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.lease_timeout = lease_timeout
+        self.poll_interval = poll_interval
+        self.on_result = on_result
+        self.priority = priority
+        self.hash_secret = hash_secret
+        self.error_backoff = error_backoff
+        self.stats = {"succeeded": 0, "retried": 0, "dead": 0, "errors": 0}
+
+        self._stats_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def _count(self, outcome: str) -> None:
+        with self._stats_lock:
+            self.stats[outcome] += 1
+
+    def process(self, job: OutboxJob) -> bool:
+        """
+        Send one claimed job and record the outcome in the outbox
+
+        Args:
+            job: Job returned by Outbox.claim
+
+        Returns:
+            bool: True if the operation succeeded
+        """
+        lane = nullcontext() if self.priority is None else priority_scope(self.priority)
+        arguments = job.arguments
+        if job.operation == "initiate_payment" and "hash_secret" not in arguments:
+            arguments = dict(arguments, hash_secret=self.hash_secret)
+        try:
+            if arguments.get("hash_secret", "") is None:
+                # A worker setting, not a transient failure: do not retry
+                raise ArzekaValidationError(
+                    "OutboxWorker has no hash_secret to sign initiate_payment"
+                )
+            with lane:
+                result = getattr(self.client, job.operation)(**arguments)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            if not is_retryable(e) or job.attempts >= self.max_attempts:
+                logger.error(f"Outbox job {job.id} ({job.operation}) failed: {error}")
+                self.outbox.dead_letter(job, error)
+                self._count("dead")
+            else:
+                delay = min(
+                    self.retry_delay * 2 ** (job.attempts - 1), self.max_retry_delay
+                )
+                logger.warning(
+                    f"Outbox job {job.id} ({job.operation}) failed, "
+                    f"retry in {delay:g}s: {error}"
+                )
+                self.outbox.retry(job, delay, error)
+                self._count("retried")
+            return False
+
+        self.outbox.complete(job)
+        self._count("succeeded")
+        if self.on_result is not None:
+            # A failing callback must not stop the delivery of other jobs
+            try:
+                self.on_result(job, result)
+            except Exception:
+                logger.exception(f"on_result failed for outbox job {job.id}")
+                self._count("errors")
+        return True
+
+    def drain(self) -> Dict[str, int]:
+        """
+        Process due jobs in the calling thread until none is left
+
+        Jobs scheduled for a later retry are left in the outbox.
+
+        Returns:
+            dict: The stats of the worker
+        """
+        while True:
+            job = self.outbox.claim(self.lease_timeout)
+            if job is None:
+                return dict(self.stats)
+            self.process(job)
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                job = self.outbox.claim(self.lease_timeout)
+                if job is None:
+                    self.outbox.wait(self.poll_interval)
+                    continue
+                self.process(job)
+            except sqlite3.Error:
+                # The job, if any, is handed out again when its lease expires
+                logger.exception("Outbox database error, pausing the worker")
+                self._count("errors")
+                self._stopping.wait(self.error_backoff)
+            except Exception:
+                logger.exception("Unexpected outbox worker error")
+                self._count("errors")
+
+    def start(self) -> "OutboxWorker":
+        """Start the worker threads"""
+        self._stopping.clear()
+        for index in range(self.workers):
+            thread = threading.Thread(
+                target=self._run, name=f"arzeka-outbox-{index}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Outbox worker started with {self.workers} thread(s)")
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Stop the worker threads after their current job
+
+        Args:
+            timeout: Maximum time to wait for each thread
+        """
+        self._stopping.set()
+        with self.outbox._enqueued:
+            self.outbox._enqueued.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        logger.info("Outbox worker stopped")
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
@@ -0,0 +1,197 @@
+"""
+Process-pool fan-out for bulk Arzeka operations
+
+An ``ArzekaPayment`` owns a live session and cannot be sent to another
+process. A ``ClientSpec`` captures what is needed to rebuild an equivalent,
+already authenticated client: the connection settings and the current token.
+``process_map`` ships the spec once to each worker process, which builds a
+single client and reuses it for every item it handles.
+"""
+
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+
+from .arzeka import ArzekaPayment
+
+logger = logging.getLogger(__name__)
+
+# Client built once per worker process by _init_worker
+_worker_client: Optional[ArzekaPayment] = None
+
+
+class ClientSpec:
+    """
+    Picklable description of an ArzekaPayment client
+
+    Attributes:
+        base_url (str): Base URL for the Arzeka API
+        options (dict): Connection options passed to ArzekaPayment
+        token (str): Access token to reuse, if any
+        token_type (str): Token type, usually "Bearer"
+        expires_at (float): Token expiration timestamp
+        username (str): Username for automatic re-authentication
+        password (str): Password for automatic re-authentication
+    """
+
+    __slots__ = (
+        "base_url",
+        "options",
+        "token",
+        "token_type",
+        "expires_at",
+        "username",
+        "password",
+    )
+
+    def __init__(
+        self,
+        base_url: str,
+        options: Optional[Dict[str, Any]] = None,
+        token: Optional[str] = None,
+        token_type: Optional[str] = None,
+        expires_at: Optional[float] = None,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+    ):
+        self.base_url = base_url
+        self.options = dict(options or {})
+        self.token = token
+        self.token_type = token_type
+        self.expires_at = expires_at
+        self.username = username
+        self.password = password
+
+    def __repr__(self) -> str:
+        return f"ClientSpec(base_url={self.base_url!r}, has_token={self.token is not None})"
+
+    @classmethod
+    def from_client(
+        cls, client: ArzekaPayment, include_credentials: bool = True
+    ) -> "ClientSpec":
+        """
+        Capture the settings and token of an existing client
+
+        Args:
+            client: Client to describe
+            include_credentials: Also copy the stored username and password so
+                   that workers can re-authenticate when the token expires
+
+        Returns:
+            ClientSpec for the client
+        """
+        options = {
+            "timeout": client.timeout,
+            "connect_timeout": client.connect_timeout,
+            "operation_timeouts": dict(client.operation_timeouts),
+            "http2": client.http2,
+            "pool_maxsize": client.pool_maxsize,
+            "keepalive_idle": client.keepalive_idle,
+            "json_codec": client.json_codec.name,
+            "typed_results": client.typed_results,
+            "lazy_responses": client.lazy_responses,
+        }
+        token, token_type, expires_at = client._token_snapshot()
+        return cls(
+            base_url=client.base_url,
+            options=options,
+            token=token,
+            token_type=token_type,
+            expires_at=expires_at,
+            username=client._username if include_credentials else None,
+            password=client._password if include_credentials else None,
+        )
+
+    def build(self) -> ArzekaPayment:
+        """
+        Create a ready-to-use client from the spec
+
+        Returns:
+            ArzekaPayment holding the captured token
+        """
+        client = ArzekaPayment(self.base_url, **self.options)
+        client._set_token(self.token, self.token_type, self.expires_at)
+        client._username = self.username
+        client._password = self.password
+        return client
+
+
+def _init_worker(spec: ClientSpec) -> None:
+    """Build the client of the current worker process"""
+    global _worker_client
+    _worker_client = spec.build()
+
+
+def _call_worker(
+    operation: Union[str, Callable[[ArzekaPayment, Any], Any]],
+    return_exceptions: bool,
+    item: Any,
+) -> Any:
+    """Run one operation on the worker client"""
+    try:
+        if callable(operation):
+            return operation(_worker_client, item)
+
+        method = getattr(_worker_client, operation)
+        if isinstance(item, dict):
+            return method(**item)
+        if isinstance(item, tuple):
+            return method(*item)
+        return method(item)
+    except Exception as e:
+        if return_exceptions:
+            return e
+        raise
+
+
+def process_map(
+    spec: Union[ClientSpec, ArzekaPayment],
+    operation: Union[str, Callable[[ArzekaPayment, Any], Any]],
+    items: Iterable[Any],
+    processes: Optional[int] = None,
+    chunksize: int = 1,
+    return_exceptions: bool = False,
+) -> List[Any]:
+    """
+    Run a bulk operation across a pool of worker processes
+
+    Each worker builds one client from the spec and reuses the token it
+    carries, so no worker authenticates unless the token expires. Tokens
+    refreshed in a worker are not sent back to the parent.
+
+    Args:
+        spec: Client spec, or a client to capture with ClientSpec.from_client
+        operation: Name of an ArzekaPayment method, or a module-level function
+                   called as ``operation(client, item)``
+        items: Arguments for each call. A dict is passed as keyword
+               arguments, a tuple as positional arguments, anything else as
+               the single argument.
+        processes: Number of worker processes (default: CPU count)
+        chunksize: Number of items sent to a worker at once
+        return_exceptions: Return failures in place of their result instead
+                   of raising the first one
+
+    Returns:
+        list: Results in the order of items
+
+    Example:
+        >>> client = ArzekaPayment()
+        >>> client.authenticate("user", "password")
+        >>> statuses = process_map(client, "check_payment", order_ids, processes=4)
+    """
+    if isinstance(spec, ArzekaPayment):
+        spec = ClientSpec.from_client(spec)
+
+    logger.info(f"Running {operation} across {processes or 'all'} process(es)")
+
+    with ProcessPoolExecutor(
+        max_workers=processes, initializer=_init_worker, initargs=(spec,)
+    ) as executor:
+        return list(
+            executor.map(
+                partial(_call_worker, operation, return_exceptions),
+                items,
+                chunksize=chunksize,
+            )
+        )
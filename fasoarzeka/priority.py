@@ -0,0 +1,345 @@
+"""
+Priority lanes for Arzeka API calls
+
+Customer-facing calls and background work (status sweeps, SMS campaigns,
+outbox workers) share one connection pool. A ``PriorityScheduler`` passed
+to a client as ``scheduler=`` admits each request through a lane:
+
+- every lane has its own concurrency budget;
+- a free slot always goes to the highest-priority lane that is waiting;
+- lower lanes never take the last ``reserve`` slots, which stay free for
+  the first lane, and stop being admitted as soon as a higher lane waits.
+
+Background work thus yields to interactive calls by itself: when checkouts
+queue up, sweeps finish their in-flight requests and wait.
+
+The lane of a call is set for a whole block with ``priority_scope``, which
+follows the caller's execution context like ``deadline_scope``::
+
+    with priority_scope(BACKGROUND):
+        for order_id in order_ids:
+            client.check_payment(order_id)
+
+Calls made outside any scope use the scheduler's default lane (interactive).
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Dict, Iterator, Optional, Sequence, Tuple
+
+from .exceptions import ArzekaTimeoutError
+from .timeouts import current_deadline
+
+logger = logging.getLogger(__name__)
+
+# Lanes, highest priority first
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+DEFAULT_LANES = (INTERACTIVE, BACKGROUND)
+
+_current_priority: ContextVar[Optional[str]] = ContextVar(
+    "arzeka_priority", default=None
+)
+
+
+def current_priority() -> Optional[str]:
+    """
+    Get the lane set by the innermost priority_scope
+
+    Returns:
+        Lane name, or None if no scope is active
+    """
+    return _current_priority.get()
+
+
+@contextmanager
+def priority_scope(lane: str) -> Iterator[str]:
+    """
+    Send every Arzeka call made within the block through a lane
+
+    Args:
+        lane: Lane name (INTERACTIVE, BACKGROUND or a custom lane)
+
+    Yields:
+        str: The lane in effect
+
+    Example:
+        >>> with priority_scope(BACKGROUND):
+        ...     client.send_sms("22670123456", "Promotion")
+    """
+    token = _current_priority.set(lane)
+    try:
+        yield lane
+    finally:
+        _current_priority.reset(token)
+
+
+class _Lanes:
+    """Admission state shared by the sync and async schedulers"""
+
+    def __init__(
+        self,
+        capacity: int,
+        limits: Optional[Dict[str, int]] = None,
+        lanes: Sequence[str] = DEFAULT_LANES,
+        reserve: Optional[int] = None,
+    ):
+        if capacity < 1:
+            raise ValueError(f"capacity must be at least 1, got {capacity}")
+        unknown = set(limits or {}) - set(lanes)
+        if unknown:
+            raise ValueError(f"Limits given for unknown lanes: {sorted(unknown)}")
+
+        self.capacity = capacity
+        self.lanes: Tuple[str, ...] = tuple(lanes)
+        # By default the first lane may use the whole pool, the others half
+        self.limits = {
+            lane: capacity if rank == 0 else max(1, capacity // 2)
+            for rank, lane in enumerate(self.lanes)
+        }
+        self.limits.update(limits or {})
+        if reserve is None:
+            reserve = max(1, capacity // 4)
+        # Lower lanes always keep at least one slot
+        self.reserve = min(reserve, capacity - 1)
+        self.default_lane = self.lanes[0]
+
+        self._rank = {lane: rank for rank, lane in enumerate(self.lanes)}
+        self._active = dict.fromkeys(self.lanes, 0)
+        self._waiting = dict.fromkeys(self.lanes, 0)
+        self._total = 0
+        self.stats = {
+            lane: {"admitted": 0, "waited": 0, "wait_time": 0.0} for lane in self.lanes
+        }
+
+    def _lane(self, lane: Optional[str]) -> str:
+        lane = lane or current_priority() or self.default_lane
+        # Lanes this scheduler does not define get the lowest priority
+        return lane if lane in self._rank else self.lanes[-1]
+
+    def _admissible(self, lane: str) -> bool:
+        rank = self._rank[lane]
+        if self._active[lane] >= self.limits[lane] or self._total >= self.capacity:
+            return False
+        if rank == 0:
+            return True
+        if self._total >= self.capacity - self.reserve:
+            return False
+        # Yield to any higher lane that is waiting for a slot
+        return not any(self._waiting[higher] for higher in self.lanes[:rank])
+
+    def _admit(self, lane: str, waited: float) -> None:
+        self._active[lane] += 1
+        self._total += 1
+        stats = self.stats[lane]
+        stats["admitted"] += 1
+        if waited:
+            stats["waited"] += 1
+            stats["wait_time"] += waited
+
+    def _release(self, lane: str) -> None:
+        self._active[lane] -= 1
+        self._total -= 1
+
+    @staticmethod
+    def _wait_deadline(deadline: Optional[float]) -> Optional[float]:
+        scoped = current_deadline()
+        if scoped is not None:
+            deadline = scoped if deadline is None else min(deadline, scoped)
+        return deadline
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        """
+        Get the current load of each lane
+
+        Returns:
+            dict: lane -> {"active", "waiting", "limit"}
+        """
+        return {
+            lane: {
+                "active": self._active[lane],
+                "waiting": self._waiting[lane],
+                "limit": self.limits[lane],
+            }
+            for lane in self.lanes
+        }
+
+
+class PriorityScheduler(_Lanes):
+    """
+    Admit requests of several priority lanes to a shared connection pool
+
+    Attributes:
+        capacity (int): Concurrent requests across all lanes (usually the
+            client's pool_maxsize)
+        lanes (tuple): Lane names, highest priority first
+        limits (dict): Concurrent requests allowed per lane
+        reserve (int): Slots lower lanes leave free for the first lane
+        stats (dict): Per lane: requests admitted, admitted after waiting,
+            and total wait time in seconds
+
+    Example:
+        >>> scheduler = PriorityScheduler(20, limits={BACKGROUND: 8})
+        >>> client = ArzekaPayment(pool_maxsize=20, scheduler=scheduler)
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        limits: Optional[Dict[str, int]] = None,
+        lanes: Sequence[str] = DEFAULT_LANES,
+        reserve: Optional[int] = None,
+    ):
+        """
+        Create a scheduler
+
+        Args:
+            capacity: Concurrent requests across all lanes
+            limits: Concurrent requests per lane (default: the whole
+                capacity for the first lane, half of it for the others)
+            lanes: Lane names, highest priority first
+            reserve: Slots lower lanes may not use (default: a quarter of
+                the capacity, at least 1, at most capacity - 1)
+
+        Raises:
+            ValueError: If capacity is not positive or a limit names an
+                unknown lane
+        """
+        super().__init__(capacity, limits, lanes, reserve)
+        self._condition = threading.Condition()
+
+    def __repr__(self) -> str:
+        return f"PriorityScheduler(capacity={self.capacity}, limits={self.limits})"
+
+    @contextmanager
+    def slot(
+        self, lane: Optional[str] = None, deadline: Optional[float] = None
+    ) -> Iterator[str]:
+        """
+        Hold a request slot of a lane for the duration of the block
+
+        Args:
+            lane: Lane name (default: the current priority_scope, else the
+                first lane). Unknown lanes get the lowest priority.
+            deadline: Absolute ``time.monotonic()`` deadline for getting a
+                slot, combined with the current deadline_scope
+
+        Yields:
+            str: The lane of the slot
+
+        Raises:
+            ArzekaTimeoutError: If the deadline passes while waiting
+        """
+        lane = self._lane(lane)
+        deadline = self._wait_deadline(deadline)
+        with self._condition:
+            start = None
+            if not self._admissible(lane):
+                start = time.monotonic()
+                self._waiting[lane] += 1
+                try:
+                    while not self._admissible(lane):
+                        remaining = None
+                        if deadline is not None:
+                            remaining = deadline - time.monotonic()
+                            if remaining <= 0:
+                                raise ArzekaTimeoutError(
+                                    f"Deadline exceeded waiting for a {lane} slot"
+                                )
+                        self._condition.wait(remaining)
+                finally:
+                    self._waiting[lane] -= 1
+                    # Lower lanes blocked by this waiter may proceed now
+                    self._condition.notify_all()
+            self._admit(lane, time.monotonic() - start if start else 0.0)
+        try:
+            yield lane
+        finally:
+            with self._condition:
+                self._release(lane)
+                self._condition.notify_all()
+
+
+class AsyncPriorityScheduler(_Lanes):
+    """
+    PriorityScheduler for AsyncArzekaPayment (one event loop)
+
+    Same lanes, budgets and arguments as PriorityScheduler, with an
+    asynchronous ``slot``.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        limits: Optional[Dict[str, int]] = None,
+        lanes: Sequence[str] = DEFAULT_LANES,
+        reserve: Optional[int] = None,
+    ):
+        super().__init__(capacity, limits, lanes, reserve)
+        self._condition: Optional[asyncio.Condition] = None
+
+    def __repr__(self) -> str:
+        return f"AsyncPriorityScheduler(capacity={self.capacity}, limits={self.limits})"
+
+    @asynccontextmanager
+    async def slot(
+        self, lane: Optional[str] = None, deadline: Optional[float] = None
+    ) -> AsyncIterator[str]:
+        """
+        Hold a request slot of a lane for the duration of the block
+
+        Args:
+            lane: Lane name (default: the current priority_scope, else the
+                first lane). Unknown lanes get the lowest priority.
+            deadline: Absolute ``time.monotonic()`` deadline for getting a
+                slot, combined with the current deadline_scope
+
+        Yields:
+            str: The lane of the slot
+
+        Raises:
+            ArzekaTimeoutError: If the deadline passes while waiting
+        """
+        if self._condition is None:
+            # Created lazily so that it binds to the running loop
+            self._condition = asyncio.Condition()
+        lane = self._lane(lane)
+        deadline = self._wait_deadline(deadline)
+        async with self._condition:
+            start = None
+            if not self._admissible(lane):
+                start = time.monotonic()
+                self._waiting[lane] += 1
+                try:
+                    while not self._admissible(lane):
+                        remaining = None
+                        if deadline is not None:
+                            remaining = deadline - time.monotonic()
+                            if remaining <= 0:
+                                raise ArzekaTimeoutError(
+                                    f"Deadline exceeded waiting for a {lane} slot"
+                                )
+                        try:
+                            await asyncio.wait_for(self._condition.wait(), remaining)
+                        except asyncio.TimeoutError:
+                            pass
+                finally:
+                    self._waiting[lane] -= 1
+                    self._condition.notify_all()
+            self._admit(lane, time.monotonic() - start if start else 0.0)
+        try:
+            yield lane
+        finally:
+            # Counters only change on the loop thread: release before any
+            # await, so a cancellation while waiting for the lock keeps no
+            # slot. The wake-up is shielded for the same reason.
+            self._release(lane)
+            await asyncio.shield(self._notify())
+
+    async def _notify(self) -> None:
+        async with self._condition:
+            self._condition.notify_all()
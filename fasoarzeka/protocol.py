@@ -0,0 +1,614 @@
+"""
+Sans-I/O protocol layer for the Arzeka API
+
+Turns an API call into a PreparedRequest and a raw HTTP response
+(status code + body bytes) into a result or an exception. Nothing in this
+module performs I/O, so it is shared by the sync, async and bulk clients
+and can be exercised or benchmarked without a network.
+"""
+
+import base64
+import numbers
+from typing import Any, Dict, Optional
+from urllib.parse import urlencode
+
+from .codec import DEFAULT_CODEC, JSONCodec
+from .exceptions import ArzekaAPIError, ArzekaAuthenticationError, ArzekaValidationError
+from .utils import generate_hash_signature, get_reference
+
+PAYMENT_BASE_URL = "AvepayPaymentGatewayUI/avepay-payment/"
+INITIATE_PAYMENT_ENDPOINT = "app/initializePayment"
+AUTH_ENDPOINT = "auth/getToken"
+PAYMENT_VERIFICATION_ENDPOINT = "app/getThirdPartyMapInfo"
+
+SMS_BASE_URL = "ArzekaSmsSender/"
+SEND_SMS = "sendSms"
+CHECK_SMS_STATUS = "checkSms"
+
+MINIMUM_AMOUNT = 100  # Minimum payment amount in Franc CFA (XOF)
+DEFAULT_EXPIRES_IN = 3600
+
+DEFAULT_HEADERS = {
+    "Content-Type": "application/x-www-form-urlencoded",
+    "User-Agent": "arzeka-payment-client/1.0",
+    "Accept-Language": "fr-FR,en-GB;q=0.8,en;q=0.6",
+}
+AUTH_REQUEST_HEADERS = {
+    "Content-Type": "application/x-www-form-urlencoded",
+    "User-Agent": "fasoarzeka-client",
+    "Accept-Language": "fr-FR,en-GB;q=0.8,en;q=0.6",
+}
+
+REQUIRED_CUSTOMER_FIELDS = ("firstname", "lastname", "mobile")
+REQUIRED_RECEIPT_FIELDS = ("paymentDescription", "accountingOffice", "accountantName")
+DEFAULT_RECEIPT_FIELDS = {
+    "generateReceipt": False,
+    "paymentDescription": "",
+    "accountingOffice": "",
+    "accountantName": "",
+    "address": "",
+}
+
+
+class PreparedRequest:
+    """
+    A fully described HTTP request, ready to be sent by any transport
+
+    The query string is already part of ``url`` and the form body is already
+    encoded, so transports send it as is.
+
+    Attributes:
+        method (str): HTTP method (GET, POST)
+        url (str): Absolute URL, including the query string
+        headers (dict): Request headers (shared, treat as read-only)
+        body (bytes): Encoded form body or None
+    """
+
+    __slots__ = ("method", "url", "headers", "body")
+
+    def __init__(
+        self,
+        method: str,
+        url: str,
+        headers: Dict[str, str],
+        body: Optional[bytes] = None,
+    ):
+        self.method = method
+        self.url = url
+        self.headers = headers
+        self.body = body
+
+    def __repr__(self) -> str:
+        return f"<PreparedRequest {self.method} {self.url}>"
+
+
+class Endpoints:
+    """
+    Absolute endpoint URLs, computed once per base URL
+
+    Attributes:
+        base_url (str): Base URL ending with a slash
+        auth (str): Token endpoint
+        initiate_payment (str): Payment initialization endpoint
+        check_payment (str): Payment status endpoint (without query string)
+        send_sms (str): SMS sending endpoint
+        check_sms_status (str): SMS status endpoint (without query string)
+    """
+
+    __slots__ = (
+        "base_url",
+        "auth",
+        "initiate_payment",
+        "check_payment",
+        "send_sms",
+        "check_sms_status",
+    )
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+        self.auth = base_url + PAYMENT_BASE_URL + AUTH_ENDPOINT
+        self.initiate_payment = base_url + PAYMENT_BASE_URL + INITIATE_PAYMENT_ENDPOINT
+        self.check_payment = base_url + PAYMENT_BASE_URL + PAYMENT_VERIFICATION_ENDPOINT
+        self.send_sms = base_url + SMS_BASE_URL + SEND_SMS
+        self.check_sms_status = base_url + SMS_BASE_URL + CHECK_SMS_STATUS
+
+
+class HeaderCache:
+    """
+    Authenticated request headers, rebuilt only when the token changes
+
+    Example:
+        >>> cache = HeaderCache()
+        >>> headers = cache.get("Bearer", "abc")
+        >>> cache.get("Bearer", "abc") is headers
+        True
+    """
+
+    __slots__ = ("_entry",)
+
+    def __init__(self):
+        # (token_type, token, headers) replaced as a whole, so that threads
+        # never see headers paired with another token
+        self._entry = (None, None, None)
+
+    def get(self, token_type: Optional[str], token: Optional[str]) -> Dict[str, str]:
+        """
+        Get the headers for the given token
+
+        Args:
+            token_type: Token type (usually "Bearer")
+            token: Access token
+
+        Returns:
+            Dictionary of headers (shared, treat as read-only)
+        """
+        cached_type, cached_token, headers = self._entry
+        if (
+            headers is None
+            or token is not cached_token
+            or token_type is not cached_type
+        ):
+            headers = build_headers(token_type, token)
+            self._entry = (token_type, token, headers)
+        return headers
+
+
+def build_headers(
+    token_type: Optional[str],
+    token: Optional[str],
+    additional_headers: Optional[Dict[str, str]] = None,
+) -> Dict[str, str]:
+    """
+    Build the headers of an authenticated request
+
+    Args:
+        token_type: Token type (usually "Bearer")
+        token: Access token
+        additional_headers: Optional dictionary of additional headers
+
+    Returns:
+        Dictionary of headers
+    """
+    headers = dict(DEFAULT_HEADERS)
+    headers["Authorization"] = f"{token_type} {token}"
+
+    if additional_headers:
+        headers.update(additional_headers)
+
+    return headers
+
+
+def encode_form(data: Optional[Dict[str, Any]]) -> Optional[bytes]:
+    """
+    Encode form fields as application/x-www-form-urlencoded bytes
+
+    None values are skipped, as requests does.
+
+    Args:
+        data: Form fields
+
+    Returns:
+        Encoded body, or None when there is no data
+    """
+    if not data:
+        return None
+    return urlencode([(k, v) for k, v in data.items() if v is not None]).encode()
+
+
+def with_query(url: str, params: Optional[Dict[str, Any]]) -> str:
+    """
+    Append an encoded query string to a URL
+
+    Args:
+        url: URL without query string
+        params: Query parameters (None values are skipped)
+
+    Returns:
+        URL with query string
+    """
+    if not params:
+        return url
+    query = urlencode([(k, v) for k, v in params.items() if v is not None])
+    if not query:
+        return url
+    return f"{url}{'&' if '?' in url else '?'}{query}"
+
+
+def prepare_request(
+    method: str,
+    base_url: str,
+    endpoint: str,
+    headers: Dict[str, str],
+    data: Optional[Dict[str, Any]] = None,
+    params: Optional[Dict[str, Any]] = None,
+) -> PreparedRequest:
+    """
+    Prepare a request to an API endpoint
+
+    Args:
+        method: HTTP method (GET, POST)
+        base_url: Base URL ending with a slash
+        endpoint: API endpoint relative to base_url
+        headers: Request headers
+        data: Request body data (for POST)
+        params: URL parameters
+
+    Returns:
+        PreparedRequest
+
+    Raises:
+        ValueError: If the HTTP method is not supported
+    """
+    method = method.upper()
+    if method not in ("GET", "POST"):
+        raise ValueError(f"Unsupported HTTP method: {method}")
+
+    return PreparedRequest(
+        method, with_query(base_url + endpoint, params), headers, encode_form(data)
+    )
+
+
+def prepare_authenticate(
+    endpoints: Endpoints, username: str, password: str
+) -> PreparedRequest:
+    """
+    Prepare the token request
+
+    Args:
+        endpoints: Endpoint URLs
+        username: User's username or email
+        password: User's password
+
+    Returns:
+        PreparedRequest for the authentication endpoint
+
+    Raises:
+        ArzekaValidationError: If credentials are invalid
+    """
+    if not username or not isinstance(username, str):
+        raise ArzekaValidationError("username must be a non-empty string")
+
+    if not password or not isinstance(password, str):
+        raise ArzekaValidationError("password must be a non-empty string")
+
+    body = urlencode(
+        (("username", username), ("password", password), ("grant_type", "access_token"))
+    ).encode()
+    return PreparedRequest("POST", endpoints.auth, AUTH_REQUEST_HEADERS, body)
+
+
+def validate_additional_info(additional_info: Dict[str, Any]) -> None:
+    """
+    Validate and complete the customer information of a payment
+
+    Missing receipt fields are filled in place with their defaults when no
+    receipt is requested.
+
+    Args:
+        additional_info: Additional payment information
+
+    Raises:
+        ArzekaValidationError: If required fields are missing or empty
+    """
+    if not set(REQUIRED_CUSTOMER_FIELDS).issubset(additional_info.keys()):
+        raise ArzekaValidationError(
+            "additional_info must contain firstname, lastname, and mobile"
+        )
+
+    if not all(additional_info.get(field) for field in REQUIRED_CUSTOMER_FIELDS):
+        raise ArzekaValidationError(
+            "additional_info fields firstname, lastname, and mobile cannot be empty or null"
+        )
+
+    if "generateReceipt" not in additional_info:
+        additional_info.update(DEFAULT_RECEIPT_FIELDS)
+    elif additional_info["generateReceipt"]:
+        if not set(REQUIRED_RECEIPT_FIELDS).issubset(additional_info.keys()):
+            raise ArzekaValidationError(
+                f"When generateReceipt is True, additional_info must contain: {', '.join(REQUIRED_RECEIPT_FIELDS)}"
+            )
+
+
+def build_payment_data(
+    amount: float,
+    merchant_id: str,
+    link_for_update_status: str,
+    link_back_to_calling_website: str,
+    additional_info: Dict[str, Any],
+    hash_secret: str,
+    mapped_order_id: Optional[str] = None,
+    codec: Optional[JSONCodec] = None,
+) -> Dict[str, Any]:
+    """
+    Validate a payment and build its signed form data
+
+    Args:
+        amount: Payment amount
+        merchant_id: Merchant identifier
+        link_for_update_status: Webhook URL for status updates
+        link_back_to_calling_website: Redirect URL after payment
+        additional_info: Additional payment information
+        hash_secret: Secret key for generating hash signature
+        mapped_order_id: Unique transaction ID (auto-generated if not provided)
+        codec: JSON codec used to encode additional_info (default: fastest
+               installed, the output is identical whatever the codec)
+
+    Returns:
+        Payment form data including the ``hashString`` signature
+
+    Raises:
+        ArzekaValidationError: If required parameters are invalid
+    """
+    if (
+        not isinstance(amount, numbers.Real)
+        or isinstance(amount, bool)
+        or amount <= MINIMUM_AMOUNT
+    ):
+        raise ArzekaValidationError(
+            f"amount must be a positive number greater than {MINIMUM_AMOUNT}"
+        )
+    # NumPy scalars (e.g. read from a validated batch) sign and encode as
+    # the equivalent Python number
+    amount = int(amount) if isinstance(amount, numbers.Integral) else float(amount)
+
+    if not merchant_id or not isinstance(merchant_id, (str, numbers.Integral)):
+        raise ArzekaValidationError("merchant_id must be a non-empty string/int")
+    if not isinstance(merchant_id, str):
+        merchant_id = int(merchant_id)
+
+    validate_additional_info(additional_info)
+
+    if not mapped_order_id:
+        mapped_order_id = get_reference()
+
+    payment_data = {
+        "amount": amount,
+        "merchantId": merchant_id,
+        "mappedOrderId": mapped_order_id,
+        "additionalInfo": (codec or DEFAULT_CODEC).dumps(additional_info),
+        "linkForUpdateStatus": base64.b64encode(
+            link_for_update_status.encode()
+        ).decode(),
+        "linkBackToCallingWebsite": base64.b64encode(
+            link_back_to_calling_website.encode()
+        ).decode(),
+    }
+    payment_data["hashString"] = generate_hash_signature(
+        hash_secret=hash_secret, **payment_data
+    )
+    return payment_data
+
+
+def prepare_initiate_payment(
+    endpoints: Endpoints, headers: Dict[str, str], payment_data: Dict[str, Any]
+) -> PreparedRequest:
+    """
+    Prepare the payment initialization request
+
+    Args:
+        endpoints: Endpoint URLs
+        headers: Authenticated request headers
+        payment_data: Output of build_payment_data
+
+    Returns:
+        PreparedRequest
+    """
+    return PreparedRequest(
+        "POST", endpoints.initiate_payment, headers, encode_form(payment_data)
+    )
+
+
+def prepare_check_payment(
+    endpoints: Endpoints,
+    headers: Dict[str, str],
+    mapped_order_id: str,
+    transaction_id: Optional[str] = None,
+) -> PreparedRequest:
+    """
+    Prepare the payment status request
+
+    Args:
+        endpoints: Endpoint URLs
+        headers: Authenticated request headers
+        mapped_order_id: Transaction ID to check
+        transaction_id: Optional gateway transaction ID
+
+    Returns:
+        PreparedRequest
+
+    Raises:
+        ArzekaValidationError: If order ID is invalid
+    """
+    if not mapped_order_id or not isinstance(mapped_order_id, str):
+        raise ArzekaValidationError("mapped_order_id must be a non-empty string")
+
+    query = (("mappedOrderId", mapped_order_id), ("transId", transaction_id))
+    if not transaction_id:
+        query = query[:1]
+
+    return PreparedRequest(
+        "POST", f"{endpoints.check_payment}?{urlencode(query)}", headers
+    )
+
+
+def prepare_send_sms(
+    endpoints: Endpoints, headers: Dict[str, str], mobile: str, message: str
+) -> PreparedRequest:
+    """
+    Prepare an SMS sending request
+
+    Args:
+        endpoints: Endpoint URLs
+        headers: Authenticated request headers
+        mobile: Recipient phone number
+        message: SMS message content
+
+    Returns:
+        PreparedRequest
+
+    Raises:
+        ArzekaValidationError: If inputs are invalid
+    """
+    if not mobile or not isinstance(mobile, str):
+        raise ArzekaValidationError("mobile must be a non-empty string")
+
+    if not message or not isinstance(message, str):
+        raise ArzekaValidationError("message must be a non-empty string")
+
+    body = urlencode((("msisdn", mobile), ("message", message))).encode()
+    return PreparedRequest("POST", endpoints.send_sms, headers, body)
+
+
+def prepare_check_sms_status(
+    endpoints: Endpoints, headers: Dict[str, str], sms_id: str
+) -> PreparedRequest:
+    """
+    Prepare an SMS status request
+
+    Args:
+        endpoints: Endpoint URLs
+        headers: Authenticated request headers
+        sms_id: Identifier of the SMS to check
+
+    Returns:
+        PreparedRequest
+
+    Raises:
+        ArzekaValidationError: If sms_id is invalid
+    """
+    if not sms_id or not isinstance(sms_id, str):
+        raise ArzekaValidationError("sms_id must be a non-empty string")
+
+    url = f"{endpoints.check_sms_status}?{urlencode((('referenceid', sms_id),))}"
+    return PreparedRequest("GET", url, headers)
+
+
+def decode_body(content: bytes, codec: Optional[JSONCodec] = None) -> Dict[str, Any]:
+    """
+    Decode a response body, keeping non-JSON bodies as ``raw_response``
+
+    Args:
+        content: Raw response body
+        codec: JSON codec (default: fastest installed)
+
+    Returns:
+        Decoded JSON or {"raw_response": text}
+    """
+    try:
+        return (codec or DEFAULT_CODEC).loads(content)
+    except ValueError:
+        return {"raw_response": content.decode("utf-8", "replace")}
+
+
+def raise_for_status(
+    status_code: int,
+    content: bytes,
+    url: str = "",
+    codec: Optional[JSONCodec] = None,
+) -> None:
+    """
+    Raise if a raw HTTP response is an API error
+
+    Args:
+        status_code: HTTP status code
+        content: Raw response body
+        url: Request URL (used in error messages)
+        codec: JSON codec (default: fastest installed)
+
+    Raises:
+        ArzekaAPIError: If the API returned an HTTP error
+    """
+    if status_code >= 400:
+        try:
+            error_data = (codec or DEFAULT_CODEC).loads(content)
+        except ValueError:
+            error_data = {"error": content.decode("utf-8", "replace")}
+
+        raise ArzekaAPIError(
+            f"API request failed: HTTP {status_code} for url: {url}",
+            status_code=status_code,
+            response_data=error_data,
+        )
+
+
+def parse_response(
+    status_code: int,
+    content: bytes,
+    url: str = "",
+    codec: Optional[JSONCodec] = None,
+) -> Dict[str, Any]:
+    """
+    Turn a raw HTTP response into a result
+
+    Args:
+        status_code: HTTP status code
+        content: Raw response body
+        url: Request URL (used in error messages)
+        codec: JSON codec (default: fastest installed)
+
+    Returns:
+        Response data as dictionary
+
+    Raises:
+        ArzekaAPIError: If the API returned an HTTP error
+    """
+    raise_for_status(status_code, content, url, codec)
+    return decode_body(content, codec)
+
+
+def parse_auth_response(
+    status_code: int,
+    content: bytes,
+    now: float,
+    url: str = "",
+    codec: Optional[JSONCodec] = None,
+) -> Dict[str, Any]:
+    """
+    Turn a raw authentication response into token information
+
+    Args:
+        status_code: HTTP status code
+        content: Raw response body
+        now: Current UTC timestamp, used to compute ``expires_at``
+        url: Request URL (used in error messages)
+        codec: JSON codec (default: fastest installed)
+
+    Returns:
+        Dictionary containing access_token, token_type, expires_in and expires_at
+
+    Raises:
+        ArzekaAPIError: If the API returned an HTTP error
+        ArzekaAuthenticationError: If the response is malformed
+    """
+    codec = codec or DEFAULT_CODEC
+    if status_code >= 400:
+        try:
+            error_data = codec.loads(content)
+        except ValueError:
+            error_data = {"error": content.decode("utf-8", "replace")}
+
+        raise ArzekaAPIError(
+            f"Authentication request failed: HTTP {status_code} for url: {url}",
+            status_code=status_code,
+            response_data=error_data,
+        )
+
+    try:
+        response_data = codec.loads(content)
+    except ValueError as e:
+        raise ArzekaAuthenticationError(
+            "Invalid response format from authentication endpoint"
+        ) from e
+
+    if not isinstance(response_data, dict) or "access_token" not in response_data:
+        raise ArzekaAuthenticationError(
+            "Authentication response missing required fields"
+        )
+
+    expires_in = response_data.get("expires_in", DEFAULT_EXPIRES_IN)
+    return {
+        "access_token": response_data["access_token"],
+        "token_type": response_data.get("token_type", "Bearer"),
+        "expires_in": expires_in,
+        "expires_at": now + float(expires_in),
+    }
@@ -0,0 +1,273 @@
+"""
+Reconciliation of internal orders against the gateway
+
+A ``Reconciler`` reads an order export (any iterable of rows, e.g.
+``read_rows`` over a CSV file), checks the gateway status of each order
+with ``bulk_map`` and yields the orders whose state differs:
+
+- paid_unfulfilled: paid on the gateway, not fulfilled internally
+- fulfilled_unpaid: fulfilled internally, not paid on the gateway
+- missing: unknown to the gateway
+- error: the status could not be checked (network, server error)
+
+With a ``PaymentLedger``, statuses are recorded and an order whose last
+recorded status is final is not checked again. Runs are recorded in the
+ledger too: an incremental run skips the orders that are unchanged since
+the previous run and already final, and re-checks the others.
+"""
+
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, Mapping, NamedTuple, Optional
+
+from .adaptive import AdaptiveLimiter
+from .bulk import DEFAULT_CONCURRENCY, bulk_map, parse_flag
+from .exceptions import ArzekaAPIError
+from .ledger import PaymentLedger
+from .priority import BACKGROUND
+
+logger = logging.getLogger(__name__)
+
+# Report categories
+PAID_UNFULFILLED = "paid_unfulfilled"
+FULFILLED_UNPAID = "fulfilled_unpaid"
+MISSING = "missing"
+ERROR = "error"
+MATCHED = "matched"
+DISCREPANCIES = (PAID_UNFULFILLED, FULFILLED_UNPAID, MISSING, ERROR)
+
+# Gateway statuses of a paid order
+PAID_STATUSES = ("SUCCESS",)
+# HTTP status of check_payment for an unknown order
+NOT_FOUND = 404
+
+# Columns of the order export
+ORDER_ID_FIELD = "mapped_order_id"
+FULFILLED_FIELD = "fulfilled"
+UPDATED_FIELD = "updated_at"
+
+_SKIPPED = object()
+
+
+class Discrepancy(NamedTuple):
+    """One line of the reconciliation report"""
+
+    category: str
+    mapped_order_id: str
+    fulfilled: bool
+    gateway_status: Optional[str] = None
+    error: Optional[str] = None
+    cached: bool = False
+
+    def as_row(self) -> Dict[str, Any]:
+        """Flat dict for RowWriter"""
+        return self._asdict()
+
+
+def _timestamp(value: Any) -> Optional[float]:
+    """Read a timestamp column: epoch seconds or ISO 8601 text"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.timestamp()
+    text = str(value).strip()
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(text.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        logger.warning(f"Unreadable order timestamp: {value!r}")
+        return None
+
+
+class Reconciler:
+    """
+    Compare an order export with the statuses reported by the gateway
+
+    Attributes:
+        client: Authenticated ArzekaPayment (or any object with check_payment)
+        ledger (PaymentLedger): Cache of final statuses and run history
+        concurrency (int): Parallel check_payment calls
+        rate (float): Maximum check_payment calls per second
+        paid_statuses (frozenset): Gateway statuses of a paid order
+        stats (dict): Counters of the last run
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        ledger: Optional[PaymentLedger] = None,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        rate: Optional[float] = None,
+        paid_statuses: Iterable[str] = PAID_STATUSES,
+        order_id_field: str = ORDER_ID_FIELD,
+        fulfilled_field: str = FULFILLED_FIELD,
+        updated_field: str = UPDATED_FIELD,
+        priority: Optional[str] = BACKGROUND,
+        limiter: Optional[AdaptiveLimiter] = None,
+    ):
+        """
+        Create a reconciler
+
+        Args:
+            client: Authenticated client used for check_payment
+            ledger: Ledger caching final statuses (and recording the runs,
+                required for incremental runs)
+            concurrency: Parallel check_payment calls
+            rate: Maximum check_payment calls per second (None: unlimited)
+            paid_statuses: Gateway statuses meaning the order is paid
+            order_id_field: Column holding the mapped_order_id
+            fulfilled_field: Column telling whether the order was fulfilled
+                (bool, or "1"/"true"/"yes"/"oui" in CSV)
+            updated_field: Column holding the last internal update of the
+                order (epoch seconds or ISO 8601), used by incremental runs
+            priority: Lane of the checks when the client has a
+                PriorityScheduler (None: the caller's priority_scope)
+            limiter: Adaptive concurrency limit replacing concurrency
+        """
+        self.client = client
+        self.ledger = ledger
+        self.concurrency = concurrency
+        self.rate = rate
+        self.paid_statuses = frozenset(paid_statuses)
+        self.order_id_field = order_id_field
+        self.fulfilled_field = fulfilled_field
+        self.updated_field = updated_field
+        self.priority = priority
+        self.limiter = limiter
+        self.stats: Dict[str, int] = {}
+
+        # The client records the statuses itself when it shares the ledger
+        self._record = (
+            ledger is not None and getattr(client, "ledger", None) is not ledger
+        )
+
+    def _classify(
+        self,
+        order_id: str,
+        fulfilled: bool,
+        status: Optional[str],
+        cached: bool = False,
+    ) -> Discrepancy:
+        if status is None:
+            return Discrepancy(MISSING, order_id, fulfilled)
+        paid = status in self.paid_statuses
+        if paid and not fulfilled:
+            category = PAID_UNFULFILLED
+        elif fulfilled and not paid:
+            category = FULFILLED_UNPAID
+        else:
+            category = MATCHED
+        return Discrepancy(category, order_id, fulfilled, status, cached=cached)
+
+    def _reconcile_order(self, order: Mapping[str, Any], since: Optional[float]) -> Any:
+        order_id = str(order[self.order_id_field])
+        fulfilled = parse_flag(order.get(self.fulfilled_field))
+
+        if self.ledger is not None:
+            payment = self.ledger.get_payment(order_id)
+            if payment is not None and payment["final"]:
+                updated = _timestamp(order.get(self.updated_field))
+                if since is not None and updated is not None and updated < since:
+                    return _SKIPPED  # Reported by a previous run if needed
+                return self._classify(order_id, fulfilled, payment["status"], True)
+
+        try:
+            response = self.client.check_payment(
+                order_id, order.get("transaction_id") or None
+            )
+        except ArzekaAPIError as e:
+            if e.status_code == NOT_FOUND:
+                return Discrepancy(MISSING, order_id, fulfilled, error=str(e))
+            raise
+        if self._record:
+            self.ledger.record_status(order_id, response)
+        return self._classify(order_id, fulfilled, response.get("status"))
+
+    def reconcile(
+        self,
+        orders: Iterable[Mapping[str, Any]],
+        incremental: bool = False,
+        since: Optional[float] = None,
+        include_matched: bool = False,
+    ) -> Iterator[Discrepancy]:
+        """
+        Reconcile an order export, yielding the report as it is produced
+
+        Orders are consumed lazily and reported in completion order, so a
+        large export is processed in constant memory. The run is recorded
+        in the ledger once the export has been read to the end.
+
+        Args:
+            orders: Order rows (mapped_order_id, fulfilled, updated_at, and
+                optionally transaction_id)
+            incremental: Skip the orders unchanged since the start of the
+                previous run whose gateway status is already final
+            since: Explicit timestamp for incremental runs
+            include_matched: Also yield the orders that match
+
+        Yields:
+            Discrepancy for each order that does not match (and for each
+            order with include_matched)
+
+        Raises:
+            ValueError: If incremental is requested without a ledger
+
+        Example:
+            >>> with open("orders.csv", newline="") as f:
+            ...     for line in reconciler.reconcile(read_rows(f), incremental=True):
+            ...         writer.write(line.as_row())
+        """
+        if incremental and since is None:
+            if self.ledger is None:
+                raise ValueError("Incremental reconciliation requires a ledger")
+            last = self.ledger.last_reconciliation()
+            since = last["started_at"] if last else None
+
+        started_at = time.time()
+        self.stats = dict.fromkeys(
+            ("orders", "checked", "cached", "skipped", "discrepancies"), 0
+        )
+        self.stats.update(dict.fromkeys(DISCREPANCIES + (MATCHED,), 0))
+        scope = f"orders changed since {since:.0f}" if since else "all orders"
+        logger.info(f"Reconciliation started: {scope}")
+
+        for outcome in bulk_map(
+            lambda order: self._reconcile_order(order, since),
+            orders,
+            concurrency=self.concurrency,
+            rate=self.rate,
+            ordered=False,
+            priority=self.priority,
+            limiter=self.limiter,
+        ):
+            self.stats["orders"] += 1
+            if outcome.ok:
+                line = outcome.result
+                if line is _SKIPPED:
+                    self.stats["skipped"] += 1
+                    continue
+                self.stats["cached" if line.cached else "checked"] += 1
+            else:
+                order_id = str(outcome.item.get(self.order_id_field))
+                line = Discrepancy(
+                    ERROR,
+                    order_id,
+                    parse_flag(outcome.item.get(self.fulfilled_field)),
+                    error=f"{type(outcome.error).__name__}: {outcome.error}",
+                )
+            self.stats[line.category] += 1
+            if line.category != MATCHED:
+                self.stats["discrepancies"] += 1
+                yield line
+            elif include_matched:
+                yield line
+
+        if self.ledger is not None:
+            self.ledger.record_reconciliation(started_at, time.time(), self.stats)
+        logger.info(f"Reconciliation finished: {self.stats}")
@@ -0,0 +1,249 @@
+"""
+Client-wide retry budget
+
+The session retries a failed request up to MAX_RETRIES times (connection
+errors, 429 and 5xx). During an outage every failing call retries, which
+multiplies the load on a gateway that is already struggling. A
+``RetryBudget`` passed to a client as ``retry_budget=`` caps the retries of
+all its threads:
+
+- over a sliding window of ``window`` seconds, retries may not exceed
+  ``ratio`` of the successful requests, plus ``min_per_second`` retries per
+  second so that a quiet client can still retry;
+- once the budget is spent, a connection error is raised at once and a 429
+  or 5xx response is returned as is (ArzekaAPIError), without retrying.
+
+The budget applies to the requests transport (HTTP/1.1); the httpx
+transports only retry failed connections.
+
+The same transport also stops retrying when the call's deadline (see
+``fasoarzeka.timeouts``) would pass during the back-off or Retry-After wait;
+the call then fails at once with ArzekaTimeoutError.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from urllib3.exceptions import MaxRetryError, TimeoutError as _UrllibTimeoutError
+from urllib3.util.retry import Retry
+
+from .timeouts import current_deadline
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RATIO = 0.2  # Retries allowed per successful request
+DEFAULT_MIN_PER_SECOND = 1.0  # Retries always allowed, per second
+DEFAULT_WINDOW = 10  # Seconds of history
+
+
+class RetryBudget:
+    """
+    Retries allowed to a client, shared by its threads
+
+    Attributes:
+        ratio (float): Retries allowed per successful request
+        min_per_second (float): Retries allowed per second in any case
+        window (int): Length of the sliding window in seconds
+        stats (dict): allowed and denied retries since creation
+
+    Example:
+        >>> budget = RetryBudget(ratio=0.1)
+        >>> client = ArzekaPayment(retry_budget=budget)
+        >>> budget.snapshot()["denied"]  # Retries refused during an outage
+    """
+
+    def __init__(
+        self,
+        ratio: float = DEFAULT_RATIO,
+        min_per_second: float = DEFAULT_MIN_PER_SECOND,
+        window: int = DEFAULT_WINDOW,
+    ):
+        """
+        Create a retry budget
+
+        Args:
+            ratio: Retries allowed per successful request in the window
+            min_per_second: Retries allowed per second whatever the traffic
+            window: Length of the sliding window in seconds
+
+        Raises:
+            ValueError: If a parameter is negative or window is below 1
+        """
+        if ratio < 0 or min_per_second < 0:
+            raise ValueError("ratio and min_per_second must not be negative")
+        if window < 1:
+            raise ValueError(f"window must be at least 1 second, got {window}")
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.window = int(window)
+        # One [second, successes, retries] bucket per second of the window
+        self._buckets: Deque[List[int]] = deque()
+        self._lock = threading.Lock()
+        self.stats = {"allowed": 0, "denied": 0}
+
+    def __repr__(self) -> str:
+        return (
+            f"RetryBudget(ratio={self.ratio}, min_per_second={self.min_per_second}, "
+            f"window={self.window})"
+        )
+
+    def _current(self) -> List[int]:
+        """Bucket of the current second, after dropping expired ones"""
+        second = int(time.monotonic())
+        while self._buckets and self._buckets[0][0] <= second - self.window:
+            self._buckets.popleft()
+        if not self._buckets or self._buckets[-1][0] != second:
+            self._buckets.append([second, 0, 0])
+        return self._buckets[-1]
+
+    def _available(self) -> float:
+        successes = sum(bucket[1] for bucket in self._buckets)
+        retries = sum(bucket[2] for bucket in self._buckets)
+        allowed = self.min_per_second * self.window + self.ratio * successes
+        return allowed - retries
+
+    def deposit(self) -> None:
+        """Record a successful request"""
+        with self._lock:
+            self._current()[1] += 1
+
+    def withdraw(self) -> bool:
+        """
+        Take one retry from the budget
+
+        Returns:
+            bool: True if the retry may be sent, False if the budget is spent
+        """
+        with self._lock:
+            bucket = self._current()
+            if self._available() < 1:
+                self.stats["denied"] += 1
+                return False
+            bucket[2] += 1
+            self.stats["allowed"] += 1
+            return True
+
+    def refund(self) -> None:
+        """Give back a withdrawn retry that was finally not sent"""
+        with self._lock:
+            for bucket in reversed(self._buckets):
+                if bucket[2]:
+                    bucket[2] -= 1
+                    self.stats["allowed"] -= 1
+                    return
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Get the state of the window and the counters
+
+        Returns:
+            dict: successes and retries in the window, available retries,
+            and the allowed/denied counters
+        """
+        with self._lock:
+            self._current()
+            return {
+                "successes": sum(bucket[1] for bucket in self._buckets),
+                "retries": sum(bucket[2] for bucket in self._buckets),
+                "available": int(self._available()),
+                **self.stats,
+            }
+
+
+class RetryDeadlineError(_UrllibTimeoutError):
+    """The next retry would start after the call's deadline"""
+
+
+def is_retry_deadline_error(error: BaseException) -> bool:
+    """
+    Tell whether a transport error means retries stopped at the deadline
+
+    Args:
+        error: Exception raised by the requests session
+
+    Returns:
+        bool: True if BudgetedRetry gave up because of the deadline
+    """
+    reason = error.args[0] if error.args else None
+    return isinstance(getattr(reason, "reason", None), RetryDeadlineError)
+
+
+class BudgetedRetry(Retry):
+    """
+    urllib3 Retry that only retries while a RetryBudget allows it
+
+    Responses that are not retried count as successes, except 429 and 5xx.
+    Without a budget it behaves as Retry. In both cases it gives up with
+    RetryDeadlineError when the wait before the next retry would reach the
+    current deadline.
+    """
+
+    def __init__(self, *args, budget: Optional[RetryBudget] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.budget = budget
+
+    def new(self, **kw):
+        # Retry copies itself after each attempt
+        retry = super().new(**kw)
+        retry.budget = self.budget
+        return retry
+
+    def is_retry(self, method, status_code, has_retry_after=False):
+        retry = super().is_retry(method, status_code, has_retry_after)
+        if self.budget is None:
+            return retry
+        if not retry:
+            if status_code < 500 and status_code not in (self.status_forcelist or ()):
+                self.budget.deposit()
+            return False
+        if self._exhausted_by_status():
+            return True  # increment() gives up: no retry is sent, none is charged
+        if not self.budget.withdraw():
+            logger.warning(f"Retry budget spent, not retrying HTTP {status_code}")
+            return False
+        return True
+
+    def increment(
+        self,
+        method=None,
+        url=None,
+        response=None,
+        error=None,
+        _pool=None,
+        _stacktrace=None,
+    ):
+        retry = super().increment(method, url, response, error, _pool, _stacktrace)
+        deadline = current_deadline()
+        if deadline is not None:
+            wait = retry._wait_before_retry(response)
+            if time.monotonic() + wait >= deadline:
+                logger.warning(f"Deadline too close, not retrying {method} {url}")
+                if error is None and self.budget is not None:
+                    self.budget.refund()  # Withdrawn by is_retry
+                raise MaxRetryError(
+                    _pool,
+                    url,
+                    RetryDeadlineError("Deadline reached before the next retry"),
+                )
+        if error is not None and self.budget is not None:
+            if not self.budget.withdraw():
+                logger.warning(f"Retry budget spent, not retrying after {error!r}")
+                raise MaxRetryError(_pool, url, error)
+        return retry
+
+    def _exhausted_by_status(self) -> bool:
+        """Whether counting one more status retry would exhaust this Retry"""
+        return any(
+            count is not None and count < 1 for count in (self.total, self.status)
+        )
+
+    def _wait_before_retry(self, response=None) -> float:
+        """Seconds sleep() will wait before the next attempt"""
+        if self.respect_retry_after_header and response:
+            retry_after = self.get_retry_after(response)
+            if retry_after:
+                return retry_after
+        return self.get_backoff_time()
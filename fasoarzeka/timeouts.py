@@ -0,0 +1,164 @@
+"""
+Timeouts and deadlines for Arzeka API calls
+
+Every request gets a connect timeout and a read timeout. The read timeout
+depends on the operation (a status check should fail much sooner than a
+payment initialization) and is further capped by the caller's deadline.
+
+Deadlines are absolute ``time.monotonic()`` values. They can be passed to
+each call or set for a whole block with ``deadline_scope``, which follows the caller's
+execution context (contextvars), including asyncio tasks::
+
+    with deadline_scope(2.5):  # e.g. the time left for the HTTP request we serve
+        client.check_payment(order_id)
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional, Tuple
+
+from .exceptions import ArzekaTimeoutError
+
+DEFAULT_CONNECT_TIMEOUT = 5
+DEFAULT_OPERATION_TIMEOUTS = {
+    "authenticate": 15,
+    "initiate_payment": 30,
+    "check_payment": 10,
+    "send_sms": 15,
+    "check_sms_status": 10,
+}
+
+_current_deadline: ContextVar[Optional[float]] = ContextVar(
+    "arzeka_deadline", default=None
+)
+
+
+def current_deadline() -> Optional[float]:
+    """
+    Get the deadline set by the innermost deadline_scope
+
+    Returns:
+        Absolute monotonic deadline, or None if no scope is active
+    """
+    return _current_deadline.get()
+
+
+@contextmanager
+def deadline_scope(seconds: float) -> Iterator[float]:
+    """
+    Limit every Arzeka call made within the block to a time budget
+
+    Nested scopes can only shorten the deadline, never extend it.
+
+    Args:
+        seconds: Time budget from now
+
+    Yields:
+        float: The absolute monotonic deadline in effect
+
+    Example:
+        >>> with deadline_scope(2):
+        ...     client.check_payment("order-123")  # gives up after 2s at most
+    """
+    deadline = time.monotonic() + seconds
+    outer = _current_deadline.get()
+    if outer is not None:
+        deadline = min(deadline, outer)
+
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def effective_deadline(deadline: Optional[float] = None) -> Optional[float]:
+    """
+    Combine a call deadline with the current deadline_scope
+
+    Args:
+        deadline: Optional absolute monotonic deadline for this call
+
+    Returns:
+        The earliest of the two, or None if neither is set
+    """
+    scoped = _current_deadline.get()
+    if scoped is not None:
+        deadline = scoped if deadline is None else min(deadline, scoped)
+    return deadline
+
+
+@contextmanager
+def deadline_at(deadline: Optional[float]) -> Iterator[Optional[float]]:
+    """
+    Run the block under an absolute deadline
+
+    Unlike deadline_scope, the deadline is a ``time.monotonic()`` value, so
+    that a deadline computed in one thread can be carried into another one
+    (contextvars are not inherited by pool threads).
+
+    Args:
+        deadline: Absolute monotonic deadline, or None to keep the current one
+
+    Yields:
+        The deadline in effect, None if there is none
+    """
+    deadline = effective_deadline(deadline)
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def operation_timeouts_for(
+    timeout: Optional[float] = None,
+    overrides: Optional[Dict[str, float]] = None,
+) -> Dict[str, float]:
+    """
+    Build the read timeout of every operation
+
+    Args:
+        timeout: Read timeout chosen by the caller for every operation, or
+            None for DEFAULT_OPERATION_TIMEOUTS
+        overrides: Read timeouts of specific operations, taking precedence
+
+    Returns:
+        dict: Read timeout in seconds keyed by operation name
+    """
+    if timeout is None:
+        timeouts = dict(DEFAULT_OPERATION_TIMEOUTS)
+    else:
+        timeouts = dict.fromkeys(DEFAULT_OPERATION_TIMEOUTS, timeout)
+    if overrides:
+        timeouts.update(overrides)
+    return timeouts
+
+
+def resolve_timeout(
+    connect: float, read: float, deadline: Optional[float] = None
+) -> Tuple[float, float]:
+    """
+    Combine the configured timeouts with the call and context deadlines
+
+    Args:
+        connect: Connect timeout in seconds
+        read: Read timeout in seconds
+        deadline: Optional absolute monotonic deadline for this call
+
+    Returns:
+        Tuple of (connect, read) timeouts in seconds
+
+    Raises:
+        ArzekaTimeoutError: If the deadline has already passed
+    """
+    deadline = effective_deadline(deadline)
+    if deadline is None:
+        return connect, read
+
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise ArzekaTimeoutError("Deadline exceeded before the request was sent")
+
+    return min(connect, remaining), min(read, remaining)
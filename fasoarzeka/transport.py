@@ -0,0 +1,135 @@
+"""
+HTTP transports for the Arzeka API client
+
+The default transport is a ``requests.Session`` (HTTP/1.1). When ``httpx``
+and ``h2`` are installed, an HTTP/2 transport can be used instead so that
+many concurrent requests are multiplexed over a few connections. HTTP/2 is
+negotiated through ALPN: when the server does not offer ``h2`` the same
+client transparently speaks HTTP/1.1.
+"""
+
+import logging
+from typing import Optional
+
+import requests
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - optional dependency
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONNECTIONS = 10  # Same as the requests/urllib3 default pool size
+DEFAULT_KEEPALIVE_IDLE = 50  # Below the usual 60s server/load-balancer timeout
+
+# Exception families raised by the supported transports
+TIMEOUT_ERRORS = (requests.exceptions.Timeout,)
+CONNECTION_ERRORS = (requests.exceptions.ConnectionError,)
+HTTP_ERRORS = (requests.exceptions.HTTPError,)
+
+if httpx is not None:
+    TIMEOUT_ERRORS += (httpx.TimeoutException,)
+    CONNECTION_ERRORS += (httpx.TransportError,)
+    HTTP_ERRORS += (httpx.HTTPStatusError,)
+
+
+def http2_available() -> bool:
+    """
+    Check whether the optional HTTP/2 dependencies are installed
+
+    Returns:
+        bool: True if both httpx and h2 can be imported
+    """
+    if httpx is None:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def httpx_timeout(connect: float, read: float) -> "httpx.Timeout":
+    """
+    Build an httpx timeout from separate connect and read timeouts
+
+    Args:
+        connect: Connect timeout in seconds
+        read: Read timeout in seconds (also used for write and pool waits)
+
+    Returns:
+        httpx.Timeout
+    """
+    return httpx.Timeout(read, connect=connect)
+
+
+def _limits(max_connections: int, keepalive_expiry: Optional[float]) -> "httpx.Limits":
+    return httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_connections,
+        keepalive_expiry=keepalive_expiry,
+    )
+
+
+def create_http2_client(
+    max_connections: int = DEFAULT_MAX_CONNECTIONS,
+    retries: int = 0,
+    keepalive_expiry: Optional[float] = DEFAULT_KEEPALIVE_IDLE,
+) -> "httpx.Client":
+    """
+    Create a synchronous httpx client with HTTP/2 enabled
+
+    Args:
+        max_connections: Maximum number of pooled connections
+        retries: Number of retries on connection failures
+        keepalive_expiry: Seconds before an idle connection is dropped
+
+    Returns:
+        Configured httpx.Client object
+    """
+    transport = httpx.HTTPTransport(
+        http2=True,
+        retries=retries,
+        limits=_limits(max_connections, keepalive_expiry),
+    )
+    return httpx.Client(transport=transport)
+
+
+def create_async_client(
+    http2: bool = False,
+    max_connections: int = DEFAULT_MAX_CONNECTIONS,
+    retries: int = 0,
+    keepalive_expiry: Optional[float] = DEFAULT_KEEPALIVE_IDLE,
+) -> "httpx.AsyncClient":
+    """
+    Create an asynchronous httpx client
+
+    Args:
+        http2: Enable HTTP/2 (falls back to HTTP/1.1 if h2 is missing)
+        max_connections: Maximum number of pooled connections
+        retries: Number of retries on connection failures
+        keepalive_expiry: Seconds before an idle connection is dropped
+
+    Returns:
+        Configured httpx.AsyncClient object
+
+    Raises:
+        ImportError: If httpx is not installed
+    """
+    if httpx is None:
+        raise ImportError(
+            "The async client requires httpx. "
+            "Install it with: pip install fasoarzeka[http2]"
+        )
+
+    if http2 and not http2_available():
+        logger.warning("HTTP/2 requested but 'h2' is not installed, using HTTP/1.1")
+        http2 = False
+
+    transport = httpx.AsyncHTTPTransport(
+        http2=http2,
+        retries=retries,
+        limits=_limits(max_connections, keepalive_expiry),
+    )
+    return httpx.AsyncClient(transport=transport)
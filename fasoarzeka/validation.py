@@ -0,0 +1,265 @@
+"""
+Columnar pre-validation of payment batches
+
+``initiate_payment`` validates one payment at a time and stops at the first
+problem. For payout batches, ``validate_payment_batch`` applies the same
+rules to every row in vectorized NumPy passes and reports all the problems
+of all the rows, before any request is sent.
+
+NumPy is required: ``pip install fasoarzeka[numpy]``.
+"""
+
+import numbers
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Union
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+from .exceptions import ArzekaValidationError
+from .protocol import MINIMUM_AMOUNT, REQUIRED_CUSTOMER_FIELDS, REQUIRED_RECEIPT_FIELDS
+
+# Columns read by validate_payment_batch
+PAYMENT_COLUMNS = (
+    ("amount", "merchant_id", "generateReceipt")
+    + REQUIRED_CUSTOMER_FIELDS
+    + REQUIRED_RECEIPT_FIELDS
+)
+
+MAX_REPORTED_ROWS = 10  # Rows listed in the message of raise_for_errors
+
+_ADDITIONAL_INFO_FIELDS = set(
+    ("generateReceipt",) + REQUIRED_CUSTOMER_FIELDS + REQUIRED_RECEIPT_FIELDS
+)
+
+
+class BatchValidationReport:
+    """
+    Per-row result of a batch validation
+
+    Attributes:
+        valid (numpy.ndarray): Boolean mask, True for rows without errors
+        errors (dict): Error messages keyed by row index, only for invalid rows
+    """
+
+    __slots__ = ("valid", "errors")
+
+    def __init__(self, valid: "np.ndarray", errors: Dict[int, List[str]]):
+        self.valid = valid
+        self.errors = errors
+
+    def __len__(self) -> int:
+        return len(self.valid)
+
+    def __repr__(self) -> str:
+        return f"BatchValidationReport(rows={len(self)}, invalid={len(self.errors)})"
+
+    @property
+    def is_valid(self) -> bool:
+        """True when every row passed validation"""
+        return not self.errors
+
+    @property
+    def invalid_rows(self) -> List[int]:
+        """Indexes of the rows that failed validation, in order"""
+        return sorted(self.errors)
+
+    def raise_for_errors(self) -> None:
+        """
+        Raise if any row failed validation
+
+        Raises:
+            ArzekaValidationError: Listing the first invalid rows
+        """
+        if not self.errors:
+            return
+
+        rows = self.invalid_rows
+        details = "; ".join(
+            f"row {row}: {', '.join(self.errors[row])}"
+            for row in rows[:MAX_REPORTED_ROWS]
+        )
+        more = len(rows) - MAX_REPORTED_ROWS
+        if more > 0:
+            details += f"; and {more} more row(s)"
+        raise ArzekaValidationError(
+            f"{len(rows)} of {len(self)} payment(s) are invalid: {details}"
+        )
+
+
+def _to_columns(
+    payments: Union[Mapping[str, Sequence[Any]], Iterable[Mapping[str, Any]]],
+) -> Dict[str, Optional[Sequence[Any]]]:
+    """Get the payment columns, None for the missing ones"""
+    if hasattr(payments, "keys"):
+        # Dict of columns or DataFrame
+        return {
+            column: payments[column] if column in payments.keys() else None
+            for column in PAYMENT_COLUMNS
+        }
+
+    rows = list(payments)
+    infos = [row.get("additional_info") or {} for row in rows]
+    columns = {
+        column: (
+            [info.get(column) for info in infos]
+            if column in _ADDITIONAL_INFO_FIELDS
+            else [row.get(column) for row in rows]
+        )
+        for column in PAYMENT_COLUMNS
+    }
+    # initiate_payment only requires the receipt keys, whatever their value
+    # (None included): keep True for a present key, None for a missing one
+    for column in REQUIRED_RECEIPT_FIELDS:
+        columns[column] = [True if column in info else None for info in infos]
+    return columns
+
+
+def _as_array(values: Sequence[Any]) -> "np.ndarray":
+    """Convert a column to an array without coercing mixed values to strings"""
+    array = np.asarray(values)
+    if array.dtype.kind == "U" and not hasattr(values, "dtype"):
+        # A list such as [1000, "1000"] would become all strings
+        array = np.asarray(values, dtype=object)
+    return array
+
+
+def _present(values: Optional[Sequence[Any]], size: int) -> "np.ndarray":
+    """Mask of non-empty values (not None, not empty, not zero)"""
+    if values is None:
+        return np.zeros(size, dtype=bool)
+    array = _as_array(values)
+    if array.dtype.kind == "U":
+        return np.char.str_len(array) > 0
+    # Object to bool conversion applies truth testing to each value in C
+    return array.astype(object).astype(bool)
+
+
+def _not_none(values: Optional[Sequence[Any]], size: int) -> "np.ndarray":
+    """Mask of values that were provided, even if empty"""
+    if values is None:
+        return np.zeros(size, dtype=bool)
+    return np.asarray(values, dtype=object) != None  # noqa: E711 - elementwise
+
+
+def _valid_amounts(values: Optional[Sequence[Any]], size: int) -> "np.ndarray":
+    if values is None:
+        return np.zeros(size, dtype=bool)
+    array = _as_array(values)
+    if array.dtype.kind in "iuf":
+        # NaN compares false and is rejected
+        return array > MINIMUM_AMOUNT
+    return np.fromiter(
+        (
+            isinstance(value, numbers.Real)
+            and not isinstance(value, bool)
+            and value > MINIMUM_AMOUNT
+            for value in array.tolist()
+        ),
+        dtype=bool,
+        count=size,
+    )
+
+
+def _valid_merchants(values: Optional[Sequence[Any]], size: int) -> "np.ndarray":
+    if values is None:
+        return np.zeros(size, dtype=bool)
+    array = _as_array(values)
+    if array.dtype.kind == "U":
+        return np.char.str_len(array) > 0
+    if array.dtype.kind in "iu":
+        return array != 0
+    return np.fromiter(
+        (
+            isinstance(value, (str, numbers.Integral)) and bool(value)
+            for value in array.tolist()
+        ),
+        dtype=bool,
+        count=size,
+    )
+
+
+def validate_payment_batch(
+    payments: Union[Mapping[str, Sequence[Any]], Iterable[Mapping[str, Any]]],
+) -> BatchValidationReport:
+    """
+    Check a batch of payments with the rules of initiate_payment
+
+    Each rule runs once over the whole column, so a batch of 100k payments
+    is screened in a few milliseconds when given as columns.
+
+    Args:
+        payments: Either columns (a dict of sequences or arrays, or a pandas
+                  DataFrame) named amount, merchant_id, firstname, lastname,
+                  mobile, generateReceipt, paymentDescription,
+                  accountingOffice and accountantName; or rows, each a dict of
+                  initiate_payment arguments (amount, merchant_id,
+                  additional_info)
+
+    Returns:
+        BatchValidationReport with the validity mask and the errors per row
+
+    Raises:
+        ImportError: If numpy is not installed
+        ArzekaValidationError: If the columns do not have the same length
+
+    Example:
+        >>> report = validate_payment_batch({
+        ...     "amount": [1000, 50],
+        ...     "merchant_id": ["M1", "M1"],
+        ...     "firstname": ["Awa", "Issa"],
+        ...     "lastname": ["Ouedraogo", ""],
+        ...     "mobile": ["70123456", "76543210"],
+        ... })
+        >>> report.errors
+        {1: ['amount must be a positive number greater than 100', 'lastname cannot be empty or null']}
+    """
+    if np is None:
+        raise ImportError(
+            "Batch validation requires numpy. "
+            "Install it with: pip install fasoarzeka[numpy]"
+        )
+
+    columns = _to_columns(payments)
+    sizes = {len(values) for values in columns.values() if values is not None}
+    if len(sizes) > 1:
+        raise ArzekaValidationError(
+            f"All payment columns must have the same length, got {sorted(sizes)}"
+        )
+    size = sizes.pop() if sizes else 0
+
+    checks = [
+        (
+            _valid_amounts(columns["amount"], size),
+            f"amount must be a positive number greater than {MINIMUM_AMOUNT}",
+        ),
+        (
+            _valid_merchants(columns["merchant_id"], size),
+            "merchant_id must be a non-empty string/int",
+        ),
+    ]
+    for field in REQUIRED_CUSTOMER_FIELDS:
+        checks.append(
+            (_present(columns[field], size), f"{field} cannot be empty or null")
+        )
+
+    receipt = _present(columns["generateReceipt"], size)
+    if receipt.any():
+        for field in REQUIRED_RECEIPT_FIELDS:
+            checks.append(
+                (
+                    ~receipt | _not_none(columns[field], size),
+                    f"{field} is required when generateReceipt is True",
+                )
+            )
+
+    valid = np.ones(size, dtype=bool)
+    errors: Dict[int, List[str]] = {}
+    for mask, message in checks:
+        valid &= mask
+        # Only failing rows are visited
+        for row in np.flatnonzero(~mask).tolist():
+            errors.setdefault(row, []).append(message)
+
+    return BatchValidationReport(valid, errors)
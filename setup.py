@@ -27,4 +27,10 @@ setup(
         "Operating System :: OS Independent",
     ],
     requires=["request", "urllib3"],
+    extras_require={
+        "http2": ["httpx[http2]>=0.24"],
+        "numpy": ["numpy>=1.20"],
+        "fast-json": ["orjson>=3.6"],
+    },
+    entry_points={"console_scripts": ["fasoarzeka=fasoarzeka.cli:main"]},
 )
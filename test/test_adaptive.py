@@ -0,0 +1,153 @@
+"""
+Tests pour la limite de concurrence adaptative (fasoarzeka.adaptive)
+"""
+
+import asyncio
+import time
+import unittest
+
+import httpx
+
+from fasoarzeka import AsyncArzekaPayment
+from fasoarzeka.adaptive import AdaptiveLimiter, AsyncAdaptiveLimiter, is_overload
+from fasoarzeka.bulk import bulk_map
+from fasoarzeka.exceptions import (
+    ArzekaAPIError,
+    ArzekaConnectionError,
+    ArzekaValidationError,
+)
+
+
+def _fail(limiter, error):
+    """Appel qui échoue sous la limite"""
+    try:
+        with limiter.slot():
+            raise error
+    except type(error):
+        pass
+
+
+class TestAdaptiveLimiter(unittest.TestCase):
+    """Tests de la limite AIMD"""
+
+    def test_is_overload(self):
+        """Erreurs signalant une surcharge de la passerelle"""
+        self.assertTrue(is_overload(ArzekaAPIError("trop", status_code=429)))
+        self.assertTrue(is_overload(ArzekaAPIError("panne", status_code=503)))
+        self.assertTrue(is_overload(ArzekaConnectionError("coupure")))
+        self.assertFalse(is_overload(ArzekaAPIError("inconnue", status_code=404)))
+        self.assertFalse(is_overload(ValueError("bug")))
+
+    def test_increase_when_saturated(self):
+        """La limite monte tant que la latence reste stable"""
+        limiter = AdaptiveLimiter(initial=2, max_limit=8)
+        results = list(
+            bulk_map(lambda _: time.sleep(0.002), range(200), limiter=limiter)
+        )
+        self.assertTrue(all(r.ok for r in results))
+        self.assertGreater(limiter.limit, 2)
+        self.assertLessEqual(limiter.limit, 8)
+        self.assertEqual(limiter.stats["calls"], 200)
+        self.assertEqual(limiter.in_flight, 0)
+
+    def test_not_saturated(self):
+        """Sans demande suffisante, la limite ne monte pas"""
+        limiter = AdaptiveLimiter(initial=4)
+        for _ in range(20):
+            with limiter.slot():
+                time.sleep(0.002)
+        self.assertEqual(limiter.stats["increases"], 0)
+        self.assertLessEqual(limiter.limit, 4)
+
+    def test_overload_halves_once_per_round_trip(self):
+        """Une rafale d'erreurs 429 ne divise la limite qu'une fois"""
+        limiter = AdaptiveLimiter(initial=16)
+        with limiter.slot():
+            time.sleep(0.05)  # Latence de référence
+        for _ in range(5):
+            _fail(limiter, ArzekaAPIError("trop", status_code=429))
+        self.assertEqual(limiter.limit, 8)
+        self.assertEqual(limiter.stats["overloads"], 5)
+        self.assertEqual(limiter.stats["decreases"], 1)
+
+        time.sleep(0.06)  # Un aller-retour plus tard
+        _fail(limiter, ArzekaAPIError("panne", status_code=503))
+        self.assertEqual(limiter.limit, 4)
+
+    def test_latency_increase(self):
+        """La limite baisse quand la latence dépasse la référence"""
+        limiter = AdaptiveLimiter(initial=10, tolerance=2.0, latency_backoff=0.5)
+        for _ in range(3):
+            with limiter.slot():
+                time.sleep(0.001)
+        with limiter.slot():
+            time.sleep(0.05)
+        self.assertEqual(limiter.limit, 5)
+        snapshot = limiter.snapshot()
+        self.assertGreater(snapshot["latency"], 2 * snapshot["baseline_latency"])
+
+    def test_rejections_are_neutral(self):
+        """Les refus (4xx, validation) ne touchent pas la limite"""
+        limiter = AdaptiveLimiter(initial=4, min_limit=2)
+        _fail(limiter, ArzekaAPIError("inconnue", status_code=404))
+        _fail(limiter, ArzekaValidationError("montant"))
+        self.assertEqual(limiter.limit, 4)
+        for _ in range(5):
+            _fail(limiter, ArzekaConnectionError("coupure"))
+        self.assertEqual(limiter.limit, 2)  # Jamais sous min_limit
+
+    def test_invalid_limits(self):
+        """Bornes incohérentes refusées"""
+        with self.assertRaises(ValueError):
+            AdaptiveLimiter(min_limit=8, max_limit=4)
+
+
+class TestAsyncAdaptiveLimiter(unittest.IsolatedAsyncioTestCase):
+    """Tests de la version asynchrone"""
+
+    async def test_limit_and_cancellation(self):
+        """Les places passent aux appels en attente, même annulés"""
+        limiter = AsyncAdaptiveLimiter(initial=2, max_limit=2)
+        peak = 0
+
+        async def call():
+            nonlocal peak
+            async with limiter.slot():
+                peak = max(peak, limiter.in_flight)
+                await asyncio.sleep(0.005)
+
+        tasks = [asyncio.create_task(call()) for _ in range(10)]
+        await asyncio.sleep(0)
+        tasks[5].cancel()
+        tasks[6].cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.assertEqual(peak, 2)
+        self.assertEqual(limiter.in_flight, 0)
+        self.assertEqual(limiter.stats["calls"], 8)
+
+    async def test_client_reports_overload(self):
+        """Le client asynchrone signale les 503 à la limite"""
+
+        def handler(request):
+            if request.url.path.endswith("auth/getToken"):
+                return httpx.Response(
+                    200, json={"access_token": "tok", "expires_in": 3600}
+                )
+            return httpx.Response(503, json={"error": "surcharge"})
+
+        limiter = AsyncAdaptiveLimiter(initial=8)
+        client = AsyncArzekaPayment(limiter=limiter)
+        await client._client.aclose()
+        client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        try:
+            await client.authenticate("user", "pass")
+            with self.assertRaises(ArzekaAPIError):
+                await client.check_payment("O1")
+        finally:
+            await client.aclose()
+        self.assertEqual(limiter.limit, 4)
+        self.assertEqual(limiter.stats["overloads"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
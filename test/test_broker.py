@@ -0,0 +1,156 @@
+"""
+Tests pour le courtier de jetons (fasoarzeka.broker)
+"""
+
+import json
+import os
+import socket
+import stat
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+from urllib.parse import parse_qs
+
+import requests
+
+from fasoarzeka import ArzekaPayment
+from fasoarzeka.broker import BrokerTokenProvider, TokenBroker
+from fasoarzeka.exceptions import ArzekaAPIError
+
+
+class FakeGateway:
+    """Authentification simulée : mot de passe "secret", un jeton par appel"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.auth_calls = 0
+
+    def transmit(self, client, prepared, timeout, **kwargs):
+        response = requests.Response()
+        if not prepared.url.endswith("auth/getToken"):
+            response.status_code = 200
+            response._content = b'{"status": "SUCCESS"}'
+            return response
+        form = parse_qs(prepared.body.decode())
+        if form["password"] != ["secret"]:
+            response.status_code = 401
+            response._content = b'{"error": "invalid credentials"}'
+            return response
+        with self.lock:
+            self.auth_calls += 1
+            token = f"tok{self.auth_calls}"
+        response.status_code = 200
+        response._content = json.dumps(
+            {"access_token": token, "expires_in": 3600}
+        ).encode()
+        return response
+
+
+@unittest.skipUnless(hasattr(socket, "AF_UNIX"), "sockets Unix indisponibles")
+class TestTokenBroker(unittest.TestCase):
+    """Tests du courtier et de son client"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "broker.sock")
+        self.gateway = FakeGateway()
+        patcher = patch.object(
+            ArzekaPayment,
+            "_transmit",
+            autospec=True,
+            side_effect=self.gateway.transmit,
+        )
+        self.transmit = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.broker = TokenBroker(self.path).start()
+        self.provider = BrokerTokenProvider(self.path)
+
+    def tearDown(self):
+        self.broker.close()
+        self.directory.cleanup()
+
+    def test_token_shared_between_processes(self):
+        """Un seul appel d'authentification pour tous les clients"""
+        for _ in range(3):
+            client = ArzekaPayment(token_provider=self.provider)
+            auth = client.authenticate("user", "secret")
+            self.assertEqual(auth["access_token"], "tok1")
+            self.assertTrue(client.is_token_valid())
+            client.check_payment("O1")
+            self.assertEqual(
+                self.transmit.call_args.args[1].headers["Authorization"], "Bearer tok1"
+            )
+            client.close()
+        self.assertEqual(self.gateway.auth_calls, 1)
+        self.assertEqual(self.broker.stats["hits"], 2)
+        self.assertEqual(self.broker.stats["authentications"], 1)
+
+    def test_concurrent_stats(self):
+        """Les compteurs restent exacts avec des requêtes simultanées"""
+        base_url = ArzekaPayment().base_url
+
+        def request():
+            for _ in range(25):
+                self.provider(base_url, "user", "secret")
+
+        threads = [threading.Thread(target=request) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats = self.broker.stats
+        self.assertEqual(stats["requests"], 200)
+        self.assertEqual(stats["hits"] + stats["authentications"], 200)
+
+    def test_wrong_password_refused(self):
+        """Un jeton n'est remis que pour le bon mot de passe"""
+        self.provider(ArzekaPayment().base_url, "user", "secret")
+        with self.assertRaises(ArzekaAPIError) as error:
+            self.provider(ArzekaPayment().base_url, "user", "devine")
+        self.assertEqual(error.exception.status_code, 401)
+        self.assertEqual(self.broker.stats["errors"], 1)
+
+    def test_refresh_ahead(self):
+        """Les jetons proches de l'expiration sont renouvelés d'avance"""
+        base_url = ArzekaPayment().base_url
+        self.provider(base_url, "user", "secret")
+        (entry,) = self.broker._entries.values()
+        token, token_type, _ = entry.client._token_snapshot()
+        entry.client._set_token(token, token_type, time.time() + 200)
+        self.assertEqual(self.broker.refresh(), 1)
+        self.assertEqual(
+            self.provider(base_url, "user", "secret")["access_token"], "tok2"
+        )
+        self.assertEqual(self.broker.refresh(), 0)
+
+        self.broker.idle_timeout = 0
+        self.broker.refresh()  # Identifiants oubliés
+        self.assertEqual(self.broker._entries, {})
+
+    def test_fallback_without_broker(self):
+        """Sans courtier, le client s'authentifie lui-même"""
+        self.broker.close()
+        client = ArzekaPayment(token_provider=self.provider)
+        self.assertEqual(client.authenticate("user", "secret")["access_token"], "tok1")
+        self.assertEqual(self.gateway.auth_calls, 1)
+        client.close()
+
+    def test_socket(self):
+        """Socket privé, un seul courtier par chemin, socket périmé remplacé"""
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), 0o600)
+        with self.assertRaises(OSError):
+            TokenBroker(self.path).start()
+        self.broker.close()
+
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(self.path)  # Laissé par un courtier arrêté
+        stale.close()
+        with TokenBroker(self.path):
+            self.provider(ArzekaPayment().base_url, "user", "secret")
+        self.assertFalse(os.path.exists(self.path))
+
+
+if __name__ == "__main__":
+    unittest.main()
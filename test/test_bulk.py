@@ -0,0 +1,467 @@
+"""
+Tests pour l'exécution en masse (fasoarzeka.bulk) et la ligne de commande
+(fasoarzeka.cli)
+"""
+
+import asyncio
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from fasoarzeka.bulk import (
+    BulkCheckpoint,
+    RateLimiter,
+    RowWriter,
+    abulk_map,
+    bulk_map,
+    detect_format,
+    read_rows,
+)
+from fasoarzeka.cli import main
+from fasoarzeka.exceptions import ArzekaAPIError, ArzekaAuthenticationError
+
+
+class TestBulkMap(unittest.TestCase):
+    """Tests de bulk_map"""
+
+    def test_order_and_errors(self):
+        """Résultats dans l'ordre d'entrée, erreurs capturées par ligne"""
+
+        def work(item):
+            time.sleep(0.001 * (item % 3))
+            if item == 5:
+                raise ValueError("cinq")
+            return item * 2
+
+        outcomes = list(bulk_map(work, range(20), concurrency=4))
+        self.assertEqual([outcome.item for outcome in outcomes], list(range(20)))
+        self.assertFalse(outcomes[5].ok)
+        self.assertIsInstance(outcomes[5].error, ValueError)
+        self.assertEqual(outcomes[6].result, 12)
+
+    def test_bounded_window(self):
+        """L'entrée est lue au fur et à mesure, pas d'un seul coup"""
+        consumed = []
+
+        def items():
+            for index in range(100):
+                consumed.append(index)
+                yield index
+
+        results = bulk_map(lambda item: item, items(), concurrency=2, window=4)
+        next(results)
+        self.assertLessEqual(len(consumed), 5)
+        self.assertEqual(len(list(results)), 99)
+
+    def test_concurrency(self):
+        """Les appels se chevauchent"""
+        active, peak = [0], [0]
+        lock = threading.Lock()
+
+        def work(item):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.01)
+            with lock:
+                active[0] -= 1
+
+        list(bulk_map(work, range(16), concurrency=4))
+        self.assertGreater(peak[0], 1)
+        self.assertLessEqual(peak[0], 4)
+
+    def test_unordered(self):
+        """Résultats dans l'ordre d'achèvement, index conservé"""
+
+        def work(item):
+            time.sleep(0.05 if item == 0 else 0)
+            return item
+
+        outcomes = list(bulk_map(work, range(8), concurrency=4, ordered=False))
+        self.assertNotEqual(outcomes[0].item, 0)
+        self.assertEqual(sorted(outcome.index for outcome in outcomes), list(range(8)))
+
+    def test_rate_limiter(self):
+        """Le débit est limité"""
+        limiter = RateLimiter(100)
+        start = time.monotonic()
+        for _ in range(6):
+            limiter.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.045)
+        with self.assertRaises(ValueError):
+            RateLimiter(0)
+
+
+class TestAsyncBulkMap(unittest.IsolatedAsyncioTestCase):
+    """Tests de abulk_map"""
+
+    async def test_completion_order_and_errors(self):
+        """Résultats dans l'ordre d'achèvement, erreurs capturées"""
+
+        async def work(item):
+            await asyncio.sleep(0.02 if item == 0 else 0)
+            if item == 3:
+                raise ValueError("trois")
+            return item * 2
+
+        outcomes = [outcome async for outcome in abulk_map(work, range(6))]
+        self.assertNotEqual(outcomes[0].item, 0)
+        self.assertEqual(sorted(outcome.index for outcome in outcomes), list(range(6)))
+        errors = [outcome for outcome in outcomes if not outcome.ok]
+        self.assertEqual([outcome.item for outcome in errors], [3])
+
+        ordered = [o.item async for o in abulk_map(work, range(6), ordered=True)]
+        self.assertEqual(ordered, list(range(6)))
+
+    async def test_backpressure(self):
+        """Producteur asynchrone lu au rythme du consommateur"""
+        produced, active, peak = [], [0], [0]
+
+        async def producer():
+            for index in range(100):
+                produced.append(index)
+                yield index
+
+        async def work(item):
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+            await asyncio.sleep(0.001)
+            active[0] -= 1
+            return item
+
+        results = abulk_map(work, producer(), concurrency=4)
+        await results.__anext__()
+        self.assertLessEqual(len(produced), 5)
+        await asyncio.sleep(0.01)  # Consommateur lent : rien de plus n'est lu
+        self.assertLessEqual(len(produced), 5)
+        self.assertEqual(len([outcome async for outcome in results]), 99)
+        self.assertLessEqual(peak[0], 4)
+
+    async def test_close_cancels(self):
+        """Arrêt anticipé : les appels en cours sont annulés"""
+        cancelled = []
+
+        async def work(item):
+            try:
+                await asyncio.sleep(0 if item == 0 else 10)
+            except asyncio.CancelledError:
+                cancelled.append(item)
+                raise
+            return item
+
+        results = abulk_map(work, range(10), concurrency=3)
+        first = await results.__anext__()
+        await results.aclose()
+        self.assertEqual(first.item, 0)
+        self.assertEqual(sorted(cancelled), [1, 2])
+
+
+class TestCheckpoint(unittest.TestCase):
+    """Tests de la reprise des exécutions en masse"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "run.checkpoint")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_bitmap(self):
+        """Le préfixe terminé avance et le bitmap reste compact"""
+        checkpoint = BulkCheckpoint(self.path)
+        for index in (1, 2, 20):
+            checkpoint.mark_done(index)
+        self.assertEqual(checkpoint.offset, 0)
+        self.assertTrue(checkpoint.is_done(20))
+        self.assertFalse(checkpoint.is_done(3))
+        checkpoint.mark_done(0)
+        self.assertEqual(checkpoint.offset, 3)
+        for index in range(3, 20):
+            checkpoint.mark_done(index)
+        self.assertEqual(checkpoint.offset, 21)
+        self.assertLessEqual(len(checkpoint._bits), 1)
+        self.assertEqual(checkpoint.completed, 21)
+
+    def test_save_and_load(self):
+        """La progression survit au redémarrage"""
+        checkpoint = BulkCheckpoint(self.path, metadata={"command": "bulk-check"})
+        for index in (0, 1, 5):
+            checkpoint.mark_done(index)
+        checkpoint.save()
+        loaded = BulkCheckpoint(self.path)
+        self.assertTrue(loaded.resumed)
+        self.assertEqual(loaded.run_id, checkpoint.run_id)
+        self.assertEqual(loaded.metadata, {"command": "bulk-check"})
+        self.assertEqual(
+            [index for index in range(8) if not loaded.is_done(index)], [2, 3, 4, 6, 7]
+        )
+        loaded.remove()
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_resume(self):
+        """Une exécution interrompue reprend sans refaire le travail terminé"""
+        calls = []
+
+        def work(item):
+            calls.append(item)
+            if item == 7:
+                raise ValueError("échec")
+            return item
+
+        for outcome in bulk_map(
+            work, range(100), concurrency=4, checkpoint=BulkCheckpoint(self.path)
+        ):
+            if outcome.index == 40:
+                break  # Arrêt brutal du traitement
+
+        first_run = set(calls)
+        calls.clear()
+        checkpoint = BulkCheckpoint(self.path)
+        outcomes = list(bulk_map(work, range(100), checkpoint=checkpoint))
+        self.assertIn(7, calls)  # Les échecs sont réessayés
+        self.assertFalse(set(calls) & (first_run - {7} - set(range(40, 100))))
+        self.assertEqual(
+            {outcome.index for outcome in outcomes} | set(range(40)), set(range(100))
+        )
+        self.assertEqual(checkpoint.offset, 7)
+        self.assertEqual(checkpoint.completed, 99)
+
+
+class TestRows(unittest.TestCase):
+    """Tests de lecture et d'écriture des lignes"""
+
+    def test_detect_format(self):
+        """Format déduit de l'extension"""
+        self.assertEqual(detect_format("a.jsonl"), "jsonl")
+        self.assertEqual(detect_format("a.NDJSON"), "jsonl")
+        self.assertEqual(detect_format("a.csv", "jsonl"), "csv")
+        self.assertEqual(detect_format("-", "jsonl"), "jsonl")
+
+    def test_csv_round_trip(self):
+        """Aller-retour CSV, l'en-tête vient de la première ligne"""
+        output = io.StringIO()
+        writer = RowWriter(output, "csv")
+        writer.write({"mobile": "22670000000", "ok": True})
+        writer.write({"mobile": "22671111111", "ok": False, "extra": "ignoré"})
+        rows = list(read_rows(io.StringIO(output.getvalue()), "csv"))
+        self.assertEqual(rows[1], {"mobile": "22671111111", "ok": "False"})
+
+    def test_jsonl_round_trip(self):
+        """Aller-retour JSON Lines, lignes vides ignorées"""
+        output = io.StringIO()
+        writer = RowWriter(output, "jsonl")
+        writer.write({"amount": 1000, "info": {"mobile": "226"}})
+        rows = list(read_rows(io.StringIO(output.getvalue() + "\n"), "jsonl"))
+        self.assertEqual(rows, [{"amount": 1000, "info": {"mobile": "226"}}])
+
+
+class FakeClient:
+    """Client simulé pour la ligne de commande"""
+
+    instances = []
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.payments = []
+        self.authenticated = None
+        FakeClient.instances.append(self)
+
+    def authenticate(self, username, password):
+        if password == "mauvais":
+            raise ArzekaAuthenticationError("identifiants invalides")
+        self.authenticated = (username, password)
+
+    def send_sms(self, mobile, message):
+        if mobile == "000":
+            raise ArzekaAPIError("numéro refusé", status_code=400)
+        return {"status": "SENT", "smsId": f"sms-{mobile}"}
+
+    def check_payment(self, mapped_order_id, transaction_id=None):
+        return {"status": "SUCCESS", "transId": f"t-{mapped_order_id}"}
+
+    def initiate_payment(self, **kwargs):
+        self.payments.append(kwargs)
+        order_id = kwargs["mapped_order_id"] or "generated"
+        return {"url": f"https://pay/{order_id}"}, {"mappedOrderId": order_id}
+
+    def close(self):
+        pass
+
+
+class TestCli(unittest.TestCase):
+    """Tests de la commande fasoarzeka"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        FakeClient.instances = []
+        patcher = patch("fasoarzeka.cli.ArzekaPayment", FakeClient)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        environment = patch.dict(
+            os.environ,
+            {
+                "ARZEKA_USERNAME": "user",
+                "ARZEKA_PASSWORD": "secret",
+                "ARZEKA_HASH_SECRET": "hash",
+            },
+        )
+        environment.start()
+        self.addCleanup(environment.stop)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def path(self, name, content=None):
+        path = os.path.join(self.directory.name, name)
+        if content is not None:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(content)
+        return path
+
+    def run_main(self, *argv):
+        with patch("sys.stderr", io.StringIO()):
+            return main(list(argv))
+
+    def test_bulk_sms(self):
+        """Envoi de SMS, les échecs sont signalés ligne par ligne"""
+        source = self.path("in.csv", "mobile,message\n22670000000,\n000,Salut\n")
+        output = self.path("out.csv")
+        code = self.run_main(
+            "bulk-sms", "-i", source, "-o", output, "--message", "Merci", "-c", "2"
+        )
+        self.assertEqual(code, 1)
+        with open(output, encoding="utf-8") as f:
+            rows = list(read_rows(f))
+        self.assertEqual(rows[0]["ok"], "True")
+        self.assertEqual(rows[0]["sms_id"], "sms-22670000000")
+        self.assertEqual(rows[1]["ok"], "False")
+        self.assertIn("numéro refusé", rows[1]["error"])
+        self.assertEqual(FakeClient.instances[0].authenticated, ("user", "secret"))
+
+    def test_bulk_check_jsonl(self):
+        """Vérification en JSON Lines, sortie dans le format de l'entrée"""
+        source = self.path("in.jsonl", '{"mapped_order_id": "O1"}\n')
+        output = self.path("out.jsonl")
+        self.assertEqual(self.run_main("bulk-check", "-i", source, "-o", output), 0)
+        with open(output, encoding="utf-8") as f:
+            row = json.loads(f.readline())
+        self.assertEqual(row["transaction_id"], "t-O1")
+
+    def test_adaptive(self):
+        """--adaptive : la limite finale figure dans le résumé"""
+        source = self.path("in.csv", "mapped_order_id\nO1\nO2\n")
+        output = self.path("out.csv")
+        with patch("sys.stderr", io.StringIO()) as stderr:
+            code = main(["bulk-check", "-i", source, "-o", output, "--adaptive"])
+        self.assertEqual(code, 0)
+        self.assertIn("2 row(s)", stderr.getvalue())
+        self.assertRegex(stderr.getvalue(), r"concurrency [1-4]\b")
+
+    def test_token_broker(self):
+        """--token-broker : le jeton est demandé au courtier"""
+        source = self.path("in.csv", "mapped_order_id\nO1\n")
+        output = self.path("out.csv")
+        socket_path = self.path("broker.sock")
+        code = self.run_main(
+            "bulk-check", "-i", source, "-o", output, "--token-broker", socket_path
+        )
+        self.assertEqual(code, 0)
+        provider = FakeClient.instances[0].kwargs["token_provider"]
+        self.assertEqual(provider.socket_path, socket_path)
+
+    def test_retry_budget(self):
+        """--retry-budget : le client reçoit un budget au ratio demandé"""
+        source = self.path("in.csv", "mapped_order_id\nO1\n")
+        output = self.path("out.csv")
+        code = self.run_main(
+            "bulk-check", "-i", source, "-o", output, "--retry-budget", "0.1"
+        )
+        self.assertEqual(code, 0)
+        self.assertEqual(FakeClient.instances[0].kwargs["retry_budget"].ratio, 0.1)
+
+        self.assertEqual(self.run_main("bulk-check", "-i", source, "-o", output), 0)
+        self.assertIsNone(FakeClient.instances[1].kwargs["retry_budget"])
+
+    def test_bulk_pay(self):
+        """Initiation de paiements depuis un CSV"""
+        source = self.path(
+            "in.csv",
+            "amount,mapped_order_id,firstname,mobile,generateReceipt\n"
+            "1000,O1,Awa,22670000000,oui\n",
+        )
+        output = self.path("out.csv")
+        code = self.run_main(
+            "bulk-pay", "-i", source, "-o", output, "--merchant-id", "M1",
+            "--callback-url", "https://cb", "--return-url", "https://back",
+        )  # fmt: skip
+        self.assertEqual(code, 0)
+        payment = FakeClient.instances[0].payments[0]
+        self.assertEqual(payment["amount"], 1000)
+        self.assertEqual(payment["merchant_id"], "M1")
+        self.assertEqual(payment["hash_secret"], "hash")
+        self.assertEqual(
+            payment["additional_info"],
+            {"firstname": "Awa", "mobile": "22670000000", "generateReceipt": True},
+        )
+
+    def test_checkpoint_resume(self):
+        """Reprise avec --checkpoint : sortie complétée, lignes faites sautées"""
+        source = self.path("in.csv", "mobile\n" + "".join(f"{i}\n" for i in range(10)))
+        output = self.path("out.csv")
+        checkpoint = self.path("run.checkpoint")
+        state = BulkCheckpoint(checkpoint, metadata={"command": "bulk-sms"})
+        for index in range(6):
+            state.mark_done(index)
+        state.save()
+        with open(output, "w", encoding="utf-8") as f:
+            f.write("mobile,ok,error,status,sms_id\n")
+
+        argv = ["bulk-sms", "-i", source, "-o", output, "--message", "m"]
+        self.assertEqual(self.run_main(*argv, "--checkpoint", checkpoint), 0)
+        with open(output, encoding="utf-8") as f:
+            rows = list(read_rows(f))
+        self.assertEqual([row["mobile"] for row in rows], ["6", "7", "8", "9"])
+        self.assertEqual(BulkCheckpoint(checkpoint).offset, 10)
+
+        with self.assertRaises(SystemExit):
+            self.run_main("bulk-check", "-i", source, "-o", output,
+                          "--checkpoint", checkpoint)  # fmt: skip
+
+    def test_reconcile(self):
+        """Rapport de rapprochement : code 1 s'il y a des écarts"""
+        source = self.path("orders.csv", "mapped_order_id,fulfilled\nO1,1\nO2,0\n")
+        output = self.path("report.csv")
+        ledger = self.path("ledger.db")
+        argv = ["reconcile", "-i", source, "-o", output, "--ledger", ledger]
+        self.assertEqual(self.run_main(*argv, "--incremental"), 1)
+        with open(output, encoding="utf-8") as f:
+            rows = list(read_rows(f))
+        self.assertEqual(
+            [(row["mapped_order_id"], row["category"]) for row in rows],
+            [("O2", "paid_unfulfilled")],
+        )
+        with self.assertRaises(SystemExit):
+            self.run_main("reconcile", "-i", source, "--incremental")
+
+    def test_missing_credentials(self):
+        """Sans identifiants, erreur d'utilisation (code 2)"""
+        with patch.dict(os.environ, {"ARZEKA_PASSWORD": ""}):
+            with self.assertRaises(SystemExit) as context:
+                self.run_main("bulk-check")
+        self.assertEqual(context.exception.code, 2)
+
+    def test_authentication_failure(self):
+        """Échec d'authentification : code 1"""
+        source = self.path("in.csv", "mapped_order_id\nO1\n")
+        with patch.dict(os.environ, {"ARZEKA_PASSWORD": "mauvais"}):
+            code = self.run_main("bulk-check", "-i", source, "-o", self.path("o.csv"))
+        self.assertEqual(code, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+"""
+Tests pour les codecs JSON
+"""
+
+import json
+import unittest
+
+from fasoarzeka import ArzekaPayment, protocol
+from fasoarzeka.codec import available_codecs, get_codec
+
+SAMPLES = [
+    {
+        "firstname": "Aïcha",
+        "lastname": "Kaboré",
+        "mobile": "70123456",
+        "generateReceipt": False,
+        "paymentDescription": "",
+        "address": None,
+    },
+    {"note": 'Guillemets " et \\ barre', "ctrl": "\x00\x1f\x7f", "emoji": "🎉"},
+    {"nested": {"items": [1, -2, 2**64 - 1, True, None]}},
+    {"amount": 1500.5, "ratio": 1e16},
+    {1: "clé entière"},
+    {"surrogate": "\ud800"},
+]
+
+
+class TestCodecs(unittest.TestCase):
+    """Tests des codecs JSON"""
+
+    def test_available(self):
+        """La bibliothèque standard est toujours disponible"""
+        self.assertIn("json", available_codecs())
+        self.assertEqual(get_codec("auto").name, available_codecs()[0])
+
+    def test_unknown_codec(self):
+        """Codec inconnu"""
+        with self.assertRaises(ValueError):
+            get_codec("simdjson")
+
+    def test_dumps_identical(self):
+        """La sortie est identique à json.dumps pour tous les codecs"""
+        for name in available_codecs():
+            codec = get_codec(name)
+            for sample in SAMPLES:
+                with self.subTest(codec=name, sample=sample):
+                    self.assertEqual(
+                        codec.dumps(sample), json.dumps(sample, separators=(",", ":"))
+                    )
+
+    def test_loads(self):
+        """Décodage, y compris des valeurs refusées par les bibliothèques rapides"""
+        for name in available_codecs():
+            codec = get_codec(name)
+            with self.subTest(codec=name):
+                self.assertEqual(codec.loads(b'{"a": [1, "\\u00e9"]}'), {"a": [1, "é"]})
+                self.assertEqual(codec.loads(b'{"big": 1e400}')["big"], float("inf"))
+                with self.assertRaises(ValueError):
+                    codec.loads(b"not json")
+
+    def test_signature_unchanged(self):
+        """La signature ne dépend pas du codec"""
+        payment = {
+            "amount": 1000,
+            "merchant_id": "M1",
+            "link_for_update_status": "https://example.com/webhook",
+            "link_back_to_calling_website": "https://example.com/return",
+            "hash_secret": "secret",
+            "mapped_order_id": "ORDER1",
+        }
+        signatures = {
+            protocol.build_payment_data(
+                additional_info=dict(SAMPLES[0]), codec=get_codec(name), **payment
+            )["hashString"]
+            for name in available_codecs()
+        }
+        self.assertEqual(len(signatures), 1)
+
+    def test_client_setting(self):
+        """Choix du codec par le client"""
+        client = ArzekaPayment(json_codec="json")
+        self.assertEqual(client.json_codec.name, "json")
+        client.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+"""
+Tests pour le préchauffage et la gestion des connexions keep-alive
+"""
+
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+import requests
+
+from fasoarzeka import ArzekaPayment
+
+
+def _response(status_code=200, content=b"{}"):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = content
+    return response
+
+
+class TestWarmup(unittest.TestCase):
+    """Tests de ArzekaPayment.warmup"""
+
+    def setUp(self):
+        self.client = ArzekaPayment(pool_maxsize=4)
+
+    def tearDown(self):
+        self.client.close()
+
+    def test_warmup_opens_concurrent_connections(self):
+        """Les connexions sont ouvertes en parallèle"""
+        barrier = threading.Barrier(3, timeout=5)
+
+        def head(url, timeout):
+            barrier.wait()
+            return _response()
+
+        with patch.object(self.client._session, "head", side_effect=head) as mock_head:
+            opened = self.client.warmup(3)
+
+        self.assertEqual(opened, 3)
+        self.assertEqual(mock_head.call_count, 3)
+
+    def test_warmup_capped_to_pool_size(self):
+        """Le nombre de connexions est limité à la taille du pool"""
+        with patch.object(self.client._session, "head", return_value=_response()):
+            self.assertEqual(self.client.warmup(10), 4)
+
+    def test_warmup_failures_are_not_fatal(self):
+        """Une connexion qui échoue n'interrompt pas le préchauffage"""
+        side_effect = [requests.exceptions.ConnectionError("boom"), _response()]
+        with patch.object(self.client._session, "head", side_effect=side_effect):
+            self.assertEqual(self.client.warmup(2), 1)
+
+    def test_warmup_with_authentication(self):
+        """Le préchauffage peut inclure l'authentification"""
+        token = b'{"access_token": "tok", "expires_in": 3600}'
+        with patch.object(
+            self.client._session, "head", return_value=_response()
+        ), patch.object(
+            self.client._session, "request", return_value=_response(content=token)
+        ) as mock_request:
+            opened = self.client.warmup(2, username="user", password="pass")
+
+        self.assertEqual(opened, 2)
+        mock_request.assert_called_once()
+        self.assertTrue(self.client.is_token_valid())
+
+
+class TestKeepAlive(unittest.TestCase):
+    """Tests de la politique keep-alive"""
+
+    def test_idle_connections_are_pruned(self):
+        """Le pool est vidé après une inactivité prolongée"""
+        client = ArzekaPayment(keepalive_idle=10)
+        client._token = "tok"
+        client._expires_at = time.time() + 3600
+        adapter = client._session.get_adapter("https://")
+
+        with patch.object(
+            client._session, "request", return_value=_response()
+        ), patch.object(adapter.poolmanager, "clear") as mock_clear:
+            client.check_payment("ORDER1")
+            mock_clear.assert_not_called()
+
+            client._last_used -= 60
+            client.check_payment("ORDER1")
+            mock_clear.assert_called_once()
+        client.close()
+
+    def test_pruning_disabled(self):
+        """keepalive_idle=None désactive le nettoyage"""
+        client = ArzekaPayment(keepalive_idle=None)
+        client._token = "tok"
+        client._expires_at = time.time() + 3600
+        client._last_used -= 3600
+        adapter = client._session.get_adapter("https://")
+
+        with patch.object(
+            client._session, "request", return_value=_response()
+        ), patch.object(adapter.poolmanager, "clear") as mock_clear:
+            client.check_payment("ORDER1")
+            mock_clear.assert_not_called()
+        client.close()
+
+    def test_pool_maxsize(self):
+        """La taille du pool est configurable"""
+        client = ArzekaPayment(pool_maxsize=32)
+        adapter = client._session.get_adapter("https://")
+        self.assertEqual(adapter._pool_maxsize, 32)
+        client.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
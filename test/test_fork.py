@@ -0,0 +1,83 @@
+"""
+Tests de la reconstruction des connexions après un fork
+"""
+
+import json
+import os
+import time
+import unittest
+from unittest.mock import patch
+
+from fasoarzeka import ArzekaPayment, close_shared_client
+from fasoarzeka import arzeka
+
+
+class TestForkSafety(unittest.TestCase):
+    """Tests du comportement après fork"""
+
+    def setUp(self):
+        self.client = ArzekaPayment()
+        self.client._token = "tok"
+        self.client._token_type = "Bearer"
+        self.client._expires_at = time.time() + 3600
+
+    def tearDown(self):
+        self.client.close()
+        close_shared_client()
+
+    def test_reset_keeps_token(self):
+        """La reconstruction garde le token mais change de session"""
+        session = self.client._session
+        lock = self.client._pool_lock
+        self.client._reset_after_fork()
+        self.assertIsNot(self.client._session, session)
+        self.assertIsNot(self.client._pool_lock, lock)
+        self.assertTrue(self.client.is_token_valid())
+        session.close()
+
+    def test_pid_check(self):
+        """Un changement de PID reconstruit la session avant la requête"""
+        session = self.client._session
+        self.client._pid = -1
+        with patch.object(arzeka.requests.Session, "request") as mock_request:
+            mock_request.return_value.status_code = 200
+            mock_request.return_value.content = b"{}"
+            self.client.check_payment("ORDER1")
+        self.assertIsNot(self.client._session, session)
+        self.assertEqual(self.client._pid, os.getpid())
+        session.close()
+
+    @unittest.skipUnless(hasattr(os, "fork"), "os.fork non disponible")
+    def test_fork(self):
+        """Le processus enfant obtient ses propres sessions"""
+        shared = arzeka._get_shared_client()
+        parent_ids = [id(self.client._session), id(shared._session)]
+
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:  # pragma: no cover - runs in the child
+            try:
+                os.close(read_fd)
+                result = {
+                    "sessions": [id(self.client._session), id(shared._session)],
+                    "pid": self.client._pid,
+                    "token": self.client._token,
+                }
+                os.write(write_fd, json.dumps(result).encode())
+            finally:
+                os._exit(0)
+
+        os.close(write_fd)
+        with os.fdopen(read_fd) as pipe:
+            result = json.loads(pipe.read())
+        os.waitpid(pid, 0)
+
+        self.assertEqual(result["pid"], pid)
+        self.assertEqual(result["token"], "tok")
+        for child_id, parent_id in zip(result["sessions"], parent_ids):
+            self.assertNotEqual(child_id, parent_id)
+        self.assertEqual(self.client._pid, os.getpid())
+
+
+if __name__ == "__main__":
+    unittest.main()
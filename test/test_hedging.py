@@ -0,0 +1,189 @@
+"""
+Tests pour les requêtes doublées (fasoarzeka.hedging)
+"""
+
+import asyncio
+import itertools
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+import httpx
+import requests
+
+from fasoarzeka import ArzekaPayment, AsyncArzekaPayment, HedgePolicy
+from fasoarzeka.exceptions import ArzekaConnectionError
+from fasoarzeka.hedging import MIN_SAMPLES
+
+
+def warmed(budget=1.0, latency=0.02):
+    """Politique ayant déjà mesuré MIN_SAMPLES latences"""
+    policy = HedgePolicy(budget=budget)
+    for _ in range(MIN_SAMPLES):
+        policy.record(latency)
+    return policy
+
+
+def slow_first(result="fast", delay=0.5):
+    """Appel dont seule la première exécution est lente"""
+    counter = itertools.count()
+
+    def call():
+        if next(counter) == 0:
+            time.sleep(delay)
+            return "slow"
+        return result
+
+    return call
+
+
+class TestHedgePolicy(unittest.TestCase):
+    """Tests du délai, du budget et de l'exécution doublée"""
+
+    def test_delay_percentile(self):
+        """Le délai suit le centile des latences récentes"""
+        policy = HedgePolicy(percentile=90)
+        for ms in range(1, MIN_SAMPLES):
+            policy.record(ms / 1000)
+        self.assertIsNone(policy.delay)  # Pas assez de mesures
+        for ms in range(MIN_SAMPLES, 101):
+            policy.record(ms / 1000)
+        self.assertAlmostEqual(policy.delay, 0.091)
+
+        fast = HedgePolicy(min_delay=0.01)
+        for _ in range(MIN_SAMPLES):
+            fast.record(0.0001)
+        self.assertEqual(fast.delay, 0.01)
+
+    def test_invalid_policy(self):
+        """Seules les consultations idempotentes peuvent être doublées"""
+        with self.assertRaises(ValueError):
+            HedgePolicy(operations=("check_payment", "initiate_payment"))
+        with self.assertRaises(ValueError):
+            HedgePolicy(percentile=100)
+        self.assertFalse(HedgePolicy().applies("send_sms"))
+
+    def test_hedge_wins(self):
+        """Une consultation lente est doublée et la plus rapide l'emporte"""
+        policy = warmed()
+        start = time.monotonic()
+        self.assertEqual(policy.run(slow_first()), "fast")
+        self.assertLess(time.monotonic() - start, 0.3)
+        snapshot = policy.snapshot()
+        self.assertEqual(snapshot["hedged"], 1)
+        self.assertEqual(snapshot["hedge_wins"], 1)
+        policy.close()
+
+    def test_fast_lookup_not_hedged(self):
+        """Une réponse arrivée avant le délai n'est pas doublée"""
+        policy = warmed()
+        calls = []
+        self.assertEqual(policy.run(lambda: calls.append(1) or "ok"), "ok")
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(policy.stats["hedged"], 0)
+        policy.close()
+
+    def test_budget(self):
+        """Sans budget, la requête lente est attendue sans copie"""
+        policy = warmed(budget=0.0)
+        self.assertEqual(policy.run(slow_first(delay=0.1)), "slow")
+        self.assertEqual(policy.stats["over_budget"], 1)
+        self.assertEqual(policy.stats["hedged"], 0)
+        policy.close()
+
+    def test_saturated_pool(self):
+        """Sans thread libre, la consultation part du thread appelant"""
+        policy = HedgePolicy(budget=1.0, max_workers=1)
+        for _ in range(MIN_SAMPLES):
+            policy.record(0.02)
+        release = threading.Event()
+        busy = threading.Thread(target=policy.run, args=(release.wait,))
+        busy.start()
+        time.sleep(0.05)  # La consultation lente occupe le seul thread
+        caller = []
+        policy.run(lambda: caller.append(threading.current_thread()))
+        self.assertEqual(caller, [threading.current_thread()])
+        release.set()
+        busy.join()
+        self.assertGreaterEqual(policy.stats["saturated"], 1)
+        policy.close()
+
+    def test_all_copies_fail(self):
+        """Si les deux copies échouent, l'erreur de la première est levée"""
+        policy = warmed()
+        counter = itertools.count()
+
+        def failing():
+            attempt = next(counter)
+            time.sleep(0.1 if attempt == 0 else 0.01)
+            raise ArzekaConnectionError(f"attempt {attempt}")
+
+        with self.assertRaisesRegex(ArzekaConnectionError, "attempt 0"):
+            policy.run(failing)
+        policy.close()
+
+
+class TestClientHedging(unittest.TestCase):
+    """Tests du client synchrone avec hedging"""
+
+    def test_check_payment_hedged(self):
+        """check_payment est doublé, initiate_payment jamais"""
+        lock = threading.Lock()
+        counter = itertools.count()
+
+        def transmit(client, prepared, timeout, **kwargs):
+            with lock:
+                attempt = next(counter)
+            if attempt == 0:
+                time.sleep(0.5)
+            response = requests.Response()
+            response.status_code = 200
+            response._content = b'{"status": "SUCCESS", "attempt": %d}' % attempt
+            return response
+
+        policy = warmed()
+        client = ArzekaPayment(hedging=policy)
+        client._set_token("tok", "Bearer", time.time() + 3600)
+        with patch.object(
+            ArzekaPayment, "_transmit", autospec=True, side_effect=transmit
+        ) as mock:
+            self.assertEqual(client.check_payment("O1")["attempt"], 1)
+            self.assertEqual(mock.call_count, 2)
+        self.assertEqual(policy.stats["hedge_wins"], 1)
+        client.close()
+        policy.close()
+
+
+class TestAsyncHedging(unittest.IsolatedAsyncioTestCase):
+    """Tests du client asynchrone avec hedging"""
+
+    async def test_slow_copy_cancelled(self):
+        """La copie la plus lente est annulée"""
+        cancelled = asyncio.Event()
+        counter = itertools.count()
+
+        async def handler(request):
+            if next(counter) == 0:
+                try:
+                    await asyncio.sleep(5)
+                except asyncio.CancelledError:
+                    cancelled.set()
+                    raise
+            return httpx.Response(200, json={"status": "SUCCESS"})
+
+        policy = warmed()
+        client = AsyncArzekaPayment(hedging=policy)
+        await client._client.aclose()
+        client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        client._token, client._expires_at = "tok", time.time() + 3600
+
+        result = await asyncio.wait_for(client.check_payment("O1"), 1)
+        self.assertEqual(result["status"], "SUCCESS")
+        await asyncio.wait_for(cancelled.wait(), 1)
+        self.assertEqual(policy.stats["hedge_wins"], 1)
+        await client.aclose()
+
+
+if __name__ == "__main__":
+    unittest.main()
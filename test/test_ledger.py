@@ -0,0 +1,175 @@
+"""
+Tests pour le registre local des paiements (fasoarzeka.ledger)
+"""
+
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+import requests
+
+from fasoarzeka import ArzekaPayment
+from fasoarzeka.ledger import STATUS_INITIATED, PaymentLedger
+
+PAYMENT_DATA = {"mappedOrderId": "ORDER1", "merchantId": "M1", "amount": 1000}
+
+
+def _response(content, status_code=200):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = content
+    return response
+
+
+class TestPaymentLedger(unittest.TestCase):
+    """Tests du registre"""
+
+    def setUp(self):
+        self.ledger = PaymentLedger()
+
+    def tearDown(self):
+        self.ledger.close()
+
+    def test_initiation_and_status(self):
+        """Initiation puis changements de statut avec historique"""
+        self.ledger.record_initiation(PAYMENT_DATA, {"url": "https://pay/x"})
+        payment = self.ledger.get_payment("ORDER1")
+        self.assertEqual(payment["status"], STATUS_INITIATED)
+        self.assertEqual(payment["merchant_id"], "M1")
+        self.assertEqual(payment["payment_url"], "https://pay/x")
+
+        self.ledger.record_status("ORDER1", {"status": "PENDING"})
+        self.ledger.record_status("ORDER1", {"status": "PENDING"})
+        self.ledger.record_status("ORDER1", {"status": "SUCCESS", "transId": "T1"})
+        payment = self.ledger.get_payment("ORDER1")
+        self.assertEqual(payment["status"], "SUCCESS")
+        self.assertEqual(payment["transaction_id"], "T1")
+        self.assertEqual(payment["final"], 1)
+        self.assertEqual(
+            [status for status, _ in self.ledger.history("ORDER1")],
+            [STATUS_INITIATED, "PENDING", "SUCCESS"],
+        )
+
+    def test_status_before_initiation(self):
+        """Un statut reçu avant l'initiation n'est pas écrasé"""
+        self.ledger.record_status("ORDER1", {"status": "SUCCESS"})
+        self.ledger.record_initiation(PAYMENT_DATA, {})
+        payment = self.ledger.get_payment("ORDER1")
+        self.assertEqual(payment["status"], "SUCCESS")
+        self.assertEqual(payment["amount"], 1000)
+
+    def test_pending(self):
+        """Paiements en attente par ancienneté et par marchand"""
+        with patch("fasoarzeka.ledger.time.time", return_value=time.time() - 900):
+            self.ledger.record_initiation(PAYMENT_DATA, {})
+            self.ledger.record_initiation(
+                dict(PAYMENT_DATA, mappedOrderId="ORDER2", merchantId="M2"), {}
+            )
+            self.ledger.record_initiation(
+                dict(PAYMENT_DATA, mappedOrderId="ORDER3"), {}
+            )
+        self.ledger.record_initiation(dict(PAYMENT_DATA, mappedOrderId="ORDER4"), {})
+        self.ledger.record_status("ORDER3", {"status": "FAILED"})
+
+        old = [p["mapped_order_id"] for p in self.ledger.pending(older_than=600)]
+        self.assertEqual(old, ["ORDER1", "ORDER2"])
+        self.assertEqual(len(self.ledger.pending()), 3)
+        self.assertEqual(
+            [p["mapped_order_id"] for p in self.ledger.pending(600, merchant_id="M2")],
+            ["ORDER2"],
+        )
+        self.assertEqual(len(self.ledger.payments(status="FAILED")), 1)
+
+    def test_pending_uses_index(self):
+        """La requête des paiements en attente utilise l'index partiel"""
+        plan = self.ledger._connection.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM payments "
+            "WHERE final = 0 AND created_at <= ? ORDER BY created_at",
+            (0,),
+        ).fetchall()
+        self.assertIn("payments_open", " ".join(row[-1] for row in plan))
+
+    def test_sms(self):
+        """Référence des SMS et mise à jour du statut"""
+        self.ledger.record_sms({"referenceId": "R1", "status": "SENT"}, mobile="226")
+        self.ledger.record_sms({"status": "DELIVERED"}, sms_id="R1")
+        sms = self.ledger.get_sms("R1")
+        self.assertEqual(sms["status"], "DELIVERED")
+        self.assertEqual(sms["mobile"], "226")
+
+    def test_batching(self):
+        """Mode par lots : écritures différées, visibles après flush"""
+        ledger = PaymentLedger(batch_size=100, flush_interval=60)
+        try:
+            ledger.record_initiation(PAYMENT_DATA, {})
+            self.assertEqual(ledger._pending[0][1][0], "ORDER1")
+            # Les requêtes écrivent d'abord les enregistrements en attente
+            self.assertIsNotNone(ledger.get_payment("ORDER1"))
+            self.assertEqual(ledger._pending, [])
+        finally:
+            ledger.close()
+
+    def test_record_after_close(self):
+        """Après fermeture, un enregistrement est signalé et abandonné"""
+        for batch_size in (None, 10):
+            with self.subTest(batch_size=batch_size):
+                ledger = PaymentLedger(batch_size=batch_size)
+                ledger.close()
+                with self.assertLogs("fasoarzeka.ledger", "WARNING") as logs:
+                    ledger.record_initiation(PAYMENT_DATA, {})
+                self.assertIn("dropped", logs.output[0])
+                self.assertEqual(ledger._pending, [])
+
+    def test_file_persistence(self):
+        """Les enregistrements en lot sont écrits à la fermeture"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "ledger.db")
+            with PaymentLedger(path, batch_size=10) as ledger:
+                ledger.record_initiation(PAYMENT_DATA, {})
+            with PaymentLedger(path) as ledger:
+                self.assertIsNotNone(ledger.get_payment("ORDER1"))
+
+
+class TestClientLedger(unittest.TestCase):
+    """Enregistrement automatique par le client"""
+
+    def test_client_records(self):
+        """initiate_payment, check_payment et send_sms sont enregistrés"""
+        ledger = PaymentLedger()
+        client = ArzekaPayment(ledger=ledger)
+        responses = [
+            _response(b'{"access_token": "jeton", "expires_in": 3600}'),
+            _response(b'{"url": "https://pay/x"}'),
+            _response(b'{"status": "SUCCESS", "transId": "T1"}'),
+            _response(b'{"status": "SENT", "referenceid": "R1"}'),
+        ]
+        with patch.object(
+            client._session, "request", side_effect=lambda *a, **k: responses.pop(0)
+        ):
+            client.authenticate("user", "password")
+            client.initiate_payment(
+                amount=1000,
+                merchant_id="M1",
+                link_for_update_status="https://example.com/webhook",
+                link_back_to_calling_website="https://example.com/return",
+                additional_info={
+                    "firstname": "Awa",
+                    "lastname": "Ouedraogo",
+                    "mobile": "70123456",
+                },
+                hash_secret="secret",
+                mapped_order_id="ORDER1",
+            )
+            client.check_payment("ORDER1")
+            client.send_sms("22670123456", "Bonjour")
+
+        self.assertEqual(ledger.get_payment("ORDER1")["status"], "SUCCESS")
+        self.assertEqual(ledger.get_sms("R1")["mobile"], "22670123456")
+        client.close()
+        ledger.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,139 @@
+"""
+Tests pour le pool multi-marchands (fasoarzeka.merchants)
+"""
+
+import json
+import threading
+import time
+import unittest
+from unittest.mock import patch
+from urllib.parse import parse_qs
+
+import requests
+
+from fasoarzeka.merchants import MerchantPool
+
+
+def _response(content):
+    response = requests.Response()
+    response.status_code = 200
+    response._content = content
+    return response
+
+
+INFO = {"firstname": "Awa", "lastname": "Ouédraogo", "mobile": "22670000000"}
+
+
+class FakeServer:
+    """Serveur simulé : un jeton par utilisateur, enregistre les appels"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.auth_calls = []
+        self.calls = []
+
+    def request(self, method, url, headers=None, data=None, **kwargs):
+        if url.endswith("auth/getToken"):
+            username = parse_qs(data.decode())["username"][0]
+            with self.lock:
+                self.auth_calls.append(username)
+                token = f"tok-{username}-{len(self.auth_calls)}"
+            return _response(
+                json.dumps({"access_token": token, "expires_in": 3600}).encode()
+            )
+        with self.lock:
+            self.calls.append((url, headers["Authorization"], data))
+        return _response(b'{"status": "SUCCESS", "url": "https://pay"}')
+
+
+class TestMerchantPool(unittest.TestCase):
+    """Tests du routage par marchand"""
+
+    def setUp(self):
+        self.pool = MerchantPool(idle_timeout=60)
+        self.pool.add_merchant("a", "user-a", "pass-a", "secret-a", merchant_id="MA")
+        self.pool.add_merchant("b", "user-b", "pass-b", "secret-b", merchant_id="MB")
+        self.server = FakeServer()
+        patcher = patch.object(
+            self.pool._transport._session, "request", side_effect=self.server.request
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.pool.close()
+
+    def test_routing_and_shared_session(self):
+        """Chaque marchand a son jeton, toutes les requêtes partagent la session"""
+        self.pool.check_payment("a", "O1")
+        self.pool.check_payment("b", "O2")
+        self.pool.check_payment("a", "O3")
+        self.assertEqual(self.server.auth_calls, ["user-a", "user-b"])
+        tokens = [authorization for _, authorization, _ in self.server.calls]
+        self.assertEqual(
+            tokens,
+            ["Bearer tok-user-a-1", "Bearer tok-user-b-2", "Bearer tok-user-a-1"],
+        )
+        self.assertIs(self.pool.client("a")._session, self.pool._transport._session)
+        self.assertIs(self.pool.client("a")._session, self.pool.client("b")._session)
+        self.assertEqual(len(self.pool), 2)
+        self.assertIn("a", self.pool)
+
+    def test_initiate_payment_signed_per_merchant(self):
+        """Le paiement porte le merchant_id et la signature du marchand"""
+        for key in ("a", "b"):
+            self.pool.initiate_payment(
+                key, 1000, "https://cb", "https://back", INFO, mapped_order_id="O1"
+            )
+        first, second = (parse_qs(data.decode()) for _, _, data in self.server.calls)
+        self.assertEqual(first["merchantId"], ["MA"])
+        self.assertEqual(second["merchantId"], ["MB"])
+        self.assertNotEqual(first["hashString"], second["hashString"])
+
+    def test_independent_refresh(self):
+        """Un jeton expiré n'entraîne que la réauthentification de son marchand"""
+        self.pool.check_payment("a", "O1")
+        self.pool.check_payment("b", "O2")
+        client = self.pool.client("a")
+        client._set_token(*client._token_snapshot()[:2], time.time() - 10)
+        self.pool.check_payment("a", "O3")
+        self.pool.check_payment("b", "O4")
+        self.assertEqual(self.server.auth_calls, ["user-a", "user-b", "user-a"])
+
+    def test_evict_idle(self):
+        """Les marchands inactifs sont évincés, pas leurs identifiants"""
+        self.pool.check_payment("a", "O1")
+        self.pool.check_payment("b", "O2")
+        in_flight = self.pool.client("b")  # b utilisé plus récemment
+        evicted = self.pool.evict_idle(time.monotonic() + 61)
+        self.assertEqual(evicted, 2)
+        # Un appel en cours avec un client évincé garde son jeton
+        self.assertTrue(in_flight.is_token_valid())
+        in_flight.check_payment("O2")
+        self.assertEqual(self.pool.snapshot()["active"], 0)
+        self.pool.check_payment("a", "O3")  # Recréé et réauthentifié
+        self.assertEqual(self.server.auth_calls, ["user-a", "user-b", "user-a"])
+        self.assertEqual(self.pool.stats, {"created": 3, "evicted": 2})
+        self.assertEqual(self.pool.evict_idle(), 0)
+
+    def test_replace_and_remove(self):
+        """Nouveaux identifiants : nouveau jeton ; marchand retiré : refusé"""
+        self.pool.check_payment("a", "O1")
+        self.pool.add_merchant("a", "user-a2", "pass", "secret-a", merchant_id="MA")
+        self.pool.check_payment("a", "O2")
+        self.assertEqual(self.server.auth_calls, ["user-a", "user-a2"])
+        self.pool.remove_merchant("a")
+        with self.assertRaises(KeyError):
+            self.pool.check_payment("a", "O3")
+        with self.assertRaises(KeyError):
+            self.pool.remove_merchant("inconnu")
+
+    def test_secrets_hidden(self):
+        """Les secrets n'apparaissent pas dans les représentations"""
+        text = repr(self.pool.credentials("a"))
+        self.assertNotIn("pass-a", text)
+        self.assertNotIn("secret-a", text)
+
+
+if __name__ == "__main__":
+    unittest.main()
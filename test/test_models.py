@@ -0,0 +1,235 @@
+"""
+Tests pour les résultats typés (fasoarzeka.models)
+"""
+
+import json
+import pickle
+import unittest
+from unittest.mock import patch
+
+import requests
+
+from fasoarzeka import ArzekaPayment
+from fasoarzeka.codec import get_codec
+from fasoarzeka.exceptions import ArzekaAPIError
+from fasoarzeka.models import (
+    AuthToken,
+    LazyResponse,
+    PaymentInitiation,
+    PaymentStatus,
+    SmsReceipt,
+    _scan_field,
+    _UNKNOWN,
+)
+
+STATUS_BODY = (
+    b'{"mappedOrderId": "ORDER1", "status": "SUCCESS", "transId": "T42", '
+    b'"amount": 1000, "operator": "ORANGE"}'
+)
+
+PAYMENT = {
+    "amount": 1000,
+    "merchant_id": "M1",
+    "link_for_update_status": "https://example.com/webhook",
+    "link_back_to_calling_website": "https://example.com/return",
+    "additional_info": {"firstname": "Awa", "lastname": "Ouedraogo", "mobile": "70"},
+    "hash_secret": "secret",
+    "mapped_order_id": "ORDER1",
+}
+
+
+def _response(content, status_code=200):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = content
+    return response
+
+
+class TestModels(unittest.TestCase):
+    """Tests des objets résultats"""
+
+    def test_slots(self):
+        """Pas de __dict__ par instance"""
+        status = PaymentStatus(STATUS_BODY)
+        self.assertFalse(hasattr(status, "__dict__"))
+        with self.assertRaises(AttributeError):
+            status.extra = 1
+
+    def test_payment_status_fields(self):
+        """Champs principaux et champs décodés à la demande"""
+        status = PaymentStatus(STATUS_BODY, get_codec("json"))
+        self.assertEqual(status.mapped_order_id, "ORDER1")
+        self.assertEqual(status.status, "SUCCESS")
+        self.assertEqual(status.transaction_id, "T42")
+        self.assertEqual(status.amount, 1000)
+        self.assertEqual(status.get("operator"), "ORANGE")
+        self.assertEqual(status["operator"], "ORANGE")
+        self.assertIsNone(status.get("absent"))
+        self.assertEqual(status.raw["transId"], "T42")
+        self.assertIn("SUCCESS", repr(status))
+
+    def test_status_interned(self):
+        """Les statuts identiques partagent la même chaîne"""
+        first = PaymentStatus(b'{"status": "PEND' + b'ING"}')
+        second = PaymentStatus(b'{"status": "PENDING"}')
+        self.assertIs(first.status, second.status)
+
+    def test_non_json_body(self):
+        """Corps non JSON conservé tel quel"""
+        receipt = SmsReceipt(b"OK")
+        self.assertIsNone(receipt.status)
+        self.assertIsNone(receipt.sms_id)
+        self.assertEqual(receipt.raw, {"raw_response": "OK"})
+
+    def test_sms_reference(self):
+        """Référence du SMS quel que soit le nom du champ"""
+        self.assertEqual(SmsReceipt(b'{"referenceId": "R1"}').sms_id, "R1")
+        self.assertEqual(SmsReceipt(b'{"smsId": "R2"}').sms_id, "R2")
+
+    def test_payment_initiation(self):
+        """Résultat d'initiation de paiement"""
+        initiation = PaymentInitiation(
+            b'{"url": "https://pay.example.com/x"}',
+            payment_data={"mappedOrderId": "ORDER1", "amount": 1000},
+        )
+        self.assertEqual(initiation.url, "https://pay.example.com/x")
+        self.assertEqual(initiation.mapped_order_id, "ORDER1")
+        self.assertEqual(initiation.amount, 1000)
+
+    def test_pickle(self):
+        """Les objets peuvent être envoyés à un autre processus"""
+        status = pickle.loads(pickle.dumps(PaymentStatus(STATUS_BODY)))
+        self.assertEqual(status.status, "SUCCESS")
+        self.assertEqual(status.transaction_id, "T42")
+
+
+class TestLazyResponse(unittest.TestCase):
+    """Tests du décodage paresseux"""
+
+    def test_scan_without_decoding(self):
+        """Lecture d'un champ sans décoder le corps"""
+        response = LazyResponse(STATUS_BODY, get_codec("json"))
+        self.assertEqual(response["status"], "SUCCESS")
+        self.assertEqual(response["amount"], 1000)
+        self.assertFalse(response.decoded)
+        self.assertEqual(response.get("absent", "défaut"), "défaut")
+        self.assertTrue(response.decoded)
+
+    def test_scan_matches_decoder(self):
+        """Le balayage donne la même valeur que le décodeur, ou abandonne"""
+        bodies = [
+            b'{"status": "OK", "n": -5, "x": 1.5e3, "ok": true, "none": null}',
+            b'{"a": {"status": 1}, "status": "X"}',
+            b'{"status": "A", "status": "B"}',
+            b'{"x": "\\"status\\": 1", "status": 2}',
+            b'{"x": "{", "status": 2}',
+            b'{"status": "caf\\u00e9 \xc3\xa9"}',
+            b'[{"status": 1}]',
+            b"pas du json",
+        ]
+        for body in bodies:
+            for key in ("status", "n", "x", "ok", "none"):
+                with self.subTest(body=body, key=key):
+                    value = _scan_field(body, key)
+                    if value is not _UNKNOWN:
+                        self.assertEqual(value, json.loads(body)[key])
+
+    def test_mapping(self):
+        """Se comporte comme un dictionnaire en lecture"""
+        response = LazyResponse(STATUS_BODY)
+        self.assertEqual(response, json.loads(STATUS_BODY))
+        self.assertIn("transId", response)
+        self.assertEqual(len(response), 5)
+        self.assertEqual(dict(response)["operator"], "ORANGE")
+        self.assertIsInstance(response.decode(), dict)
+
+    def test_non_json_body(self):
+        """Corps non JSON"""
+        self.assertEqual(LazyResponse(b"OK")["raw_response"], "OK")
+
+
+class TestTypedClient(unittest.TestCase):
+    """Tests du client avec typed_results=True"""
+
+    def setUp(self):
+        self.client = ArzekaPayment(typed_results=True)
+        self.responses = []
+        self.patcher = patch.object(
+            self.client._session,
+            "request",
+            side_effect=lambda *args, **kwargs: self.responses.pop(0),
+        )
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.client.close()
+
+    def _authenticate(self):
+        self.responses.append(
+            _response(b'{"access_token": "jeton", "expires_in": 3600}')
+        )
+        return self.client.authenticate("user", "password")
+
+    def test_authenticate(self):
+        """authenticate renvoie un AuthToken"""
+        token = self._authenticate()
+        self.assertIsInstance(token, AuthToken)
+        self.assertEqual(token.access_token, "jeton")
+        self.assertEqual(token.token_type, "Bearer")
+        self.assertTrue(self.client.is_token_valid())
+
+    def test_check_payment(self):
+        """check_payment renvoie un PaymentStatus"""
+        self._authenticate()
+        self.responses.append(_response(STATUS_BODY))
+        status = self.client.check_payment("ORDER1")
+        self.assertIsInstance(status, PaymentStatus)
+        self.assertEqual(status.status, "SUCCESS")
+
+    def test_initiate_payment(self):
+        """initiate_payment renvoie un PaymentInitiation"""
+        self._authenticate()
+        self.responses.append(_response(b'{"url": "https://pay.example.com/x"}'))
+        initiation = self.client.initiate_payment(**PAYMENT)
+        self.assertIsInstance(initiation, PaymentInitiation)
+        self.assertEqual(initiation.mapped_order_id, "ORDER1")
+        self.assertEqual(initiation.payment_data["amount"], 1000)
+
+    def test_send_sms(self):
+        """send_sms renvoie un SmsReceipt"""
+        self._authenticate()
+        self.responses.append(_response(b'{"status": "SENT", "referenceId": "R1"}'))
+        receipt = self.client.send_sms("22670123456", "Bonjour")
+        self.assertIsInstance(receipt, SmsReceipt)
+        self.assertEqual(receipt.sms_id, "R1")
+
+    def test_errors_still_raised(self):
+        """Les erreurs HTTP lèvent toujours ArzekaAPIError"""
+        self._authenticate()
+        self.responses.append(_response(b'{"message": "inconnu"}', 404))
+        with self.assertRaises(ArzekaAPIError) as context:
+            self.client.check_payment("ORDER1")
+        self.assertEqual(context.exception.status_code, 404)
+
+    def test_lazy_responses(self):
+        """lazy_responses renvoie des LazyResponse"""
+        self.client.typed_results = False
+        self.client.lazy_responses = True
+        self._authenticate()
+        self.assertTrue(self.client.is_token_valid())
+        self.responses.append(_response(STATUS_BODY))
+        response = self.client.check_payment("ORDER1")
+        self.assertIsInstance(response, LazyResponse)
+        self.assertEqual(response["status"], "SUCCESS")
+
+    def test_default_dicts(self):
+        """Sans l'option, les résultats restent des dictionnaires"""
+        self.client.typed_results = False
+        self._authenticate()
+        self.responses.append(_response(STATUS_BODY))
+        self.assertIsInstance(self.client.check_payment("ORDER1"), dict)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+"""
+Tests pour la normalisation des numéros par lots
+"""
+
+import io
+import os
+import tempfile
+import unittest
+
+from fasoarzeka import normalize_msisdns, stream_msisdns, validate_msisdns
+from fasoarzeka.utils import format_msisdn, validate_phone_number
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+NUMBERS = [
+    "+226 70 12 34 56",
+    "226-70-12-34-56",
+    "(226) 70123456",
+    "0022670123456",
+    "70123456",
+    "22570123456",
+    "+225 07 12 34 56 78",
+    "2267012345a",
+    "123",
+    "",
+]
+
+
+class TestNormalizeMsisdns(unittest.TestCase):
+    """Tests de normalize_msisdns"""
+
+    def test_list(self):
+        """Normalisation et masque de validité"""
+        normalized, valid = normalize_msisdns(NUMBERS)
+        self.assertEqual(normalized[0], "22670123456")
+        self.assertEqual(normalized[3], "22670123456")
+        self.assertEqual(normalized[4], "70123456")
+        self.assertEqual(
+            valid, [True, True, True, True, False, False, True, False, False, False]
+        )
+
+    def test_default_country_code(self):
+        """Les numéros nationaux reçoivent l'indicatif par défaut"""
+        normalized, valid = normalize_msisdns(["70123456"], default_country_code="226")
+        self.assertEqual(normalized, ["22670123456"])
+        self.assertEqual(valid, [True])
+
+    def test_country_table(self):
+        """Table d'indicatifs personnalisée"""
+        valid = validate_msisdns(NUMBERS[:2] + NUMBERS[6:7], country_codes={"225": 10})
+        self.assertEqual(valid, [False, False, True])
+
+    def test_matches_single_number_functions(self):
+        """Même résultat que format_msisdn et validate_phone_number"""
+        normalized, valid = normalize_msisdns(NUMBERS, country_codes={"226": 8})
+        for number, cleaned, ok in zip(NUMBERS, normalized, valid):
+            if not number.startswith("00"):
+                self.assertEqual(cleaned, format_msisdn(number))
+                self.assertEqual(ok, validate_phone_number(number))
+
+    def test_line_break_fallback(self):
+        """Un numéro contenant un saut de ligne reste aligné"""
+        normalized, valid = normalize_msisdns(["226\n70123456", "+226 70123456"])
+        self.assertEqual(normalized, ["226\n70123456", "22670123456"])
+        self.assertEqual(valid, [False, True])
+
+    @unittest.skipIf(np is None, "numpy non installé")
+    def test_numpy(self):
+        """Le chemin NumPy donne les mêmes résultats"""
+        normalized, valid = normalize_msisdns(NUMBERS, default_country_code="226")
+        array_normalized, array_valid = normalize_msisdns(
+            np.array(NUMBERS), default_country_code="226"
+        )
+        self.assertIsInstance(array_valid, np.ndarray)
+        self.assertEqual(array_normalized.tolist(), normalized)
+        self.assertEqual(array_valid.tolist(), valid)
+
+
+class TestStreamMsisdns(unittest.TestCase):
+    """Tests de stream_msisdns"""
+
+    def test_stream_file_object(self):
+        """Lecture par blocs d'un fichier ouvert"""
+        source = io.StringIO("\n".join(NUMBERS) + "\n")
+        results = list(stream_msisdns(source, chunk_size=3))
+        normalized, valid = normalize_msisdns(NUMBERS)
+        self.assertEqual(results, list(zip(normalized, valid)))
+
+    def test_stream_path(self):
+        """Lecture depuis un chemin"""
+        with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as handle:
+            handle.write("+226 70 12 34 56\n70123456\n")
+        try:
+            results = list(stream_msisdns(handle.name, default_country_code="226"))
+        finally:
+            os.unlink(handle.name)
+        self.assertEqual(results, [("22670123456", True), ("22670123456", True)])
+
+
+if __name__ == "__main__":
+    unittest.main()
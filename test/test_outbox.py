@@ -0,0 +1,210 @@
+"""
+Tests pour la file d'envoi durable (fasoarzeka.outbox)
+"""
+
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+
+from fasoarzeka.exceptions import (
+    ArzekaAPIError,
+    ArzekaConnectionError,
+    ArzekaValidationError,
+)
+from fasoarzeka.outbox import Outbox, OutboxWorker, is_retryable
+
+
+class FakeClient:
+    """Client simulé : enregistre les appels, échoue à la demande"""
+
+    def __init__(self, failures=()):
+        self.failures = list(failures)
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def send_sms(self, mobile, message):
+        with self.lock:
+            self.calls.append(("send_sms", mobile, message))
+            if self.failures:
+                raise self.failures.pop(0)
+        return {"status": "SENT"}
+
+    def initiate_payment(self, **kwargs):
+        with self.lock:
+            self.calls.append(("initiate_payment", kwargs["mapped_order_id"]))
+        return {"url": "https://pay/x"}, kwargs
+
+
+class TestOutbox(unittest.TestCase):
+    """Tests de la file d'envoi"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "outbox.db")
+        self.outbox = Outbox(self.path)
+
+    def tearDown(self):
+        self.outbox.close()
+        self.directory.cleanup()
+
+    def test_unsupported_operation(self):
+        """Seules les opérations prévues sont acceptées"""
+        with self.assertRaises(ArzekaValidationError):
+            self.outbox.enqueue("authenticate", username="u")
+
+    def test_durable(self):
+        """Les opérations survivent à la fermeture du processus"""
+        self.outbox.enqueue("send_sms", mobile="22670123456", message="Bonjour")
+        self.outbox.close()
+        self.outbox = Outbox(self.path)
+        self.assertEqual(len(self.outbox), 1)
+        job = self.outbox.claim()
+        self.assertEqual(job.arguments["mobile"], "22670123456")
+        self.assertEqual(job.attempts, 1)
+
+    def test_reference_fixed_at_enqueue(self):
+        """La référence de commande est fixée à la mise en file"""
+        self.outbox.enqueue("initiate_payment", amount=1000)
+        self.outbox.enqueue("initiate_payment", amount=1000, mapped_order_id="O1")
+        first, second = self.outbox.claim(), self.outbox.claim()
+        self.assertTrue(first.arguments["mapped_order_id"])
+        self.assertEqual(second.arguments["mapped_order_id"], "O1")
+
+    def test_lease(self):
+        """Un travail réclamé est invisible jusqu'à l'expiration du bail"""
+        self.outbox.enqueue("send_sms", mobile="226", message="m")
+        job = self.outbox.claim(lease_timeout=0.05)
+        self.assertIsNone(self.outbox.claim())
+        time.sleep(0.06)
+        again = self.outbox.claim()
+        self.assertEqual(again.id, job.id)
+        self.assertEqual(again.attempts, 2)
+
+    def test_delay(self):
+        """Envoi différé"""
+        self.outbox.enqueue("send_sms", delay=60, mobile="226", message="m")
+        self.assertIsNone(self.outbox.claim())
+
+    def test_worker_success(self):
+        """Le worker vide la file"""
+        for index in range(5):
+            self.outbox.enqueue("send_sms", mobile=f"2267000000{index}", message="m")
+        client = FakeClient()
+        results = []
+        worker = OutboxWorker(
+            self.outbox, client, on_result=lambda job, result: results.append(result)
+        )
+        self.assertEqual(worker.drain()["succeeded"], 5)
+        self.assertEqual(len(self.outbox), 0)
+        self.assertEqual(len(results), 5)
+
+    def test_worker_retry_then_dead_letter(self):
+        """Erreurs temporaires réessayées, erreurs définitives mises de côté"""
+        self.outbox.enqueue("send_sms", mobile="226", message="temporaire")
+        client = FakeClient([ArzekaConnectionError("coupure")])
+        worker = OutboxWorker(self.outbox, client, retry_delay=0)
+        stats = worker.drain()
+        self.assertEqual((stats["retried"], stats["succeeded"]), (1, 1))
+
+        self.outbox.enqueue("send_sms", mobile="226", message="invalide")
+        client.failures = [ArzekaAPIError("refusé", status_code=400)]
+        worker.drain()
+        dead = self.outbox.dead_letters()
+        self.assertEqual(len(dead), 1)
+        self.assertEqual(dead[0]["arguments"]["message"], "invalide")
+        self.assertIn("ArzekaAPIError", dead[0]["last_error"])
+
+        self.outbox.requeue_dead_letter(dead[0]["id"])
+        self.assertEqual(worker.drain()["succeeded"], 2)
+        self.assertEqual(self.outbox.dead_letters(), [])
+
+    def test_max_attempts(self):
+        """Abandon après le nombre maximal de tentatives"""
+        self.outbox.enqueue("send_sms", mobile="226", message="m")
+        client = FakeClient([ArzekaConnectionError("coupure")] * 3)
+        worker = OutboxWorker(self.outbox, client, max_attempts=2, retry_delay=0)
+        stats = worker.drain()
+        self.assertEqual((stats["retried"], stats["dead"]), (1, 1))
+
+    def test_threads(self):
+        """Pool de threads : chaque travail est envoyé une fois"""
+        client = FakeClient()
+        with OutboxWorker(self.outbox, client, workers=4, poll_interval=0.01):
+            for index in range(40):
+                self.outbox.enqueue("send_sms", mobile=str(index), message="m")
+            deadline = time.monotonic() + 5
+            while len(self.outbox) and time.monotonic() < deadline:
+                time.sleep(0.01)
+        self.assertEqual(sorted(int(call[1]) for call in client.calls), list(range(40)))
+
+    def test_worker_survives_errors(self):
+        """Un rappel ou une erreur SQLite n'arrête pas les threads"""
+        client = FakeClient()
+        claim = self.outbox.claim
+        failures = [sqlite3.OperationalError("database is locked")]
+
+        def flaky_claim(lease_timeout):
+            if failures:
+                raise failures.pop()
+            return claim(lease_timeout)
+
+        def on_result(job, result):
+            raise RuntimeError("rappel en erreur")
+
+        self.outbox.claim = flaky_claim
+        worker = OutboxWorker(
+            self.outbox,
+            client,
+            workers=1,
+            poll_interval=0.01,
+            on_result=on_result,
+            error_backoff=0.01,
+        )
+        with self.assertLogs("fasoarzeka.outbox", "ERROR"), worker:
+            for index in range(3):
+                self.outbox.enqueue("send_sms", mobile=str(index), message="m")
+            deadline = time.monotonic() + 5
+            while len(self.outbox) and time.monotonic() < deadline:
+                time.sleep(0.01)
+        self.assertEqual(worker.stats["succeeded"], 3)
+        self.assertEqual(worker.stats["errors"], 4)
+
+    def test_hash_secret_not_stored(self):
+        """Le secret est fourni par le worker, jamais écrit dans la file"""
+        with self.assertRaises(ArzekaValidationError):
+            self.outbox.enqueue("initiate_payment", amount=1000, hash_secret="s")
+        self.outbox.enqueue("initiate_payment", amount=1000, mapped_order_id="O1")
+        results = []
+        worker = OutboxWorker(
+            self.outbox,
+            FakeClient(),
+            hash_secret="s",
+            on_result=lambda job, result: results.append(result[1]),
+        )
+        worker.drain()
+        self.assertEqual(results[0]["hash_secret"], "s")
+
+    def test_missing_hash_secret(self):
+        """Sans secret configuré, le paiement n'est pas réessayé"""
+        self.outbox.enqueue("initiate_payment", amount=1000, mapped_order_id="O1")
+        client = FakeClient()
+        stats = OutboxWorker(self.outbox, client, retry_delay=0).drain()
+        self.assertEqual((stats["retried"], stats["dead"]), (0, 1))
+        self.assertEqual(client.calls, [])
+        self.assertIn("hash_secret", self.outbox.dead_letters()[0]["last_error"])
+
+    def test_is_retryable(self):
+        """Classification des erreurs"""
+        self.assertTrue(is_retryable(ArzekaConnectionError("x")))
+        self.assertTrue(is_retryable(ArzekaAPIError("x", status_code=503)))
+        self.assertTrue(is_retryable(ArzekaAPIError("x", status_code=429)))
+        self.assertFalse(is_retryable(ArzekaAPIError("x", status_code=404)))
+        self.assertFalse(is_retryable(ArzekaValidationError("x")))
+        self.assertFalse(is_retryable(TypeError("x")))
+
+
+if __name__ == "__main__":
+    unittest.main()
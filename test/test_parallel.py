@@ -0,0 +1,86 @@
+"""
+Tests pour la répartition sur plusieurs processus
+"""
+
+import os
+import pickle
+import time
+import unittest
+
+from fasoarzeka import ArzekaPayment, ClientSpec, process_map
+from fasoarzeka.exceptions import ArzekaAPIError, ArzekaValidationError
+
+
+def _token_and_pid(client, item):
+    return client._token, os.getpid(), item
+
+
+def _fail(client, item):
+    raise ArzekaAPIError("boom", status_code=503, response_data={"item": item})
+
+
+class TestClientSpec(unittest.TestCase):
+    """Tests de ClientSpec"""
+
+    def setUp(self):
+        self.client = ArzekaPayment(
+            timeout=12, operation_timeouts={"check_payment": 3}, pool_maxsize=4
+        )
+        self.client._token = "jeton"
+        self.client._token_type = "Bearer"
+        self.client._expires_at = time.time() + 3600
+        self.client._username = "user"
+        self.client._password = "pass"
+
+    def tearDown(self):
+        self.client.close()
+
+    def test_roundtrip(self):
+        """Le spec se sérialise et reconstruit un client équivalent"""
+        spec = pickle.loads(pickle.dumps(ClientSpec.from_client(self.client)))
+        client = spec.build()
+        try:
+            self.assertEqual(client.base_url, self.client.base_url)
+            self.assertEqual(client.timeout, 12)
+            self.assertEqual(client.operation_timeouts["check_payment"], 3)
+            self.assertEqual(client.pool_maxsize, 4)
+            self.assertTrue(client.is_token_valid())
+            self.assertEqual(client._password, "pass")
+        finally:
+            client.close()
+
+    def test_without_credentials(self):
+        """Les identifiants peuvent être exclus"""
+        spec = ClientSpec.from_client(self.client, include_credentials=False)
+        self.assertIsNone(spec.username)
+        self.assertIsNone(spec.password)
+        self.assertEqual(spec.token, "jeton")
+        self.assertNotIn("jeton", repr(spec))
+
+    def test_process_map(self):
+        """Les workers réutilisent le token du parent"""
+        results = process_map(self.client, _token_and_pid, range(6), processes=2)
+        self.assertEqual([item for _, _, item in results], list(range(6)))
+        self.assertTrue(all(token == "jeton" for token, _, _ in results))
+        self.assertNotIn(os.getpid(), {pid for _, pid, _ in results})
+
+    def test_process_map_method(self):
+        """Appel d'une méthode du client par son nom"""
+        results = process_map(self.client, "is_token_valid", [0, 60], processes=1)
+        self.assertEqual(results, [True, True])
+
+    def test_process_map_exceptions(self):
+        """Les erreurs gardent leurs détails d'un processus à l'autre"""
+        results = process_map(
+            self.client, _fail, [1], processes=1, return_exceptions=True
+        )
+        self.assertIsInstance(results[0], ArzekaAPIError)
+        self.assertEqual(results[0].status_code, 503)
+        self.assertEqual(results[0].response_data, {"item": 1})
+
+        with self.assertRaises(ArzekaValidationError):
+            process_map(self.client, "check_payment", [""], processes=1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,186 @@
+"""
+Tests pour les voies de priorité (fasoarzeka.priority)
+"""
+
+import asyncio
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+import requests
+
+from fasoarzeka import ArzekaPayment
+from fasoarzeka.bulk import bulk_map
+from fasoarzeka.exceptions import ArzekaTimeoutError
+from fasoarzeka.priority import (
+    BACKGROUND,
+    INTERACTIVE,
+    AsyncPriorityScheduler,
+    PriorityScheduler,
+    current_priority,
+    priority_scope,
+)
+from fasoarzeka.timeouts import deadline_scope
+
+
+def _hold(scheduler, lane, release, admitted, order=None):
+    """Occupe une place de la voie jusqu'à release"""
+    with scheduler.slot(lane):
+        if order is not None:
+            order.append(lane)
+        admitted.release()
+        release.wait(5)
+
+
+class TestPriorityScheduler(unittest.TestCase):
+    """Tests de l'ordonnanceur"""
+
+    def start(self, *args):
+        thread = threading.Thread(target=_hold, args=args, daemon=True)
+        thread.start()
+        return thread
+
+    def test_interactive_first(self):
+        """Une place libérée va d'abord à la voie interactive"""
+        scheduler = PriorityScheduler(2, limits={BACKGROUND: 2}, reserve=0)
+        admitted = threading.Semaphore(0)
+        first, rest = threading.Event(), threading.Event()
+        self.start(scheduler, BACKGROUND, first, admitted)
+        self.start(scheduler, BACKGROUND, rest, admitted)
+        admitted.acquire()
+        admitted.acquire()
+
+        order = []
+        waiters = [self.start(scheduler, BACKGROUND, rest, admitted, order)]
+        time.sleep(0.02)
+        waiters.append(self.start(scheduler, INTERACTIVE, rest, admitted, order))
+        time.sleep(0.02)
+        self.assertEqual(scheduler.snapshot()[BACKGROUND]["waiting"], 1)
+        self.assertEqual(scheduler.snapshot()[INTERACTIVE]["waiting"], 1)
+
+        first.set()  # Une seule place se libère
+        admitted.acquire()
+        self.assertEqual(order, [INTERACTIVE])
+        rest.set()
+        for thread in waiters:
+            thread.join(5)
+        self.assertEqual(order, [INTERACTIVE, BACKGROUND])
+        self.assertEqual(scheduler.stats[INTERACTIVE]["waited"], 1)
+
+    def test_budgets_and_reserve(self):
+        """Budget par voie, places réservées à la voie interactive"""
+        scheduler = PriorityScheduler(4, limits={BACKGROUND: 4}, reserve=1)
+        admitted = threading.Semaphore(0)
+        release = threading.Event()
+        threads = [
+            self.start(scheduler, BACKGROUND, release, admitted) for _ in range(4)
+        ]
+        for _ in range(3):
+            admitted.acquire()
+        time.sleep(0.02)
+        self.assertEqual(scheduler.snapshot()[BACKGROUND]["active"], 3)
+        with scheduler.slot(INTERACTIVE):  # La réserve reste disponible
+            self.assertEqual(scheduler.snapshot()[INTERACTIVE]["active"], 1)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(scheduler.stats[BACKGROUND]["admitted"], 4)
+
+    def test_deadline(self):
+        """L'attente d'une place respecte l'échéance"""
+        scheduler = PriorityScheduler(1)
+        with scheduler.slot():
+            with deadline_scope(0.02):
+                with self.assertRaises(ArzekaTimeoutError):
+                    with scheduler.slot():
+                        pass
+        self.assertEqual(scheduler.snapshot()[INTERACTIVE]["waiting"], 0)
+
+    def test_scope(self):
+        """La voie suit le contexte, y compris dans les threads de bulk_map"""
+        self.assertIsNone(current_priority())
+        with priority_scope(BACKGROUND):
+            lanes = [r.result for r in bulk_map(lambda _: current_priority(), "ab")]
+        self.assertEqual(lanes, [BACKGROUND, BACKGROUND])
+        lanes = [
+            r.result
+            for r in bulk_map(lambda _: current_priority(), "ab", priority="batch")
+        ]
+        self.assertEqual(lanes, ["batch", "batch"])
+        # Voie inconnue de l'ordonnanceur : priorité la plus basse
+        scheduler = PriorityScheduler(2)
+        with scheduler.slot("batch") as lane:
+            self.assertEqual(lane, BACKGROUND)
+
+    def test_async(self):
+        """Version asynchrone : la voie interactive passe devant"""
+        scheduler = AsyncPriorityScheduler(1)
+        order = []
+
+        async def call(lane, delay):
+            await asyncio.sleep(delay)
+            async with scheduler.slot(lane):
+                order.append(lane)
+                await asyncio.sleep(0.01)
+
+        async def main():
+            await asyncio.gather(
+                call(INTERACTIVE, 0),
+                call(BACKGROUND, 0.001),
+                call(INTERACTIVE, 0.002),
+            )
+
+        asyncio.run(main())
+        self.assertEqual(order, [INTERACTIVE, INTERACTIVE, BACKGROUND])
+
+    def test_async_cancelled_release(self):
+        """Une tâche annulée en rendant sa place ne la garde pas"""
+        scheduler = AsyncPriorityScheduler(1)
+
+        async def main():
+            done = asyncio.Event()
+
+            async def hold():
+                async with scheduler.slot(INTERACTIVE):
+                    await done.wait()
+
+            holder = asyncio.create_task(hold())
+            await asyncio.sleep(0)
+            waiter = asyncio.create_task(hold())
+            await asyncio.sleep(0)
+            # Le verrou est pris : la libération attend, puis est annulée
+            await scheduler._condition.acquire()
+            done.set()
+            await asyncio.sleep(0)
+            holder.cancel()
+            await asyncio.sleep(0)
+            scheduler._condition.release()
+            await asyncio.gather(holder, return_exceptions=True)
+            await asyncio.wait_for(waiter, 1)  # Réveillé par la libération
+
+        asyncio.run(main())
+        self.assertEqual(scheduler.snapshot()[INTERACTIVE]["active"], 0)
+
+
+class TestClientScheduler(unittest.TestCase):
+    """Le client passe par l'ordonnanceur"""
+
+    def test_execute_uses_lane(self):
+        scheduler = PriorityScheduler(4)
+        client = ArzekaPayment(scheduler=scheduler)
+        response = requests.Response()
+        response.status_code = 200
+        response._content = b'{"status": "SUCCESS"}'
+        client._token, client._expires_at = "jeton", time.time() + 3600
+        with patch.object(client._session, "request", return_value=response):
+            client.check_payment("O1")
+            with priority_scope(BACKGROUND):
+                client.check_payment("O2")
+        client.close()
+        self.assertEqual(scheduler.stats[INTERACTIVE]["admitted"], 1)
+        self.assertEqual(scheduler.stats[BACKGROUND]["admitted"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,183 @@
+"""
+Tests pour la couche protocole (sans I/O)
+"""
+
+import json
+import unittest
+from urllib.parse import parse_qs
+
+from fasoarzeka import protocol
+from fasoarzeka.exceptions import (
+    ArzekaAPIError,
+    ArzekaAuthenticationError,
+    ArzekaValidationError,
+)
+
+BASE = "https://example.com/"
+ENDPOINTS = protocol.Endpoints(BASE)
+
+
+def _payment(**overrides):
+    data = {
+        "amount": 1000,
+        "merchant_id": "M1",
+        "link_for_update_status": "https://example.com/webhook",
+        "link_back_to_calling_website": "https://example.com/return",
+        "additional_info": {"firstname": "A", "lastname": "B", "mobile": "70123456"},
+        "hash_secret": "secret",
+        "mapped_order_id": "ORDER1",
+    }
+    data.update(overrides)
+    return data
+
+
+class TestPrepare(unittest.TestCase):
+    """Tests de construction des requêtes"""
+
+    def test_prepare_authenticate(self):
+        """Requête d'authentification sans header Authorization"""
+        prepared = protocol.prepare_authenticate(ENDPOINTS, "user", "pass")
+        self.assertEqual(prepared.method, "POST")
+        self.assertTrue(prepared.url.endswith("auth/getToken"))
+        self.assertNotIn("Authorization", prepared.headers)
+        self.assertEqual(
+            parse_qs(prepared.body.decode())["grant_type"], ["access_token"]
+        )
+
+        with self.assertRaises(ArzekaValidationError):
+            protocol.prepare_authenticate(ENDPOINTS, "", "pass")
+
+    def test_build_headers(self):
+        """Header Authorization"""
+        headers = protocol.build_headers("Bearer", "tok", {"X-Test": "1"})
+        self.assertEqual(headers["Authorization"], "Bearer tok")
+        self.assertEqual(headers["X-Test"], "1")
+        self.assertNotIn("Authorization", protocol.DEFAULT_HEADERS)
+
+    def test_build_payment_data(self):
+        """Données de paiement signées"""
+        data = protocol.build_payment_data(**_payment())
+        self.assertEqual(data["mappedOrderId"], "ORDER1")
+        self.assertIn("hashString", data)
+        info = json.loads(data["additionalInfo"])
+        self.assertFalse(info["generateReceipt"])
+
+    def test_build_payment_data_validation(self):
+        """Validation des données de paiement"""
+        with self.assertRaises(ArzekaValidationError):
+            protocol.build_payment_data(**_payment(amount=50))
+        with self.assertRaises(ArzekaValidationError):
+            protocol.build_payment_data(**_payment(merchant_id=""))
+        with self.assertRaises(ArzekaValidationError):
+            protocol.build_payment_data(
+                **_payment(additional_info={"firstname": "A", "lastname": "B"})
+            )
+        with self.assertRaises(ArzekaValidationError):
+            protocol.build_payment_data(
+                **_payment(
+                    additional_info={
+                        "firstname": "A",
+                        "lastname": "B",
+                        "mobile": "1",
+                        "generateReceipt": True,
+                    }
+                )
+            )
+
+    def test_prepare_check_payment(self):
+        """Requête de vérification de paiement"""
+        prepared = protocol.prepare_check_payment(ENDPOINTS, {}, "ORDER1", "T1")
+        self.assertEqual(prepared.method, "POST")
+        self.assertIn("mappedOrderId=ORDER1", prepared.url)
+        self.assertIn("transId=T1", prepared.url)
+
+        with self.assertRaises(ArzekaValidationError):
+            protocol.prepare_check_payment(ENDPOINTS, {}, "")
+
+    def test_prepare_sms(self):
+        """Requêtes SMS"""
+        prepared = protocol.prepare_send_sms(ENDPOINTS, {}, "22670123456", "Bonjour")
+        self.assertEqual(prepared.body, b"msisdn=22670123456&message=Bonjour")
+
+        prepared = protocol.prepare_check_sms_status(ENDPOINTS, {}, "SMS1")
+        self.assertEqual(prepared.method, "GET")
+        self.assertIn("referenceid=SMS1", prepared.url)
+
+        with self.assertRaises(ArzekaValidationError):
+            protocol.prepare_send_sms(ENDPOINTS, {}, "22670123456", "")
+
+    def test_query_encoding(self):
+        """Les paramètres de requête sont encodés"""
+        prepared = protocol.prepare_check_payment(ENDPOINTS, {}, "A&B C")
+        self.assertTrue(prepared.url.endswith("?mappedOrderId=A%26B+C"))
+
+        prepared = protocol.prepare_request(
+            "GET", BASE, "x?a=1", {}, params={"b": "2", "c": None}
+        )
+        self.assertEqual(prepared.url, BASE + "x?a=1&b=2")
+
+    def test_encode_form(self):
+        """Encodage du corps de formulaire"""
+        body = protocol.encode_form({"amount": 1000, "skip": None, "ok": True})
+        self.assertEqual(body, b"amount=1000&ok=True")
+        self.assertIsNone(protocol.encode_form(None))
+
+    def test_endpoints(self):
+        """URLs absolues précalculées"""
+        self.assertEqual(
+            ENDPOINTS.check_payment,
+            BASE + protocol.PAYMENT_BASE_URL + protocol.PAYMENT_VERIFICATION_ENDPOINT,
+        )
+
+    def test_header_cache(self):
+        """Les headers ne sont reconstruits qu'au changement de token"""
+        cache = protocol.HeaderCache()
+        headers = cache.get("Bearer", "a")
+        self.assertIs(cache.get("Bearer", "a"), headers)
+
+        new_headers = cache.get("Bearer", "b")
+        self.assertIsNot(new_headers, headers)
+        self.assertEqual(new_headers["Authorization"], "Bearer b")
+
+    def test_unsupported_method(self):
+        """Méthode HTTP non supportée"""
+        with self.assertRaises(ValueError):
+            protocol.prepare_request("DELETE", BASE, "x", {})
+
+
+class TestParse(unittest.TestCase):
+    """Tests d'analyse des réponses"""
+
+    def test_parse_json(self):
+        """Réponse JSON"""
+        self.assertEqual(protocol.parse_response(200, b'{"a": 1}'), {"a": 1})
+
+    def test_parse_raw(self):
+        """Réponse non JSON"""
+        self.assertEqual(protocol.parse_response(200, b"OK"), {"raw_response": "OK"})
+
+    def test_parse_error(self):
+        """Réponse d'erreur HTTP"""
+        with self.assertRaises(ArzekaAPIError) as context:
+            protocol.parse_response(503, b"down", "https://example.com/x")
+        self.assertEqual(context.exception.status_code, 503)
+        self.assertEqual(context.exception.response_data, {"error": "down"})
+
+    def test_parse_auth_response(self):
+        """Réponse d'authentification"""
+        body = b'{"access_token": "tok", "expires_in": 60}'
+        token = protocol.parse_auth_response(200, body, now=1000.0)
+        self.assertEqual(token["access_token"], "tok")
+        self.assertEqual(token["token_type"], "Bearer")
+        self.assertEqual(token["expires_at"], 1060.0)
+
+        with self.assertRaises(ArzekaAuthenticationError):
+            protocol.parse_auth_response(200, b"not json", now=0)
+        with self.assertRaises(ArzekaAuthenticationError):
+            protocol.parse_auth_response(200, b"{}", now=0)
+        with self.assertRaises(ArzekaAPIError):
+            protocol.parse_auth_response(401, b'{"error": "bad"}', now=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+"""
+Tests pour le rapprochement des commandes (fasoarzeka.reconcile)
+"""
+
+import threading
+import time
+import unittest
+
+from fasoarzeka.exceptions import ArzekaAPIError, ArzekaConnectionError
+from fasoarzeka.ledger import PaymentLedger
+from fasoarzeka.reconcile import (
+    ERROR,
+    FULFILLED_UNPAID,
+    MATCHED,
+    MISSING,
+    PAID_UNFULFILLED,
+    Reconciler,
+    _timestamp,
+)
+
+
+class FakeClient:
+    """Client simulé : statuts de la passerelle par commande"""
+
+    def __init__(self, statuses):
+        self.statuses = statuses
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def check_payment(self, mapped_order_id, transaction_id=None):
+        with self.lock:
+            self.calls.append(mapped_order_id)
+        status = self.statuses.get(mapped_order_id)
+        if status is None:
+            raise ArzekaAPIError("commande inconnue", status_code=404)
+        if status == "COUPURE":
+            raise ArzekaConnectionError("coupure réseau")
+        return {"status": status, "transId": f"t-{mapped_order_id}"}
+
+
+ORDERS = [
+    {"mapped_order_id": "O1", "fulfilled": "1", "updated_at": "100"},
+    {"mapped_order_id": "O2", "fulfilled": "0", "updated_at": "100"},
+    {"mapped_order_id": "O3", "fulfilled": "oui", "updated_at": "100"},
+    {"mapped_order_id": "O4", "fulfilled": "0", "updated_at": "100"},
+    {"mapped_order_id": "O5", "fulfilled": "0", "updated_at": "100"},
+    {"mapped_order_id": "O6", "fulfilled": "1", "updated_at": "100"},
+]
+STATUSES = {
+    "O1": "SUCCESS",  # Concordant
+    "O2": "SUCCESS",  # Payé, non livré
+    "O3": "PENDING",  # Livré, non payé
+    # O4 : inconnue de la passerelle
+    "O5": "COUPURE",  # Vérification impossible
+    "O6": "FAILED",  # Livré, non payé
+}
+
+
+class TestReconciler(unittest.TestCase):
+    """Tests du rapprochement"""
+
+    def setUp(self):
+        self.ledger = PaymentLedger()
+        self.client = FakeClient(dict(STATUSES))
+
+    def tearDown(self):
+        self.ledger.close()
+
+    def report(self, reconciler, **kwargs):
+        return {
+            line.mapped_order_id: line.category
+            for line in reconciler.reconcile(ORDERS, **kwargs)
+        }
+
+    def test_categories(self):
+        """Chaque écart est classé"""
+        reconciler = Reconciler(self.client, concurrency=3)
+        self.assertEqual(
+            self.report(reconciler),
+            {
+                "O2": PAID_UNFULFILLED,
+                "O3": FULFILLED_UNPAID,
+                "O4": MISSING,
+                "O5": ERROR,
+                "O6": FULFILLED_UNPAID,
+            },
+        )
+        self.assertEqual(reconciler.stats["orders"], 6)
+        self.assertEqual(reconciler.stats["discrepancies"], 5)
+        self.assertEqual(self.report(reconciler, include_matched=True)["O1"], MATCHED)
+
+    def test_final_statuses_cached(self):
+        """Les statuts définitifs ne sont pas redemandés"""
+        reconciler = Reconciler(self.client, self.ledger)
+        self.report(reconciler)
+        self.client.calls.clear()
+        report = self.report(reconciler)
+        # O3 (PENDING), O4 (inconnue) et O5 (erreur) sont revérifiées
+        self.assertEqual(sorted(self.client.calls), ["O3", "O4", "O5"])
+        self.assertEqual(report["O2"], PAID_UNFULFILLED)
+        self.assertEqual(reconciler.stats["cached"], 3)
+
+    def test_incremental(self):
+        """Seules les commandes modifiées ou non définitives sont reprises"""
+        reconciler = Reconciler(self.client, self.ledger)
+        self.report(reconciler, incremental=True)
+        self.assertIsNotNone(self.ledger.last_reconciliation())
+
+        self.client.calls.clear()
+        self.client.statuses["O3"] = "SUCCESS"
+        report = self.report(reconciler, incremental=True)
+        self.assertEqual(sorted(self.client.calls), ["O3", "O4", "O5"])
+        self.assertNotIn("O3", report)  # Désormais concordante
+        self.assertNotIn("O2", report)  # Inchangée et définitive
+        self.assertEqual(reconciler.stats["skipped"], 3)
+
+        # Une commande modifiée depuis est comparée de nouveau
+        orders = [dict(ORDERS[1], fulfilled="1", updated_at=str(time.time()))]
+        lines = list(reconciler.reconcile(orders, incremental=True))
+        self.assertEqual(lines, [])
+        self.assertEqual(reconciler.stats[MATCHED], 1)
+
+    def test_incremental_requires_ledger(self):
+        """Le mode incrémental a besoin du registre"""
+        with self.assertRaises(ValueError):
+            list(Reconciler(self.client).reconcile(ORDERS, incremental=True))
+
+    def test_timestamp(self):
+        """Horodatages acceptés"""
+        self.assertEqual(_timestamp("1700000000"), 1700000000.0)
+        self.assertEqual(_timestamp("1970-01-01T00:01:00Z"), 60.0)
+        self.assertIsNone(_timestamp(""))
+        self.assertIsNone(_timestamp("hier"))
+
+
+if __name__ == "__main__":
+    unittest.main()
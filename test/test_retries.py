@@ -0,0 +1,190 @@
+"""
+Tests pour le budget de nouvelles tentatives (fasoarzeka.retries)
+"""
+
+import socket
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+from fasoarzeka import ArzekaPayment, RetryBudget
+from fasoarzeka.exceptions import (
+    ArzekaAPIError,
+    ArzekaConnectionError,
+    ArzekaPaymentError,
+    ArzekaTimeoutError,
+)
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Passerelle répondant toujours avec server.status"""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def _reply(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self.server.requests += 1
+        body = b'{"status": "SUCCESS"}'
+        self.send_response(self.server.status)
+        if self.server.retry_after is not None:
+            self.send_header("Retry-After", str(self.server.retry_after))
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = _reply
+
+    def log_message(self, *args):
+        pass
+
+
+def budgeted_client(base_url, budget):
+    """Client dont la session réessaie aussi en http://, sans attente"""
+    client = ArzekaPayment(base_url, retry_budget=budget)
+    adapter = client._session.get_adapter("https://")
+    adapter.max_retries.backoff_factor = 0
+    client._session.mount("http://", adapter)
+    client._set_token("tok", "Bearer", time.time() + 3600)
+    return client
+
+
+class TestRetryBudget(unittest.TestCase):
+    """Tests de la fenêtre glissante"""
+
+    def test_ratio_and_floor(self):
+        """Les tentatives suivent les succès, plus un minimum par seconde"""
+        budget = RetryBudget(ratio=0.5, min_per_second=0)
+        self.assertFalse(budget.withdraw())
+        budget.deposit()
+        budget.deposit()
+        self.assertTrue(budget.withdraw())
+        self.assertFalse(budget.withdraw())
+        self.assertEqual(budget.stats, {"allowed": 1, "denied": 2})
+
+        floor = RetryBudget(ratio=0, min_per_second=0.3, window=10)
+        self.assertEqual([floor.withdraw() for _ in range(4)], [True] * 3 + [False])
+
+    def test_window_expiry(self):
+        """Les tentatives sortent de la fenêtre après window secondes"""
+        budget = RetryBudget(ratio=0, min_per_second=0.1, window=10)
+        with patch("fasoarzeka.retries.time.monotonic", return_value=1000.0):
+            self.assertTrue(budget.withdraw())
+            self.assertFalse(budget.withdraw())
+        with patch("fasoarzeka.retries.time.monotonic", return_value=1010.0):
+            self.assertTrue(budget.withdraw())
+            self.assertEqual(budget.snapshot()["retries"], 1)
+
+    def test_invalid(self):
+        """Paramètres négatifs refusés"""
+        with self.assertRaises(ValueError):
+            RetryBudget(ratio=-1)
+        with self.assertRaises(ValueError):
+            RetryBudget(window=0)
+
+
+class TestBudgetedSession(unittest.TestCase):
+    """Tests de la session avec un budget"""
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.server.requests = 0
+        self.server.status = 503
+        self.server.retry_after = None
+        threading.Thread(
+            target=self.server.serve_forever, args=(0.05,), daemon=True
+        ).start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}/"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_outage_fails_fast(self):
+        """Budget épuisé : l'erreur 503 est rendue sans réessayer"""
+        budget = RetryBudget(ratio=0, min_per_second=0.2, window=10)
+        client = budgeted_client(self.base_url, budget)
+        for _ in range(2):
+            with self.assertRaises(ArzekaAPIError) as error:
+                client.check_payment("O1")
+            self.assertEqual(error.exception.status_code, 503)
+        # 1 + 2 tentatives, puis 1 seule requête une fois le budget épuisé
+        self.assertEqual(self.server.requests, 4)
+        self.assertEqual(budget.stats, {"allowed": 2, "denied": 2})
+        client.close()
+
+    def test_exhausted_call_not_charged(self):
+        """Seules les tentatives réellement envoyées sont décomptées"""
+        budget = RetryBudget(ratio=0, min_per_second=10)
+        client = budgeted_client(self.base_url, budget)
+        with self.assertRaises(ArzekaPaymentError):
+            client.check_payment("O1")
+        self.assertEqual(self.server.requests, 4)  # 1 + MAX_RETRIES
+        self.assertEqual(budget.stats["allowed"], self.server.requests - 1)
+        self.assertEqual(budget.snapshot()["retries"], 3)
+        client.close()
+
+    def test_successes_refill(self):
+        """Les réponses réussies alimentent le budget"""
+        budget = RetryBudget(ratio=0.5, min_per_second=0)
+        client = budgeted_client(self.base_url, budget)
+        self.server.status = 200
+        for _ in range(4):
+            client.check_payment("O1")
+        self.assertEqual(budget.snapshot()["available"], 2)
+        self.server.status = 503
+        with self.assertRaises(ArzekaAPIError):
+            client.check_payment("O1")
+        self.assertEqual(self.server.requests, 4 + 3)
+        client.close()
+
+    def test_deadline_stops_retries(self):
+        """Pas d'attente entre tentatives au-delà de l'échéance de l'appel"""
+        client = budgeted_client(self.base_url, None)
+        client._session.get_adapter("http://").max_retries.backoff_factor = 1
+        start = time.monotonic()
+        with self.assertRaises(ArzekaTimeoutError):
+            client.check_payment("O1", deadline=start + 2)
+        self.assertLess(time.monotonic() - start, 2)
+        # Seconde tentative immédiate, la suivante attendrait 2 s
+        self.assertEqual(self.server.requests, 2)
+
+        self.server.requests = 0
+        self.server.retry_after = 5
+        start = time.monotonic()
+        with self.assertRaises(ArzekaTimeoutError):
+            client.check_payment("O1", deadline=start + 2)
+        self.assertLess(time.monotonic() - start, 2)
+        self.assertEqual(self.server.requests, 1)
+        client.close()
+
+    def test_deadline_not_charged(self):
+        """Une tentative arrêtée par l'échéance rend sa part du budget"""
+        budget = RetryBudget(ratio=0, min_per_second=10)
+        client = budgeted_client(self.base_url, budget)
+        self.server.retry_after = 5
+        with self.assertRaises(ArzekaTimeoutError):
+            client.check_payment("O1", deadline=time.monotonic() + 2)
+        self.assertEqual(self.server.requests, 1)
+        self.assertEqual(budget.stats["allowed"], 0)
+        client.close()
+
+    def test_connection_errors(self):
+        """Les erreurs de connexion consomment aussi le budget"""
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            port = probe.getsockname()[1]  # Port fermé
+        budget = RetryBudget(ratio=0, min_per_second=0)
+        client = budgeted_client(f"http://127.0.0.1:{port}/", budget)
+        with self.assertRaises(ArzekaConnectionError):
+            client.check_payment("O1")
+        self.assertEqual(budget.stats, {"allowed": 0, "denied": 1})
+        client.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
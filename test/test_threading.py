@@ -0,0 +1,215 @@
+"""
+Tests de charge multi-threads (préparation pour CPython sans GIL)
+"""
+
+import os
+import sys
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import requests
+
+from fasoarzeka import arzeka, close_shared_client, protocol
+from fasoarzeka.arzeka import ArzekaPayment
+from fasoarzeka.protocol import HeaderCache
+
+THREADS = 16
+
+
+def _response(content=b"{}"):
+    response = requests.Response()
+    response.status_code = 200
+    response._content = content
+    return response
+
+
+class FakeServer:
+    """Serveur simulé : compte les authentifications, répond après un délai"""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.auth_calls = 0
+        self.tokens_seen = set()
+
+    def request(self, method, url, headers=None, **kwargs):
+        time.sleep(self.latency)
+        if url.endswith("auth/getToken"):
+            with self.lock:
+                self.auth_calls += 1
+                token = f"tok{self.auth_calls}"
+            return _response(
+                f'{{"access_token": "{token}", "expires_in": 3600}}'.encode()
+            )
+        with self.lock:
+            self.tokens_seen.add(headers["Authorization"])
+        return _response(b'{"status": "SUCCESS"}')
+
+
+class TestThreadSafety(unittest.TestCase):
+    """Tests de sûreté des threads"""
+
+    def setUp(self):
+        self.client = ArzekaPayment()
+        self.server = FakeServer(latency=0.01)
+        self.patcher = patch.object(
+            self.client._session, "request", side_effect=self.server.request
+        )
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.client.close()
+        close_shared_client()
+
+    def test_single_reauthentication(self):
+        """Un token expiré n'est renouvelé qu'une seule fois"""
+        self.client._set_token("old", "Bearer", time.time() - 10, "user", "pass")
+
+        barrier = threading.Barrier(THREADS)
+
+        def call(i):
+            barrier.wait()
+            return self.client.check_payment(f"ORDER{i}")
+
+        with ThreadPoolExecutor(THREADS) as executor:
+            results = list(executor.map(call, range(THREADS)))
+
+        self.assertEqual(self.server.auth_calls, 1)
+        self.assertEqual(self.server.tokens_seen, {"Bearer tok1"})
+        self.assertTrue(all(r["status"] == "SUCCESS" for r in results))
+
+    def test_token_snapshot_consistency(self):
+        """Le token et son type sont toujours lus ensemble"""
+        stop = threading.Event()
+        errors = []
+
+        def writer():
+            i = 0
+            while not stop.is_set():
+                i += 1
+                self.client._set_token(f"t{i}", f"T{i}", time.time() + 60)
+
+        def reader():
+            while not stop.is_set():
+                token, token_type, _ = self.client._token_snapshot()
+                if token is not None and token[1:] != token_type[1:]:
+                    errors.append((token, token_type))
+
+        threads = [threading.Thread(target=writer)] + [
+            threading.Thread(target=reader) for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.2)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+
+    def test_header_cache_consistency(self):
+        """Le cache de headers ne mélange jamais deux tokens"""
+        cache = HeaderCache()
+        tokens = [f"tok{i}" for i in range(8)]
+        errors = []
+
+        def worker(token):
+            for _ in range(2000):
+                headers = cache.get("Bearer", token)
+                if headers["Authorization"] != f"Bearer {token}":
+                    errors.append(token)
+
+        with ThreadPoolExecutor(len(tokens)) as executor:
+            list(executor.map(worker, tokens))
+
+        self.assertEqual(errors, [])
+
+    def test_shared_client_single_instance(self):
+        """Les threads obtiennent la même instance partagée"""
+        barrier = threading.Barrier(THREADS)
+
+        def get(_):
+            barrier.wait()
+            return arzeka._get_shared_client()
+
+        with ThreadPoolExecutor(THREADS) as executor:
+            clients = list(executor.map(get, range(THREADS)))
+
+        self.assertEqual(len({id(client) for client in clients}), 1)
+
+    def test_concurrent_requests_overlap(self):
+        """Smoke test : les requêtes simultanées ne sont pas sérialisées
+
+        Le serveur simulé ne fait qu'attendre : ce test mesure le
+        recouvrement des attentes réseau (vrai aussi avec le GIL), pas le
+        passage à l'échelle sur plusieurs cœurs.
+        """
+        self.client._set_token("tok", "Bearer", time.time() + 3600, "user", "pass")
+        requests_count = 64
+
+        def run(threads):
+            start = time.perf_counter()
+            with ThreadPoolExecutor(threads) as executor:
+                list(
+                    executor.map(
+                        lambda i: self.client.check_payment(f"ORDER{i}"),
+                        range(requests_count),
+                    )
+                )
+            return requests_count / (time.perf_counter() - start)
+
+        single = run(1)
+        parallel = run(THREADS)
+        self.assertGreater(parallel, 2 * single)
+
+
+@unittest.skipIf(
+    getattr(sys, "_is_gil_enabled", lambda: True)() or (os.cpu_count() or 1) < 4,
+    "CPython sans GIL et au moins 4 cœurs requis",
+)
+class TestFreeThreadedScaling(unittest.TestCase):
+    """Passage à l'échelle sur plusieurs cœurs (CPython sans GIL)"""
+
+    def test_cpu_bound_scaling(self):
+        """La préparation des paiements signés profite de plusieurs cœurs"""
+        client = ArzekaPayment()
+        client._set_token("tok", "Bearer", time.time() + 3600)
+        count = 2000
+
+        def build(_):
+            for i in range(count):
+                data = protocol.build_payment_data(
+                    amount=1000,
+                    merchant_id="M1",
+                    link_for_update_status="https://example.com/webhook",
+                    link_back_to_calling_website="https://example.com/return",
+                    additional_info={
+                        "firstname": "A",
+                        "lastname": "B",
+                        "mobile": "70123456",
+                    },
+                    hash_secret="secret",
+                    mapped_order_id=f"ORDER{i}",
+                )
+                protocol.prepare_initiate_payment(
+                    client._endpoints, client._get_headers(), data
+                )
+
+        def run(threads):
+            start = time.perf_counter()
+            with ThreadPoolExecutor(threads) as executor:
+                list(executor.map(build, range(threads)))
+            return threads * count / (time.perf_counter() - start)
+
+        single = run(1)
+        parallel = run(4)
+        client.close()
+        self.assertGreater(parallel, 2 * single)
+
+
+if __name__ == "__main__":
+    unittest.main()
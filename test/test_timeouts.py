@@ -0,0 +1,138 @@
+"""
+Tests pour les timeouts de connexion/lecture et les échéances
+"""
+
+import time
+import unittest
+from unittest.mock import patch
+
+import requests
+
+from fasoarzeka import ArzekaPayment, deadline_scope
+from fasoarzeka.exceptions import ArzekaConnectionError, ArzekaTimeoutError
+from fasoarzeka.timeouts import (
+    DEFAULT_CONNECT_TIMEOUT,
+    DEFAULT_OPERATION_TIMEOUTS,
+    current_deadline,
+    resolve_timeout,
+)
+
+
+def _response(content=b"{}"):
+    response = requests.Response()
+    response.status_code = 200
+    response._content = content
+    return response
+
+
+class TestResolveTimeout(unittest.TestCase):
+    """Tests de resolve_timeout"""
+
+    def test_without_deadline(self):
+        """Sans échéance les timeouts sont inchangés"""
+        self.assertEqual(resolve_timeout(5, 30), (5, 30))
+
+    def test_deadline_caps_timeouts(self):
+        """L'échéance limite les timeouts"""
+        connect, read = resolve_timeout(5, 30, time.monotonic() + 2)
+        self.assertLessEqual(connect, 2)
+        self.assertLessEqual(read, 2)
+
+    def test_expired_deadline(self):
+        """Une échéance dépassée lève ArzekaTimeoutError"""
+        with self.assertRaises(ArzekaTimeoutError):
+            resolve_timeout(5, 30, time.monotonic() - 1)
+
+    def test_deadline_scope(self):
+        """Les portées imbriquées ne peuvent que raccourcir l'échéance"""
+        self.assertIsNone(current_deadline())
+        with deadline_scope(1) as outer:
+            with deadline_scope(60) as inner:
+                self.assertEqual(inner, outer)
+                _, read = resolve_timeout(5, 30)
+                self.assertLessEqual(read, 1)
+        self.assertIsNone(current_deadline())
+
+
+class TestClientTimeouts(unittest.TestCase):
+    """Tests des timeouts par opération du client"""
+
+    def setUp(self):
+        self.client = ArzekaPayment(operation_timeouts={"check_payment": 2})
+        self.client._token = "tok"
+        self.client._expires_at = time.time() + 3600
+
+    def tearDown(self):
+        self.client.close()
+
+    def test_defaults(self):
+        """Valeurs par défaut"""
+        client = ArzekaPayment()
+        self.assertEqual(client.connect_timeout, DEFAULT_CONNECT_TIMEOUT)
+        self.assertEqual(client.operation_timeouts, DEFAULT_OPERATION_TIMEOUTS)
+        client.close()
+
+    def test_client_timeout(self):
+        """Un timeout donné au client s'applique à chaque opération"""
+        client = ArzekaPayment(timeout=60, operation_timeouts={"send_sms": 20})
+        client._set_token("tok", "Bearer", time.time() + 3600)
+        with patch.object(
+            client._session, "request", return_value=_response()
+        ) as mock_request:
+            client.check_payment("ORDER1")
+            self.assertEqual(
+                mock_request.call_args.kwargs["timeout"], (DEFAULT_CONNECT_TIMEOUT, 60)
+            )
+            client.send_sms("22670123456", "Bonjour")
+            self.assertEqual(
+                mock_request.call_args.kwargs["timeout"], (DEFAULT_CONNECT_TIMEOUT, 20)
+            )
+        client.close()
+
+    def test_operation_timeout(self):
+        """Chaque opération utilise son propre timeout de lecture"""
+        with patch.object(
+            self.client._session, "request", return_value=_response()
+        ) as mock_request:
+            self.client.check_payment("ORDER1")
+            self.assertEqual(
+                mock_request.call_args.kwargs["timeout"], (DEFAULT_CONNECT_TIMEOUT, 2)
+            )
+
+            self.client.send_sms("22670123456", "Bonjour")
+            self.assertEqual(
+                mock_request.call_args.kwargs["timeout"],
+                (DEFAULT_CONNECT_TIMEOUT, DEFAULT_OPERATION_TIMEOUTS["send_sms"]),
+            )
+
+    def test_call_deadline(self):
+        """L'échéance passée à l'appel limite le timeout"""
+        with patch.object(
+            self.client._session, "request", return_value=_response()
+        ) as mock_request:
+            self.client.check_payment("ORDER1", deadline=time.monotonic() + 0.5)
+            connect, read = mock_request.call_args.kwargs["timeout"]
+            self.assertLessEqual(connect, 0.5)
+            self.assertLessEqual(read, 0.5)
+
+    def test_expired_deadline_skips_request(self):
+        """Aucune requête n'est envoyée si l'échéance est dépassée"""
+        with patch.object(self.client._session, "request") as mock_request:
+            with self.assertRaises(ArzekaTimeoutError):
+                self.client.check_payment("ORDER1", deadline=time.monotonic() - 1)
+            mock_request.assert_not_called()
+
+    def test_transport_timeout(self):
+        """Un timeout de transport devient ArzekaTimeoutError"""
+        with patch.object(
+            self.client._session,
+            "request",
+            side_effect=requests.exceptions.ReadTimeout("slow"),
+        ):
+            with self.assertRaises(ArzekaTimeoutError) as context:
+                self.client.check_payment("ORDER1")
+        self.assertIsInstance(context.exception, ArzekaConnectionError)
+
+
+if __name__ == "__main__":
+    unittest.main()
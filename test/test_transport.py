@@ -0,0 +1,139 @@
+"""
+Tests pour les transports HTTP/2 et le client asynchrone
+"""
+
+import time
+import unittest
+from unittest.mock import patch
+
+import httpx
+import requests
+
+from fasoarzeka import ArzekaPayment, AsyncArzekaPayment
+from fasoarzeka.exceptions import ArzekaAPIError, ArzekaConnectionError
+
+
+def _handler(request):
+    """Simule l'API Arzeka"""
+    if request.url.path.endswith("auth/getToken"):
+        return httpx.Response(
+            200,
+            json={"access_token": "tok", "token_type": "Bearer", "expires_in": 3600},
+        )
+    if request.url.path.endswith("app/getThirdPartyMapInfo"):
+        order_id = request.url.params["mappedOrderId"]
+        if order_id == "UNKNOWN":
+            return httpx.Response(404, json={"error": "not found"})
+        return httpx.Response(200, json={"mappedOrderId": order_id, "status": "OK"})
+    return httpx.Response(200, text="done")
+
+
+class TestHTTP2Transport(unittest.TestCase):
+    """Tests du transport HTTP/2 synchrone"""
+
+    def test_http2_session(self):
+        """Le client HTTP/2 utilise httpx"""
+        with ArzekaPayment(http2=True) as client:
+            self.assertTrue(client.http2)
+            self.assertIsInstance(client._session, httpx.Client)
+
+    def test_default_session(self):
+        """Par défaut le client utilise requests"""
+        with ArzekaPayment() as client:
+            self.assertFalse(client.http2)
+            self.assertIsInstance(client._session, requests.Session)
+
+    @patch("fasoarzeka.arzeka.http2_available", return_value=False)
+    def test_http2_fallback_when_unavailable(self, _mock):
+        """Sans httpx/h2 on retombe sur HTTP/1.1"""
+        with ArzekaPayment(http2=True) as client:
+            self.assertFalse(client.http2)
+            self.assertIsInstance(client._session, requests.Session)
+
+    def test_requests_through_httpx(self):
+        """Les appels passent par le client httpx"""
+        client = ArzekaPayment(http2=True)
+        client._session = httpx.Client(transport=httpx.MockTransport(_handler))
+
+        client.authenticate("user", "pass")
+        result = client.check_payment("ORDER1")
+        self.assertEqual(result["mappedOrderId"], "ORDER1")
+
+        with self.assertRaises(ArzekaAPIError) as context:
+            client.check_payment("UNKNOWN")
+        self.assertEqual(context.exception.status_code, 404)
+        client.close()
+
+    def test_httpx_connection_error(self):
+        """Les erreurs httpx deviennent ArzekaConnectionError"""
+
+        def failing(request):
+            raise httpx.ConnectError("boom", request=request)
+
+        client = ArzekaPayment(http2=True)
+        client._session = httpx.Client(transport=httpx.MockTransport(failing))
+        client._token = "tok"
+        client._expires_at = time.time() + 3600
+
+        with self.assertRaises(ArzekaConnectionError):
+            client.check_payment("ORDER1")
+        client.close()
+
+
+class TestAsyncClient(unittest.IsolatedAsyncioTestCase):
+    """Tests du client asynchrone"""
+
+    async def asyncSetUp(self):
+        self.client = AsyncArzekaPayment(http2=True)
+        await self.client._client.aclose()
+        self.client._client = httpx.AsyncClient(transport=httpx.MockTransport(_handler))
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+
+    async def test_authenticate_and_check(self):
+        """Authentification puis vérification asynchrone"""
+        auth = await self.client.authenticate("user", "pass")
+        self.assertEqual(auth["access_token"], "tok")
+        self.assertTrue(self.client.is_token_valid())
+
+        result = await self.client.check_payment("ORDER1")
+        self.assertEqual(result["status"], "OK")
+
+    async def test_reauth_is_shared(self):
+        """Une seule réauthentification pour des appels concurrents"""
+        import asyncio
+
+        await self.client.authenticate("user", "pass")
+        self.client._expires_at = time.time() - 10
+
+        with patch.object(
+            self.client, "authenticate", wraps=self.client.authenticate
+        ) as mock_auth:
+            await asyncio.gather(
+                *(self.client.check_payment(f"ORDER{i}") for i in range(5))
+            )
+        self.assertEqual(mock_auth.call_count, 1)
+
+    async def test_stream_check_payments(self):
+        """Flux de statuts, erreurs par commande"""
+        await self.client.authenticate("user", "pass")
+        outcomes = [
+            outcome
+            async for outcome in self.client.stream_check_payments(
+                ["O1", "UNKNOWN", "O2"], concurrency=2, ordered=True
+            )
+        ]
+        self.assertEqual([o.item for o in outcomes], ["O1", "UNKNOWN", "O2"])
+        self.assertEqual(outcomes[2].result["status"], "OK")
+        self.assertIsInstance(outcomes[1].error, ArzekaAPIError)
+
+    async def test_api_error(self):
+        """Les erreurs HTTP deviennent ArzekaAPIError"""
+        await self.client.authenticate("user", "pass")
+        with self.assertRaises(ArzekaAPIError):
+            await self.client.check_payment("UNKNOWN")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,141 @@
+"""
+Tests pour la validation des paiements par lots
+"""
+
+import unittest
+
+from fasoarzeka import protocol, validate_payment_batch
+from fasoarzeka.exceptions import ArzekaValidationError
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+
+def _payment(**overrides):
+    info = {"firstname": "Awa", "lastname": "Ouedraogo", "mobile": "70123456"}
+    info.update(overrides.pop("additional_info", {}))
+    payment = {"amount": 1000, "merchant_id": "M1", "additional_info": info}
+    payment.update(overrides)
+    return payment
+
+
+@unittest.skipIf(np is None, "numpy non installé")
+class TestValidatePaymentBatch(unittest.TestCase):
+    """Tests de validate_payment_batch"""
+
+    def test_columns(self):
+        """Validation de colonnes"""
+        report = validate_payment_batch(
+            {
+                "amount": np.array([1000, 50, 100, 5000.5]),
+                "merchant_id": ["M1", "M1", "", "M2"],
+                "firstname": ["Awa", "Issa", "Ali", "Fati"],
+                "lastname": ["Ouedraogo", "", "Sawadogo", "Kabore"],
+                "mobile": ["70123456", "76543210", None, "71234567"],
+            }
+        )
+        self.assertEqual(report.valid.tolist(), [True, False, False, True])
+        self.assertEqual(report.invalid_rows, [1, 2])
+        self.assertEqual(len(report.errors[1]), 2)
+        self.assertEqual(len(report.errors[2]), 3)
+        self.assertFalse(report.is_valid)
+
+    def test_rows(self):
+        """Validation de lignes au format initiate_payment"""
+        report = validate_payment_batch(
+            [
+                _payment(),
+                _payment(amount="1000"),
+                _payment(amount=True),
+                _payment(merchant_id=None),
+                _payment(additional_info={"mobile": ""}),
+                _payment(amount=float("nan")),
+            ]
+        )
+        self.assertEqual(report.invalid_rows, [1, 2, 3, 4, 5])
+        self.assertEqual(report.errors[4], ["mobile cannot be empty or null"])
+
+    def test_numpy_scalars(self):
+        """Un montant NumPy validé par lot est accepté par initiate_payment"""
+        amounts = np.array([1000, 50], dtype=np.int64)
+        report = validate_payment_batch(
+            [_payment(amount=amounts[0]), _payment(amount=amounts[1])]
+        )
+        self.assertEqual(report.invalid_rows, [1])
+
+        signing = {
+            "link_for_update_status": "https://example.com/webhook",
+            "link_back_to_calling_website": "https://example.com/return",
+            "hash_secret": "secret",
+            "mapped_order_id": "ORDER1",
+        }
+        data = protocol.build_payment_data(
+            **_payment(amount=amounts[0], merchant_id=np.int64(7)), **signing
+        )
+        self.assertEqual(
+            data, protocol.build_payment_data(**_payment(merchant_id=7), **signing)
+        )
+        self.assertIs(type(data["amount"]), int)
+        with self.assertRaises(ArzekaValidationError):
+            protocol.build_payment_data(**_payment(amount=amounts[1]), **signing)
+
+    def test_receipt_fields(self):
+        """Champs requis quand un reçu est demandé"""
+        report = validate_payment_batch(
+            [
+                _payment(additional_info={"generateReceipt": True}),
+                _payment(
+                    additional_info={
+                        "generateReceipt": True,
+                        "paymentDescription": "Frais",
+                        "accountingOffice": "Ouaga",
+                        "accountantName": "Zongo",
+                    }
+                ),
+                _payment(additional_info={"generateReceipt": False}),
+            ]
+        )
+        self.assertEqual(report.invalid_rows, [0])
+        self.assertEqual(len(report.errors[0]), 3)
+
+    def test_receipt_fields_none(self):
+        """Clé de reçu présente à None : acceptée, comme par initiate_payment"""
+        payment = _payment(
+            additional_info={
+                "generateReceipt": True,
+                "paymentDescription": None,
+                "accountingOffice": None,
+                "accountantName": None,
+            }
+        )
+        protocol.validate_additional_info(dict(payment["additional_info"]))
+        self.assertTrue(validate_payment_batch([payment]).is_valid)
+
+    def test_missing_column(self):
+        """Une colonne absente invalide toutes les lignes"""
+        report = validate_payment_batch(
+            {"amount": [1000, 2000], "merchant_id": ["M1", "M1"]}
+        )
+        self.assertEqual(report.invalid_rows, [0, 1])
+        self.assertIn("firstname cannot be empty or null", report.errors[0])
+
+    def test_length_mismatch(self):
+        """Colonnes de longueurs différentes"""
+        with self.assertRaises(ArzekaValidationError):
+            validate_payment_batch({"amount": [1000], "merchant_id": ["M1", "M2"]})
+
+    def test_raise_for_errors(self):
+        """Résumé des erreurs"""
+        validate_payment_batch([_payment()]).raise_for_errors()
+
+        report = validate_payment_batch([_payment(amount=1)] * 15)
+        with self.assertRaises(ArzekaValidationError) as context:
+            report.raise_for_errors()
+        self.assertIn("15 of 15", str(context.exception))
+        self.assertIn("and 5 more row(s)", str(context.exception))
+
+
+if __name__ == "__main__":
+    unittest.main()